@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+bench_capture_process.py - 截图子进程对界面响应的影响
+
+在Qt事件循环中以固定间隔触发定时器，统计定时器的延迟（界面事件延迟），同时让屏幕监控
+以最高频率对合成的大尺寸画面截图和比较，分别在本进程线程中（capture_process.enabled=false）
+和截图子进程中运行，对比界面事件延迟和截图速率；off为不运行屏幕监控的基线。
+合成截图与pyautogui相同，经过PIL图像转数组和RGB转BGR，每帧有一块移动的变化区域。
+
+用法示例:
+    QT_QPA_PLATFORM=offscreen python benchmarks/bench_capture_process.py --duration 5
+    QT_QPA_PLATFORM=offscreen python benchmarks/bench_capture_process.py --width 1920 --height 1080 --interval 0.05
+"""
+
+import os
+import sys
+import time
+import argparse
+import contextlib
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from benchmarks.common import run_metadata, write_results, summarize
+from benchmarks.fakes import FakeChat, RecordingClipboard, RecordingPyAutoGUI, installed_input_stubs
+
+_base_images = {}
+_frame_counter = [0]
+
+
+def synthetic_grab(region=None):
+    """合成截图：固定的随机背景上有一块每帧移动的矩形（截图子进程中通过名称导入调用）"""
+    import cv2
+    from PIL import Image
+    width, height = (region[2], region[3]) if region else (1920, 1080)
+    base = _base_images.get((width, height))
+    if base is None:
+        rng = np.random.default_rng(0)
+        base = _base_images[(width, height)] = rng.integers(0, 255, (height, width, 3), dtype=np.uint8)
+    _frame_counter[0] += 1
+    i = _frame_counter[0]
+    image = Image.fromarray(base)
+    x, y = (i * 53) % max(1, width - 200), (i * 37) % max(1, height - 100)
+    image.paste((i % 256, 0, 0), (x, y, x + 200, y + 100))
+    return cv2.cvtColor(np.asarray(image), cv2.COLOR_RGB2BGR)
+
+
+def run_mode(mode, args, app):
+    """运行一种模式，返回界面定时器延迟和截图速率"""
+    from PyQt5.QtCore import QTimer, QEventLoop
+    from modules.screen_monitor import ScreenMonitor
+
+    monitor = None
+    if mode != 'off':
+        options = {'enabled': mode == 'process',
+                   'grab': 'benchmarks.bench_capture_process:synthetic_grab'}
+        monitor = ScreenMonitor(confidence_threshold=0.5, check_interval=args.interval, capture_process=options)
+        monitor.update_detection_region(0, 0, args.width, args.height)
+        monitor.capture_screen = lambda: synthetic_grab(monitor.detection_region)
+        monitor.start_monitoring()
+        time.sleep(args.warmup)  # 子进程启动和第一帧
+
+    lateness = []
+    expected = [time.perf_counter() + args.tick / 1000.0]
+
+    def on_tick():
+        now = time.perf_counter()
+        lateness.append(max(0.0, now - expected[0]))
+        expected[0] = now + args.tick / 1000.0
+
+    timer = QTimer()
+    timer.setTimerType(0)  # Qt.PreciseTimer
+    timer.timeout.connect(on_tick)
+    loop = QEventLoop()
+    frames_before = monitor.get_stats()['frames'] if monitor else 0
+    start = time.perf_counter()
+    timer.start(args.tick)
+    QTimer.singleShot(int(args.duration * 1000), loop.quit)
+    loop.exec_()
+    timer.stop()
+    elapsed = time.perf_counter() - start
+
+    result = {'gui_latency': summarize(lateness), 'ticks': len(lateness)}
+    if monitor is not None:
+        stats = monitor.get_stats()
+        result.update({'frames': stats['frames'] - frames_before,
+                       'capture_fps': (stats['frames'] - frames_before) / elapsed,
+                       'changes': stats['changes'], 'dropped_events': stats['dropped_events']})
+        monitor.stop_monitoring()
+    else:
+        result.update({'frames': 0, 'capture_fps': 0.0, 'changes': 0, 'dropped_events': 0})
+    result['stages'] = {'gui_latency': result['gui_latency']}
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='截图子进程对界面响应的影响')
+    parser.add_argument('--modes', default='off,thread,process', help='逗号分隔：off, thread, process')
+    parser.add_argument('--duration', type=float, default=5.0, help='每种模式的测量时长（秒）')
+    parser.add_argument('--width', type=int, default=3840, help='截图区域宽度')
+    parser.add_argument('--height', type=int, default=2160, help='截图区域高度')
+    parser.add_argument('--interval', type=float, default=0.0, help='check_interval（秒），0为尽可能快')
+    parser.add_argument('--tick', type=int, default=10, help='界面定时器间隔（毫秒）')
+    parser.add_argument('--warmup', type=float, default=1.5, help='启动屏幕监控后开始测量前的等待（秒）')
+    parser.add_argument('--output', help='结果JSON文件路径，默认写入benchmarks/results/')
+    parser.add_argument('--verbose', action='store_true', help='保留被测代码的控制台输出')
+    args = parser.parse_args()
+
+    from PyQt5.QtWidgets import QApplication
+    app = QApplication.instance() or QApplication(sys.argv)
+
+    clipboard_stub = RecordingClipboard()
+    pyautogui_stub = RecordingPyAutoGUI(clipboard_stub, FakeChat(), screen_size=(args.width, args.height))
+    results = {'meta': run_metadata('capture_process', args), 'scenarios': {}}
+    with installed_input_stubs(pyautogui_stub, clipboard_stub):
+        for mode in args.modes.split(','):
+            quiet = contextlib.nullcontext() if args.verbose else \
+                contextlib.redirect_stdout(open(os.devnull, 'w', encoding='utf-8'))
+            with quiet:
+                results['scenarios'][mode] = run_mode(mode, args, app)
+
+    print(f"截图区域 {args.width}x{args.height}，界面定时器 {args.tick}ms")
+    print(f"{'模式':<10}{'截图/秒':>10}{'延迟p50(ms)':>14}{'p95(ms)':>10}{'p99(ms)':>10}{'最大(ms)':>10}{'丢弃事件':>10}")
+    for mode, data in results['scenarios'].items():
+        latency = data['gui_latency']
+        print(f"{mode:<10}{data['capture_fps']:>10.1f}{latency['p50_ms']:>14.2f}{latency['p95_ms']:>10.2f}"
+              f"{latency['p99_ms']:>10.2f}{latency['max_ms']:>10.2f}{data['dropped_events']:>10}")
+
+    output = write_results('capture_process', results, args.output)
+    print(f"\n📄 结果已写入: {output}")
+
+
+if __name__ == '__main__':
+    main()
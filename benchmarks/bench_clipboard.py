@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+bench_clipboard.py - 剪贴板后端基准测试
+
+测量各后端单次 copy / paste 的耗时，以及"聊天窗口"复制文本后
+wait_for_change 被唤醒的延迟（对应自动复制周期中Ctrl+C之后的等待）。
+"聊天窗口"由另一个独立的X11剪贴板连接模拟。
+
+需要X11显示，且pyperclip需要安装xclip或xsel:
+    xvfb-run -a python benchmarks/bench_clipboard.py
+"""
+
+import os
+import sys
+import time
+import argparse
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.common import summarize, run_metadata, write_results
+from modules.clipboard_backend import PyperclipBackend, X11ClipboardBackend
+
+
+def make_backend(name):
+    if name == 'x11':
+        return X11ClipboardBackend()
+    return PyperclipBackend()
+
+
+def timed_calls(operation, count):
+    durations = []
+    for i in range(count):
+        start = time.perf_counter()
+        operation(i)
+        durations.append(time.perf_counter() - start)
+    return durations
+
+
+def change_wake_latency(backend, chat, count, delay):
+    """聊天窗口在delay秒后取得剪贴板，统计从取得到wait_for_change返回的延迟"""
+    latencies, missed = [], 0
+    for i in range(count):
+        backend.clear()
+        token = backend.change_token()
+        copied_at = []
+
+        def chat_copy(index=i):
+            copied_at.append(time.perf_counter())
+            chat.copy(f"聊天消息 {index}")
+
+        timer = threading.Timer(delay, chat_copy)
+        timer.start()
+        changed = backend.wait_for_change(token, timeout=delay + 1.0)
+        woke_at = time.perf_counter()
+        timer.join()
+        if changed and copied_at:
+            latencies.append(max(0.0, woke_at - copied_at[0]))
+        else:
+            missed += 1
+    return latencies, missed
+
+
+def bench_backend(name, chat, count, delay, text_size):
+    backend = make_backend(name)
+    text = "消" * text_size
+    try:
+        result = {
+            'copy': summarize(timed_calls(lambda i: backend.copy(f"{i}{text}"), count)),
+        }
+        chat.copy(text)
+        result['paste'] = summarize(timed_calls(lambda i: backend.paste(), count))
+        latencies, missed = change_wake_latency(backend, chat, max(1, count // 5), delay)
+        result['change_wake'] = summarize(latencies)
+        result['change_missed'] = missed
+    finally:
+        backend.close()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='剪贴板后端基准测试')
+    parser.add_argument('--backends', default='x11,pyperclip', help='逗号分隔的后端名称')
+    parser.add_argument('--count', type=int, default=100, help='copy/paste的重复次数')
+    parser.add_argument('--delay', type=float, default=0.1, help='开始等待后聊天窗口多久复制（秒）')
+    parser.add_argument('--text-size', type=int, default=200, help='复制文本的字符数')
+    parser.add_argument('--output', help='结果JSON文件路径，默认写入benchmarks/results/')
+    args = parser.parse_args()
+
+    if not os.environ.get('DISPLAY'):
+        print("❌ 没有X11显示，请使用: xvfb-run -a python benchmarks/bench_clipboard.py")
+        return
+
+    chat = X11ClipboardBackend()  # 模拟聊天窗口
+    results = {'meta': run_metadata('clipboard', args), 'scenarios': {}}
+    try:
+        for name in args.backends.split(','):
+            try:
+                data = bench_backend(name, chat, args.count, args.delay, args.text_size)
+            except Exception as e:
+                print(f"⚠️ 后端 {name} 不可用: {e}")
+                continue
+            results['scenarios'][name] = data
+            print(f"{name:<10} copy p50 {data['copy']['p50_ms']:.2f}ms p95 {data['copy']['p95_ms']:.2f}ms  "
+                  f"paste p50 {data['paste']['p50_ms']:.2f}ms p95 {data['paste']['p95_ms']:.2f}ms  "
+                  f"变化唤醒 p50 {data['change_wake']['p50_ms']:.2f}ms "
+                  f"p95 {data['change_wake']['p95_ms']:.2f}ms (未唤醒 {data['change_missed']})")
+    finally:
+        chat.close()
+
+    output = write_results('clipboard', results, args.output)
+    print(f"\n📄 结果已写入: {output}")
+
+
+if __name__ == '__main__':
+    main()
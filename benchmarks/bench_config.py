@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+bench_config.py - 配置读取方式的微基准测试
+
+对比工作线程一个周期内读取所需配置的两种方式：
+ConfigLoader.get() 的点分路径查找与逐级字典查找，以及配置快照的属性读取；
+同时测量每次修改后重建快照的开销。
+
+用法示例:
+    python benchmarks/bench_config.py --number 200000
+"""
+
+import os
+import sys
+import timeit
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.common import run_metadata, write_results
+from modules.config_loader import ConfigLoader
+from modules.config_snapshot import build_snapshot
+
+
+def read_with_get(config):
+    """修改前一个自动复制周期内的配置读取"""
+    delay_scale = float(config.get('humanize_delay_scale', 1.0))
+    gate_enabled = config.get('monitoring', {}).get('change_gate_enabled', True)
+    rate_hz = config.get('mouse_move_rate_hz', 60)
+    trajectory = config.get('mouse_trajectory', 'eased')
+    ollama_config = config.get('ollama', {})
+    url = ollama_config.get('url', 'http://localhost:11434/api/generate')
+    model = config.get('ollama_model', ollama_config.get('model', 'llama2'))
+    interval = config.get('auto_copy_interval', 2)
+    pipeline_enabled = config.get('pipeline.enabled', True)
+    return delay_scale, gate_enabled, rate_hz, trajectory, url, model, interval, pipeline_enabled
+
+
+def read_with_snapshot(config):
+    """使用配置快照的同样读取"""
+    settings = config.snapshot()
+    auto_copy = settings.auto_copy
+    return (auto_copy.delay_scale, settings.monitoring.change_gate_enabled, auto_copy.mouse_move_rate_hz,
+            auto_copy.mouse_trajectory, settings.ollama.url, settings.ollama.model, auto_copy.interval,
+            auto_copy.pipeline_enabled)
+
+
+def per_call_ns(func, number, repeat):
+    return min(timeit.repeat(func, number=number, repeat=repeat)) / number * 1e9
+
+
+def main():
+    parser = argparse.ArgumentParser(description='配置读取方式的微基准测试')
+    parser.add_argument('--number', type=int, default=100000, help='每轮调用次数')
+    parser.add_argument('--repeat', type=int, default=5, help='重复轮数，取最快一轮')
+    parser.add_argument('--output', help='结果JSON文件路径，默认写入benchmarks/results/')
+    args = parser.parse_args()
+
+    config = ConfigLoader(os.path.join(os.path.dirname(__file__), '__bench_config__.json'))
+    config.set('monitoring.copy_area_coords', {'x': 520, 'y': 400})
+    config.set('monitoring.input_coords', {'x': 520, 'y': 900})
+    assert read_with_get(config) == read_with_snapshot(config)
+
+    data = {
+        'get_cycle_ns': per_call_ns(lambda: read_with_get(config), args.number, args.repeat),
+        'snapshot_cycle_ns': per_call_ns(lambda: read_with_snapshot(config), args.number, args.repeat),
+        'get_single_ns': per_call_ns(lambda: config.get('monitoring.change_gate_enabled', True),
+                                     args.number, args.repeat),
+        'snapshot_single_ns': per_call_ns(lambda: config.snapshot().monitoring.change_gate_enabled,
+                                          args.number, args.repeat),
+        'rebuild_us': per_call_ns(lambda: build_snapshot(config.config), max(1, args.number // 100),
+                                  args.repeat) / 1000.0,
+    }
+    results = {'meta': run_metadata('config', args), 'scenarios': {'reads': data}}
+
+    print(f"一个周期的配置读取: get() {data['get_cycle_ns']:.0f}ns  快照 {data['snapshot_cycle_ns']:.0f}ns  "
+          f"({data['get_cycle_ns'] / data['snapshot_cycle_ns']:.1f}x)")
+    print(f"单个嵌套键读取:     get() {data['get_single_ns']:.0f}ns  快照 {data['snapshot_single_ns']:.0f}ns")
+    print(f"每次修改后重建快照: {data['rebuild_us']:.1f}us")
+
+    output = write_results('config', results, args.output)
+    print(f"\n📄 结果已写入: {output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+bench_conversation_store.py - 会话存储的持续写入基准测试
+
+多个生产线程（代表捕获和推理线程）以最高速度或固定速率记录消息，同时一个查询线程不断查询
+最近历史和去重指纹。对比两种写入方式：
+  batched  ConversationStore：append()只放入队列，由写入线程合并为事务
+  direct   每次记录在调用线程中执行一次INSERT并提交（共用一个连接，加锁）
+统计持续写入速率（包括关闭时写完剩余消息的时间）、append()在调用线程中的耗时（即对捕获和推理
+路径的阻塞）以及查询耗时。
+
+用法示例:
+    python benchmarks/bench_conversation_store.py --duration 5
+    python benchmarks/bench_conversation_store.py --threads 8 --rate 10000 --modes batched
+"""
+
+import os
+import sys
+import time
+import shutil
+import sqlite3
+import argparse
+import tempfile
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.common import run_metadata, write_results, summarize, print_stage_table
+from modules.conversation_store import ConversationStore, ROLE_USER, ROLE_ASSISTANT, _SCHEMA, _INSERT
+from modules.dedup_store import text_fingerprint
+
+
+class DirectStore:
+    """对照组：在调用线程中逐条写入并提交"""
+
+    def __init__(self, path):
+        self.conn = sqlite3.connect(path, timeout=30.0, check_same_thread=False)
+        self.conn.executescript(_SCHEMA)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.lock = threading.Lock()
+        self.written = 0
+
+    def append(self, chat, role, text):
+        row = (chat, time.time(), role, text_fingerprint(text), text)
+        with self.lock:
+            with self.conn:
+                self.conn.execute(_INSERT, row)
+            self.written += 1
+        return True
+
+    def close(self):
+        self.conn.close()
+
+    def get_stats(self):
+        return {'written': self.written, 'dropped': 0, 'batches': self.written}
+
+
+def run_mode(mode, args):
+    workdir = tempfile.mkdtemp()
+    path = os.path.join(workdir, 'conversations.db')
+    store = ConversationStore(path, max_pending=args.max_pending) if mode == 'batched' else DirectStore(path)
+    # 查询使用独立的ConversationStore读连接（direct模式下同样通过WAL并发读取）
+    reader = store if mode == 'batched' else ConversationStore(path, retention_days=0)
+    stop = threading.Event()
+    append_times = [[] for _ in range(args.threads)]
+    query_times = {'recent': [], 'lookup': []}
+    text = '消息内容' * (args.text_chars // 4)
+
+    def produce(index):
+        samples = append_times[index]
+        chat = f"chat{index % args.chats}"
+        period = 1.0 / args.rate if args.rate else 0.0
+        next_at = time.perf_counter()
+        i = 0
+        while not stop.is_set():
+            start = time.perf_counter()
+            store.append(chat, ROLE_USER if i % 2 == 0 else ROLE_ASSISTANT, f"{text} {index}-{i}")
+            samples.append(time.perf_counter() - start)
+            i += 1
+            if period:
+                next_at += period
+                delay = next_at - time.perf_counter()
+                if delay > 0:
+                    stop.wait(delay)
+
+    def query():
+        i = 0
+        while not stop.is_set():
+            chat = f"chat{i % args.chats}"
+            start = time.perf_counter()
+            reader.recent(chat, limit=12)
+            query_times['recent'].append(time.perf_counter() - start)
+            start = time.perf_counter()
+            reader.lookup(f"{text} 0-{i}", chat=chat)
+            query_times['lookup'].append(time.perf_counter() - start)
+            i += 1
+            stop.wait(args.query_interval)
+
+    threads = [threading.Thread(target=produce, args=(n,), daemon=True) for n in range(args.threads)]
+    threads.append(threading.Thread(target=query, daemon=True))
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    time.sleep(args.duration)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    produced_at = time.perf_counter()
+    store.close()  # batched模式下写完队列中剩余的消息
+    finished = time.perf_counter()
+    if reader is not store:
+        reader.close()
+
+    stats = store.get_stats()
+    check = sqlite3.connect(path)
+    rows = check.execute("SELECT COUNT(*) FROM messages").fetchone()[0]
+    check.close()
+    shutil.rmtree(workdir, ignore_errors=True)
+
+    appends = [value for samples in append_times for value in samples]
+    return {
+        'appends': len(appends),
+        'rows': rows,
+        'dropped': stats['dropped'],
+        'batches': stats['batches'],
+        'inserts_per_sec': rows / (finished - start),
+        'drain_ms': (finished - produced_at) * 1000.0,
+        'stages': {
+            'append': summarize(appends),
+            'recent': summarize(query_times['recent']),
+            'lookup': summarize(query_times['lookup']),
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='会话存储的持续写入基准测试')
+    parser.add_argument('--modes', default='batched,direct', help='逗号分隔：batched, direct')
+    parser.add_argument('--duration', type=float, default=5.0, help='每种方式的写入时长（秒）')
+    parser.add_argument('--threads', type=int, default=4, help='生产线程数')
+    parser.add_argument('--rate', type=float, default=5000.0,
+                        help='每个线程每秒写入的消息数；0为不停地写入（生产线程会与写入线程争用GIL）')
+    parser.add_argument('--chats', type=int, default=4, help='聊天数量')
+    parser.add_argument('--text-chars', type=int, default=80, help='每条消息的大致字数')
+    parser.add_argument('--query-interval', type=float, default=0.005, help='查询线程两次查询之间的间隔（秒）')
+    parser.add_argument('--max-pending', type=int, default=10000, help='batched模式的队列容量')
+    parser.add_argument('--output', help='结果JSON文件路径，默认写入benchmarks/results/')
+    args = parser.parse_args()
+
+    results = {'meta': run_metadata('conversation_store', args), 'scenarios': {}}
+    for mode in args.modes.split(','):
+        data = results['scenarios'][mode] = run_mode(mode, args)
+        print_stage_table(f"{mode}: {data['inserts_per_sec']:.0f} 条/秒，写入 {data['rows']} 条"
+                          f"（丢弃 {data['dropped']}，{data['batches']} 个事务，收尾 {data['drain_ms']:.0f}ms）",
+                          data['stages'])
+
+    output = write_results('conversation_store', results, args.output)
+    print(f"\n📄 结果已写入: {output}")
+
+
+if __name__ == '__main__':
+    main()
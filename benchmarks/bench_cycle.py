@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+"""
+bench_cycle.py - 端到端消息→回复周期基准测试
+
+用记录型替身代替鼠标、键盘和剪贴板，用本地HTTP服务代替Ollama，
+连续执行N次 AutoCopyHandler.perform_auto_copy_cycle 和/或
+ChatAutomationApp.on_new_content，统计各阶段p50/p95/p99耗时和整体吞吐量。
+
+用法示例:
+    python benchmarks/bench_cycle.py --cycles 200
+    python benchmarks/bench_cycle.py --cycles 20 --delay-scale 1.0 --llm-latency 0.5
+    python benchmarks/bench_cycle.py --compare benchmarks/results/cycle_abc123_....json
+"""
+
+import os
+import sys
+import time
+import argparse
+import contextlib
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.common import (
+    summarize, run_metadata, write_results, print_stage_table, compare_results
+)
+from benchmarks.fakes import (
+    FakeChat, RecordingClipboard, RecordingPyAutoGUI, FakeOllamaServer, installed_input_stubs
+)
+
+CAPTURE_POINT = {'x': 520, 'y': 400}
+INPUT_POINT = {'x': 520, 'y': 900}
+
+
+def configure(config, server, delay_scale):
+    """把配置指向替身服务和固定坐标"""
+    config.set('ollama.url', f"{server.base_url}/api/generate")
+    config.set('ollama.model', server.server.model_name)
+    config.set('ollama_model', server.server.model_name)
+    config.set('monitoring.copy_area_coords', dict(CAPTURE_POINT))
+    config.set('monitoring.input_coords', dict(INPUT_POINT))
+    config.set('capture_point', dict(CAPTURE_POINT))
+    config.set('input_point', dict(INPUT_POINT))
+    config.set('humanize_delay_scale', delay_scale)
+    config.set('tracing.enabled', False)
+    config.set('clipboard_backend', 'pyperclip')  # 剪贴板替身通过pyperclip模块注入
+    config.set('input_backend', 'pyautogui')  # 输入替身通过pyautogui模块注入
+    config.set('conversation_store.enabled', False)  # 不把测量用的消息写入会话数据库
+
+
+def timed(method, sink):
+    """包装实例方法，把每次调用的起止时间追加到sink"""
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return method(*args, **kwargs)
+        finally:
+            sink.append((start, time.perf_counter()))
+    return wrapper
+
+
+def first_event_after(events, start, predicate):
+    """返回start之后第一个满足条件的事件时间"""
+    for event in events:
+        if event[0] >= start and predicate(event):
+            return event[0]
+    return None
+
+
+def bench_auto_copy(cycles, server, delay_scale, pyautogui_stub, clipboard_stub, message_every=1):
+    """对 AutoCopyHandler.perform_auto_copy_cycle 进行基准测试"""
+    from modules.config_loader import ConfigLoader
+    from modules.auto_copy_handler import AutoCopyHandler
+    from modules.input_backend import PyAutoGUIBackend
+
+    config = ConfigLoader(os.path.join(os.path.dirname(__file__), '__bench_config__.json'))
+    configure(config, server, delay_scale)
+    # 固定使用pyautogui后端，注入的是替身模块而不是真实的X11事件
+    handler = AutoCopyHandler(config, input_backend=PyAutoGUIBackend())
+    handler.is_running = True
+
+    llm_calls = []
+    handler.send_to_ollama_with_system_info = timed(handler.send_to_ollama_with_system_info, llm_calls)
+
+    stages = {'capture': [], 'llm': [], 'deliver': [], 'total': []}
+    completed = 0
+    wall_start = time.perf_counter()
+    for i in range(cycles):
+        if i % message_every == 0:
+            pyautogui_stub.chat.post_message()
+        start = time.perf_counter()
+        sent_before = len(pyautogui_stub.chat.sent_replies)
+        handler.perform_auto_copy_cycle()
+        end = time.perf_counter()
+
+        pasted_at = first_event_after(clipboard_stub.events, start, lambda e: e[1] == 'paste')
+        sent_at = first_event_after(pyautogui_stub.events, start,
+                                    lambda e: e[1] == 'press' and e[2] == ('enter',))
+        if pasted_at is not None:
+            stages['capture'].append(pasted_at - start)
+        if llm_calls and llm_calls[-1][0] >= start:
+            llm_start, llm_end = llm_calls[-1]
+            stages['llm'].append(llm_end - llm_start)
+            if sent_at is not None:
+                stages['deliver'].append(sent_at - llm_end)
+        stages['total'].append(end - start)
+        if len(pyautogui_stub.chat.sent_replies) > sent_before:
+            completed += 1
+    wall = time.perf_counter() - wall_start
+    handler.is_running = False
+
+    return {
+        'cycles': cycles,
+        'replies_sent': completed,
+        'wall_time_s': wall,
+        'throughput_per_s': completed / wall if wall > 0 else 0.0,
+        'skipped_cycles': handler.get_stats()['skipped_cycles'],
+        'dedup': handler.get_stats()['dedup'],
+        'stages': {name: summarize(values) for name, values in stages.items()},
+    }
+
+
+def bench_on_new_content(cycles, server, delay_scale, pyautogui_stub):
+    """对 ChatAutomationApp.on_new_content 进行基准测试"""
+    from main import ChatAutomationApp
+
+    app = ChatAutomationApp(os.path.join(os.path.dirname(__file__), '__bench_config__.json'))
+    # 子系统在第一次使用时按配置创建，因此先把配置指向替身
+    configure(app.config, server, delay_scale)
+    from modules.tracing import NULL_TRACER
+    app.tracer = NULL_TRACER
+
+    llm_calls, deliver_calls = [], []
+    app.ai_handler.get_ai_response = timed(app.ai_handler.get_ai_response, llm_calls)
+    app.send_response = timed(app.send_response, deliver_calls)
+
+    stages = {'llm': [], 'deliver': [], 'total': []}
+    completed = 0
+    wall_start = time.perf_counter()
+    for i in range(cycles):
+        sent_before = len(pyautogui_stub.chat.sent_replies)
+        start = time.perf_counter()
+        app.on_new_content(pyautogui_stub.chat.post_message())
+        end = time.perf_counter()
+        if llm_calls and llm_calls[-1][0] >= start:
+            stages['llm'].append(llm_calls[-1][1] - llm_calls[-1][0])
+        if deliver_calls and deliver_calls[-1][0] >= start:
+            stages['deliver'].append(deliver_calls[-1][1] - deliver_calls[-1][0])
+        stages['total'].append(end - start)
+        if len(pyautogui_stub.chat.sent_replies) > sent_before:
+            completed += 1
+    wall = time.perf_counter() - wall_start
+
+    return {
+        'cycles': cycles,
+        'replies_sent': completed,
+        'wall_time_s': wall,
+        'throughput_per_s': completed / wall if wall > 0 else 0.0,
+        'delivery': app.keyboard_sim.get_stats(),
+        'stages': {name: summarize(values) for name, values in stages.items()},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='端到端消息→回复周期基准测试')
+    parser.add_argument('--cycles', type=int, default=50, help='模拟的消息→回复周期数')
+    parser.add_argument('--scenario', choices=['auto_copy', 'on_new_content', 'all'], default='all')
+    parser.add_argument('--delay-scale', type=float, default=0.0,
+                        help='人性化延迟缩放系数，1.0为真实延迟，0为不等待')
+    parser.add_argument('--message-every', type=int, default=1,
+                        help='auto_copy场景中每隔多少个周期到达一条新消息，其余周期聊天窗口静止')
+    parser.add_argument('--llm-latency', type=float, default=0.0, help='Ollama替身的响应延迟（秒）')
+    parser.add_argument('--output', help='结果JSON文件路径，默认写入benchmarks/results/')
+    parser.add_argument('--compare', help='与之前的结果JSON文件对比')
+    parser.add_argument('--verbose', action='store_true', help='保留被测代码的控制台输出')
+    args = parser.parse_args()
+
+    chat = FakeChat()
+    clipboard_stub = RecordingClipboard()
+    pyautogui_stub = RecordingPyAutoGUI(clipboard_stub, chat)
+
+    results = {'meta': run_metadata('cycle', args), 'scenarios': {}}
+    with installed_input_stubs(pyautogui_stub, clipboard_stub), \
+            FakeOllamaServer(latency=args.llm_latency) as server:
+        quiet = contextlib.nullcontext() if args.verbose else \
+            contextlib.redirect_stdout(open(os.devnull, 'w', encoding='utf-8'))
+        with quiet:
+            if args.scenario in ('auto_copy', 'all'):
+                results['scenarios']['auto_copy'] = bench_auto_copy(
+                    args.cycles, server, args.delay_scale, pyautogui_stub, clipboard_stub,
+                    max(1, args.message_every))
+            if args.scenario in ('on_new_content', 'all'):
+                results['scenarios']['on_new_content'] = bench_on_new_content(
+                    args.cycles, server, args.delay_scale, pyautogui_stub)
+        results['llm_requests'] = server.request_count
+
+    for scenario, data in results['scenarios'].items():
+        skipped = f", 跳过 {data['skipped_cycles']} 个" if 'skipped_cycles' in data else ""
+        print_stage_table(f"{scenario} ({data['replies_sent']}/{data['cycles']} 条回复{skipped}, "
+                          f"{data['throughput_per_s']:.2f} 周期/秒)", data['stages'])
+
+    output = write_results('cycle', results, args.output)
+    print(f"\n📄 结果已写入: {output}")
+    if args.compare:
+        compare_results(args.compare, results)
+
+
+if __name__ == '__main__':
+    main()
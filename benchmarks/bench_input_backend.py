@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+bench_input_backend.py - 输入注入后端基准测试
+
+测量各后端每秒可注入的事件数，以及一次自动复制周期的全部输入操作
+（不含人性化等待）的注入开销。
+
+会真实注入鼠标和键盘事件（包括Ctrl+C/Ctrl+V/回车），请在Xvfb中运行:
+    xvfb-run -a python benchmarks/bench_input_backend.py --inject
+"""
+
+import os
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.common import summarize, run_metadata, write_results
+from modules.input_backend import XTestBackend, PyAutoGUIBackend
+from modules.trajectory import plan_eased_path
+
+CAPTURE_POINT = (400, 300)
+INPUT_POINT = (400, 700)
+
+
+def make_backend(name):
+    if name == 'xtest':
+        return XTestBackend()
+    backend = PyAutoGUIBackend()
+    backend.pyautogui.FAILSAFE = False
+    return backend
+
+
+def events_per_second(backend, operation, count):
+    """重复执行某种操作，返回每秒事件数"""
+    start = time.perf_counter()
+    for i in range(count):
+        operation(backend, i)
+    elapsed = time.perf_counter() - start
+    return count / elapsed if elapsed > 0 else 0.0
+
+
+def move_along(backend, target, move_points):
+    """沿预计算轨迹逐点移动，不做等待"""
+    for point in plan_eased_path(backend.position(), target, 1.0, rate_hz=move_points):
+        backend.move_to(point.x, point.y)
+
+
+def one_cycle(backend, move_points):
+    """按 perform_auto_copy_cycle 的顺序注入一轮输入，不做任何等待"""
+    backend.fail_safe_check()
+    move_along(backend, CAPTURE_POINT, move_points)
+    backend.click(*CAPTURE_POINT)
+    with backend.batch():
+        backend.click(*CAPTURE_POINT, clicks=3)
+        backend.hotkey('ctrl', 'c')
+    move_along(backend, INPUT_POINT, move_points)
+    with backend.batch():
+        backend.click(*INPUT_POINT)
+        backend.hotkey('ctrl', 'v')
+    backend.press('enter')
+
+
+def bench_backend(name, count, cycles, move_points):
+    backend = make_backend(name)
+    result = {
+        'move_events_per_s': events_per_second(
+            backend, lambda b, i: b.move_to(100 + i % 500, 100 + i % 300), count),
+        'click_events_per_s': events_per_second(
+            backend, lambda b, i: b.click(50, 50), count),
+        'hotkey_events_per_s': events_per_second(
+            backend, lambda b, i: b.hotkey('shift', 'a'), count),
+    }
+    durations = []
+    for _ in range(cycles):
+        start = time.perf_counter()
+        one_cycle(backend, move_points)
+        durations.append(time.perf_counter() - start)
+    result['cycle_injection'] = summarize(durations)
+    backend.close()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='输入注入后端基准测试')
+    parser.add_argument('--backends', default='xtest,pyautogui', help='逗号分隔的后端名称')
+    parser.add_argument('--count', type=int, default=500, help='每种操作的重复次数')
+    parser.add_argument('--cycles', type=int, default=50, help='模拟的周期数')
+    parser.add_argument('--move-points', type=int, default=30, help='每次鼠标移动的轨迹点数')
+    parser.add_argument('--inject', action='store_true', help='确认允许向当前X显示注入真实输入事件')
+    parser.add_argument('--output', help='结果JSON文件路径，默认写入benchmarks/results/')
+    args = parser.parse_args()
+
+    if not os.environ.get('DISPLAY'):
+        print("❌ 没有X11显示，请使用: xvfb-run -a python benchmarks/bench_input_backend.py --inject")
+        return
+    if not args.inject:
+        print("⚠️ 该基准会注入真实的鼠标键盘事件（包括回车），请在Xvfb中运行并加上 --inject")
+        return
+
+    results = {'meta': run_metadata('input_backend', args), 'scenarios': {}}
+    for name in args.backends.split(','):
+        try:
+            data = bench_backend(name, args.count, args.cycles, args.move_points)
+        except Exception as e:
+            print(f"⚠️ 后端 {name} 不可用: {e}")
+            continue
+        results['scenarios'][name] = data
+        cycle = data['cycle_injection']
+        print(f"{name:<10} 移动 {data['move_events_per_s']:>9.0f}/s  点击 {data['click_events_per_s']:>9.0f}/s  "
+              f"组合键 {data['hotkey_events_per_s']:>9.0f}/s  每周期注入 p50 {cycle['p50_ms']:.2f}ms "
+              f"p95 {cycle['p95_ms']:.2f}ms")
+
+    output = write_results('input_backend', results, args.output)
+    print(f"\n📄 结果已写入: {output}")
+
+
+if __name__ == '__main__':
+    main()
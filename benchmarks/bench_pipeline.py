@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+bench_pipeline.py - 串行循环与流水线模式的对比
+
+在固定时长内按固定间隔向模拟聊天窗口发送消息，分别以串行循环
+（pipeline.enabled=false）和捕获/推理/投递流水线运行自动复制，
+统计捕获到的消息数、发送的回复数以及各队列的深度和等待时间。
+--targets 可以指定多个聊天窗口数量，观察回复吞吐量随窗口数的变化。
+
+用法示例:
+    python benchmarks/bench_pipeline.py --duration 10 --message-interval 0.5 --llm-latency 1.0
+    python benchmarks/bench_pipeline.py --capture-policy drop_oldest --capture-maxsize 2
+    python benchmarks/bench_pipeline.py --modes pipeline --targets 1,2,4 --llm-latency 3
+"""
+
+import os
+import sys
+import time
+import argparse
+import contextlib
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.common import run_metadata, write_results
+from benchmarks.fakes import (
+    FakeChatDesk, RecordingClipboard, RecordingPyAutoGUI, FakeOllamaServer, installed_input_stubs
+)
+from benchmarks.bench_cycle import configure
+
+CAPTURE_Y = 400
+INPUT_Y = 900
+
+
+def run_mode(mode, target_count, args, server, pyautogui_stub):
+    """以指定模式和聊天窗口数连续运行自动复制，返回统计"""
+    from modules.config_loader import ConfigLoader
+    from modules.auto_copy_handler import AutoCopyHandler
+    from modules.input_backend import PyAutoGUIBackend
+
+    config = ConfigLoader(os.path.join(os.path.dirname(__file__), '__bench_config__.json'))
+    configure(config, server, args.delay_scale)
+    config.set('auto_copy_interval', args.capture_interval)
+    config.set('pipeline.enabled', mode == 'pipeline')
+    config.set('pipeline.capture_queue.policy', args.capture_policy)
+    config.set('pipeline.capture_queue.maxsize', args.capture_maxsize)
+
+    desk = FakeChatDesk(target_count)
+    config.set('monitoring.chat_targets', [
+        {'name': f"chat{i + 1}",
+         'copy_area_coords': {'x': desk.column_center(i), 'y': CAPTURE_Y},
+         'input_coords': {'x': desk.column_center(i), 'y': INPUT_Y}}
+        for i in range(target_count)
+    ])
+
+    pyautogui_stub.chat = desk
+    handler = AutoCopyHandler(config, input_backend=PyAutoGUIBackend())
+    requests_before = server.request_count
+    posted = 0
+    handler.start_listening()
+    deadline = time.perf_counter() + args.duration
+    while time.perf_counter() < deadline:
+        for chat in desk.chats:
+            chat.post_message()
+            posted += 1
+        time.sleep(args.message_interval)
+    handler.stop_listening()
+
+    stats = handler.get_stats()
+    result = {
+        'targets': target_count,
+        'messages_posted': posted,
+        'llm_requests': server.request_count - requests_before,
+        'replies_sent': len(desk.sent_replies),
+        'replies_per_s': len(desk.sent_replies) / args.duration,
+        'executed_cycles': stats['executed_cycles'],
+        'skipped_cycles': stats['skipped_cycles'],
+        'stop_latency_ms': stats['last_stop_latency_ms'],
+        'input_lock_wait_ms': stats['input_lock_wait_ms'],
+    }
+    if mode == 'pipeline':
+        result['queues'] = stats['queues']
+        result['messages_captured'] = sum(queue['put'] + queue['coalesced']
+                                          for name, queue in stats['queues'].items() if name != 'delivery')
+    else:
+        result['messages_captured'] = result['llm_requests']
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='串行循环与流水线模式的对比')
+    parser.add_argument('--modes', default='serial,pipeline', help='逗号分隔：serial, pipeline')
+    parser.add_argument('--targets', default='1', help='逗号分隔的聊天窗口数量，如 1,2,4')
+    parser.add_argument('--duration', type=float, default=10.0, help='每种模式的运行时长（秒）')
+    parser.add_argument('--message-interval', type=float, default=0.5, help='每个窗口新消息到达的间隔（秒）')
+    parser.add_argument('--capture-interval', type=float, default=0.5, help='auto_copy_interval配置（秒）')
+    parser.add_argument('--delay-scale', type=float, default=0.1, help='人性化延迟缩放系数')
+    parser.add_argument('--llm-latency', type=float, default=1.0, help='Ollama替身的响应延迟（秒）')
+    parser.add_argument('--capture-policy', default='coalesce', help='捕获队列的背压策略')
+    parser.add_argument('--capture-maxsize', type=int, default=4, help='捕获队列容量')
+    parser.add_argument('--output', help='结果JSON文件路径，默认写入benchmarks/results/')
+    parser.add_argument('--verbose', action='store_true', help='保留被测代码的控制台输出')
+    args = parser.parse_args()
+
+    clipboard_stub = RecordingClipboard()
+    pyautogui_stub = RecordingPyAutoGUI(clipboard_stub, FakeChatDesk(1))
+
+    results = {'meta': run_metadata('pipeline', args), 'scenarios': {}}
+    with installed_input_stubs(pyautogui_stub, clipboard_stub), \
+            FakeOllamaServer(latency=args.llm_latency) as server:
+        for mode in args.modes.split(','):
+            for target_count in [int(v) for v in args.targets.split(',')]:
+                quiet = contextlib.nullcontext() if args.verbose else \
+                    contextlib.redirect_stdout(open(os.devnull, 'w', encoding='utf-8'))
+                with quiet:
+                    results['scenarios'][f"{mode}x{target_count}"] = run_mode(
+                        mode, target_count, args, server, pyautogui_stub)
+
+    print(f"{'模式':<14}{'到达':>6}{'捕获':>6}{'推理':>6}{'回复':>6}{'回复/秒':>9}{'停止(ms)':>10}")
+    for mode, data in results['scenarios'].items():
+        print(f"{mode:<14}{data['messages_posted']:>6}{data['messages_captured']:>6}{data['llm_requests']:>6}"
+              f"{data['replies_sent']:>6}{data['replies_per_s']:>9.2f}{data['stop_latency_ms']:>10.0f}")
+        for name, queue in data.get('queues', {}).items():
+            print(f"    队列 {name:<14} 策略 {queue['policy']:<12} 最大深度 {queue['max_depth']:<3} "
+                  f"合并 {queue['coalesced']:<3} 丢弃 {queue['dropped']:<3} "
+                  f"等待 p50 {queue['wait_p50_ms']:.0f}ms p95 {queue['wait_p95_ms']:.0f}ms")
+
+    output = write_results('pipeline', results, args.output)
+    print(f"\n📄 结果已写入: {output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,369 @@
+#!/usr/bin/env python3
+"""
+bench_replay.py - 聊天记录回放模拟
+
+读取带时间戳的入站消息记录（JSONL，每行 {"t": 秒, "chat": "chat1", "text": "..."}），
+按记录的节奏（--speed 1为原速，2为两倍速，0为尽可能快）把消息投放到模拟聊天窗口，
+经由屏幕/剪贴板/输入替身驱动 AutoCopyHandler，或直接调用 ChatAutomationApp.on_new_content，
+模型由本地Ollama替身代替。每条消息带一个唯一标记，替身在回复中回显当前消息的标记，
+据此统计回复延迟分布、吞吐量，以及丢失（没有得到回复）、重复回复和发错窗口的消息。
+
+尽可能快的模式下，自动复制场景等上一条消息被复制后才投放下一条，on_new_content场景等上一条处理完。
+
+用法示例:
+    python benchmarks/bench_replay.py benchmarks/transcripts/sample.jsonl
+    python benchmarks/bench_replay.py benchmarks/transcripts/sample.jsonl --speed 0 --entries auto_copy
+    python benchmarks/bench_replay.py transcript.jsonl --llm-latency 2 --fail-on-loss --max-p95-ms 8000
+"""
+
+import os
+import sys
+import json
+import time
+import queue
+import argparse
+import threading
+import contextlib
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.common import run_metadata, write_results, summarize, compare_results
+from benchmarks.fakes import (
+    FakeChat, FakeChatDesk, RecordingClipboard, RecordingPyAutoGUI, FakeOllamaServer, installed_input_stubs
+)
+from benchmarks.bench_cycle import configure
+from benchmarks.bench_pipeline import CAPTURE_Y, INPUT_Y
+
+TAG_PATTERN = r'\[#m\d+\]'
+LATENCY_BUCKETS = (0.5, 1.0, 2.0, 5.0, 10.0, 30.0)  # 回复延迟分布的桶上限（秒）
+
+
+def load_transcript(path):
+    """
+    读取消息记录，按时间排序并从0开始计时
+    每行需要text字段；t为相对秒数，也可以用ts给出Unix时间戳；chat缺省为chat1
+    :return: [{'id', 'tag', 't', 'chat', 'text'}]
+    """
+    messages = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line_number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                entry = json.loads(line)
+                t = float(entry['t'] if 't' in entry else entry['ts'])
+                text = str(entry['text'])
+            except (ValueError, KeyError, TypeError) as e:
+                raise ValueError(f"{path} 第{line_number}行格式错误: {e}")
+            messages.append({'t': t, 'chat': str(entry.get('chat', 'chat1')), 'text': text})
+    if not messages:
+        raise ValueError(f"{path} 中没有消息")
+    messages.sort(key=lambda m: m['t'])
+    start = messages[0]['t']
+    for index, message in enumerate(messages, 1):
+        message['t'] -= start
+        message['id'] = f"m{index:04d}"
+        message['tag'] = f"[#{message['id']}]"
+    return messages
+
+
+class ReplayChat(FakeChat):
+    """回放用的聊天窗口：投放带标记的消息，并记录每条消息第一次被复制的时刻"""
+
+    def __init__(self):
+        super().__init__()
+        self.arrivals = {}  # 标记 -> 投放时刻
+        self.captured = {}  # 标记 -> 第一次被复制的时刻
+        self.current_tag = None
+        self.copied = threading.Event()
+
+    def post(self, message):
+        self.revision += 1
+        self.current_tag = message['tag']
+        self.current_text = f"{message['text']} {message['tag']}"
+        self.copied.clear()
+        self.arrivals[message['tag']] = time.perf_counter()
+
+    def copy_text(self):
+        if self.current_tag is not None:
+            self.captured.setdefault(self.current_tag, time.perf_counter())
+            self.copied.set()
+        return self.current_text
+
+
+def feed(messages, speed, post, wait_ready, stop_event):
+    """
+    按记录的节奏投放消息
+    :param speed: 回放倍速，0为不等待（投放前调用wait_ready）
+    :return: 尽可能快模式下等待超时的次数
+    """
+    start = time.perf_counter()
+    timeouts = 0
+    for message in messages:
+        if stop_event.is_set():
+            break
+        if speed > 0:
+            delay = start + message['t'] / speed - time.perf_counter()
+            if delay > 0:
+                stop_event.wait(delay)
+        elif not wait_ready(message):
+            timeouts += 1
+        post(message)
+    return timeouts
+
+
+def wait_for_replies(chats, expected, drain):
+    """等待所有消息得到回复，或连续drain秒没有新的回复"""
+    last_count, last_change = -1, time.perf_counter()
+    while True:
+        count = sum(len(chat.sent_replies) for chat in chats)
+        if count != last_count:
+            last_count, last_change = count, time.perf_counter()
+        answered = set()
+        for chat in chats:
+            for reply in chat.sent_replies:
+                answered.update(tag for tag in expected if tag in reply)
+        if answered >= expected or time.perf_counter() - last_change >= drain:
+            return
+        time.sleep(0.05)
+
+
+def analyze(messages, chats_by_name, wall_start):
+    """把发出的回复按标记对应到消息，统计延迟、丢失、重复和发错窗口"""
+    by_tag = {message['tag']: message for message in messages}
+    arrivals, captured = {}, {}
+    for chat in chats_by_name.values():
+        arrivals.update(chat.arrivals)
+        captured.update(chat.captured)
+
+    replies = {tag: [] for tag in by_tag}
+    untagged = merged = misrouted = 0
+    last_reply = wall_start
+    for name, chat in chats_by_name.items():
+        for text, sent_at in zip(chat.sent_replies, chat.sent_at):
+            last_reply = max(last_reply, sent_at)
+            tags = [tag for tag in by_tag if tag in text]
+            if not tags:
+                untagged += 1
+            if len(tags) > 1:
+                merged += 1  # 合并后的多条消息共用一条回复
+            for tag in tags:
+                replies[tag].append(sent_at)
+                if by_tag[tag]['chat'] != name:
+                    misrouted += 1
+
+    latencies = []
+    not_captured, captured_not_replied, duplicated = [], [], []
+    for message in messages:
+        tag = message['tag']
+        times = replies[tag]
+        if not times:
+            (captured_not_replied if tag in captured else not_captured).append(message['id'])
+            continue
+        latencies.append(min(times) - arrivals[tag])
+        if len(times) > 1:
+            duplicated.append(message['id'])
+
+    histogram = {}
+    for upper in LATENCY_BUCKETS:
+        histogram[f"<={upper:g}s"] = 0
+    histogram[f">{LATENCY_BUCKETS[-1]:g}s"] = 0
+    for latency in latencies:
+        for upper in LATENCY_BUCKETS:
+            if latency <= upper:
+                histogram[f"<={upper:g}s"] += 1
+                break
+        else:
+            histogram[f">{LATENCY_BUCKETS[-1]:g}s"] += 1
+
+    wall = max(last_reply - wall_start, 1e-9)
+    replies_sent = sum(len(chat.sent_replies) for chat in chats_by_name.values())
+    return {
+        'messages': len(messages),
+        'answered': len(latencies),
+        'replies_sent': replies_sent,
+        'wall_time_s': wall,
+        'replies_per_s': replies_sent / wall,
+        'answered_per_s': len(latencies) / wall,
+        'dropped': len(not_captured) + len(captured_not_replied),
+        'dropped_not_captured': not_captured,
+        'dropped_after_capture': captured_not_replied,
+        'duplicated': duplicated,
+        'merged_replies': merged,
+        'untagged_replies': untagged,
+        'misrouted': misrouted,
+        'latency_histogram': histogram,
+        'stages': {'reply_latency': summarize(latencies)},
+    }
+
+
+def run_auto_copy(messages, args, server, pyautogui_stub):
+    """经由屏幕/剪贴板/输入替身驱动AutoCopyHandler（每个chat对应一个聊天窗口）"""
+    from modules.config_loader import ConfigLoader
+    from modules.auto_copy_handler import AutoCopyHandler
+    from modules.input_backend import PyAutoGUIBackend
+
+    names = list(dict.fromkeys(message['chat'] for message in messages))
+    config = ConfigLoader(os.path.join(os.path.dirname(__file__), '__bench_config__.json'))
+    configure(config, server, args.delay_scale)
+    config.set('auto_copy_interval', args.capture_interval)
+    config.set('pipeline.enabled', args.mode == 'pipeline')
+    desk = FakeChatDesk(len(names), chat_factory=ReplayChat)
+    config.set('monitoring.chat_targets', [
+        {'name': name,
+         'copy_area_coords': {'x': desk.column_center(i), 'y': CAPTURE_Y},
+         'input_coords': {'x': desk.column_center(i), 'y': INPUT_Y}}
+        for i, name in enumerate(names)
+    ])
+    chats_by_name = dict(zip(names, desk.chats))
+    pyautogui_stub.chat = desk
+
+    def wait_ready(message):
+        # 尽可能快：等该窗口的上一条消息被复制后再投放
+        chat = chats_by_name[message['chat']]
+        return chat.current_tag is None or chat.copied.wait(args.asap_timeout)
+
+    handler = AutoCopyHandler(config, input_backend=PyAutoGUIBackend())
+    stop_event = threading.Event()
+    handler.start_listening()
+    wall_start = time.perf_counter()
+    try:
+        timeouts = feed(messages, args.speed, lambda m: chats_by_name[m['chat']].post(m), wait_ready, stop_event)
+        wait_for_replies(desk.chats, {message['tag'] for message in messages}, args.drain)
+    finally:
+        handler.stop_listening()
+    result = analyze(messages, chats_by_name, wall_start)
+    stats = handler.get_stats()
+    result.update({'asap_timeouts': timeouts, 'executed_cycles': stats['executed_cycles'],
+                   'skipped_cycles': stats['skipped_cycles']})
+    if 'queues' in stats:
+        result['queues'] = stats['queues']
+    return result
+
+
+def run_on_new_content(messages, args, server, pyautogui_stub):
+    """
+    按节奏把消息交给 ChatAutomationApp.on_new_content
+    与屏幕监控线程相同，由一个工作线程依次处理，处理期间到达的消息排队等待；回复都发到同一个输入框
+    """
+    from main import ChatAutomationApp
+    from modules.tracing import NULL_TRACER
+
+    app = ChatAutomationApp(os.path.join(os.path.dirname(__file__), '__bench_config__.json'))
+    configure(app.config, server, args.delay_scale)
+    app.tracer = NULL_TRACER
+    chat = ReplayChat()
+    pyautogui_stub.chat = chat
+    inbox = queue.Queue()
+
+    def worker():
+        while True:
+            message = inbox.get()
+            if message is None:
+                break
+            chat.captured.setdefault(message['tag'], time.perf_counter())
+            try:
+                app.on_new_content(f"{message['text']} {message['tag']}")
+            except Exception as e:
+                print(f"❌ 处理消息 {message['id']} 失败: {e}")
+            finally:
+                inbox.task_done()
+
+    def post(message):
+        chat.arrivals[message['tag']] = time.perf_counter()
+        inbox.put(message)
+
+    def wait_ready(message):
+        inbox.join()
+        return True
+
+    thread = threading.Thread(target=worker, daemon=True)
+    thread.start()
+    wall_start = time.perf_counter()
+    try:
+        feed(messages, args.speed, post, wait_ready, threading.Event())
+        wait_for_replies([chat], {message['tag'] for message in messages}, args.drain)
+    finally:
+        inbox.put(None)
+        thread.join(timeout=args.drain)
+    # 该入口只有一个输入框，所有消息都视为发往同一窗口
+    result = analyze([dict(message, chat='chat') for message in messages], {'chat': chat}, wall_start)
+    result['delivery'] = app.keyboard_sim.get_stats()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='聊天记录回放模拟')
+    parser.add_argument('transcript', help='消息记录JSONL文件')
+    parser.add_argument('--entries', default='auto_copy,on_new_content',
+                        help='逗号分隔：auto_copy, on_new_content')
+    parser.add_argument('--speed', type=float, default=1.0, help='回放倍速，1为原速，0为尽可能快')
+    parser.add_argument('--mode', choices=['serial', 'pipeline'], default='pipeline',
+                        help='auto_copy场景使用串行循环还是流水线')
+    parser.add_argument('--capture-interval', type=float, default=0.2, help='auto_copy_interval配置（秒）')
+    parser.add_argument('--delay-scale', type=float, default=0.0, help='人性化延迟缩放系数，1.0为真实延迟')
+    parser.add_argument('--llm-latency', type=float, default=0.5, help='Ollama替身的响应延迟（秒）')
+    parser.add_argument('--drain', type=float, default=10.0, help='最后一条消息后最多等待新回复的时间（秒）')
+    parser.add_argument('--asap-timeout', type=float, default=5.0,
+                        help='尽可能快模式下等待上一条消息被复制的最长时间（秒）')
+    parser.add_argument('--fail-on-loss', action='store_true', help='有丢失、重复或发错窗口的消息时返回非0')
+    parser.add_argument('--max-p95-ms', type=float, help='回复延迟p95超过该值时返回非0')
+    parser.add_argument('--output', help='结果JSON文件路径，默认写入benchmarks/results/')
+    parser.add_argument('--compare', help='与之前的结果JSON文件对比')
+    parser.add_argument('--verbose', action='store_true', help='保留被测代码的控制台输出')
+    args = parser.parse_args()
+
+    messages = load_transcript(args.transcript)
+    runners = {'auto_copy': run_auto_copy, 'on_new_content': run_on_new_content}
+    entries = args.entries.split(',')
+    for entry in entries:
+        if entry not in runners:
+            parser.error(f"未知入口: {entry}")
+
+    clipboard_stub = RecordingClipboard()
+    pyautogui_stub = RecordingPyAutoGUI(clipboard_stub, FakeChat())
+    results = {'meta': run_metadata('replay', args), 'scenarios': {}}
+    with installed_input_stubs(pyautogui_stub, clipboard_stub), \
+            FakeOllamaServer(latency=args.llm_latency, reply_text='好的，收到啦！', echo_pattern=TAG_PATTERN) as server:
+        for entry in entries:
+            quiet = contextlib.nullcontext() if args.verbose else \
+                contextlib.redirect_stdout(open(os.devnull, 'w', encoding='utf-8'))
+            requests_before = server.request_count
+            with quiet:
+                result = runners[entry]([dict(message) for message in messages], args, server, pyautogui_stub)
+            result['llm_requests'] = server.request_count - requests_before
+            results['scenarios'][entry] = result
+
+    print(f"回放 {len(messages)} 条消息，时长 {messages[-1]['t']:.1f}s，倍速 {args.speed:g}")
+    print(f"{'入口':<16}{'回复':>6}{'已答':>6}{'丢失':>6}{'重复':>6}{'错窗':>6}{'合并':>6}"
+          f"{'回复/秒':>9}{'p50(ms)':>10}{'p95(ms)':>10}{'最大(ms)':>10}")
+    failed = []
+    for entry, data in results['scenarios'].items():
+        latency = data['stages']['reply_latency']
+        print(f"{entry:<16}{data['replies_sent']:>6}{data['answered']:>6}{data['dropped']:>6}"
+              f"{len(data['duplicated']):>6}{data['misrouted']:>6}{data['merged_replies']:>6}"
+              f"{data['replies_per_s']:>9.2f}{latency['p50_ms']:>10.0f}{latency['p95_ms']:>10.0f}"
+              f"{latency['max_ms']:>10.0f}")
+        print(f"    延迟分布: {', '.join(f'{k} {v}' for k, v in data['latency_histogram'].items())}")
+        if data['dropped_not_captured']:
+            print(f"    未被捕获（被后续消息覆盖）: {', '.join(data['dropped_not_captured'])}")
+        if data['dropped_after_capture']:
+            print(f"    捕获后未回复: {', '.join(data['dropped_after_capture'])}")
+        if data['duplicated']:
+            print(f"    重复回复: {', '.join(data['duplicated'])}")
+        if args.fail_on_loss and (data['dropped'] or data['duplicated'] or data['misrouted']):
+            failed.append(f"{entry} 有丢失、重复或发错窗口的消息")
+        if args.max_p95_ms is not None and latency['p95_ms'] > args.max_p95_ms:
+            failed.append(f"{entry} 回复延迟p95 {latency['p95_ms']:.0f}ms 超过 {args.max_p95_ms:.0f}ms")
+
+    output = write_results('replay', results, args.output)
+    print(f"\n📄 结果已写入: {output}")
+    if args.compare:
+        compare_results(args.compare, results)
+    for reason in failed:
+        print(f"❌ {reason}")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+bench_retrieval.py - 早期对话检索索引的建立速率和查询延迟
+
+生成合成的多聊天对话记录写入临时的会话存储，再由 RetrievalIndex.sync() 增量建立索引，统计：
+  - 建立速率（条/秒），以及其中计算向量和写入矩阵各自的耗时
+  - 查询延迟：只做矩阵乘法和top-k（search_vector，全部消息/限定聊天），以及包含查询向量计算的完整检索
+  - 注入提示的字数，与把该聊天全部记录放进提示的字数对比
+向量默认在本进程中用替身的确定性向量计算（--embed local），--embed http 时经由本地Ollama替身的 /api/embed。
+
+用法示例:
+    python benchmarks/bench_retrieval.py --messages 100000
+    python benchmarks/bench_retrieval.py --messages 20000 --embed http --embed-latency 0.02
+"""
+
+import os
+import sys
+import time
+import random
+import shutil
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from benchmarks.common import run_metadata, write_results, summarize, print_stage_table
+from benchmarks.fakes import FakeOllamaServer, fake_embeddings
+from modules.conversation_store import ConversationStore, ROLE_USER, ROLE_ASSISTANT
+from modules.retrieval_index import RetrievalIndex, OllamaEmbedder
+
+TOPICS = ['周末爬山', '新买的相机', '公司年会', '孩子上学', '装修房子', '学吉他', '看病复查', '出差北京',
+          '养的猫咪', '减肥跑步', '考研复习', '换工作面试', '旅游签证', '做红烧肉', '股票基金', '搬家租房']
+PHRASES = ['你觉得怎么样', '我打算下周', '上次说的那个', '最近有点忙', '价格还可以', '要不要一起',
+           '我查了一下', '感觉不太合适', '已经安排好了', '还在考虑中', '明天再说吧', '有什么推荐']
+
+
+def synthetic_message(rng, index):
+    topic = rng.choice(TOPICS)
+    return f"{topic}{rng.choice(PHRASES)}，{rng.choice(PHRASES)}（{topic}） #{index}"
+
+
+def build_corpus(store, count, chats, rng):
+    """按时间顺序写入count条消息，用户消息和回复交替"""
+    start_ts = time.time() - count
+    for i in range(count):
+        role = ROLE_USER if i % 2 == 0 else ROLE_ASSISTANT
+        while not store.append(f"chat{rng.randrange(chats)}", role, synthetic_message(rng, i), ts=start_ts + i):
+            time.sleep(0.001)  # 写入队列已满，等待写入线程
+    assert store.flush(timeout=120)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='早期对话检索索引的建立速率和查询延迟')
+    parser.add_argument('--messages', type=int, default=100000, help='消息总数')
+    parser.add_argument('--chats', type=int, default=20, help='聊天数量')
+    parser.add_argument('--dim', type=int, default=768, help='向量维度（nomic-embed-text为768）')
+    parser.add_argument('--batch-size', type=int, default=256, help='每次计算向量的消息数')
+    parser.add_argument('--embed', choices=['local', 'http'], default='local',
+                        help='local: 本进程计算替身向量；http: 经由Ollama替身的 /api/embed')
+    parser.add_argument('--embed-latency', type=float, default=0.0, help='http模式下每次向量请求的额外延迟（秒）')
+    parser.add_argument('--queries', type=int, default=500, help='查询次数')
+    parser.add_argument('--top-k', type=int, default=3, help='每次返回的片段数')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='结果JSON文件路径，默认写入benchmarks/results/')
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    workdir = tempfile.mkdtemp()
+    server = None
+    store = ConversationStore(os.path.join(workdir, 'conversations.db'), retention_days=0)
+    try:
+        print(f"📝 写入 {args.messages} 条合成消息...")
+        corpus_start = time.perf_counter()
+        build_corpus(store, args.messages, args.chats, rng)
+        corpus_seconds = time.perf_counter() - corpus_start
+
+        if args.embed == 'http':
+            server = FakeOllamaServer(embedding_dim=args.dim, embed_latency=args.embed_latency).start()
+            embed = OllamaEmbedder(server.base_url, model='bench-embed')
+        else:
+            def embed(texts):
+                return fake_embeddings(texts, args.dim)
+
+        index = RetrievalIndex(embed, batch_size=args.batch_size, top_k=args.top_k, min_score=0.0)
+        print(f"🧠 建立索引（{args.embed}，{args.dim}维）...")
+        build_start = time.perf_counter()
+        indexed = index.sync(store)
+        build_seconds = time.perf_counter() - build_start
+        stats = index.get_stats()
+        embed_seconds = stats['embed_seconds']
+
+        # 增量：再加入少量新消息，只处理新增部分
+        for i in range(args.batch_size):
+            store.append('chat0', ROLE_USER, synthetic_message(rng, args.messages + i))
+        store.flush()
+        incremental_start = time.perf_counter()
+        incremental = index.sync(store)
+        incremental_seconds = time.perf_counter() - incremental_start
+
+        queries = [synthetic_message(rng, -i) for i in range(args.queries)]
+        query_vectors = np.asarray(embed(queries), dtype=np.float32)
+        stages = {'search_all': [], 'search_chat': [], 'search_full': []}
+        injected_chars, transcript_chars = [], []
+        chat_chars = {}
+        for chat, _, text, _ in index._meta:
+            chat_chars[chat] = chat_chars.get(chat, 0) + len(text)
+        for i, (text, vector) in enumerate(zip(queries, query_vectors)):
+            chat = f"chat{i % args.chats}"
+            start = time.perf_counter()
+            index.search_vector(vector)
+            stages['search_all'].append(time.perf_counter() - start)
+            start = time.perf_counter()
+            index.search_vector(vector, chat=chat)
+            stages['search_chat'].append(time.perf_counter() - start)
+            start = time.perf_counter()
+            related = index.related_text(text, chat=chat)
+            stages['search_full'].append(time.perf_counter() - start)
+            injected_chars.append(len(related))
+            transcript_chars.append(chat_chars.get(chat, 0))
+    finally:
+        store.close()
+        if server is not None:
+            server.stop()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    results = {
+        'meta': run_metadata('retrieval', args),
+        'scenarios': {args.embed: {
+            'messages': len(index),
+            'indexed': indexed,
+            'corpus_write_per_sec': args.messages / corpus_seconds,
+            'build_seconds': build_seconds,
+            'build_per_sec': indexed / build_seconds,
+            'embed_seconds': embed_seconds,
+            'index_seconds': build_seconds - embed_seconds,
+            'incremental_messages': incremental,
+            'incremental_ms': incremental_seconds * 1000.0,
+            'matrix_mb': stats['matrix_bytes'] / 1024 / 1024,
+            'injected_chars_mean': sum(injected_chars) / len(injected_chars),
+            'transcript_chars_mean': sum(transcript_chars) / len(transcript_chars),
+            'stages': {name: summarize(values) for name, values in stages.items()},
+        }},
+    }
+    data = results['scenarios'][args.embed]
+    print(f"\n建立索引: {data['indexed']} 条，{data['build_seconds']:.1f}秒，{data['build_per_sec']:.0f} 条/秒 "
+          f"(计算向量 {data['embed_seconds']:.1f}秒，写入矩阵等 {data['index_seconds']:.1f}秒)，"
+          f"矩阵 {data['matrix_mb']:.0f}MB")
+    print(f"增量同步 {data['incremental_messages']} 条新消息: {data['incremental_ms']:.0f}ms")
+    print(f"注入提示平均 {data['injected_chars_mean']:.0f} 字，对比整个聊天记录平均 "
+          f"{data['transcript_chars_mean']:.0f} 字")
+    print_stage_table(f"查询延迟（{data['messages']} 条消息，top-{args.top_k}）", data['stages'])
+
+    output = write_results('retrieval', results, args.output)
+    print(f"\n📄 结果已写入: {output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+bench_stop_latency.py - 停止自动复制的响应延迟基准测试
+
+启动连续自动复制循环（真实人性化延迟 + 慢速Ollama替身），
+在周期内的随机时刻调用 stop_listening，统计从调用到线程退出的耗时，
+并检查停止之后是否还有鼠标/键盘事件被注入。
+
+用法示例:
+    python benchmarks/bench_stop_latency.py --trials 20
+    python benchmarks/bench_stop_latency.py --trials 10 --llm-latency 10 --max-delay 12
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+import contextlib
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.common import summarize, run_metadata, write_results
+from benchmarks.fakes import (
+    FakeChat, RecordingClipboard, RecordingPyAutoGUI, FakeOllamaServer, installed_input_stubs
+)
+from benchmarks.bench_cycle import configure
+
+
+def run_trials(trials, server, delay_scale, max_delay, pyautogui_stub):
+    from modules.config_loader import ConfigLoader
+    from modules.auto_copy_handler import AutoCopyHandler
+    from modules.input_backend import PyAutoGUIBackend
+
+    config = ConfigLoader(os.path.join(os.path.dirname(__file__), '__bench_config__.json'))
+    configure(config, server, delay_scale)
+    config.set('monitoring.change_gate_enabled', False)
+    handler = AutoCopyHandler(config, input_backend=PyAutoGUIBackend())
+
+    latencies, leaked_events, stop_points = [], 0, []
+    for _ in range(trials):
+        pyautogui_stub.chat.post_message()
+        for target in handler.targets:
+            target.dedup_store.clear()
+        handler.start_listening()
+        stop_after = random.uniform(0.0, max_delay)
+        time.sleep(stop_after)
+
+        handler.stop_listening()
+        stopped_at = time.perf_counter()
+        latencies.append(handler.last_stop_latency)
+        stop_points.append(stop_after)
+
+        # 停止之后稍等片刻，检查是否还有输入事件被注入
+        time.sleep(0.2)
+        leaked_events += sum(1 for event in pyautogui_stub.events if event[0] >= stopped_at)
+
+    return {
+        'trials': trials,
+        'stop_latency': summarize(latencies),
+        'stop_after': summarize(stop_points),
+        'events_after_stop': leaked_events,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='停止自动复制的响应延迟基准测试')
+    parser.add_argument('--trials', type=int, default=10, help='启动/停止的次数')
+    parser.add_argument('--delay-scale', type=float, default=1.0, help='人性化延迟缩放系数')
+    parser.add_argument('--llm-latency', type=float, default=5.0, help='Ollama替身的响应延迟（秒）')
+    parser.add_argument('--max-delay', type=float, default=8.0, help='启动后最晚多少秒调用停止')
+    parser.add_argument('--output', help='结果JSON文件路径，默认写入benchmarks/results/')
+    parser.add_argument('--verbose', action='store_true', help='保留被测代码的控制台输出')
+    args = parser.parse_args()
+
+    chat = FakeChat()
+    clipboard_stub = RecordingClipboard()
+    pyautogui_stub = RecordingPyAutoGUI(clipboard_stub, chat)
+
+    results = {'meta': run_metadata('stop_latency', args), 'scenarios': {}}
+    with installed_input_stubs(pyautogui_stub, clipboard_stub), \
+            FakeOllamaServer(latency=args.llm_latency) as server:
+        quiet = contextlib.nullcontext() if args.verbose else \
+            contextlib.redirect_stdout(open(os.devnull, 'w', encoding='utf-8'))
+        with quiet:
+            data = run_trials(args.trials, server, args.delay_scale, args.max_delay, pyautogui_stub)
+    results['scenarios']['auto_copy'] = data
+
+    latency = data['stop_latency']
+    print(f"停止延迟 ({data['trials']} 次): p50 {latency['p50_ms']:.1f}ms  p95 {latency['p95_ms']:.1f}ms  "
+          f"最大 {latency['max_ms']:.1f}ms")
+    print(f"停止后注入的输入事件: {data['events_after_stop']}")
+
+    output = write_results('stop_latency', results, args.output)
+    print(f"\n📄 结果已写入: {output}")
+
+
+if __name__ == '__main__':
+    main()
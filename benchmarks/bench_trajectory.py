@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+bench_trajectory.py - 鼠标轨迹计划时长与实际时长对比
+
+对比原先逐步 moveTo + sleep 的实现（每次调用额外承受 pyautogui.PAUSE）
+与预计算轨迹 + 截止时间回放的 TrajectoryPlayer。
+注入函数用 time.sleep 模拟每次 moveTo 的开销，不会真正移动鼠标。
+
+用法示例:
+    python benchmarks/bench_trajectory.py --moves 20
+    python benchmarks/bench_trajectory.py --latencies 0,0.002,0.01 --skip-legacy
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.common import summarize, run_metadata, write_results
+from modules.trajectory import TrajectoryPlayer, plan_eased_path, plan_bezier_path
+
+
+def make_injector(latency, pause=0.0):
+    """模拟一次鼠标移动注入的开销"""
+    def move(x, y):
+        time.sleep(latency + pause)
+    return move
+
+
+def legacy_move(move_fn, start, end, duration):
+    """原先的 _human_like_mouse_move 实现（PAUSE由move_fn模拟）"""
+    steps = random.randint(10, 25)
+    for i in range(steps):
+        progress = i / steps
+        ease_progress = pow(progress, 2)
+        x = start[0] + (end[0] - start[0]) * ease_progress + random.uniform(-2, 2)
+        y = start[1] + (end[1] - start[1]) * ease_progress + random.uniform(-2, 2)
+        move_fn(x, y)
+        time.sleep(duration / steps * random.uniform(0.8, 1.2))
+
+
+def run_variant(name, moves, latency, legacy_pause, rate_hz):
+    """执行一组移动，返回实际耗时与计划耗时的差异统计"""
+    errors, ratios, skipped = [], [], 0
+    player = TrajectoryPlayer(make_injector(latency))
+    for _ in range(moves):
+        start = (random.randint(0, 1920), random.randint(0, 1080))
+        end = (random.randint(0, 1920), random.randint(0, 1080))
+        duration = random.uniform(0.3, 0.8)
+        t0 = time.perf_counter()
+        if name == 'legacy':
+            legacy_move(make_injector(latency, legacy_pause), start, end, duration)
+        else:
+            planner = plan_bezier_path if name == 'bezier' else plan_eased_path
+            result = player.play(planner(start, end, duration, rate_hz))
+            skipped += result.points_skipped
+        actual = time.perf_counter() - t0
+        errors.append(actual - duration)
+        ratios.append(actual / duration)
+    return {
+        'moves': moves,
+        'error': summarize(errors),
+        'actual_over_planned_mean': sum(ratios) / len(ratios),
+        'points_skipped': skipped,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='鼠标轨迹计划/实际时长对比')
+    parser.add_argument('--moves', type=int, default=10, help='每种组合的移动次数')
+    parser.add_argument('--latencies', default='0,0.002,0.01', help='逗号分隔的单次注入开销（秒）')
+    parser.add_argument('--legacy-pause', type=float, default=0.1,
+                        help='原实现每次moveTo额外承受的pyautogui.PAUSE（秒）')
+    parser.add_argument('--rate-hz', type=int, default=60, help='预计算轨迹的采样频率')
+    parser.add_argument('--skip-legacy', action='store_true', help='不运行耗时较长的原实现')
+    parser.add_argument('--output', help='结果JSON文件路径，默认写入benchmarks/results/')
+    args = parser.parse_args()
+
+    variants = ['eased', 'bezier'] if args.skip_legacy else ['legacy', 'eased', 'bezier']
+    results = {'meta': run_metadata('trajectory', args), 'scenarios': {}}
+    print(f"{'实现':<8}{'注入开销(ms)':>14}{'误差p50(ms)':>14}{'误差p95(ms)':>14}{'实际/计划':>12}")
+    for latency in [float(v) for v in args.latencies.split(',')]:
+        for variant in variants:
+            data = run_variant(variant, args.moves, latency, args.legacy_pause, args.rate_hz)
+            results['scenarios'][f"{variant}@{latency * 1000:g}ms"] = data
+            print(f"{variant:<8}{latency * 1000:>14.1f}{data['error']['p50_ms']:>14.1f}"
+                  f"{data['error']['p95_ms']:>14.1f}{data['actual_over_planned_mean']:>12.2f}")
+
+    output = write_results('trajectory', results, args.output)
+    print(f"\n📄 结果已写入: {output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+"""
+common.py - 基准测试公共工具
+百分位统计、运行环境信息以及JSON结果的写入与对比
+"""
+
+import os
+import sys
+import json
+import math
+import time
+import platform
+import subprocess
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(PROJECT_ROOT, 'benchmarks', 'results')
+
+
+def percentile(values, pct):
+    """线性插值计算百分位数，values为空时返回0"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * pct / 100.0
+    lower = math.floor(rank)
+    upper = math.ceil(rank)
+    if lower == upper:
+        return ordered[int(rank)]
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (rank - lower)
+
+
+def summarize(values):
+    """把一组耗时（秒）汇总为毫秒单位的统计字典"""
+    return {
+        'count': len(values),
+        'mean_ms': (sum(values) / len(values) * 1000.0) if values else 0.0,
+        'p50_ms': percentile(values, 50) * 1000.0,
+        'p95_ms': percentile(values, 95) * 1000.0,
+        'p99_ms': percentile(values, 99) * 1000.0,
+        'max_ms': (max(values) * 1000.0) if values else 0.0,
+    }
+
+
+def git_revision():
+    """获取当前提交的短哈希，不在git仓库中时返回unknown"""
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            cwd=PROJECT_ROOT, stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except Exception:
+        return 'unknown'
+
+
+def run_metadata(name, args):
+    """生成结果文件中的运行环境信息"""
+    return {
+        'benchmark': name,
+        'commit': git_revision(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': sys.version.split()[0],
+        'platform': platform.platform(),
+        'args': vars(args) if hasattr(args, '__dict__') else args,
+    }
+
+
+def write_results(name, results, output=None):
+    """把结果写入JSON文件并返回文件路径"""
+    if output is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        meta = results.get('meta', {})
+        output = os.path.join(
+            RESULTS_DIR,
+            f"{name}_{meta.get('commit', 'unknown')}_{time.strftime('%Y%m%d-%H%M%S')}.json"
+        )
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+    return output
+
+
+def print_stage_table(title, stages):
+    """以表格形式打印各阶段统计"""
+    print(f"\n== {title} ==")
+    print(f"{'阶段':<14}{'次数':>8}{'p50(ms)':>12}{'p95(ms)':>12}{'p99(ms)':>12}")
+    for stage, stats in stages.items():
+        print(f"{stage:<14}{stats['count']:>8}{stats['p50_ms']:>12.2f}{stats['p95_ms']:>12.2f}{stats['p99_ms']:>12.2f}")
+
+
+def compare_results(baseline_file, results):
+    """与之前保存的结果对比，打印各阶段p50/p95的变化"""
+    with open(baseline_file, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)
+    print(f"\n== 与基线对比: {baseline_file} (提交 {baseline.get('meta', {}).get('commit', '?')}) ==")
+    for scenario, data in results.get('scenarios', {}).items():
+        old = baseline.get('scenarios', {}).get(scenario)
+        if not old:
+            continue
+        for stage, stats in data.get('stages', {}).items():
+            old_stats = old.get('stages', {}).get(stage)
+            if not old_stats:
+                continue
+            for key in ('p50_ms', 'p95_ms'):
+                before, after = old_stats[key], stats[key]
+                change = ((after - before) / before * 100.0) if before else 0.0
+                print(f"{scenario}.{stage}.{key}: {before:.2f} -> {after:.2f} ({change:+.1f}%)")
@@ -0,0 +1,348 @@
+"""
+fakes.py - 基准测试用的替身实现
+提供记录型的鼠标/键盘/剪贴板替身以及本地的Ollama替身服务，
+让自动化流程可以在没有真实桌面和模型的情况下运行。
+"""
+
+import re
+import sys
+import json
+import time
+import zlib
+import types
+import threading
+import contextlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class FakeChat:
+    """
+    模拟聊天窗口
+    post_message() 模拟收到一条新的入站消息，复制操作总是拿到最新的一条；
+    revision 随每条新消息递增，屏幕替身据此改变捕获点附近的画面；
+    draft 是输入框中尚未发送的文本，屏幕替身据此改变输入框附近的画面
+    """
+
+    def __init__(self, messages=None):
+        self.messages = list(messages) if messages else None
+        self.counter = 0
+        self.revision = 0
+        self.sent_replies = []
+        self.sent_at = []  # 每条回复发送时的perf_counter时刻
+        self.current_text = ""
+        self.draft = ""
+
+    def post_message(self):
+        """收到下一条入站消息"""
+        if self.messages is not None:
+            text = self.messages[self.counter % len(self.messages)]
+        else:
+            text = f"你好，这是第{self.counter}条测试消息"
+        self.counter += 1
+        self.revision += 1
+        self.current_text = text
+        return text
+
+    def copy_text(self):
+        """复制操作（Ctrl+C）拿到的文本"""
+        return self.current_text
+
+    def send_draft(self):
+        """发送输入框中的内容（回车）"""
+        self.sent_replies.append(self.draft)
+        self.sent_at.append(time.perf_counter())
+        self.draft = ""
+
+
+class FakeChatDesk:
+    """
+    并排摆放的多个模拟聊天窗口
+    屏幕按横向等分，每列一个窗口；鼠标所在的列决定操作的是哪个窗口
+    """
+
+    def __init__(self, count, screen_width=1920, chat_factory=FakeChat):
+        self.chats = [chat_factory() for _ in range(count)]
+        self.column_width = screen_width // count
+        for index, chat in enumerate(self.chats):
+            chat.counter = index * 100000  # 不同窗口的消息文本互不相同
+
+    def column_center(self, index):
+        return index * self.column_width + self.column_width // 2
+
+    def chat_at(self, x):
+        return self.chats[max(0, min(len(self.chats) - 1, int(x) // self.column_width))]
+
+    @property
+    def sent_replies(self):
+        return [reply for chat in self.chats for reply in chat.sent_replies]
+
+
+class RecordingClipboard(types.ModuleType):
+    """记录型剪贴板替身，接口与pyperclip一致"""
+
+    def __init__(self):
+        super().__init__('pyperclip')
+        self._text = ""
+        self.events = []
+
+    def copy(self, text):
+        self.events.append((time.perf_counter(), 'copy', len(text)))
+        self._text = text
+
+    def paste(self):
+        self.events.append((time.perf_counter(), 'paste', len(self._text)))
+        return self._text
+
+
+class RecordingPyAutoGUI(types.ModuleType):
+    """
+    记录型pyautogui替身
+    所有鼠标键盘调用只记录事件，不会真正注入输入；
+    Ctrl+C 会把模拟聊天窗口中的最新消息放入剪贴板，Ctrl+V 把剪贴板内容放入输入框，
+    回车会把输入框内容记为已发送的回复。
+    屏幕下三分之一为输入框，其余为消息区域。
+    chat 也可以是 FakeChatDesk，此时按鼠标位置选择窗口
+    """
+
+    class FailSafeException(Exception):
+        pass
+
+    def __init__(self, clipboard, chat, screen_size=(1920, 1080)):
+        super().__init__('pyautogui')
+        self.clipboard = clipboard
+        self.chat = chat
+        self.screen_size = screen_size
+        self.PAUSE = 0.0
+        self.FAILSAFE = False
+        self._position = (screen_size[0] // 2, screen_size[1] // 2)
+        self.events = []
+
+    def _record(self, name, *args):
+        self.events.append((time.perf_counter(), name, args))
+
+    def _chat_at(self, x):
+        return self.chat.chat_at(x) if hasattr(self.chat, 'chat_at') else self.chat
+
+    def size(self):
+        return self.screen_size
+
+    def position(self):
+        return self._position
+
+    def screenshot(self, region=None):
+        """返回纯色画面，消息区域的颜色随消息版本变化，输入框的颜色随是否有草稿变化"""
+        from PIL import Image
+        self._record('screenshot', region)
+        width, height = (region[2], region[3]) if region else self.screen_size
+        chat = self._chat_at(region[0] + region[2] // 2 if region else self._position[0])
+        if region and region[1] + region[3] // 2 >= self.screen_size[1] * 2 // 3:
+            shade = 200 if chat.draft else 20
+        else:
+            shade = (chat.revision * 37) % 256
+        return Image.new('RGB', (width, height), (shade, shade, shade))
+
+    def moveTo(self, x, y, duration=0.0, _pause=True):
+        self._position = (int(x), int(y))
+        self._record('moveTo', x, y)
+
+    def click(self, x=None, y=None, clicks=1, interval=0.0, button='left', _pause=True):
+        if x is not None and y is not None:
+            self._position = (int(x), int(y))
+        self._record('click', x, y, clicks)
+
+    def tripleClick(self, x=None, y=None, _pause=True):
+        self.click(x, y, clicks=3)
+
+    def hotkey(self, *keys, **kwargs):
+        self._record('hotkey', *keys)
+        chat = self._chat_at(self._position[0])
+        if keys == ('ctrl', 'c'):
+            self.clipboard.copy(chat.copy_text())
+        elif keys == ('ctrl', 'v'):
+            chat.draft += self.clipboard._text
+
+    def press(self, key, _pause=True):
+        self._record('press', key)
+        chat = self._chat_at(self._position[0])
+        if key == 'enter':
+            chat.send_draft()
+        elif key == 'backspace':
+            chat.draft = ""  # 只在全选之后使用
+
+
+class FakeKeyboardModule(types.ModuleType):
+    """keyboard模块替身，仅满足导入需求"""
+
+    def __init__(self):
+        super().__init__('keyboard')
+
+    def add_hotkey(self, *args, **kwargs):
+        return None
+
+
+@contextlib.contextmanager
+def installed_input_stubs(pyautogui_stub, clipboard_stub):
+    """
+    在sys.modules中临时替换pyautogui/pyperclip/keyboard
+    必须在导入项目模块之前进入，退出时恢复原模块
+    """
+    replacements = {
+        'pyautogui': pyautogui_stub,
+        'pyperclip': clipboard_stub,
+        'keyboard': FakeKeyboardModule(),
+    }
+    saved = {name: sys.modules.get(name) for name in replacements}
+    sys.modules.update(replacements)
+    try:
+        yield
+    finally:
+        for name, module in saved.items():
+            if module is None:
+                sys.modules.pop(name, None)
+            else:
+                sys.modules[name] = module
+
+
+_EMBEDDING_BUCKETS = 4096
+_embedding_tables = {}
+
+
+def fake_embeddings(texts, dim=256):
+    """
+    确定性的文本向量：每个字符二元组哈希到一个固定的随机向量，文本的向量为它们之和，
+    含有相同词语的文本相似度较高，足以检验检索的排序
+    """
+    import numpy as np
+    table = _embedding_tables.get(dim)
+    if table is None:
+        rng = np.random.default_rng(7)
+        table = _embedding_tables[dim] = rng.standard_normal((_EMBEDDING_BUCKETS, dim)).astype(np.float32)
+    vectors = np.zeros((len(texts), dim), np.float32)
+    for row, text in enumerate(texts):
+        buckets = [zlib.crc32(text[i:i + 2].encode('utf-8')) % _EMBEDDING_BUCKETS
+                   for i in range(max(1, len(text) - 1))]
+        vectors[row] = table[buckets].sum(axis=0)
+    return vectors
+
+
+class _FakeOllamaRequestHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass  # 不输出访问日志
+
+    def _send_json(self, payload, status=200):
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        try:
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # 客户端已停止请求并断开连接
+
+    def do_GET(self):
+        if self.path == '/api/tags':
+            self.server.tags_count += 1
+            self._send_json({'models': [{
+                'name': self.server.model_name,
+                'size': 5_200_000_000,
+                'digest': self.server.model_digest,
+                'modified_at': '2026-01-01T00:00:00Z',
+                'details': {'family': 'bench', 'parameter_size': '8.2B', 'quantization_level': 'Q4_K_M'},
+            }]})
+        else:
+            self._send_json({'error': 'not found'}, status=404)
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length', 0))
+        request = json.loads(self.rfile.read(length) or b'{}')
+        if self.path == '/api/show':
+            self.server.show_count += 1
+            if self.server.show_failures > 0:
+                self.server.show_failures -= 1
+                self._send_json({'error': 'model is loading'}, status=500)
+                return
+            self._send_json({'details': {'family': 'bench'}, 'model_info': {'bench.context_length': 40960}})
+            return
+        if self.path == '/api/embed':
+            texts = request.get('input', [])
+            texts = [texts] if isinstance(texts, str) else texts
+            self.server.embed_count += len(texts)
+            time.sleep(self.server.embed_latency)
+            self._send_json({'model': request.get('model', self.server.model_name),
+                             'embeddings': fake_embeddings(texts, self.server.embedding_dim).tolist()})
+            return
+        if self.path != '/api/generate':
+            self._send_json({'error': 'not found'}, status=404)
+            return
+        self.server.request_count += 1
+        self.server.last_prompt = request.get('prompt', '')
+        time.sleep(self.server.latency)
+        reply_text = self.server.reply_text
+        if self.server.echo_pattern is not None:
+            # 回显当前消息中的标记，调用方据此把回复对应到消息（对话历史中的标记不回显）
+            current = request.get('prompt', '').rsplit('用户消息:', 1)[-1]
+            tags = list(dict.fromkeys(self.server.echo_pattern.findall(current)))
+            reply_text = f"{reply_text} {' '.join(tags)}".strip()
+        self._send_json({
+            'model': request.get('model', self.server.model_name),
+            'response': reply_text,
+            'done': True,
+            # 与真实Ollama相同的生成统计字段（纳秒），按固定延迟折算
+            'load_duration': 0,
+            'prompt_eval_duration': int(self.server.latency * 0.2 * 1e9),
+            'eval_count': len(reply_text),
+            'eval_duration': max(1, int(self.server.latency * 0.8 * 1e9)),
+        })
+
+
+class FakeOllamaServer:
+    """
+    本地Ollama替身服务
+    在127.0.0.1的随机端口上提供 /api/generate、/api/tags、/api/show 和 /api/embed，
+    按固定延迟返回固定回复；指定echo_pattern时在回复末尾附上当前消息中匹配该正则的标记；
+    /api/embed 返回fake_embeddings计算的向量
+    """
+
+    def __init__(self, latency=0.0, reply_text="<think>想一想</think>好的，收到啦！", model_name="bench-model",
+                 echo_pattern=None, embedding_dim=256, embed_latency=0.0):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), _FakeOllamaRequestHandler)
+        self.server.daemon_threads = True
+        self.server.latency = latency
+        self.server.reply_text = reply_text
+        self.server.model_name = model_name
+        self.server.echo_pattern = re.compile(echo_pattern) if echo_pattern else None
+        self.server.request_count = 0
+        self.server.model_digest = 'sha256:bench'
+        self.server.tags_count = 0
+        self.server.show_count = 0
+        self.server.show_failures = 0  # 接下来多少次 /api/show 请求返回500
+        self.server.embedding_dim = embedding_dim
+        self.server.embed_latency = embed_latency
+        self.server.embed_count = 0
+        self.server.last_prompt = None
+        self.thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def request_count(self):
+        return self.server.request_count
+
+    def start(self):
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
@@ -41,4 +41,9 @@ def get_config():
     
     return default_config
 
-CONFIG = get_config()
\ No newline at end of file
+def __getattr__(name):
+    """CONFIG在第一次访问时才计算，导入本模块不再读取配置文件"""
+    if name == 'CONFIG':
+        value = globals()['CONFIG'] = get_config()
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
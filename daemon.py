@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+无界面守护进程模式：不加载Qt，通过本地控制socket（Unix域套接字，JSON行协议）接收命令
+    python daemon.py                      # 启动守护进程，等待start命令
+    python daemon.py --start              # 启动后立即按当前模式开始运行
+    python daemon.py ctl status           # 向正在运行的守护进程发送命令
+    python daemon.py ctl mode screen_monitor
+    python daemon.py ctl model qwen3:8b
+    python daemon.py ctl stats
+适合在systemd等服务管理器下运行：收到SIGTERM/SIGINT后停止所有功能、写入配置并删除socket文件
+"""
+
+import os
+import sys
+import json
+import signal
+import argparse
+import threading
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from modules.control_server import ControlServer, default_socket_path, send_command
+
+# ctl子命令中带一个参数的命令及其参数名
+_COMMAND_ARGS = {'mode': 'mode', 'model': 'model'}
+
+
+def run_daemon(args):
+    from main import ChatAutomationApp
+
+    stop_event = threading.Event()
+
+    def on_signal(signum, frame):
+        print(f"\n👋 收到信号 {signal.Signals(signum).name}，守护进程即将退出...")
+        stop_event.set()
+
+    signal.signal(signal.SIGTERM, on_signal)
+    signal.signal(signal.SIGINT, on_signal)
+
+    app = ChatAutomationApp(args.config)
+    try:
+        server = ControlServer(app, args.socket).start()
+    except (RuntimeError, OSError) as e:
+        print(f"❌ 无法监听控制socket: {e}")
+        app.shutdown()
+        return 1
+    try:
+        if args.start and not app.start_monitoring():
+            print("⚠️ 启动失败，等待控制命令")
+        print(f"🟢 守护进程已就绪 (PID {os.getpid()})")
+        while not stop_event.wait(1.0):
+            pass
+    finally:
+        server.close()
+        app.shutdown()
+        print("✅ 守护进程已退出")
+    return 0
+
+
+def run_ctl(args):
+    request = {}
+    if args.command in _COMMAND_ARGS:
+        if args.value is None:
+            print(f"❌ {args.command} 命令需要一个参数")
+            return 2
+        request[_COMMAND_ARGS[args.command]] = args.value
+    try:
+        response = send_command(args.command, path=args.socket, timeout=args.timeout, **request)
+    except (OSError, ValueError) as e:
+        print(f"❌ 无法连接守护进程 ({args.socket or default_socket_path()}): {e}")
+        return 1
+    print(json.dumps(response, ensure_ascii=False, indent=2))
+    return 0 if response.get('ok') else 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description="聊天自动化守护进程（无界面，本地控制socket）")
+    parser.add_argument('--socket', default=None, help=f"控制socket路径，默认 {default_socket_path()}")
+    parser.add_argument('--config', default='user_config.json', help="配置文件路径")
+    parser.add_argument('--start', action='store_true', help="启动后立即按当前模式开始运行")
+    subparsers = parser.add_subparsers(dest='action')
+
+    ctl = subparsers.add_parser('ctl', help="向正在运行的守护进程发送命令")
+    ctl.add_argument('command', choices=['ping', 'status', 'start', 'stop', 'mode', 'model', 'stats'])
+    ctl.add_argument('value', nargs='?', help="mode命令的模式（auto_copy / screen_monitor）或model命令的模型名")
+    ctl.add_argument('--timeout', type=float, default=10.0, help="等待响应的超时（秒）")
+
+    args = parser.parse_args()
+    if sys.stdout is not None:
+        sys.stdout.reconfigure(line_buffering=True)  # 服务管理器收集日志时及时输出
+    if args.action == 'ctl':
+        return run_ctl(args)
+    return run_daemon(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -3,40 +3,53 @@ import sys
 import json
 from PyQt5.QtWidgets import (
     QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, QFormLayout,
-    QLabel, QLineEdit, QPushButton, QTextEdit, QGroupBox, QSlider, QComboBox,
+    QLabel, QLineEdit, QPushButton, QTextEdit, QPlainTextEdit, QGroupBox, QSlider, QComboBox,
     QMessageBox, QTabWidget, QCheckBox, QStatusBar, QRadioButton
 )
 from PyQt5.QtCore import Qt, QThread, QMutex, QTimer
 from PyQt5.QtGui import QIntValidator
 
-import requests
-
 class ModelListWorker(QThread):
-    def __init__(self, host_url):
+    """在后台刷新模型清单（请求Ollama），完成后由finished信号通知界面"""
+
+    def __init__(self, inventory, force=False):
         super().__init__()
-        self.host_url = host_url
+        self.inventory = inventory
+        self.force = force
         self.models = []
+        self.changed = False
+        self.error = None
 
     def run(self):
         try:
-            response = requests.get(f"{self.host_url}/api/tags")
-            if response.status_code == 200:
-                data = response.json()
-                self.models = [model['name'] for model in data.get('models', [])]
+            if self.force:
+                self.models, self.changed = self.inventory.refresh()
+            else:
+                self.models, self.changed = self.inventory.refresh_if_stale()
         except Exception as e:
+            self.models = self.inventory.models()
+            self.error = e
             print(f"获取模型列表失败: {e}")
 
 from modules.config_loader import ConfigLoader
+from modules.model_inventory import ModelInventory
+from gui.log_sink import LogSink, LOG_LEVELS
+from gui.metrics_panel import MetricsPanel
 
 class GUIApp(QMainWindow):
     def __init__(self, automation_app=None):
         super().__init__()
         self.automation_app = automation_app
-        # ConfigLoader在初始化时已经加载了配置文件
-        self.config = ConfigLoader('user_config.json')
+        # 开启延迟写回：输入框的连续修改合并后由后台线程原子写入，程序崩溃也不会丢失设置
+        if automation_app is not None:
+            # 与自动化应用共用同一个ConfigLoader：修改立即发布到工作线程读取的快照，
+            # 也不会有两份内存中的配置各自写回同一个文件、互相覆盖
+            self.config = automation_app.config
+            self.config.start_write_behind()
+        else:
+            self.config = ConfigLoader('user_config.json', write_behind=True, debounce=0.5)
         self.init_ui()
         self.setup_auto_save()
-        self.setup_logging()
         self.load_last_used_model()
         
         # 使用定时器在UI初始化完成后自动刷新模型列表
@@ -62,21 +75,14 @@ class GUIApp(QMainWindow):
         except Exception as e:
             self.log_message(f"加载上次模型失败: {e}", "ERROR")
 
-    def setup_logging(self):
-        """设置日志功能"""
-        # 在自动化应用中添加日志回调
-        if self.automation_app:
-            self.automation_app.log_callback = self.log_message
-
     def log_message(self, message, level="INFO"):
-        """记录日志消息"""
-        from datetime import datetime
-        timestamp = datetime.now().strftime("%H:%M:%S")
-        formatted_message = f"[{timestamp}] [{level}] {message}"
-        # 添加到日志文本框
-        self.log_text.append(formatted_message)
-        # 滚动到底部
-        self.log_text.moveCursor(self.log_text.textCursor().End)
+        """记录日志消息（可在任意线程调用，由日志写入器定时批量显示）"""
+        self.log_sink.emit(message, level)
+
+    def on_log_level_changed(self, level):
+        """修改日志面板显示的最低级别"""
+        self.log_sink.set_min_level(level)
+        self.config.set('log_panel.min_level', level)
 
     def setup_auto_save(self):
         """设置自动保存功能"""
@@ -109,84 +115,86 @@ class GUIApp(QMainWindow):
     def auto_save_config(self):
         """自动保存配置"""
         try:
-            # 更新工作模式
-            if self.screen_monitor_radio.isChecked():
-                active_mode = 'screen_monitor'
-            else:
-                active_mode = 'auto_copy'
-            self.config.update_config('active_mode', active_mode)
+            # 所有修改完成后只发布一次配置快照，工作线程不会读到修改了一半的配置
+            with self.config.batch_update():
+                # 更新工作模式
+                if self.screen_monitor_radio.isChecked():
+                    active_mode = 'screen_monitor'
+                else:
+                    active_mode = 'auto_copy'
+                self.config.update_config('active_mode', active_mode)
             
-            # 更新Ollama设置 - 使用当前文本而不是当前索引的文本
-            current_model = self.model_selector.currentText().strip()
-            if current_model:  # 确保不为空
-                self.config.update_config('ollama_model', current_model)
+                # 更新Ollama设置 - 使用当前文本而不是当前索引的文本
+                current_model = self.model_selector.currentText().strip()
+                if current_model:  # 确保不为空
+                    self.config.update_config('ollama_model', current_model)
             
-            # 更新基本设置
-            self.config.update_config('prompt_template', self.template_input.toPlainText())
+                # 更新基本设置
+                self.config.update_config('prompt_template', self.template_input.toPlainText())
             
-            # 更新捕获点和输入点坐标到monitoring配置中
-            monitoring_config = self.config.config.get('monitoring', {})
+                # 更新捕获点和输入点坐标到monitoring配置中
+                monitoring_config = self.config.config.get('monitoring', {})
             
-            # 更新input_coords（输入框坐标）
-            input_coords = {
-                'x': int(self.input_x_input.text()),
-                'y': int(self.input_y_input.text())
-            }
-            monitoring_config['input_coords'] = input_coords
+                # 更新input_coords（输入框坐标）
+                input_coords = {
+                    'x': int(self.input_x_input.text()),
+                    'y': int(self.input_y_input.text())
+                }
+                monitoring_config['input_coords'] = input_coords
             
-            # 更新copy_area_coords（文本捕获点坐标）
-            copy_area_coords = {
-                'x': int(self.capture_x_input.text()),
-                'y': int(self.capture_y_input.text())
-            }
-            monitoring_config['copy_area_coords'] = copy_area_coords
+                # 更新copy_area_coords（文本捕获点坐标）
+                copy_area_coords = {
+                    'x': int(self.capture_x_input.text()),
+                    'y': int(self.capture_y_input.text())
+                }
+                monitoring_config['copy_area_coords'] = copy_area_coords
             
-            self.config.update_config('monitoring', monitoring_config)
+                self.config.update_config('monitoring', monitoring_config)
             
-            # 同时更新旧格式以保证兼容性
-            capture_point = {
-                'x': int(self.capture_x_input.text()),
-                'y': int(self.capture_y_input.text())
-            }
-            self.config.update_config('capture_point', capture_point)
+                # 同时更新旧格式以保证兼容性
+                capture_point = {
+                    'x': int(self.capture_x_input.text()),
+                    'y': int(self.capture_y_input.text())
+                }
+                self.config.update_config('capture_point', capture_point)
             
-            input_point = {
-                'x': int(self.input_x_input.text()),
-                'y': int(self.input_y_input.text())
-            }
-            self.config.update_config('input_point', input_point)
-
-            # 更新高级设置
-            confidence = self.confidence_slider.value() / 100.0
-            self.config.update_config('confidence_threshold', confidence)
-
-            check_interval = float(self.interval_input.text())
-            if check_interval >= 0.1:  # 只有在有效值时才更新
-                self.config.update_config('check_interval', check_interval)
-
-            # 更新区域设置
-            screen_region = {
-                'offset_x': int(self.offset_x_input.text()),
-                'offset_y': int(self.offset_y_input.text()),
-                'width': int(self.width_input.text()),
-                'height': int(self.height_input.text())
-            }
-            self.config.update_config('screen_region', screen_region)
-
-            # 如果自动化应用存在，只更新其配置而不改变运行状态
-            if self.automation_app:
-                # 更新检测区域
-                self.automation_app.update_screen_region(
-                    screen_region['offset_x'],
-                    screen_region['offset_y'],
-                    screen_region['width'],
-                    screen_region['height']
-                )
-                # 更新监控参数
-                if hasattr(self.automation_app.screen_monitor, 'confidence_threshold'):
-                    self.automation_app.screen_monitor.confidence_threshold = confidence
-                if hasattr(self.automation_app.screen_monitor, 'check_interval'):
-                    self.automation_app.screen_monitor.check_interval = check_interval
+                input_point = {
+                    'x': int(self.input_x_input.text()),
+                    'y': int(self.input_y_input.text())
+                }
+                self.config.update_config('input_point', input_point)
+
+                # 更新高级设置
+                confidence = self.confidence_slider.value() / 100.0
+                self.config.update_config('confidence_threshold', confidence)
+
+                check_interval = float(self.interval_input.text())
+                if check_interval >= 0.1:  # 只有在有效值时才更新
+                    self.config.update_config('check_interval', check_interval)
+
+                # 更新区域设置
+                screen_region = {
+                    'offset_x': int(self.offset_x_input.text()),
+                    'offset_y': int(self.offset_y_input.text()),
+                    'width': int(self.width_input.text()),
+                    'height': int(self.height_input.text())
+                }
+                self.config.update_config('screen_region', screen_region)
+
+                # 如果自动化应用存在，只更新其配置而不改变运行状态
+                if self.automation_app:
+                    # 更新检测区域
+                    self.automation_app.update_screen_region(
+                        screen_region['offset_x'],
+                        screen_region['offset_y'],
+                        screen_region['width'],
+                        screen_region['height']
+                    )
+                    # 更新监控参数（屏幕监控尚未创建时不创建，启动时会从配置读取）
+                    monitor = self.automation_app.loaded('screen_monitor')
+                    if monitor is not None:
+                        monitor.confidence_threshold = confidence
+                        monitor.check_interval = check_interval
 
         except ValueError:
             pass  # 忽略无效数值
@@ -199,9 +207,11 @@ class GUIApp(QMainWindow):
         self.setWindowTitle('聊天自动化应用')
         self.setGeometry(300, 300, 1000, 950)  # 增加宽度以容纳日志区域
 
-        # 创建中心窗口部件
+        # 创建中心窗口部件：控制页和性能页
+        self.tabs = QTabWidget()
+        self.setCentralWidget(self.tabs)
         central_widget = QWidget()
-        self.setCentralWidget(central_widget)
+        self.tabs.addTab(central_widget, "控制")
 
         # 主布局 - 水平分割左右两部分
         main_layout = QHBoxLayout(central_widget)
@@ -220,6 +230,15 @@ class GUIApp(QMainWindow):
         current_model = self.config.config.get('ollama_model', 'qwen3:8b')
         self.model_selector.addItem(current_model)
         self.model_selector.setCurrentText(current_model)
+        self.model_selector.editTextChanged.connect(self.update_model_info)
+        # 模型清单：磁盘缓存中的列表启动时立即显示，过期后在后台刷新
+        inventory_config = self.config.get('model_inventory', {})
+        self.model_inventory = ModelInventory(
+            self.config.get('ollama.url', 'http://localhost:11434'),
+            ttl=float(inventory_config.get('ttl', 600.0)),
+            timeout=float(inventory_config.get('timeout', 5.0))
+        )
+        self.model_worker = None
         
         # 刷新模型按钮
         refresh_models_btn = QPushButton("刷新模型列表")
@@ -231,6 +250,10 @@ class GUIApp(QMainWindow):
         
         api_layout.addRow("Ollama模型选择:", model_hbox)
 
+        # 选中模型的参数量、量化方式和上下文长度
+        self.model_info_label = QLabel("")
+        api_layout.addRow("模型信息:", self.model_info_label)
+
         left_layout.addWidget(api_group)
 
         # 提示模板设置组
@@ -397,10 +420,28 @@ class GUIApp(QMainWindow):
         log_group = QGroupBox("系统日志")
         log_layout = QVBoxLayout(log_group)
         
-        self.log_text = QTextEdit()
+        # 日志级别过滤
+        level_layout = QHBoxLayout()
+        level_layout.addWidget(QLabel("显示级别:"))
+        self.log_level_selector = QComboBox()
+        self.log_level_selector.addItems(list(LOG_LEVELS))
+        self.log_level_selector.setCurrentText(self.config.get('log_panel.min_level', 'INFO'))
+        level_layout.addWidget(self.log_level_selector)
+        log_layout.addLayout(level_layout)
+
+        # 纯文本视图按行数限制，长时间运行时内存和追加耗时保持稳定
+        self.log_text = QPlainTextEdit()
         self.log_text.setReadOnly(True)
         self.log_text.setMaximumWidth(350)  # 设置日志区域的最大宽度
         log_layout.addWidget(self.log_text)
+        self.log_sink = LogSink(
+            self.log_text,
+            max_blocks=int(self.config.get('log_panel.max_lines', 5000)),
+            flush_interval_ms=int(self.config.get('log_panel.flush_interval_ms', 100)),
+            min_level=self.log_level_selector.currentText(),
+            parent=self,
+        )
+        self.log_level_selector.currentTextChanged.connect(self.on_log_level_changed)
         
         # 添加清空日志按钮
         clear_log_btn = QPushButton("清空日志")
@@ -418,9 +459,24 @@ class GUIApp(QMainWindow):
         self.setStatusBar(self.status_bar)
         self.status_bar.showMessage("就绪")
 
+        # 运行状态提示：两个定时器只创建一次，启动/停止监控时复用
+        self.operation_counter = 0
+        self.operation_timer = QTimer(self)
+        self.operation_timer.timeout.connect(self.update_operation_status)
+        self.status_restore_timer = QTimer(self)
+        self.status_restore_timer.setSingleShot(True)
+        self.status_restore_timer.timeout.connect(self.update_status_with_coordinates)
+
+        # 性能页：各阶段耗时分布、模型生成速度、去重命中和队列深度
+        self.metrics_panel = None
+        metrics = getattr(self.automation_app, 'metrics', None)
+        if metrics is not None:
+            self.metrics_panel = MetricsPanel(metrics, refresh_hz=float(self.config.get('metrics.refresh_hz', 2.0)))
+            self.tabs.addTab(self.metrics_panel, "性能")
+
     def clear_log(self):
         """清空日志"""
-        self.log_text.clear()
+        self.log_sink.clear()
 
     def on_mode_changed(self):
         """工作模式改变时的处理"""
@@ -429,6 +485,9 @@ class GUIApp(QMainWindow):
         else:
             mode = 'auto_copy'
         self.log_message(f"工作模式已切换到: {mode}")
+        # 监控运行中切换模式时立即停止旧模式并启动新模式
+        if self.automation_app and self.stop_btn.isEnabled():
+            self.automation_app.switch_mode(mode)
 
     def set_region(self):
         """设置监控区域"""
@@ -493,61 +552,95 @@ class GUIApp(QMainWindow):
         self.log_message(f"输入框坐标已设置: ({x}, {y})")
 
     def select_region(self):
-        """手动选择区域"""
-        # 实现手动选择区域的功能
-        QMessageBox.information(self, "提示", "此功能将在后续版本中实现")
-        self.log_message("手动选择区域功能尚未实现")
+        """手动选择区域：在屏幕实时预览上拖动框选，叠加变化热力图"""
+        try:
+            from gui.region_picker import pick_region
+        except ImportError as e:
+            self.log_message(f"无法导入区域选择工具: {e}", "ERROR")
+            return
+        try:
+            current = (int(self.offset_x_input.text()), int(self.offset_y_input.text()),
+                       int(self.width_input.text()), int(self.height_input.text()))
+        except ValueError:
+            current = None
+        # 只使用已创建的屏幕监控器的热力图，不为此加载屏幕监控
+        monitor = self.automation_app.loaded('screen_monitor') if self.automation_app else None
+        region = pick_region(current, monitor=monitor, parent=self)
+        if region is None:
+            return
+        x, y, w, h = region
+        for widget, value in ((self.offset_x_input, x), (self.offset_y_input, y),
+                              (self.width_input, w), (self.height_input, h)):
+            widget.setText(str(value))
+        self.set_region()
         
     def auto_refresh_models(self):
-        """自动刷新模型列表 - 在程序启动时调用"""
-        # 使用默认的Ollama服务地址
-        host = 'http://localhost:11434'
+        """自动刷新模型列表 - 在程序启动时调用：先显示缓存的列表，缓存过期时再在后台刷新"""
+        cached = self.model_inventory.models()
+        if cached:
+            self.populate_models(cached)
+            self.log_message(f"已从缓存加载 {len(cached)} 个模型")
+        if cached and not self.model_inventory.is_stale():
+            return
         self.log_message("正在自动获取模型列表...")
-            
-        # 使用线程获取模型列表，防止UI冻结
-        self.model_worker = ModelListWorker(host)
-        self.model_worker.finished.connect(self.on_models_loaded)
         self.status_bar.showMessage("正在自动获取模型列表...")
-        self.model_worker.start()
+        self.start_model_worker(force=False)
         
     def refresh_models(self):
-        """刷新模型列表 - 修复错误：使用固定的host地址"""
-        # 使用固定的默认地址，因为我们没有对应的输入框
-        host = 'http://localhost:11434'
+        """刷新模型列表 - 忽略缓存有效期，立即请求Ollama"""
         self.log_message("正在获取模型列表...")
-        # 如果需要自定义地址，可以考虑添加一个输入框或从配置读取
-        custom_host = self.config.config.get('ollama', {}).get('url', 'http://localhost:11434')
-        # 提取主机地址部分
-        if custom_host.startswith('http://'):
-            host = custom_host.replace('/api/generate', '').replace('/api/tags', '') if '/api/' in custom_host else custom_host
-        elif custom_host.startswith('https://'):
-            host = custom_host.replace('/api/generate', '').replace('/api/tags', '') if '/api/' in custom_host else custom_host
-            
-        # 使用线程获取模型列表，防止UI冻结
-        self.model_worker = ModelListWorker(host)
-        self.model_worker.finished.connect(self.on_models_loaded)
         self.status_bar.showMessage("正在获取模型列表...")
+        self.start_model_worker(force=True)
+
+    def start_model_worker(self, force):
+        """使用线程获取模型列表，防止UI冻结；已有刷新在进行时不再重复请求"""
+        if self.model_worker is not None and self.model_worker.isRunning():
+            return
+        self.model_worker = ModelListWorker(self.model_inventory, force=force)
+        self.model_worker.finished.connect(self.on_models_loaded)
         self.model_worker.start()
 
     def on_models_loaded(self):
         """模型列表加载完成后更新下拉框"""
+        worker = self.model_worker
+        if worker.error is not None and not worker.models:
+            self.status_bar.showMessage("未能获取模型列表，请检查Ollama服务")
+            self.log_message("未能获取模型列表，请检查Ollama服务", "WARNING")
+            return
+        if worker.error is not None:
+            self.status_bar.showMessage(f"Ollama服务不可用，显示缓存的 {len(worker.models)} 个模型")
+            self.log_message(f"获取模型列表失败，继续使用缓存: {worker.error}", "WARNING")
+        elif not worker.changed and self.model_selector.count() > 1:
+            self.status_bar.showMessage(f"模型列表没有变化 ({len(worker.models)} 个模型)")
+            return
+        else:
+            self.status_bar.showMessage(f"已加载 {len(worker.models)} 个模型")
+            self.log_message(f"已加载 {len(worker.models)} 个模型")
+        self.populate_models(worker.models)
+
+    def populate_models(self, models):
+        """用模型清单填充下拉框，悬停提示显示参数量、量化方式和上下文长度"""
         # 先保存当前选中的模型
         current_selection = self.model_selector.currentText()
-        
+
+        self.model_selector.blockSignals(True)
         self.model_selector.clear()
         self.model_selector.addItem(current_selection)  # 先添加当前选中的模型
+        for model in models:
+            if model.name != current_selection:  # 避免重复添加
+                self.model_selector.addItem(model.name)
+        for index in range(self.model_selector.count()):
+            info = self.model_inventory.get(self.model_selector.itemText(index))
+            if info is not None:
+                self.model_selector.setItemData(index, info.describe(), Qt.ToolTipRole)
         self.model_selector.setCurrentText(current_selection)  # 设置为当前选中
-        
-        if self.model_worker.models:
-            # 添加从API获取的模型
-            for model in self.model_worker.models:
-                if model != current_selection:  # 避免重复添加
-                    self.model_selector.addItem(model)
-            self.status_bar.showMessage(f"已加载 {len(self.model_worker.models)} 个模型")
-            self.log_message(f"已加载 {len(self.model_worker.models)} 个模型")
-        else:
-            self.status_bar.showMessage("未能获取模型列表，请检查Ollama服务")
-            self.log_message("未能获取模型列表，请检查Ollama服务", "WARNING")
+        self.model_selector.blockSignals(False)
+        self.update_model_info()
+
+    def update_model_info(self, *args):
+        """显示当前模型的元数据"""
+        info = self.model_inventory.get(self.model_selector.currentText().strip())
+        self.model_info_label.setText(info.describe() if info is not None else "（未知模型）")
 
     def start_monitoring(self):
         """启动监控"""
@@ -575,8 +668,6 @@ class GUIApp(QMainWindow):
             
             # 在状态栏显示周期性提示，让用户知道程序正在运行
             self.operation_counter = 0
-            self.operation_timer = QTimer(self)
-            self.operation_timer.timeout.connect(self.update_operation_status)
             self.operation_timer.start(5000)  # 每5秒更新一次
         else:
             QMessageBox.warning(self, "警告", "自动化应用未初始化")
@@ -589,13 +680,9 @@ class GUIApp(QMainWindow):
         current_model = self.model_selector.currentText()
         status_msg = f"监控运行中... (运行周期: {self.operation_counter}, 模型: {current_model})"
         self.status_bar.showMessage(status_msg)
-        self.log_message(f"监控运行中 (周期: {self.operation_counter})")
-        
-        # 5秒后恢复常规状态信息
-        timer = QTimer(self)
-        timer.setSingleShot(True)
-        timer.timeout.connect(lambda: self.update_status_with_coordinates())
-        timer.start(5000)
+
+        # 稍后恢复常规状态信息（详细的运行数据见性能页）
+        self.status_restore_timer.start(2500)
     
     def update_status_with_coordinates(self):
         """恢复显示坐标信息"""
@@ -617,17 +704,21 @@ class GUIApp(QMainWindow):
             self.log_message("监控已停止")
             
             # 停止周期性状态更新
-            if hasattr(self, 'operation_timer'):
-                self.operation_timer.stop()
+            self.operation_timer.stop()
+            self.status_restore_timer.stop()
         else:
             QMessageBox.warning(self, "警告", "自动化应用未初始化")
             self.log_message("停止监控失败: 自动化应用未初始化", "ERROR")
 
     def closeEvent(self, event):
         """程序关闭时自动保存坐标设置"""
-        # 保存配置到文件
-        self.config.save('user_config.json')
+        # 停止后台写回线程并写入尚未保存的修改
+        self.config.close()
+        stats = self.config.get_write_stats()
+        print(f"💾 配置写入 {stats['writes']} 次，合并修改 {stats['coalesced']} 次，"
+              f"平均耗时 {stats['mean_write_ms']:.1f}ms")
         self.log_message("所有设置已自动保存")
+        self.log_sink.stop()
         print("✅ 所有设置已自动保存")
         # 接受关闭事件
         event.accept()
\ No newline at end of file
@@ -0,0 +1,100 @@
+# gui/log_sink.py
+import time
+from collections import deque
+
+from PyQt5.QtCore import QObject, QTimer
+
+LOG_LEVELS = {'DEBUG': 10, 'INFO': 20, 'WARNING': 30, 'ERROR': 40}
+
+
+class LogSink(QObject):
+    """
+    GUI日志面板的批量写入器
+    emit() 可以在任意线程调用，只把记录追加到deque（append/popleft在CPython中是原子的，无需加锁）；
+    GUI线程的定时器按批取出记录，一次性追加到QPlainTextEdit。
+    视图限制最大行数，内存中只保留同样数量的历史记录用于切换级别过滤
+    """
+
+    def __init__(self, view, max_blocks=5000, flush_interval_ms=100, max_batch=500, max_pending=20000,
+                 min_level='INFO', parent=None):
+        """
+        :param view: 只读的QPlainTextEdit
+        :param max_blocks: 视图和历史记录保留的最大行数
+        :param flush_interval_ms: 刷新到视图的间隔（毫秒）
+        :param max_batch: 每次刷新最多处理的记录数，避免一次刷新占用太多界面时间
+        :param max_pending: 等待刷新的记录上限，超过时丢弃最旧的记录
+        """
+        super().__init__(parent)
+        self.view = view
+        self.view.setMaximumBlockCount(max_blocks)
+        self.max_batch = max_batch
+        self.min_level = LOG_LEVELS.get(min_level, 20)
+        self._pending = deque(maxlen=max_pending)
+        self._history = deque(maxlen=max_blocks)  # (级别数值, 格式化后的行)
+        self.stats = {'received': 0, 'displayed': 0, 'filtered': 0, 'flushes': 0, 'max_batch': 0,
+                      'flush_ms': 0.0, 'max_flush_ms': 0.0}
+
+        self.timer = QTimer(self)
+        self.timer.timeout.connect(self.flush)
+        self.timer.start(flush_interval_ms)
+
+    def emit(self, message, level="INFO"):
+        """记录一条日志，可在任意线程调用"""
+        self._pending.append((time.time(), level, message))
+        self.stats['received'] += 1  # 多线程同时写入时计数可能略少，仅用于统计
+
+    @property
+    def dropped(self):
+        """因等待刷新的记录过多而被丢弃的数量"""
+        return max(0, self.stats['received'] - len(self._pending) - self.stats['displayed'] - self.stats['filtered'])
+
+    def flush(self):
+        """把等待中的记录批量追加到视图（只在GUI线程调用）"""
+        if not self._pending:
+            return
+        start = time.perf_counter()
+        lines = []
+        count = 0
+        while self._pending and count < self.max_batch:
+            timestamp, level, message = self._pending.popleft()
+            count += 1
+            level_no = LOG_LEVELS.get(level, 20)
+            line = f"[{time.strftime('%H:%M:%S', time.localtime(timestamp))}] [{level}] {message}"
+            self._history.append((level_no, line))
+            if level_no >= self.min_level:
+                lines.append(line)
+        self.stats['filtered'] += count - len(lines)
+        if lines:
+            self._append(lines)
+            self.stats['displayed'] += len(lines)
+        elapsed_ms = (time.perf_counter() - start) * 1000.0
+        self.stats['flushes'] += 1
+        self.stats['max_batch'] = max(self.stats['max_batch'], count)
+        self.stats['flush_ms'] += elapsed_ms
+        self.stats['max_flush_ms'] = max(self.stats['max_flush_ms'], elapsed_ms)
+
+    def _append(self, lines):
+        # 只有用户停留在底部时才自动滚动，向上翻看历史时不打断
+        scrollbar = self.view.verticalScrollBar()
+        at_bottom = scrollbar.value() >= scrollbar.maximum() - 2
+        self.view.appendPlainText("\n".join(lines))
+        if at_bottom:
+            scrollbar.setValue(scrollbar.maximum())
+
+    def set_min_level(self, level):
+        """修改显示的最低级别，并按新级别重新显示保留的历史记录"""
+        self.flush()
+        self.min_level = LOG_LEVELS.get(level, 20)
+        self.view.clear()
+        lines = [line for level_no, line in self._history if level_no >= self.min_level]
+        if lines:
+            self._append(lines)
+
+    def clear(self):
+        self._pending.clear()
+        self._history.clear()
+        self.view.clear()
+
+    def stop(self):
+        self.timer.stop()
+        self.flush()
@@ -0,0 +1,104 @@
+# gui/metrics_panel.py
+from PyQt5.QtWidgets import QWidget, QVBoxLayout, QLabel, QTableWidget, QTableWidgetItem, QHeaderView
+from PyQt5.QtCore import QTimer
+
+_BARS = ' ▁▂▃▄▅▆▇█'
+
+
+def render_histogram(counts):
+    """把直方图各桶的计数渲染为一行字符条形图"""
+    peak = max(counts) if counts else 0
+    if not peak:
+        return ''
+    return ''.join(_BARS[0 if not count else max(1, round(count / peak * (len(_BARS) - 1)))] for count in counts)
+
+
+def _ms(seconds):
+    return f"{seconds * 1000.0:.0f}"
+
+
+class MetricsPanel(QWidget):
+    """
+    性能面板
+    定时从MetricsAggregator读取已在环形缓冲区中的样本并聚合显示；刷新频率有上限，
+    面板不可见时不做任何聚合，流水线线程只负责追加样本，不受面板影响
+    """
+
+    STAGE_COLUMNS = ['追踪', '阶段', '次数', 'p50(ms)', 'p95(ms)', '最大(ms)', '出错', '耗时分布']
+
+    def __init__(self, metrics, refresh_hz=2.0, parent=None):
+        """
+        :param metrics: MetricsAggregator
+        :param refresh_hz: 刷新频率，最高5次/秒
+        """
+        super().__init__(parent)
+        self.metrics = metrics
+        self.refresh_count = 0
+
+        layout = QVBoxLayout(self)
+        self.summary_label = QLabel("等待数据...")
+        self.summary_label.setWordWrap(True)
+        layout.addWidget(self.summary_label)
+
+        self.stage_table = QTableWidget(0, len(self.STAGE_COLUMNS))
+        self.stage_table.setHorizontalHeaderLabels(self.STAGE_COLUMNS)
+        self.stage_table.setEditTriggers(QTableWidget.NoEditTriggers)
+        self.stage_table.verticalHeader().setVisible(False)
+        self.stage_table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeToContents)
+        self.stage_table.horizontalHeader().setStretchLastSection(True)
+        layout.addWidget(self.stage_table)
+
+        bucket_text = ', '.join(f"{upper:g}" for upper in metrics.buckets)
+        layout.addWidget(QLabel(f"最近{metrics.window:.0f}秒的数据；耗时分布的桶上限（秒）: {bucket_text}, +Inf"))
+
+        self.timer = QTimer(self)
+        self.timer.timeout.connect(self.refresh)
+        self.timer.start(int(1000 / min(max(refresh_hz, 0.2), 5.0)))
+
+    def refresh(self):
+        """聚合并重绘，面板不可见时跳过"""
+        if not self.isVisible():
+            return
+        self.refresh_count += 1
+        summary = self.metrics.summary()
+        self.summary_label.setText(self.format_summary(summary))
+
+        rows = sorted(summary['stages'].items())
+        self.stage_table.setRowCount(len(rows))
+        for row, ((kind, name), stage) in enumerate(rows):
+            values = [kind, name, str(stage['count']), _ms(stage['p50']), _ms(stage['p95']), _ms(stage['max']),
+                      str(stage['errors']), render_histogram(stage['histogram'])]
+            for column, value in enumerate(values):
+                item = self.stage_table.item(row, column)
+                if item is None:
+                    self.stage_table.setItem(row, column, QTableWidgetItem(value))
+                elif item.text() != value:
+                    item.setText(value)
+
+    @staticmethod
+    def format_summary(summary):
+        """汇总信息：模型生成速度、缓存命中、截图和队列深度"""
+        lines = []
+        llm = summary['llm']
+        if llm:
+            lines.append(f"🤖 模型生成: {llm['tokens_per_s']:.1f} token/s (最近一次 {llm['last_tokens_per_s']:.1f})，"
+                         f"首token p50 {_ms(llm['ttft_p50'])}ms / p95 {_ms(llm['ttft_p95'])}ms，"
+                         f"{llm['count']} 次生成共 {llm['tokens']} token")
+        else:
+            lines.append("🤖 模型生成: 暂无数据")
+
+        outcomes = summary['outcomes']
+        captured = sum(stage['count'] for (kind, name), stage in summary['stages'].items() if name == 'capture')
+        skipped = sum(count for (kind, outcome), count in outcomes.items() if outcome in ('skipped', 'unchanged'))
+        lines.append(f"🖼️ 截图: {captured} 次，其中无变化跳过 {skipped} 次")
+
+        auto_copy = summary['sources'].get('auto_copy') or {}
+        dedup = auto_copy.get('dedup')
+        if dedup:
+            lines.append(f"🔄 去重命中率: {dedup['hit_rate'] * 100:.1f}% "
+                         f"(消息 {dedup['hits_inbound']}, 自身回复 {dedup['hits_reply']}, 未命中 {dedup['misses']})")
+        queues = auto_copy.get('queues')
+        if queues:
+            depths = ', '.join(f"{name} {stats['depth']}/{stats['maxsize']}" for name, stats in queues.items())
+            lines.append(f"📥 队列深度: {depths}")
+        return '\n'.join(lines)
@@ -0,0 +1,280 @@
+# gui/region_picker.py
+import os
+import time
+import threading
+
+import cv2
+import numpy as np
+from PyQt5.QtWidgets import QDialog, QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton, QSizePolicy
+from PyQt5.QtCore import Qt, QThread, QRectF, pyqtSignal
+from PyQt5.QtGui import QImage, QPainter, QPen, QColor
+
+from modules.screen_monitor import ChangeHeatmap
+
+
+def wrap_rgb(frame):
+    """
+    把连续的RGB uint8数组包装为QImage，不复制像素
+    QImage只引用数组的内存，调用方必须在QImage使用期间持有该数组
+    """
+    height, width = frame.shape[:2]
+    return QImage(frame.data, width, height, frame.strides[0], QImage.Format_RGB888)
+
+
+def heat_to_rgba(heat):
+    """把热力图转换为半透明红色的RGBA数组，变化越多越不透明"""
+    peak = float(heat.max())
+    rgba = np.zeros(heat.shape + (4,), dtype=np.uint8)
+    if peak <= 0:
+        return rgba
+    rgba[..., 0] = 255
+    rgba[..., 3] = (np.clip(heat / peak, 0.0, 1.0) * 170).astype(np.uint8)
+    return rgba
+
+
+class PreviewGrabber(QThread):
+    """
+    预览截图线程
+    按固定频率截取全屏并在本线程中缩小（OpenCV缩放时释放GIL），只把缩小后的帧交给界面；
+    界面尚未取走上一帧时跳过本次截图，线程以较低的调度优先级运行，不与监控线程争抢CPU
+    """
+    frame_ready = pyqtSignal(object, float)  # 缩小后的RGB帧, 缩放比例（预览像素/屏幕像素）
+
+    def __init__(self, grab=None, fps=4.0, max_width=960):
+        """
+        :param grab: 返回PIL图像或RGB数组的截图函数，默认使用pyautogui.screenshot
+        """
+        super().__init__()
+        self.grab = grab
+        self.interval = 1.0 / max(0.5, fps)
+        self.max_width = max_width
+        self.pending = False  # 界面尚未处理上一帧
+        self.stats = {'frames': 0, 'skipped': 0, 'grab_ms': 0.0}
+        self._stop_event = threading.Event()
+
+    def stop(self):
+        self._stop_event.set()
+        self.wait(2000)
+
+    def _lower_priority(self):
+        # Linux下setpriority可以作用于单个线程
+        try:
+            os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), 10)
+        except (AttributeError, OSError):
+            pass
+
+    def run(self):
+        self._lower_priority()
+        grab = self.grab
+        if grab is None:
+            import pyautogui
+            grab = pyautogui.screenshot
+        while not self._stop_event.is_set():
+            start = time.perf_counter()
+            if self.pending:
+                self.stats['skipped'] += 1
+            else:
+                try:
+                    screen = np.asarray(grab())
+                except Exception as e:
+                    print(f"⚠️ 预览截图失败: {e}")
+                    self._stop_event.wait(1.0)
+                    continue
+                scale = min(1.0, self.max_width / screen.shape[1])
+                size = (max(1, int(screen.shape[1] * scale)), max(1, int(screen.shape[0] * scale)))
+                frame = cv2.resize(screen[..., :3], size, interpolation=cv2.INTER_AREA)
+                self.stats['frames'] += 1
+                self.stats['grab_ms'] += (time.perf_counter() - start) * 1000.0
+                self.pending = True
+                self.frame_ready.emit(frame, scale)
+            self._stop_event.wait(max(0.0, self.interval - (time.perf_counter() - start)))
+
+
+class RegionPreview(QWidget):
+    """
+    区域预览控件：显示缩小后的屏幕、变化热力图和当前区域，拖动鼠标框选新的区域
+    """
+    region_changed = pyqtSignal(int, int, int, int)
+
+    def __init__(self, region=None, parent=None):
+        super().__init__(parent)
+        self.frame = None       # 当前帧数组，QImage引用其内存，必须与image一起保留
+        self.image = None
+        self.scale = 1.0        # 预览像素/屏幕像素
+        self.heat_rgba = None   # 同上，热力图的RGBA数组
+        self.heat_image = None
+        self.heat_region = None
+        self.region = tuple(region) if region else None  # 屏幕坐标 (x, y, 宽, 高)
+        self._drag_start = None
+        self._drag_end = None
+        self.setMinimumSize(480, 270)
+        self.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
+        self.setCursor(Qt.CrossCursor)
+
+    def set_frame(self, frame, scale):
+        self.frame = frame
+        self.image = wrap_rgb(frame)
+        self.scale = scale
+        self.update()
+
+    def set_heatmap(self, heat, region):
+        if heat is None:
+            self.heat_rgba = self.heat_image = self.heat_region = None
+        else:
+            self.heat_rgba = heat_to_rgba(heat)
+            height, width = heat.shape
+            self.heat_image = QImage(self.heat_rgba.data, width, height, self.heat_rgba.strides[0],
+                                     QImage.Format_RGBA8888)
+            self.heat_region = region
+        self.update()
+
+    def _view_rect(self):
+        """预览图在控件中的显示位置（保持宽高比居中）"""
+        if self.image is None:
+            return QRectF(self.rect())
+        image_w, image_h = self.image.width(), self.image.height()
+        factor = min(self.width() / image_w, self.height() / image_h)
+        w, h = image_w * factor, image_h * factor
+        return QRectF((self.width() - w) / 2, (self.height() - h) / 2, w, h)
+
+    def _screen_to_widget(self, x, y, w, h):
+        view = self._view_rect()
+        if self.image is None:
+            return QRectF()
+        factor = view.width() / self.image.width() * self.scale
+        return QRectF(view.x() + x * factor, view.y() + y * factor, w * factor, h * factor)
+
+    def _widget_to_screen(self, point):
+        view = self._view_rect()
+        factor = view.width() / self.image.width() * self.scale
+        x = min(max(point.x() - view.x(), 0), view.width()) / factor
+        y = min(max(point.y() - view.y(), 0), view.height()) / factor
+        return int(round(x)), int(round(y))
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        painter.fillRect(self.rect(), Qt.black)
+        if self.image is None:
+            painter.setPen(Qt.white)
+            painter.drawText(self.rect(), Qt.AlignCenter, "正在获取屏幕预览...")
+            return
+        painter.setRenderHint(QPainter.SmoothPixmapTransform, False)
+        painter.drawImage(self._view_rect(), self.image)
+        if self.heat_image is not None:
+            painter.drawImage(self._screen_to_widget(*self.heat_region), self.heat_image)
+
+        region = self.region
+        if self._drag_start is not None and self._drag_end is not None:
+            region = self._drag_region()
+        if region:
+            painter.setPen(QPen(QColor(255, 220, 0), 2))
+            painter.drawRect(self._screen_to_widget(*region))
+
+    def _drag_region(self):
+        (x1, y1), (x2, y2) = self._drag_start, self._drag_end
+        return (min(x1, x2), min(y1, y2), abs(x2 - x1), abs(y2 - y1))
+
+    def mousePressEvent(self, event):
+        if event.button() == Qt.LeftButton and self.image is not None:
+            self._drag_start = self._drag_end = self._widget_to_screen(event.pos())
+
+    def mouseMoveEvent(self, event):
+        if self._drag_start is not None:
+            self._drag_end = self._widget_to_screen(event.pos())
+            self.update()
+
+    def mouseReleaseEvent(self, event):
+        if self._drag_start is None:
+            return
+        self._drag_end = self._widget_to_screen(event.pos())
+        region = self._drag_region()
+        self._drag_start = self._drag_end = None
+        if region[2] >= 8 and region[3] >= 8:  # 忽略误触的单击
+            self.region = region
+            self.region_changed.emit(*region)
+        self.update()
+
+
+class RegionPickerDialog(QDialog):
+    """
+    监控区域选择对话框
+    显示屏幕的实时缩小预览，叠加屏幕监控累计的变化热力图（监控未运行时使用预览帧自身的变化），
+    拖动鼠标框选区域，确认后返回屏幕坐标
+    """
+
+    def __init__(self, region=None, monitor=None, grab=None, fps=4.0, max_width=960, parent=None):
+        """
+        :param region: 当前区域 (x, y, 宽, 高)
+        :param monitor: ScreenMonitor，运行中时显示其热力图
+        """
+        super().__init__(parent)
+        self.setWindowTitle("选择监控区域")
+        self.monitor = monitor
+        self.local_heatmap = ChangeHeatmap(cell=4)
+        self._previous_gray = None
+
+        layout = QVBoxLayout(self)
+        self.preview = RegionPreview(region)
+        self.preview.region_changed.connect(self.on_region_changed)
+        layout.addWidget(self.preview)
+
+        self.info_label = QLabel()
+        layout.addWidget(self.info_label)
+        buttons = QHBoxLayout()
+        self.ok_btn = QPushButton("使用该区域")
+        self.ok_btn.clicked.connect(self.accept)
+        self.ok_btn.setEnabled(region is not None)
+        cancel_btn = QPushButton("取消")
+        cancel_btn.clicked.connect(self.reject)
+        buttons.addStretch()
+        buttons.addWidget(self.ok_btn)
+        buttons.addWidget(cancel_btn)
+        layout.addLayout(buttons)
+        self.on_region_changed(*(region or (0, 0, 0, 0)))
+        self.resize(1000, 640)
+
+        self.grabber = PreviewGrabber(grab=grab, fps=fps, max_width=max_width)
+        self.grabber.frame_ready.connect(self.on_frame)
+        self.grabber.start()
+
+    @property
+    def region(self):
+        return self.preview.region
+
+    def on_region_changed(self, x, y, w, h):
+        self.ok_btn.setEnabled(w > 0 and h > 0)
+        self.info_label.setText(f"拖动鼠标框选区域，红色为检测到变化的位置。当前区域: ({x}, {y}, {w}, {h})")
+
+    def on_frame(self, frame, scale):
+        self.preview.set_frame(frame, scale)
+        self.grabber.pending = False
+        if self.monitor is not None and self.monitor.running:
+            heat, region = self.monitor.heatmap.snapshot()
+        else:
+            heat, region = self._accumulate_preview_changes(frame, scale)
+        self.preview.set_heatmap(heat, region)
+
+    def _accumulate_preview_changes(self, frame, scale):
+        """监控未运行时，用相邻两帧预览的差异累计热力图（在缩小后的帧上计算，开销很小）"""
+        gray = cv2.cvtColor(frame, cv2.COLOR_RGB2GRAY)
+        if self._previous_gray is not None and self._previous_gray.shape == gray.shape:
+            diff = cv2.absdiff(self._previous_gray, gray)
+            screen_w, screen_h = int(round(gray.shape[1] / scale)), int(round(gray.shape[0] / scale))
+            self.local_heatmap.accumulate(diff, (0, 0, screen_w, screen_h))
+        self._previous_gray = gray
+        return self.local_heatmap.snapshot()
+
+    def done(self, result):
+        self.grabber.stop()
+        super().done(result)
+
+
+def pick_region(region=None, monitor=None, parent=None):
+    """
+    打开区域选择对话框
+    :return: 选中的 (x, y, 宽, 高)，取消时返回None
+    """
+    dialog = RegionPickerDialog(region, monitor=monitor, parent=parent)
+    if dialog.exec_() == QDialog.Accepted and dialog.region:
+        return dialog.region
+    return None
@@ -1,69 +1,263 @@
 # main.py
-import cv2
+import sys
+if __name__ == "__main__" and '--profile-startup' in sys.argv:
+    # 在其他导入之前开始统计启动耗时
+    from modules.startup_profile import start_profiling
+    start_profiling()
+import os
 import time
 import threading
-import json
-from modules.screen_monitor import ScreenMonitor
-from modules.ai_handler import AIHandler
-from modules.keyboard_sim import KeyboardSimulator
 from modules.config_loader import ConfigLoader
-from modules.auto_copy_handler import AutoCopyHandler
+from modules.tracing import Tracer
+from modules.metrics import MetricsAggregator
+from modules.config_watcher import ConfigWatcher
+from modules.startup_profile import get_profiler
+
+# 屏幕监控（cv2、numpy、pyautogui）、自动复制、键盘模拟和AI处理器都在第一次用到时才导入和创建，
+# 例如只使用自动复制模式时不会加载屏幕监控
 
 class ChatAutomationApp:
     def __init__(self, config_file="config.json"):
         # 加载配置
         self.config = ConfigLoader(config_file)
-        print(f"⚙️ 配置加载完成: {self.config.config}")  # 调试信息
-        
-        # 初始化键盘模拟器
-        self.keyboard_sim = KeyboardSimulator()
-        
-        # 初始化AI处理器 - 确保传递的是完整的配置字典
-        print(f"🤖 配置对象类型: {type(self.config)}")  # 调试信息
-        print(f"🤖 配置内容: {self.config.config}")  # 调试信息
-        self.ai_handler = AIHandler(self.config.config)  # 关键修复：传递config.config而不是config对象
-        
-        # 初始化屏幕监控器，传递配置
-        self.screen_monitor = ScreenMonitor(
-            callback=self.on_new_content,
-            confidence_threshold=self.config.config.get('confidence_threshold', 0.7),
-            check_interval=self.config.config.get('check_interval', 0.5)
-        )
-        
-        # 从配置加载屏幕区域设置
-        screen_region = self.config.config.get('screen_region', {
-            'offset_x': 0,
-            'offset_y': 0,
-            'width': 800,
-            'height': 600
-        })
-        self.screen_monitor.update_detection_region(
-            screen_region['offset_x'],
-            screen_region['offset_y'],
-            screen_region['width'],
-            screen_region['height']
-        )
-        
-        # 初始化自动复制处理器
-        self.auto_copy_handler = AutoCopyHandler(self.config)
+        print(f"⚙️ 配置加载完成: {config_file}")
+
+        # 初始化追踪器，记录各处理阶段的耗时
+        # 追踪文件默认写入配置文件所在目录下的logs/，不随启动时的工作目录变化
+        self.tracer = Tracer.from_config(self.config.config.get('tracing', {}),
+                                         base_dir=os.path.dirname(os.path.abspath(config_file)))
+        # 进程内指标聚合：保存最近的span样本，供GUI性能页读取
+        metrics_config = self.config.config.get('metrics', {})
+        self.metrics = MetricsAggregator(
+            window=float(metrics_config.get('window', 300.0)),
+            max_samples=int(metrics_config.get('max_samples', 2048))
+        ).attach(self.tracer)
+        self.metrics.add_source('auto_copy', lambda: self.loaded('auto_copy_handler').get_stats()
+                                if self.loaded('auto_copy_handler') else {})
+        self.metrics.add_source('delivery', lambda: self.loaded('keyboard_sim').get_stats()
+                                if self.loaded('keyboard_sim') else {})
+        self.metrics.add_source('frame_store', lambda: self.loaded('screen_monitor').frame_store.get_stats()
+                                if self.loaded('screen_monitor') else {})
+        self.metrics.add_source('conversation_store', lambda: self.loaded('conversation_store').get_stats()
+                                if self.loaded('conversation_store') else {})
+        self.metrics.add_source('retrieval', lambda: self.loaded('retrieval_index').get_stats()
+                                if self.loaded('retrieval_index') else {})
+
+        # 按需创建的子系统
+        self._input_backend = None
+        self._clipboard = None
+        self._keyboard_sim = None
+        self._ai_handler = None
+        self._screen_monitor = None
+        self._auto_copy_handler = None
+        self._conversation_store = None
+        self._retrieval_index = None
+        self._lazy_lock = threading.RLock()
         
         # 启动屏幕监控线程
         self.monitor_thread = None
         self.auto_copy_thread = None
+
+        # 监视配置文件，修改后只把变化的部分应用到正在运行的组件
+        self.config_watcher = None
+        if self.config.config.get('config_hot_reload', True):
+            self.config_watcher = ConfigWatcher(config_file, self.on_config_file_changed)
+            self.config_watcher.start()
         
         print("✅ 应用初始化完成")
 
+    # ---------- 按需创建的子系统 ----------
+
+    def loaded(self, name):
+        """返回已创建的子系统，尚未创建时返回None（不会触发创建）"""
+        return getattr(self, f"_{name}")
+
+    @property
+    def input_backend(self):
+        """输入后端，键盘模拟器和自动复制处理器共用"""
+        with self._lazy_lock:
+            if self._input_backend is None:
+                with get_profiler().step('init input_backend'):
+                    from modules.input_backend import create_input_backend
+                    self._input_backend = create_input_backend(self.config.config.get('input_backend', 'auto'))
+            return self._input_backend
+
+    @property
+    def clipboard(self):
+        """剪贴板后端，同样由两者共用（X11下保持一个持久连接）"""
+        with self._lazy_lock:
+            if self._clipboard is None:
+                with get_profiler().step('init clipboard'):
+                    from modules.clipboard_backend import create_clipboard_backend
+                    self._clipboard = create_clipboard_backend(self.config.config.get('clipboard_backend', 'auto'))
+            return self._clipboard
+
+    @property
+    def keyboard_sim(self):
+        """键盘模拟器（屏幕监控模式发送回复时使用）"""
+        with self._lazy_lock:
+            if self._keyboard_sim is None:
+                with get_profiler().step('init KeyboardSimulator'):
+                    from modules.keyboard_sim import KeyboardSimulator
+                    self._keyboard_sim = KeyboardSimulator(
+                        delay_scale=self.config.config.get('humanize_delay_scale', 1.0),
+                        input_backend=self.input_backend,
+                        clipboard=self.clipboard,
+                        delivery_config=self.config.config.get('delivery', {})
+                    )
+            return self._keyboard_sim
+
+    @property
+    def ai_handler(self):
+        """AI处理器 - 传递的是完整的配置字典"""
+        with self._lazy_lock:
+            if self._ai_handler is None:
+                with get_profiler().step('init AIHandler'):
+                    from modules.ai_handler import AIHandler
+                    self._ai_handler = AIHandler(self.config.config, retrieval_index=self.retrieval_index)
+            return self._ai_handler
+
+    @property
+    def screen_monitor(self):
+        """屏幕监控器，创建时应用配置中的检测区域"""
+        with self._lazy_lock:
+            if self._screen_monitor is None:
+                with get_profiler().step('init ScreenMonitor'):
+                    from modules.screen_monitor import ScreenMonitor
+                    from modules.frame_store import FrameStore
+                    monitor = ScreenMonitor(
+                        callback=self.on_new_content,
+                        confidence_threshold=self.config.config.get('confidence_threshold', 0.7),
+                        check_interval=self.config.config.get('check_interval', 0.5),
+                        tracer=self.tracer,
+                        frame_store=FrameStore.from_config(self.config.config.get('frame_store', {})),
+                        capture_process=self.config.config.get('capture_process', {})
+                    )
+                    screen_region = self.config.config.get('screen_region', {
+                        'offset_x': 0,
+                        'offset_y': 0,
+                        'width': 800,
+                        'height': 600
+                    })
+                    monitor.update_detection_region(
+                        screen_region['offset_x'],
+                        screen_region['offset_y'],
+                        screen_region['width'],
+                        screen_region['height']
+                    )
+                    self._screen_monitor = monitor
+            return self._screen_monitor
+
+    @property
+    def conversation_store(self):
+        """会话存储（SQLite），conversation_store.enabled为false时为None"""
+        with self._lazy_lock:
+            if self._conversation_store is None:
+                with get_profiler().step('init ConversationStore'):
+                    from modules.conversation_store import ConversationStore
+                    self._conversation_store = ConversationStore.from_config(
+                        self.config.config.get('conversation_store', {}))
+            return self._conversation_store
+
+    @property
+    def retrieval_index(self):
+        """早期对话的检索索引，retrieval.enabled为false或没有会话存储时为None"""
+        with self._lazy_lock:
+            # 未启用时不为此创建会话存储
+            if self._retrieval_index is None and self.config.config.get('retrieval', {}).get('enabled', False):
+                with get_profiler().step('init RetrievalIndex'):
+                    from modules.retrieval_index import RetrievalIndex
+                    self._retrieval_index = RetrievalIndex.from_config(self.config.config, self.conversation_store)
+            return self._retrieval_index
+
+    @property
+    def auto_copy_handler(self):
+        """自动复制处理器"""
+        with self._lazy_lock:
+            if self._auto_copy_handler is None:
+                with get_profiler().step('init AutoCopyHandler'):
+                    from modules.auto_copy_handler import AutoCopyHandler
+                    self._auto_copy_handler = AutoCopyHandler(self.config, tracer=self.tracer,
+                                                              input_backend=self.input_backend,
+                                                              clipboard_backend=self.clipboard,
+                                                              conversation_store=self.conversation_store,
+                                                              retrieval_index=self.retrieval_index)
+            return self._auto_copy_handler
+
+    def _screen_monitor_running(self):
+        return self._screen_monitor is not None and self._screen_monitor.running
+
+    def _auto_copy_running(self):
+        return self._auto_copy_handler is not None and self._auto_copy_handler.is_running
+
+    def on_config_file_changed(self):
+        """配置文件在磁盘上被修改（GUI写回或手动编辑）"""
+        changed = self.config.reload()
+        if not changed:
+            return  # 与上次读写的内容相同，例如本进程自己的写入
+        print(f"🔁 配置文件已更新: {', '.join(changed)}")
+        self.apply_config_changes(changed)
+
+    def apply_config_changes(self, changed):
+        """
+        把变化的配置应用到运行中的组件，不重启线程
+        自动复制处理器和AI处理器读取的是同一份配置（快照/字典），下一个周期或请求自动生效
+        """
+        def touched(*names):
+            return any(key == name or key.startswith(name + '.') for key in changed for name in names)
+
+        config = self.config.config
+        # 尚未创建的子系统在创建时会读取最新配置，这里只更新已创建的
+        if self._screen_monitor is not None:
+            if touched('screen_region'):
+                region = config.get('screen_region', {})
+                self.update_screen_region(region.get('offset_x', 0), region.get('offset_y', 0),
+                                          region.get('width', 800), region.get('height', 600))
+            if touched('confidence_threshold'):
+                self._screen_monitor.confidence_threshold = config.get('confidence_threshold', 0.7)
+            if touched('check_interval'):
+                self._screen_monitor.check_interval = config.get('check_interval', 0.5)
+        if touched('humanize_delay_scale') and self._keyboard_sim is not None:
+            self._keyboard_sim.delay_scale = config.get('humanize_delay_scale', 1.0)
+        if touched('ollama', 'ollama_model', 'ollama_host', 'prompt_template'):
+            print(f"🤖 Ollama设置已更新，下一次请求使用模型: {self.config.snapshot().ollama.model}")
+        if touched('monitoring', 'capture_point', 'input_point', 'auto_copy_interval'):
+            print("🖱️ 坐标或间隔已更新，自动复制将在下一个周期使用新设置")
+        if touched('active_mode'):
+            self.switch_mode(config.get('active_mode', 'auto_copy'))
+
     def update_model(self, new_model_name):
         """更新AI模型"""
         print(f"🔄 更新AI模型为: {new_model_name}")
         # 更新配置
-        self.config.config['ollama_model'] = new_model_name
-        # 重新创建AI处理器以使用新模型
-        self.ai_handler = AIHandler(self.config.config)
+        self.config.set('ollama_model', new_model_name)
+        # ollama_model优先于ollama.model（见resolve_ollama_model），AI处理器和自动复制的下一次请求即使用新模型
         print(f"✅ AI模型已更新为: {new_model_name}")
 
+    def is_running(self):
+        """是否有功能正在运行（不会为此创建子系统）"""
+        return self._screen_monitor_running() or self._auto_copy_running()
+
+    def get_status(self):
+        """当前状态，供控制socket的status等命令返回"""
+        running_mode = None
+        if self._screen_monitor_running():
+            running_mode = 'screen_monitor'
+        elif self._auto_copy_running():
+            running_mode = 'auto_copy'
+        return {
+            'running': running_mode is not None,
+            'running_mode': running_mode,
+            'mode': self.config.config.get('active_mode', 'auto_copy'),
+            'model': self.config.snapshot().ollama.model,
+            'loaded': [name for name in ('input_backend', 'clipboard', 'keyboard_sim', 'ai_handler',
+                                         'screen_monitor', 'auto_copy_handler', 'conversation_store',
+                                         'retrieval_index')
+                       if self.loaded(name)],
+        }
+
     def start_monitoring(self):
-        """启动监控 - 根据配置的模式决定启动哪种功能"""
+        """启动监控 - 根据配置的模式决定启动哪种功能，返回是否成功"""
         active_mode = self.config.config.get('active_mode', 'auto_copy')
         print(f"🔄 当前激活模式: {active_mode}")
         print(f"📋 启用自动复制: {self.config.config.get('enable_auto_copy', False)}")
@@ -76,45 +270,58 @@ class ChatAutomationApp:
                 print("✅ 屏幕监控已启动")
             else:
                 print("⚠️ 屏幕监控已在运行")
+            return True
         elif active_mode == 'auto_copy':
             # 启动自动复制模式
-            self.start_auto_copy()
+            return self.start_auto_copy()
         else:
             print(f"❌ 未知模式: {active_mode}")
+            return False
 
     def stop_monitoring(self):
-        """停止监控 - 根据配置的模式决定停止哪种功能"""
+        """
+        停止监控 - 停止所有正在运行的功能
+        运行中切换模式后，配置里的active_mode已是新模式，因此不能只按配置决定停止哪种功能
+        """
         active_mode = self.config.config.get('active_mode', 'auto_copy')
         print(f"🔄 停止模式: {active_mode}")
-        
-        if active_mode == 'screen_monitor':
+        stop_start = time.perf_counter()
+
+        if self._screen_monitor_running():
             # 停止屏幕监控模式
             self.screen_monitor.stop_monitoring()
             if self.monitor_thread and self.monitor_thread.is_alive():
                 self.monitor_thread.join(timeout=2)  # 最多等待2秒
             print("✅ 屏幕监控已停止")
-        elif active_mode == 'auto_copy':
+        if self._auto_copy_running():
             # 停止自动复制模式
             self.stop_auto_copy()
-        else:
-            print(f"❌ 未知模式: {active_mode}")
+        print(f"⏱️ 停止耗时: {(time.perf_counter() - stop_start) * 1000:.0f}ms")
+
+    def switch_mode(self, mode):
+        """运行中切换工作模式：停止当前功能并以新模式重新启动"""
+        running_mode = None
+        if self._screen_monitor_running():
+            running_mode = 'screen_monitor'
+        elif self._auto_copy_running():
+            running_mode = 'auto_copy'
+        self.config.set('active_mode', mode)
+        if running_mode is None or running_mode == mode:
+            return
+        switch_start = time.perf_counter()
+        self.stop_monitoring()
+        self.start_monitoring()
+        print(f"🔀 模式已切换到 {mode}，耗时 {(time.perf_counter() - switch_start) * 1000:.0f}ms")
 
     def start_auto_copy(self):
         """启动自动复制功能"""
         try:
-            # 检查坐标是否已设置
-            capture_point = self.config.config.get('capture_point', {'x': 0, 'y': 0})
-            input_point = self.config.config.get('input_point', {'x': 0, 'y': 0})
-            print(f"📋 捕获点坐标: ({capture_point.get('x', 0)}, {capture_point.get('y', 0)})")
-            print(f"⌨️ 输入框坐标: ({input_point.get('x', 0)}, {input_point.get('y', 0)})")
-            
-            if capture_point.get('x', 0) == 0 and capture_point.get('y', 0) == 0:
-                print("❌ 捕获点坐标未设置，请先设置坐标")
+            # 检查是否有坐标已设置的聊天目标（monitoring.chat_targets、copy_area_coords/input_coords或旧的capture_point/input_point）
+            targets = self.config.snapshot().chat_targets
+            if not targets:
+                print("❌ 没有设置好捕获点和输入框坐标的聊天目标，请先设置坐标")
                 return False
-            if input_point.get('x', 0) == 0 and input_point.get('y', 0) == 0:
-                print("❌ 输入框坐标未设置，请先设置坐标")
-                return False
-                
+
             self.auto_copy_handler.start_listening()
             print("✅ 自动复制功能已启动")
             return True
@@ -127,7 +334,8 @@ class ChatAutomationApp:
     def stop_auto_copy(self):
         """停止自动复制功能"""
         try:
-            self.auto_copy_handler.stop_listening()
+            if self._auto_copy_handler is not None:
+                self._auto_copy_handler.stop_listening()
             print("✅ 自动复制功能已停止")
             return True
         except Exception as e:
@@ -139,42 +347,85 @@ class ChatAutomationApp:
     def on_new_content(self, detected_text):
         """当检测到新内容时的回调函数"""
         print(f"💬 检测到新内容: {detected_text}")
-        print(f"🤖 当前使用的模型: {self.config.config.get('ollama_model', 'default')}")
-        print(f"🤖 AI处理器的配置类型: {type(self.ai_handler.config)}")
-        print(f"🤖 AI处理器的配置内容: {self.ai_handler.config}")  # 新增调试信息
-        
-        # 使用AI处理检测到的内容
-        response = self.ai_handler.get_ai_response(detected_text)
-        
-        if response:
-            print(f"🤖 AI响应: {response}")
-            
-            # 发送响应
-            self.send_response(response)
+        print(f"🤖 当前使用的模型: {self.config.snapshot().ollama.model}")
+        from modules.cancellation import OperationCancelled
+
+        try:
+            self._reply_to_content(detected_text)
+        except OperationCancelled:
+            print("⏹️ 屏幕监控已停止，放弃本次回复")
+
+    def _monitor_stop_event(self):
+        """屏幕监控的停止事件：停止监控时立即中断进行中的Ollama请求和发送"""
+        return self._screen_monitor.stop_event if self._screen_monitor is not None else None
+
+    def _reply_to_content(self, detected_text):
+        with self.tracer.trace('on_new_content') as trace:
+            # 使用AI处理检测到的内容
+            with trace.span('llm'):
+                response = self.ai_handler.get_ai_response(detected_text, chat='screen_monitor',
+                                                           cancel_event=self._monitor_stop_event())
+
+            if response:
+                print(f"🤖 AI响应: {response}")
+                store = self.conversation_store
+                if store is not None:
+                    from modules.conversation_store import ROLE_USER, ROLE_ASSISTANT
+                    store.append('screen_monitor', ROLE_USER, detected_text)
+                    store.append('screen_monitor', ROLE_ASSISTANT, response)
+
+                # 发送响应
+                with trace.span('send'):
+                    self.send_response(response)
 
     def send_response(self, response):
         """发送响应"""
-        # 使用键盘模拟器发送响应
-        self.keyboard_sim.type_text(response)
-        time.sleep(0.1)  # 短暂延迟
-        self.keyboard_sim.press_enter()
+        # 使用键盘模拟器发送响应 - 优先使用monitoring中的输入框坐标
+        input_point = self.config.config.get('monitoring', {}).get('input_coords') or \
+            self.config.config.get('input_point', {'x': 0, 'y': 0})
+        # 停止屏幕监控时立即中断发送中的停顿和确认等待
+        return self.keyboard_sim.send_message(response, (input_point.get('x', 0), input_point.get('y', 0)),
+                                              cancel_event=self._monitor_stop_event())
+
+    def shutdown(self):
+        """退出前停止所有功能、配置监视，写入未保存的配置并关闭追踪文件"""
+        self.stop_monitoring()
+        if self.config_watcher is not None:
+            self.config_watcher.stop()
+            self.config_watcher = None
+        self.config.close()
+        if self._retrieval_index is not None:
+            self._retrieval_index.stop()  # 保存已计算的向量
+        if self._conversation_store is not None:
+            self._conversation_store.close()
+        self.tracer.close()
 
     def update_screen_region(self, x, y, width, height):
-        """更新屏幕监控区域"""
-        self.screen_monitor.update_detection_region(x, y, width, height)
-        print(f"🔄 屏幕监控区域已更新: ({x}, {y}, {width}, {h})")
+        """更新屏幕监控区域（屏幕监控尚未创建时，创建时会从配置读取区域）"""
+        if self._screen_monitor is not None:
+            self._screen_monitor.update_detection_region(x, y, width, height)
+        print(f"🔄 屏幕监控区域已更新: ({x}, {y}, {width}, {height})")
 
     def get_current_region(self):
         """获取当前屏幕监控区域"""
-        return self.screen_monitor.get_current_region()
+        if self._screen_monitor is not None:
+            return self._screen_monitor.get_current_region()
+        region = self.config.config.get('screen_region', {})
+        return (region.get('offset_x', 0), region.get('offset_y', 0), region.get('width', 800), region.get('height', 600))
 
 def main():
-    """主函数"""
-    automation_system = ChatAutomationApp("user_config.json")
+    """主函数，--profile-startup 输出启动耗时分析"""
+    profiler = get_profiler()
+    with profiler.step('ChatAutomationApp.__init__'):
+        automation_system = ChatAutomationApp("user_config.json")
     
     try:
-        # 启动监控
-        automation_system.start_monitoring()
+        # 启动监控（按当前模式创建需要的子系统）
+        with profiler.step('start_monitoring'):
+            automation_system.start_monitoring()
+        if '--profile-startup' in sys.argv:
+            profiler.mark('监控已启动')
+            print(profiler.report())
         
         # 保持主线程运行
         while True:
@@ -6,6 +6,50 @@ import datetime
 import platform
 import getpass
 
+from .config_snapshot import resolve_ollama_model
+from .cancellation import OperationCancelled, post_json_cancellable
+
+
+def filter_thinking_process(response):
+    """过滤AI的思考过程，只返回最终回复"""
+    # 移除<think>...</think>标签及其内容
+    no_thinking = re.sub(r'<think>.*?</think>', '', response, flags=re.DOTALL | re.IGNORECASE)
+
+    # 移除[think]...[/think]标签及其内容
+    no_thinking = re.sub(r'\[think\].*?\[/think\]', '', no_thinking, flags=re.DOTALL | re.IGNORECASE)
+
+    # 移除<!--think-->...<!--/think-->注释及其内容
+    no_thinking = re.sub(r'<!--think-->.*?<!--/think-->', '', no_thinking, flags=re.DOTALL | re.IGNORECASE)
+
+    # 移除其他可能的思考标记
+    no_thinking = re.sub(r'Thought:.*?(?=AI回复:|$)', '', no_thinking, flags=re.DOTALL | re.IGNORECASE)
+    no_thinking = re.sub(r'思考:.*?(?=回复:|$)', '', no_thinking, flags=re.DOTALL | re.IGNORECASE)
+
+    # 清理多余的空白行和空格
+    lines = [line.strip() for line in no_thinking.split('\n') if line.strip()]
+    cleaned_response = '\n'.join(lines).strip()
+
+    # 如果清理后为空，返回原响应的非思考部分
+    if not cleaned_response:
+        # 只移除思考部分，保留其他内容
+        fallback = re.sub(r'<think>.*?</think>', '', response, flags=re.DOTALL | re.IGNORECASE)
+        fallback = re.sub(r'\[think\].*?\[/think\]', '', fallback, flags=re.DOTALL | re.IGNORECASE)
+        fallback = fallback.strip()
+
+        if fallback:
+            # 提取第一个完整句子作为回复
+            sentences = re.split(r'[。！!?]', fallback)
+            for sentence in sentences:
+                clean_sentence = sentence.strip()
+                if len(clean_sentence) > 0 and not clean_sentence.startswith('<') and not clean_sentence.startswith('['):
+                    return clean_sentence + '。'
+            return sentences[0].strip() + '。' if sentences else "我理解了，谢谢！"
+        else:
+            return "我理解了，谢谢！"
+
+    return cleaned_response
+
+
 class SystemInfoProvider:
     def __init__(self):
         pass
@@ -33,8 +77,12 @@ class SystemInfoProvider:
 - 操作系统: {info['system_name']} ({info['platform_details']})"""
 
 class AIHandler:
-    def __init__(self, config):
+    def __init__(self, config, retrieval_index=None):
+        """
+        :param retrieval_index: 早期对话的检索索引（RetrievalIndex），提供时在提示中加入最相关的几条早期消息
+        """
         self.config = config
+        self.retrieval_index = retrieval_index
         self.system_info_provider = SystemInfoProvider()
         print(f"📊 AIHandler初始化完成")
 
@@ -47,18 +95,23 @@ class AIHandler:
             print(f"❌ Ollama连接测试失败: {e}")
             return False
 
-    def get_ai_response(self, user_message):
-        """获取AI回复 - 注入系统信息（使用最初有效的实现方式）"""
+    def get_ai_response(self, user_message, chat=None, cancel_event=None):
+        """
+        获取AI回复 - 注入系统信息（使用最初有效的实现方式）
+        :param chat: 消息所属的聊天，检索早期对话时只在该聊天中查找
+        :param cancel_event: 停止事件，设置后立即断开Ollama请求并抛出OperationCancelled
+        """
         try:
             # 获取系统信息
             system_info_text = self.system_info_provider.get_formatted_info()
             print(f"📊 系统信息已注入: {system_info_text[:100]}...")  # 调试信息
-            
+            memory_text = self.related_conversation(user_message, chat)
+
             # 使用最初有效的提示词结构
             prompt = f"""你是一个智能对话助手。请根据以下信息进行回复：
 
 {system_info_text}
-
+{memory_text}
 用户消息: {user_message}
 
 请根据上述系统信息和用户消息进行智能回复:"""
@@ -69,12 +122,12 @@ class AIHandler:
             if isinstance(self.config, dict):
                 # 从配置字典中获取模型信息
                 ollama_config = self.config.get('ollama', {})
-                model_name = ollama_config.get('model') or self.config.get('ollama_model', 'qwen3:8b')
+                model_name = resolve_ollama_model(self.config)
                 ollama_url = ollama_config.get('url', 'http://localhost:11434/api/generate')
             else:
                 # 兼容其他配置格式
                 ollama_config = self.config.get('ollama', {}) if hasattr(self.config, 'get') else self.config
-                model_name = ollama_config.get('model', self.config.get('ollama_model', 'qwen3:8b')) if hasattr(self.config, 'get') else self.config.get('ollama_model', 'qwen3:8b')
+                model_name = resolve_ollama_model(self.config) if hasattr(self.config, 'get') else self.config.get('ollama_model', 'qwen3:8b')
                 ollama_url = ollama_config.get('url', 'http://localhost:11434/api/generate') if hasattr(self.config, 'get') else 'http://localhost:11434/api/generate'
 
             print(f"🔧 使用模型: {model_name}, URL: {ollama_url}")  # 调试信息
@@ -91,8 +144,8 @@ class AIHandler:
                 }
             }
 
-            # 发送请求
-            response = requests.post(ollama_url, json=data, timeout=60)
+            # 发送请求（可被停止事件中断）
+            response = post_json_cancellable(ollama_url, data, cancel_event, timeout=60)
             print(f"AI请求状态码: {response.status_code}, 响应长度: {len(response.text)}")  # 调试信息
 
             if response.status_code == 200:
@@ -114,6 +167,8 @@ class AIHandler:
                 print(error_msg)
                 return "抱歉，暂时无法回复"
 
+        except OperationCancelled:
+            raise
         except requests.exceptions.Timeout:
             print("⏰ AI请求超时，请检查Ollama服务状态或增加超时时间")
             return "抱歉，AI响应超时"
@@ -126,43 +181,13 @@ class AIHandler:
             traceback.print_exc()  # 打印详细错误堆栈
             return "抱歉，AI服务出现错误"
 
+    def related_conversation(self, user_message, chat=None, exclude=()):
+        """与当前消息最相关的几条早期消息组成的提示片段，没有检索索引或没有相关消息时返回空字符串"""
+        if self.retrieval_index is None:
+            return ""
+        related = self.retrieval_index.related_text(user_message, chat=chat, exclude=exclude)
+        return f"\n相关的早期对话:\n{related}\n" if related else ""
+
     def filter_thinking_process(self, response):
         """过滤AI的思考过程，只返回最终回复"""
-        import re
-
-        # 移除<think>...</think>标签及其内容
-        no_thinking = re.sub(r'<think>.*?</think>', '', response, flags=re.DOTALL | re.IGNORECASE)
-
-        # 移除[think]...[/think]标签及其内容
-        no_thinking = re.sub(r'\[think\].*?\[/think\]', '', no_thinking, flags=re.DOTALL | re.IGNORECASE)
-
-        # 移除<!--think-->...<!--/think-->注释及其内容
-        no_thinking = re.sub(r'<!--think-->.*?<!--/think-->', '', no_thinking, flags=re.DOTALL | re.IGNORECASE)
-
-        # 移除其他可能的思考标记
-        no_thinking = re.sub(r'Thought:.*?(?=AI回复:|$)', '', no_thinking, flags=re.DOTALL | re.IGNORECASE)
-        no_thinking = re.sub(r'思考:.*?(?=回复:|$)', '', no_thinking, flags=re.DOTALL | re.IGNORECASE)
-
-        # 清理多余的空白行和空格
-        lines = [line.strip() for line in no_thinking.split('\n') if line.strip()]
-        cleaned_response = '\n'.join(lines).strip()
-
-        # 如果清理后为空，返回原响应的非思考部分
-        if not cleaned_response:
-            # 只移除思考部分，保留其他内容
-            fallback = re.sub(r'<think>.*?</think>', '', response, flags=re.DOTALL | re.IGNORECASE)
-            fallback = re.sub(r'\[think\].*?\[/think\]', '', fallback, flags=re.DOTALL | re.IGNORECASE)
-            fallback = fallback.strip()
-
-            if fallback:
-                # 提取第一个完整句子作为回复
-                sentences = re.split(r'[。！!?]', fallback)
-                for sentence in sentences:
-                    clean_sentence = sentence.strip()
-                    if len(clean_sentence) > 0 and not clean_sentence.startswith('<') and not clean_sentence.startswith('['):
-                        return clean_sentence + '。'
-                return sentences[0].strip() + '。' if sentences else "我理解了，谢谢！"
-            else:
-                return "我理解了，谢谢！"
-
-        return cleaned_response
\ No newline at end of file
+        return filter_thinking_process(response)
\ No newline at end of file
@@ -1,11 +1,20 @@
-import pyautogui
+import os
 import time
-import keyboard
-import requests
-import json
 import threading
 import random
+import contextlib
+from collections import namedtuple
 from .config_loader import ConfigLoader
+from .ai_handler import filter_thinking_process
+from .tracing import Tracer
+from .dedup_store import KIND_INBOUND, KIND_REPLY
+from .chat_targets import build_chat_targets
+from .input_backend import create_input_backend
+from .clipboard_backend import create_clipboard_backend
+from .trajectory import TrajectoryPlayer, plan_eased_path, plan_bezier_path
+from .cancellation import OperationCancelled, interruptible_sleep, post_json_cancellable
+from .pipeline import StageQueue, FairLock, render_queue_metrics
+from .metrics import ollama_generation_stats
 import datetime
 import platform
 import getpass
@@ -36,32 +45,82 @@ class SystemInfoProvider:
 - 用户: {info['user_name']}
 - 操作系统: {info['system_name']} ({info['platform_details']})"""
 
+# 捕获阶段的产物：text为待回复的文本，parts为合并前的各条原文
+CapturedMessage = namedtuple('CapturedMessage', ['text', 'parts', 'gate_patch', 'gate_point'])
+
+
+def merge_captured_messages(older, newer):
+    """捕获队列的合并函数：推理跟不上时把排队中的消息合并成一条，闸门基准取最新的画面"""
+    return CapturedMessage(f"{older.text}\n{newer.text}", older.parts + newer.parts,
+                           newer.gate_patch, newer.gate_point)
+
+
 class AutoCopyHandler:
-    def __init__(self, config: ConfigLoader):
+    def __init__(self, config: ConfigLoader, tracer=None, input_backend=None, clipboard_backend=None,
+                 conversation_store=None, retrieval_index=None):
         self.config = config
+        self.tracer = tracer or Tracer.from_config(  # 各阶段耗时追踪
+            self.config.get('tracing', {}), base_dir=os.path.dirname(os.path.abspath(self.config.config_file)))
         self.system_info_provider = SystemInfoProvider()  # 添加系统信息提供器
         self.is_running = False
         self.auto_copy_thread = None
-        self.last_processed_text = ""  # 记录上次处理的文本，避免重复处理
-        self.last_processed_time = 0   # 记录处理时间，避免短时间内重复处理
+        # 停止事件：周期内的所有等待和Ollama请求都在该事件被设置时立即中断
+        self.stop_event = threading.Event()
+        self.last_stop_latency = None  # 最近一次停止的耗时（秒）
         self.is_processing = False     # 标记是否正在处理中，避免并发处理
         self.processing_lock = threading.Lock()  # 线程锁
-
-        # 程序启动时清理一次剪贴板
-        self._clear_clipboard()
+        self.delay_scale = float(self.config.get('humanize_delay_scale', 1.0))  # 人性化延迟缩放系数，0表示不等待
+
+        # 会话存储（可选）：持久化每轮对话，重启后恢复对话历史和去重指纹
+        self.conversation_store = conversation_store
+        # 早期对话检索索引（可选）：生成回复时只注入最相关的几条早期消息
+        self.retrieval_index = retrieval_index
+        # 聊天目标：每个聊天窗口有各自的捕获点、输入框、变化闸门、去重表和对话历史
+        self.targets = build_chat_targets(self.config, merge=merge_captured_messages, store=conversation_store)
+        self._serial_index = 0  # 串行模式下轮流处理各个聊天目标
+        self._targets_version = self.config.snapshot().version  # 构建目标列表时的配置快照版本
+        # 输入注入后端：Linux下优先XTest，不可用时回退到pyautogui
+        self.input_backend = input_backend or create_input_backend(self.config.get('input_backend', 'auto'))
+
+        # 鼠标轨迹回放器：按单调时钟的截止时间发出每个轨迹点
+        self.trajectory_player = TrajectoryPlayer(self.input_backend.move_to, sleep=self._wait)
+        self.last_mouse_move = None  # 最近一次鼠标移动的计划/实际耗时
+        # 剪贴板后端：Linux下优先使用持久X连接并订阅所有者变化，不可用时回退到pyperclip
+        self.clipboard = clipboard_backend or create_clipboard_backend(self.config.get('clipboard_backend', 'auto'))
+        self.clipboard_timeout = float(self.config.get('clipboard_timeout', 1.0))  # 等待复制完成的最长时间（秒）
+
+        self.skipped_cycles = 0   # 因捕获区域无变化而跳过的周期数
+        self.executed_cycles = 0  # 实际执行复制操作的周期数
+        self.failed_messages = 0  # 推理或投递出错、已撤销指纹等待重新捕获的消息数
+
+        # 流水线模式：一个捕获线程按截止时间轮流观察各聊天目标，每个目标一个推理线程，
+        # 一个投递线程；各目标的捕获队列和共用的投递队列都是有界队列
+        pipeline_config = self.config.get('pipeline', {})
+        delivery_queue_config = pipeline_config.get('delivery_queue', {})
+        self.delivery_queue = StageQueue(
+            'delivery',
+            maxsize=delivery_queue_config.get('maxsize', 8),
+            policy=delivery_queue_config.get('policy', 'block')
+        )
+        # 捕获和投递阶段共用鼠标键盘，同一时间只允许一个阶段操作，按申请顺序轮流获得
+        self.input_lock = FairLock()
+        self.generation_slots = None  # 同时进行的模型生成数量上限
+        self.pipeline_threads = []
+        self._inference_threads = {}  # 聊天目标 -> 推理线程
+        self.tracer.add_collector(lambda: render_queue_metrics(
+            [target.capture_queue for target in self.targets] + [self.delivery_queue]))
 
     def _clear_clipboard(self):
         """清理剪贴板"""
         try:
-            import pyperclip
-            pyperclip.copy("")  # 清空剪贴板
+            self.clipboard.clear()  # 清空剪贴板
             print("🧹 启动时剪贴板已清理")
         except Exception as e:
             print(f"⚠️ 启动时清理剪贴板失败: {e}")
 
     def perform_auto_copy_cycle(self):
         """
-        执行一次自动复制周期:
+        执行一次自动复制周期（串行模式）:
         1. 点击文本捕获点选中文本
         2. 复制文本
         3. 发送给Ollama模型
@@ -85,169 +144,283 @@ class AutoCopyHandler:
             self.is_processing = True  # 设置处理标志
 
         try:
-            # 获取坐标配置 - 优先使用新的monitoring配置格式
-            monitoring_config = self.config.get('monitoring', {})
-            capture_point = monitoring_config.get('copy_area_coords', {})
-            input_point = monitoring_config.get('input_coords', {})
-            
-            # 如果新格式没有找到，尝试旧格式
-            if not capture_point:
-                capture_point = self.config.get('capture_point', {'x': 0, 'y': 0})
-            if not input_point:
-                input_point = self.config.get('input_point', {'x': 0, 'y': 0})
-
-            capture_x = capture_point.get('x', 0)
-            capture_y = capture_point.get('y', 0)
-            input_x = input_point.get('x', 0)
-            input_y = input_point.get('y', 0)
-
-            if capture_x == 0 and capture_y == 0:
-                print("⚠️ 文本捕获点坐标未设置")
-                return
+            with self.tracer.trace('auto_copy_cycle') as trace:
+                # 每个周期取一次配置快照，周期内的所有读取都来自同一份配置
+                settings = self.config.snapshot()
+                self.delay_scale = settings.auto_copy.delay_scale
+
+                if not self._refresh_targets(trace, settings):
+                    return
+                target = self.targets[self._serial_index % len(self.targets)]
+                self._serial_index += 1
+                trace.attrs['target'] = target.name
+
+                message = self._capture_message(trace, target, settings)
+                if message is None:
+                    return
+
+                response_text = self._generate_reply(trace, target, message.text)
+                if not response_text:
+                    return
+
+                self._deliver_reply(trace, target, message, response_text)
+                print("✅ 自动复制周期完成 - 用户消息已处理，AI回复已发送")
+
+        except OperationCancelled:
+            print("🛑 自动复制已停止，当前周期已中断")
+        except Exception as e:
+            print(f"❌ 自动复制周期执行失败: {e}")
+        finally:
+            with self.processing_lock:  # 使用锁确保线程安全
+                self.is_processing = False  # 无论成功与否，都要清除处理标志
 
-            if input_x == 0 and input_y == 0:
-                print("⚠️ 输入框坐标未设置")
-                return
+    def _refresh_targets(self, trace=None, settings=None):
+        """
+        按当前配置更新聊天目标列表（坐标未变的目标保留去重表和对话历史）
+        配置快照与上次相同时直接沿用现有目标
+        :return: 是否至少有一个已设置坐标的目标
+        """
+        settings = settings or self.config.snapshot()
+        if settings.version != self._targets_version:
+            self.targets = build_chat_targets(self.config, existing=self.targets, merge=merge_captured_messages,
+                                              definitions=settings.chat_targets, store=self.conversation_store)
+            self._targets_version = settings.version
+        if not self.targets:
+            if trace is not None:
+                trace.attrs['outcome'] = 'unconfigured'
+            return False
+        return True
+
+    def _capture_message(self, trace, target, settings):
+        """
+        捕获阶段：检查目标的变化闸门，复制捕获点的文本，过滤空文本和重复文本
+        :param settings: 本周期的配置快照
+        :return: CapturedMessage，无需处理时返回None（原因记录在trace.attrs['outcome']）
+        """
+        capture_x, capture_y = target.capture_point
+
+        # 捕获点周围区域自上次处理后没有变化，说明没有新消息，跳过本次周期
+        with trace.span('capture'):
+            gate_patch = target.check_change_gate(settings.monitoring.change_gate_enabled)
+        if gate_patch is False:
+            self.skipped_cycles += 1
+            target.skipped_cycles += 1
+            trace.attrs['outcome'] = 'skipped'
+            print(f"🙈 [{target.name}] 捕获区域无变化，跳过本次周期 (已跳过 {self.skipped_cycles} 次)")
+            return None
+        self.executed_cycles += 1
+        target.executed_cycles += 1
+
+        print(f"🖱️ [{target.name}] 准备点击文本捕获点: ({capture_x}, {capture_y})")
 
-            print(f"🖱️ 准备点击坐标 - 捕获点: ({capture_x}, {capture_y}), 输入框: ({input_x}, {input_y})")
+        with trace.span('copy') as span_attrs:
+            # 鼠标位于屏幕角落时中止本次周期（每周期检查一次）
+            self.input_backend.fail_safe_check()
 
             # 添加随机的人类行为模拟
             # 1. 鼠标移动模拟人类轨迹
             self._human_like_mouse_move(capture_x, capture_y)
-            time.sleep(random.uniform(0.2, 0.5))  # 随机停顿
+            self._human_pause(0.2, 0.5)  # 随机停顿
 
-            # 2. 点击文本捕获点并选中文本
+            # 2. 点击文本捕获点
             print(f"🖱️ 移动到文本捕获点 ({capture_x}, {capture_y}) 并选中文本")
-            pyautogui.click(capture_x, capture_y)
-            time.sleep(random.uniform(0.1, 0.3))  # 随机停顿
-            pyautogui.tripleClick(capture_x, capture_y)  # 三击选中文本
-            time.sleep(random.uniform(0.2, 0.4))  # 随机停顿
+            self.input_backend.click(capture_x, capture_y)
+            self._human_pause(0.4, 0.9)  # 选中和复制之前的随机停顿
 
-            # 3. 复制文本 (Ctrl+C) - 添加随机停顿
+            # 3. 三击选中文本并复制 (Ctrl+C) - 合并为一次注入
             print("📋 执行复制操作")
-            time.sleep(random.uniform(0.1, 0.2))
-            pyautogui.hotkey('ctrl', 'c')
-            time.sleep(random.uniform(0.3, 0.7))  # 等待复制完成
-
-            # 4. 从剪贴板获取文本
-            import pyperclip
-            captured_text = pyperclip.paste()
-            print(f"📄 捕获到的文本: {captured_text[:50]}...")  # 只显示前50个字符
+            try:
+                token = self.clipboard.change_token()
+                with self.input_backend.batch():
+                    self.input_backend.click(capture_x, capture_y, clicks=3)  # 三击选中文本
+                    self.input_backend.hotkey('ctrl', 'c')
+                # 等待聊天窗口取得剪贴板（复制完成），而不是固定休眠
+                with trace.span('clipboard_wait') as wait_attrs:
+                    changed = self.clipboard.wait_for_change(
+                        token, timeout=self.clipboard_timeout, cancel_event=self.stop_event)
+                    wait_attrs['changed'] = changed
+                if not changed:
+                    print(f"⚠️ {self.clipboard_timeout:.1f}秒内剪贴板没有变化，直接读取")
+
+                # 4. 从剪贴板获取文本
+                captured_text = self.clipboard.paste()
+            finally:
+                self._clear_clipboard_after_use("复制完成后")
+            span_attrs['chars'] = len(captured_text)
+        print(f"📄 捕获到的文本: {captured_text[:50]}...")  # 只显示前50个字符
+
+        if not captured_text.strip():
+            print("⚠️ 捕获的文本为空，跳过处理")
+            trace.attrs['outcome'] = 'empty'
+            target.commit_change_gate(gate_patch)
+            return None
 
-            if not captured_text.strip():
-                print("⚠️ 捕获的文本为空，跳过处理")
-                return
+        # 检查是否为重复文本（避免重复处理AI的回复或用户消息）
+        duplicate_kind = target.dedup_store.check(captured_text)
+        if duplicate_kind:
+            stats = target.dedup_store.get_stats()
+            source = "自己发出的回复" if duplicate_kind == KIND_REPLY else "已处理的消息"
+            print(f"🔄 检测到重复文本（{source}），跳过处理 - 已避免重复生成 "
+                  f"{stats['hits_inbound'] + stats['hits_reply']} 次 "
+                  f"(消息 {stats['hits_inbound']}, 自身回复 {stats['hits_reply']})")
+            trace.attrs['outcome'] = 'duplicate'
+            target.commit_change_gate(gate_patch)
+            return None
 
-            # 检查是否为重复文本（避免重复处理AI的回复或用户消息）
-            current_time = time.time()
-            if (captured_text.strip() == self.last_processed_text.strip() and 
-                current_time - self.last_processed_time < 10):  # 10秒内不重复处理
-                print("🔄 检测到重复文本，跳过处理")
-                return
+        return CapturedMessage(captured_text, (captured_text,), gate_patch, target.capture_point)
+
+    def _generate_reply(self, trace, target, text):
+        """推理阶段：带上该目标的对话历史发送给Ollama模型并过滤思考过程，未返回响应时返回None"""
+        # 5. 发送给Ollama模型 - 使用增强的系统信息注入
+        memory = ''
+        if self.retrieval_index is not None:
+            with trace.span('retrieve') as span_attrs:
+                # 最近的对话已在历史中，不重复注入
+                recent = [entry[1] for entry in list(target.history)]
+                memory = self.retrieval_index.related_text(text, chat=target.name, exclude=recent)
+                span_attrs['chars'] = len(memory)
+        with trace.span('llm') as span_attrs:
+            response_text = self.send_to_ollama_with_system_info(text, history=target.format_history(),
+                                                                 stats=span_attrs, memory=memory)
+        if not response_text:
+            print("⚠️ Ollama未返回响应，跳过处理")
+            trace.attrs['outcome'] = 'no_response'
+            return None
 
-            # 5. 发送给Ollama模型 - 使用增强的系统信息注入
-            response_text = self.send_to_ollama_with_system_info(captured_text)
-            if not response_text:
-                print("⚠️ Ollama未返回响应，跳过处理")
-                return
+        # 过滤模型输出中的思考过程，只保留最终回复
+        with trace.span('filter') as span_attrs:
+            response_text = filter_thinking_process(response_text)
+            span_attrs['chars'] = len(response_text)
+        print(f"🤖 Ollama响应: {response_text[:50]}...")  # 只显示前50个字符
+        return response_text
 
-            print(f"🤖 Ollama响应: {response_text[:50]}...")  # 只显示前50个字符
+    def _deliver_reply(self, trace, target, message, response_text, input_lock=None):
+        """
+        投递阶段：模拟思考时间后粘贴并发送回复，记录指纹、对话历史和闸门基准
+        :param input_lock: 流水线模式下与捕获阶段共用的输入锁，只在操作鼠标键盘时持有
+        """
+        input_x, input_y = target.input_point
 
-            # 添加AI思考时间模拟
+        # 添加AI思考时间模拟
+        with trace.span('think'):
             thinking_time = len(response_text) * random.uniform(0.05, 0.15)  # 根据回复长度计算思考时间
             thinking_time = max(1.0, min(thinking_time, 8.0))  # 限制在1-8秒之间
             print(f"⏳ 模拟AI思考时间: {thinking_time:.2f}秒")
-            time.sleep(thinking_time)
-
-            # 6. 鼠标移动到输入框（模拟人类轨迹）
-            self._human_like_mouse_move(input_x, input_y)
-            time.sleep(random.uniform(0.1, 0.3))
-
-            # 7. 点击输入框
-            print(f"🖱️ 点击输入框 ({input_x}, {input_y})")
-            pyautogui.click(input_x, input_y)
-            time.sleep(random.uniform(0.1, 0.3))
-
-            # 8. 粘贴AI回复 (Ctrl+V) - 添加随机停顿
-            print("📋 准备粘贴AI回复到输入框")
-            pyperclip.copy(response_text)  # 确保AI回复在剪贴板中
-            time.sleep(random.uniform(0.1, 0.2))
-            pyautogui.hotkey('ctrl', 'v')  # 粘贴AI回复
-            time.sleep(random.uniform(0.2, 0.5))
-
-            # 9. 添加打字延迟模拟，让粘贴看起来更自然
-            typing_delay = len(response_text) * random.uniform(0.01, 0.03)  # 模拟打字时间
-            print(f"⌨️ 模拟打字时间: {typing_delay:.2f}秒")
-            time.sleep(typing_delay)
+            self._wait(thinking_time * self.delay_scale)
 
-            # 10. 回车发送 - 添加随机停顿
-            print("📨 发送AI回复消息")
-            time.sleep(random.uniform(0.2, 0.8))  # 发送前随机停顿
-            pyautogui.press('enter')
-
-            # 更新记录
-            self.last_processed_text = captured_text.strip()
-            self.last_processed_time = time.time()
+        with input_lock or contextlib.nullcontext():
+            try:
+                with trace.span('paste'):
+                    # 6. 鼠标移动到输入框（模拟人类轨迹）
+                    self._human_like_mouse_move(input_x, input_y)
+                    self._human_pause(0.1, 0.3)
+
+                    # 7. 准备剪贴板内容 - 添加随机停顿
+                    print("📋 准备粘贴AI回复到输入框")
+                    self.clipboard.copy(response_text)  # 确保AI回复在剪贴板中
+                    self._human_pause(0.2, 0.5)
+
+                    # 8. 点击输入框并粘贴AI回复 (Ctrl+V) - 合并为一次注入
+                    print(f"🖱️ 点击输入框 ({input_x}, {input_y}) 并粘贴")
+                    with self.input_backend.batch():
+                        self.input_backend.click(input_x, input_y)
+                        self.input_backend.hotkey('ctrl', 'v')  # 粘贴AI回复
+                    self._human_pause(0.2, 0.5)
+
+                    # 9. 添加打字延迟模拟，让粘贴看起来更自然
+                    typing_delay = len(response_text) * random.uniform(0.01, 0.03)  # 模拟打字时间
+                    print(f"⌨️ 模拟打字时间: {typing_delay:.2f}秒")
+                    self._wait(typing_delay * self.delay_scale)
+
+                with trace.span('send'):
+                    # 10. 回车发送 - 添加随机停顿
+                    print("📨 发送AI回复消息")
+                    self._human_pause(0.2, 0.8)  # 发送前随机停顿
+                    self._wait(0)  # 停止后绝不再按回车
+                    self.input_backend.press('enter')
+            finally:
+                # 11. 清理剪贴板 - 这是关键改进！
+                self._clear_clipboard_after_use("循环结束后")
+
+        # 更新记录
+        target.record_exchange(message.text, response_text)
+        target.commit_change_gate(message.gate_patch)
+        trace.attrs['outcome'] = 'sent'
+
+    def _clear_clipboard_after_use(self, when):
+        """复制或粘贴之后清理剪贴板"""
+        try:
+            self.clipboard.clear()  # 清空剪贴板
+            print(f"🧹 {when}剪贴板已清理")
+        except Exception as e:
+            print(f"⚠️ {when}清理剪贴板失败: {e}")
+
+    def get_stats(self):
+        """获取自动复制的运行统计，去重统计为所有聊天目标之和"""
+        targets = {target.name: target.get_stats() for target in self.targets}
+        dedup = {key: 0 for key in ('entries', 'hits_inbound', 'hits_reply', 'misses', 'evictions')}
+        for target_stats in targets.values():
+            for key in dedup:
+                dedup[key] += target_stats['dedup'][key]
+        lookups = dedup['hits_inbound'] + dedup['hits_reply'] + dedup['misses']
+        dedup['hit_rate'] = ((dedup['hits_inbound'] + dedup['hits_reply']) / lookups) if lookups else 0.0
+        queues = {target.capture_queue.name: targets[target.name]['capture_queue'] for target in self.targets}
+        queues['delivery'] = self.delivery_queue.get_stats()
+        return {
+            'executed_cycles': self.executed_cycles,
+            'skipped_cycles': self.skipped_cycles,
+            'failed_messages': self.failed_messages,
+            'last_stop_latency_ms': None if self.last_stop_latency is None else self.last_stop_latency * 1000.0,
+            'dedup': dedup,
+            'queues': queues,
+            'targets': targets,
+            'input_lock_wait_ms': self.input_lock.wait_time * 1000.0,
+        }
 
-            print("✅ 自动复制周期完成 - 用户消息已处理，AI回复已发送")
+    def _wait(self, seconds):
+        """可中断的等待，停止事件被设置时抛出OperationCancelled"""
+        interruptible_sleep(self.stop_event, seconds)
 
-        except Exception as e:
-            print(f"❌ 自动复制周期执行失败: {e}")
-        finally:
-            # 11. 清理剪贴板 - 这是关键改进！
-            try:
-                import pyperclip
-                pyperclip.copy("")  # 清空剪贴板
-                print("🧹 循环结束后剪贴板已清理")
-            except Exception as e:
-                print(f"⚠️ 循环结束后清理剪贴板失败: {e}")
-            
-            with self.processing_lock:  # 使用锁确保线程安全
-                self.is_processing = False  # 无论成功与否，都要清除处理标志
+    def _human_pause(self, low, high):
+        """随机停顿，时长按人性化延迟缩放系数调整"""
+        self._wait(random.uniform(low, high) * self.delay_scale)
 
     def _human_like_mouse_move(self, target_x, target_y):
-        """模拟人类鼠标移动轨迹"""
-        current_x, current_y = pyautogui.position()
-        steps = random.randint(10, 25)  # 随机步数
-        duration = random.uniform(0.3, 0.8)  # 总移动时间
-        
-        for i in range(steps):
-            progress = i / steps
-            # 使用缓动函数让移动更自然
-            ease_progress = pow(progress, 2)  # 二次缓动
-            
-            # 添加轻微的随机偏移
-            offset_x = random.uniform(-2, 2)
-            offset_y = random.uniform(-2, 2)
-            
-            x = current_x + (target_x - current_x) * ease_progress + offset_x
-            y = current_y + (target_y - current_y) * ease_progress + offset_y
-            
-            pyautogui.moveTo(x, y)
-            time.sleep(duration / steps * random.uniform(0.8, 1.2))  # 随机速度变化
-
-    def send_to_ollama_with_system_info(self, text):
-        """发送文本到Ollama并获取响应 - 强制注入系统信息"""
+        """模拟人类鼠标移动轨迹 - 预先规划整条轨迹，再按截止时间回放，保证在计划时长内到达"""
+        start = self.input_backend.position()
+        duration = random.uniform(0.3, 0.8) * self.delay_scale  # 总移动时间
+        settings = self.config.snapshot().auto_copy
+        rate_hz = settings.mouse_move_rate_hz  # 每秒的轨迹点数
+        if settings.mouse_trajectory == 'bezier':
+            points = plan_bezier_path(start, (target_x, target_y), duration, rate_hz)
+        else:
+            points = plan_eased_path(start, (target_x, target_y), duration, rate_hz)
+        self.last_mouse_move = self.trajectory_player.play(points)
+        return self.last_mouse_move
+
+    def send_to_ollama_with_system_info(self, text, history='', stats=None, memory=''):
+        """
+        发送文本到Ollama并获取响应 - 强制注入系统信息
+        :param history: 该聊天窗口最近的对话，为空时不加入提示
+        :param memory: 检索到的相关早期对话，为空时不加入提示
+        :param stats: 传入字典时写入生成统计（token数、每秒token数、首token时间）
+        """
         try:
-            # 获取Ollama配置
-            ollama_config = self.config.get('ollama', {})
-            ollama_host = ollama_config.get('url', 'http://localhost:11434/api/generate')
-            
-            if not ollama_host or ollama_host == 'http://localhost:11434/api/generate':
-                ollama_base_host = self.config.get('ollama_host', 'http://localhost:11434')
-                if not ollama_host or '/api/' not in ollama_host:
-                    ollama_host = f"{ollama_base_host}/api/generate"
-            
-            ollama_model = self.config.get('ollama_model', ollama_config.get('model', 'llama2'))
-            
+            # 获取Ollama配置（地址和模型已在配置快照中解析）
+            ollama_settings = self.config.snapshot().ollama
+            ollama_host = ollama_settings.url
+            ollama_model = ollama_settings.model
+
             # 获取系统信息
             system_info_text = self.system_info_provider.get_formatted_info()
-            
+            history_text = f"\n最近的对话:\n{history}\n" if history else ""
+            memory_text = f"\n相关的早期对话:\n{memory}\n" if memory else ""
+
             # 强制使用包含系统信息的提示模板，而不是配置中的模板
             enhanced_prompt = f"""你是一个智能对话助手。请根据以下信息进行回复：
 
 {system_info_text}
-
+{memory_text}{history_text}
 用户消息: {text}
 
 请根据上述系统信息和用户消息进行智能回复:"""
@@ -261,7 +434,7 @@ class AutoCopyHandler:
 
             print(f"📤 发送请求到Ollama: {ollama_host}")
             print(f"📝 使用增强提示（包含系统信息）")
-            response = requests.post(ollama_host, json=payload, timeout=60)
+            response = post_json_cancellable(ollama_host, payload, self.stop_event, timeout=60)
 
             if response.status_code != 200:
                 print(f"❌ Ollama请求失败，状态码: {response.status_code}")
@@ -270,9 +443,13 @@ class AutoCopyHandler:
 
             result = response.json()
             response_text = result.get('response', '')
+            if stats is not None:
+                stats.update(ollama_generation_stats(result))
 
             return response_text
 
+        except OperationCancelled:
+            raise
         except Exception as e:
             print(f"❌ 发送到Ollama时出现错误: {e}")
             return None
@@ -280,18 +457,11 @@ class AutoCopyHandler:
     def send_to_ollama(self, text):
         """原始的发送方法（保留，以防需要）"""
         try:
-            # 获取Ollama配置 - 优先使用config中的ollama配置块
-            ollama_config = self.config.get('ollama', {})
-            ollama_host = ollama_config.get('url', 'http://localhost:11434/api/generate')
-            
-            # 如果上面的配置没有URL，则使用备用方法获取
-            if not ollama_host or ollama_host == 'http://localhost:11434/api/generate':
-                ollama_base_host = self.config.get('ollama_host', 'http://localhost:11434')
-                if not ollama_host or '/api/' not in ollama_host:
-                    ollama_host = f"{ollama_base_host}/api/generate"
-            
-            ollama_model = self.config.get('ollama_model', ollama_config.get('model', 'llama2'))
-            prompt_template = self.config.get('prompt_template', '请对以下消息进行简洁回复：{message}')
+            # 获取Ollama配置 - 地址、模型和提示模板已在配置快照中解析
+            ollama_settings = self.config.snapshot().ollama
+            ollama_host = ollama_settings.url
+            ollama_model = ollama_settings.model
+            prompt_template = ollama_settings.prompt_template
 
             # 替换模板中的消息占位符
             prompt = prompt_template.format(message=text)
@@ -304,7 +474,7 @@ class AutoCopyHandler:
             }
 
             print(f"📤 发送请求到Ollama: {ollama_host}")
-            response = requests.post(ollama_host, json=payload, timeout=60)
+            response = post_json_cancellable(ollama_host, payload, self.stop_event, timeout=60)
 
             if response.status_code != 200:
                 print(f"❌ Ollama请求失败，状态码: {response.status_code}")
@@ -316,6 +486,8 @@ class AutoCopyHandler:
 
             return response_text
 
+        except OperationCancelled:
+            raise
         except Exception as e:
             print(f"❌ 发送到Ollama时出现错误: {e}")
             return None
@@ -327,26 +499,46 @@ class AutoCopyHandler:
             return
 
         print("🔄 开始自动复制功能（连续运行模式）")
-        print(f"📋 捕获点坐标: ({self.config.get('capture_point', {'x': 0, 'y': 0}).get('x', 0)}, {self.config.get('capture_point', {'x': 0, 'y': 0}).get('y', 0)})")
-        print(f"⌨️ 输入框坐标: ({self.config.get('input_point', {'x': 0, 'y': 0}).get('x', 0)}, {self.config.get('input_point', {'x': 0, 'y': 0}).get('y', 0)})")
         
-        # 启动时再次清理剪贴板，确保干净状态
+        # 启动时清理剪贴板，确保干净状态（创建处理器时不触碰剪贴板）
         self._clear_clipboard()
-        print("🧹 启动时再次清理剪贴板，确保干净状态")
         
         # 重置记录的状态
-        self.last_processed_text = ""
-        self.last_processed_time = 0
         self.is_processing = False
+        self.skipped_cycles = 0
+        self.executed_cycles = 0
+        self.failed_messages = 0
         
         # 确保配置已更新到最新状态
         import time
         time.sleep(0.1)  # 短暂延迟，确保配置更新
+        self._refresh_targets()
+        for target in self.targets:
+            target.reset()
+        print(f"💬 聊天目标: {', '.join(target.name for target in self.targets) or '无'}")
         
         # 启动自动复制线程
+        self.stop_event.clear()
         self.is_running = True  # 在启动线程前设置标志
-        self.auto_copy_thread = threading.Thread(target=self._continuous_auto_copy, daemon=True)
-        self.auto_copy_thread.start()
+        settings = self.config.snapshot().auto_copy
+        if settings.pipeline_enabled:
+            for target in self.targets:
+                target.capture_queue.clear()
+            self.delivery_queue.clear()
+            max_generations = settings.max_concurrent_generations or len(self.targets)
+            self.generation_slots = threading.Semaphore(max(1, max_generations))
+            print(f"🧵 使用流水线模式：捕获 → 推理（最多 {max(1, max_generations)} 个并发生成） → 投递")
+            self.pipeline_threads = [
+                threading.Thread(target=self._pipeline_capture_loop, name="auto-copy-capture", daemon=True),
+                threading.Thread(target=self._pipeline_delivery_loop, name="auto-copy-delivery", daemon=True),
+            ]
+            for thread in self.pipeline_threads:
+                thread.start()
+            self._inference_threads = {}
+            self._start_inference_threads()
+        else:
+            self.auto_copy_thread = threading.Thread(target=self._continuous_auto_copy, daemon=True)
+            self.auto_copy_thread.start()
 
     def stop_listening(self):
         """停止自动复制功能"""
@@ -354,26 +546,40 @@ class AutoCopyHandler:
             return
 
         print("⏹️ 停止自动复制功能")
+        stop_start = time.perf_counter()
         self.is_running = False  # 设置停止标志
-        
-        # 停止时也清理剪贴板
+        self.stop_event.set()    # 立即中断周期内的等待和Ollama请求
+
+        # 等待线程结束，所有线程共用最多2秒的等待时间
+        threads = [t for t in [self.auto_copy_thread] + self.pipeline_threads if t is not None]
+        for thread in threads:
+            if thread.is_alive():
+                thread.join(timeout=max(0.0, 2 - (time.perf_counter() - stop_start)))
+        self.last_stop_latency = time.perf_counter() - stop_start
+        if any(thread.is_alive() for thread in threads):
+            print(f"⚠️ 自动复制线程在 {self.last_stop_latency * 1000:.0f}ms 内未退出")
+        self.pipeline_threads = []
+        self._inference_threads = {}
+        # 队列中尚未投递的消息丢弃，并允许之后重新捕获
+        for target in self.targets:
+            for message in target.capture_queue.drain():
+                self._release_message(target, message)
+        for target, message, _ in self.delivery_queue.drain():
+            self._release_message(target, message)
+
+        # 线程退出后再清理剪贴板，避免被仍在进行的周期覆盖
         try:
-            import pyperclip
-            pyperclip.copy("")  # 清空剪贴板
+            self.clipboard.clear()  # 清空剪贴板
             print("🧹 停止时剪贴板已清理")
         except Exception as e:
             print(f"⚠️ 停止时清理剪贴板失败: {e}")
-        
-        # 等待线程结束
-        if self.auto_copy_thread and self.auto_copy_thread.is_alive():
-            self.auto_copy_thread.join(timeout=2)  # 最多等待2秒
-        print("✅ 自动复制功能已完全停止")
+
+        print(f"✅ 自动复制功能已完全停止 (耗时 {self.last_stop_latency * 1000:.0f}ms)")
 
     def _continuous_auto_copy(self):
         """连续执行自动复制周期"""
         # 获取自动复制的时间间隔（秒）
-        interval = self.config.get('auto_copy_interval', 2)  # 减少间隔到2秒，更快响应
-        print(f"⏱️ 自动复制间隔: {interval}秒")
+        print(f"⏱️ 自动复制间隔: {self.config.snapshot().auto_copy.interval}秒")
         
         while self.is_running:
             try:
@@ -382,16 +588,125 @@ class AutoCopyHandler:
                     break
                     
                 self.perform_auto_copy_cycle()
-                # 等待指定的时间间隔（加入随机性避免过于规律）
-                base_wait = interval
+                # 等待指定的时间间隔（加入随机性避免过于规律），每次读取最新配置
+                base_wait = self.config.snapshot().auto_copy.interval
                 random_jitter = random.uniform(-0.5, 0.5)  # ±0.5秒随机抖动
                 wait_time = max(0.5, base_wait + random_jitter)  # 确保至少等待0.5秒
                 
-                remaining_time = wait_time
-                while remaining_time > 0 and self.is_running:
-                    sleep_time = min(0.1, remaining_time)  # 每0.1秒检查一次
-                    time.sleep(sleep_time)
-                    remaining_time -= sleep_time
+                if self.stop_event.wait(wait_time):  # 停止时立即返回
+                    break
             except Exception as e:
                 print(f"❌ 连续自动复制过程中出现错误: {e}")
-                time.sleep(1)  # 出错后稍作延时再继续
\ No newline at end of file
+                self.stop_event.wait(1)  # 出错后稍作延时再继续
+
+    def _start_inference_threads(self):
+        """为还没有推理线程的聊天目标启动推理线程（启动时，以及运行中新增聊天目标时）"""
+        for target in self.targets:
+            thread = self._inference_threads.get(target)
+            if thread is not None and thread.is_alive():
+                continue
+            thread = threading.Thread(target=self._pipeline_inference_loop, args=(target,),
+                                      name=f"auto-copy-inference-{target.name}", daemon=True)
+            self._inference_threads[target] = thread
+            self.pipeline_threads.append(thread)
+            thread.start()
+
+    def _pipeline_capture_loop(self):
+        """
+        捕获阶段：按各聊天目标的下次捕获时间，总是先处理最早到期的目标，
+        把新消息放入该目标的捕获队列；推理进行时仍持续观察。
+        配置变化（如热重载了坐标或间隔）在下一次捕获时生效，不需要重启线程
+        """
+        print(f"⏱️ 捕获间隔: {self.config.snapshot().auto_copy.interval}秒")
+        if not self.targets:
+            print("⚠️ 没有已设置坐标的聊天目标，等待配置坐标")
+        while not self.stop_event.is_set():
+            settings = self.config.snapshot()
+            if settings.version != self._targets_version:
+                self._refresh_targets(settings=settings)
+                self._start_inference_threads()
+                print(f"🔁 聊天目标已按新配置更新: {', '.join(t.name for t in self.targets) or '无'}")
+            if not self.targets:
+                if self.stop_event.wait(0.5):
+                    break
+                continue
+            target = min(self.targets, key=lambda t: t.next_capture_at)
+            if self.stop_event.wait(max(0.0, min(target.next_capture_at - time.perf_counter(), 0.5))):
+                break
+            if target.next_capture_at > time.perf_counter():
+                continue  # 分段等待，期间配置可能已改变
+            try:
+                # 每个周期取一次配置快照，便于运行时调整延迟缩放系数等设置
+                self.delay_scale = settings.auto_copy.delay_scale
+                with self.tracer.trace('pipeline_capture') as trace:
+                    trace.attrs['target'] = target.name
+                    with self.input_lock:
+                        message = self._capture_message(trace, target, settings)
+                    if message is not None:
+                        # 入队前记录指纹和闸门基准，推理期间不会重复捕获同一条消息
+                        target.dedup_store.add(message.text, KIND_INBOUND)
+                        target.commit_change_gate(message.gate_patch)
+                        # 闸门基准已在此提交，投递阶段不再用较旧的画面覆盖
+                        target.capture_queue.put(message._replace(gate_patch=None), self.stop_event)
+                        trace.attrs['outcome'] = 'queued'
+                        trace.attrs['queue_depth'] = len(target.capture_queue)
+            except OperationCancelled:
+                break
+            except Exception as e:
+                print(f"❌ [{target.name}] 捕获阶段出现错误: {e}")
+            # 安排该目标的下次捕获（加入随机性避免过于规律）
+            interval = settings.auto_copy.interval
+            target.next_capture_at = time.perf_counter() + max(0.5, interval + random.uniform(-0.5, 0.5))
+
+    def _pipeline_inference_loop(self, target):
+        """推理阶段：每个聊天目标一个线程，按顺序为该目标生成回复，不同目标的生成并发进行"""
+        while not self.stop_event.is_set():
+            message = None
+            try:
+                message, waited = target.capture_queue.get(self.stop_event)
+                with self.tracer.trace('pipeline_inference') as trace:
+                    trace.attrs['target'] = target.name
+                    trace.add_span('queue_wait', waited, queue=target.capture_queue.name)
+                    with self.generation_slots:
+                        response_text = self._generate_reply(trace, target, message.text)
+                    if not response_text:
+                        self._release_message(target, message)
+                        continue
+                    self.delivery_queue.put((target, message, response_text), self.stop_event)
+                    trace.attrs['outcome'] = 'queued'
+            except OperationCancelled:
+                if message is not None:
+                    self._release_message(target, message)
+                break
+            except Exception as e:
+                print(f"❌ [{target.name}] 推理阶段出现错误: {e}")
+                if message is not None:
+                    self._release_message(target, message)
+                    self.failed_messages += 1
+
+    def _pipeline_delivery_loop(self):
+        """投递阶段：按入队顺序粘贴并发送回复，同一目标的回复顺序与捕获顺序一致"""
+        while not self.stop_event.is_set():
+            target = message = None
+            try:
+                (target, message, response_text), waited = self.delivery_queue.get(self.stop_event)
+                with self.tracer.trace('pipeline_delivery') as trace:
+                    trace.attrs['target'] = target.name
+                    trace.add_span('queue_wait', waited, queue='delivery')
+                    self._deliver_reply(trace, target, message, response_text, self.input_lock)
+                print(f"✅ [{target.name}] 流水线投递完成 - 用户消息已处理，AI回复已发送")
+            except OperationCancelled:
+                if message is not None:
+                    self._release_message(target, message)
+                break
+            except Exception as e:
+                print(f"❌ 投递阶段出现错误: {e}")
+                if message is not None:
+                    self._release_message(target, message)
+                    self.failed_messages += 1
+
+    def _release_message(self, target, message):
+        """消息未能回复（停止、生成失败或投递出错）时撤销其指纹和闸门基准，使其可以被重新捕获"""
+        for part in message.parts:
+            target.dedup_store.discard(part)
+        target.change_gate.reset()
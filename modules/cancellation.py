@@ -0,0 +1,113 @@
+# modules/cancellation.py
+import json
+import time
+import socket
+import threading
+import http.client
+from urllib.parse import urlsplit
+
+import requests
+
+
+class OperationCancelled(Exception):
+    """等待或请求被停止事件中断"""
+
+    span_status = 'cancelled'  # 追踪中记录为cancelled而不是error
+
+
+def interruptible_sleep(cancel_event, seconds):
+    """
+    可中断的等待：在seconds秒内停止事件被设置时立即抛出OperationCancelled
+    seconds<=0时只检查一次事件
+    """
+    if cancel_event.wait(max(0.0, seconds)):
+        raise OperationCancelled()
+
+
+def wait_for_condition(predicate, timeout, poll_interval=0.02, cancel_event=None):
+    """
+    轮询等待条件成立，代替固定时长的休眠
+    :return: 条件在timeout秒内成立返回True，超时返回False
+    cancel_event被设置时抛出OperationCancelled
+    """
+    deadline = time.perf_counter() + timeout
+    while True:
+        if predicate():
+            return True
+        remaining = deadline - time.perf_counter()
+        if remaining <= 0:
+            return False
+        wait = min(poll_interval, remaining)
+        if cancel_event is not None:
+            interruptible_sleep(cancel_event, wait)
+        else:
+            time.sleep(wait)
+
+
+def _build_response(url, raw, content):
+    """把http.client的响应包装为requests.Response，调用方可以照常使用status_code/text/json()"""
+    response = requests.Response()
+    response.status_code = raw.status
+    response.reason = raw.reason
+    response.headers = requests.structures.CaseInsensitiveDict(raw.getheaders())
+    response.encoding = requests.utils.get_encoding_from_headers(response.headers) or 'utf-8'
+    response.url = url
+    response._content = content
+    return response
+
+
+def post_json_cancellable(url, payload, cancel_event, timeout=60, poll_interval=0.05):
+    """
+    可取消的POST请求
+    请求在后台线程中通过自己持有的连接发送，调用方每poll_interval秒检查一次停止事件；
+    停止时直接关闭（shutdown）该连接的套接字：后台线程阻塞的读取立即返回并结束，
+    服务端也随即看到连接断开（Ollama据此中止正在进行的生成），然后抛出OperationCancelled
+    超时和连接错误以requests.exceptions.Timeout / ConnectionError抛出
+    :param cancel_event: 停止事件，为None时不可取消
+    :return: requests.Response
+    """
+    parts = urlsplit(url)
+    connection_class = http.client.HTTPSConnection if parts.scheme == 'https' else http.client.HTTPConnection
+    conn = connection_class(parts.hostname, parts.port, timeout=timeout)
+    path = (parts.path or '/') + (f"?{parts.query}" if parts.query else '')
+    body = json.dumps(payload).encode('utf-8')
+    lock = threading.Lock()
+    state = {'cancelled': False}
+    done = threading.Event()
+    outcome = {}
+
+    def worker():
+        try:
+            conn.connect()
+            with lock:
+                # 连接建立期间已停止：调用方看不到套接字，由这里放弃请求
+                if state['cancelled']:
+                    return
+            conn.request('POST', path, body=body, headers={'Content-Type': 'application/json'})
+            raw = conn.getresponse()
+            outcome['response'] = _build_response(url, raw, raw.read())
+        except socket.timeout as e:
+            outcome['error'] = requests.exceptions.Timeout(f"请求 {url} 超时（{timeout}秒）: {e}")
+        except (OSError, http.client.HTTPException) as e:
+            outcome['error'] = requests.exceptions.ConnectionError(f"请求 {url} 失败: {e}")
+        except Exception as e:
+            outcome['error'] = e
+        finally:
+            conn.close()
+            done.set()
+
+    threading.Thread(target=worker, name="cancellable-post", daemon=True).start()
+    while not done.wait(poll_interval):
+        if cancel_event is not None and cancel_event.is_set():
+            with lock:
+                state['cancelled'] = True
+                sock = conn.sock
+            if sock is not None:
+                try:
+                    sock.shutdown(socket.SHUT_RDWR)
+                except OSError:
+                    pass  # 连接已经关闭
+            raise OperationCancelled()
+    if 'error' in outcome:
+        raise outcome['error']
+    return outcome['response']
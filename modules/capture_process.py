@@ -0,0 +1,262 @@
+# modules/capture_process.py
+import time
+import queue
+import struct
+import importlib
+import multiprocessing
+from multiprocessing import shared_memory
+from typing import NamedTuple
+
+import cv2
+import numpy as np
+
+from .frame_store import FrameStore
+
+DEFAULT_GRAB = 'modules.capture_process:grab_screen'
+
+# 每个槽位的头部：帧序号（写入过程中为0）, 高, 宽, 通道数；数据从64字节处开始
+_HEADER = struct.Struct('<QIII')
+_HEADER_SIZE = 64
+
+
+class CaptureEvent(NamedTuple):
+    """截图子进程发给主进程的变化事件，只包含描述信息，帧数据在共享内存中"""
+    seq: int              # 帧序号，从1开始；0表示只携带统计信息的心跳
+    slot: int             # 帧所在的共享内存槽位，-1表示没有写入帧
+    timestamp: float      # 截图时刻（time.time()）
+    first: bool           # 第一帧或区域改变后的第一帧
+    ratio: float          # 变化像素占比
+    rects: tuple          # 变化区域，帧内全分辨率坐标 (x, y, 宽, 高)
+    shape: tuple          # 帧的形状 (高, 宽, 通道)
+    frames: int           # 子进程累计处理的帧数
+    dropped_events: int   # 主进程来不及接收而丢弃的事件数
+    capture_ms: float
+    diff_ms: float
+
+
+def grab_screen(region=None):
+    """默认的截图函数（在子进程中调用）：截取区域并转为BGR数组，区域超出屏幕时裁剪到屏幕内"""
+    import pyautogui
+    if region:
+        screen_width, screen_height = pyautogui.size()
+        x, y, width, height = region
+        x, y = max(0, x), max(0, y)
+        width, height = min(width, screen_width - x), min(height, screen_height - y)
+        region = (x, y, width, height) if width > 0 and height > 0 else None
+    screenshot = pyautogui.screenshot(region=region)
+    return cv2.cvtColor(np.asarray(screenshot.convert('RGB')), cv2.COLOR_RGB2BGR)
+
+
+def resolve_grab(spec):
+    """把 "模块:函数" 解析为函数（子进程以spawn方式启动，只能传递可导入的名称）"""
+    module_name, _, attr = spec.partition(':')
+    return getattr(importlib.import_module(module_name), attr)
+
+
+class FrameRing:
+    """
+    共享内存中的帧环形缓冲区
+    每个槽位保存一整帧；写入时先把头部序号置0，写完数据后再写入序号，
+    读取方在复制前后各检查一次序号，槽位在读取期间被覆盖时返回None（与seqlock相同的思路）
+    """
+
+    def __init__(self, slots, slot_bytes, name=None):
+        """
+        :param name: 为None时创建新的共享内存，否则连接到已有的
+        """
+        self.slots = slots
+        self.slot_bytes = slot_bytes
+        self.stride = _HEADER_SIZE + slot_bytes
+        self.owner = name is None
+        if self.owner:
+            self.shm = shared_memory.SharedMemory(create=True, size=self.stride * slots)
+        else:
+            # spawn启动的子进程与主进程共用同一个resource_tracker，连接时的重复登记不影响主进程删除
+            self.shm = shared_memory.SharedMemory(name=name)
+        self.name = self.shm.name
+
+    def write(self, slot, seq, frame):
+        """把帧写入槽位，帧超过槽位大小时返回False"""
+        if frame.nbytes > self.slot_bytes or frame.dtype != np.uint8:
+            return False
+        offset = slot * self.stride
+        channels = frame.shape[2] if frame.ndim == 3 else 1
+        _HEADER.pack_into(self.shm.buf, offset, 0, 0, 0, 0)
+        target = np.ndarray(frame.shape, np.uint8, buffer=self.shm.buf, offset=offset + _HEADER_SIZE)
+        target[...] = frame
+        del target  # 不保留对共享内存的引用，否则无法关闭
+        _HEADER.pack_into(self.shm.buf, offset, seq, frame.shape[0], frame.shape[1], channels)
+        return True
+
+    def read(self, slot, seq, rect=None):
+        """
+        复制槽位中的帧（或其中的rect区域）
+        :return: 数组副本；该序号的帧已被覆盖时返回None
+        """
+        offset = slot * self.stride
+        current, height, width, channels = _HEADER.unpack_from(self.shm.buf, offset)
+        if current != seq:
+            return None
+        shape = (height, width, channels) if channels > 1 else (height, width)
+        view = np.ndarray(shape, np.uint8, buffer=self.shm.buf, offset=offset + _HEADER_SIZE)
+        if rect is not None:
+            x, y, w, h = rect
+            view = view[y:y + h, x:x + w]
+        data = view.copy()
+        del view
+        if _HEADER.unpack_from(self.shm.buf, offset)[0] != seq:
+            return None
+        return data
+
+    def close(self):
+        self.shm.close()
+        if self.owner:
+            try:
+                self.shm.unlink()
+            except FileNotFoundError:
+                pass
+
+
+def _capture_main(options, ring_name, events, commands, stop_event):
+    """截图子进程：按间隔截图、在缩小的灰度帧上比较，有变化时把帧写入共享内存并发送事件"""
+    ring = FrameRing(options['slots'], options['slot_bytes'], name=ring_name)
+    try:
+        grab = resolve_grab(options['grab'])
+        store = FrameStore(level=options['level'], pixel_threshold=options['pixel_threshold'],
+                           keep_dirty_regions=False)
+        region = options['region']
+        interval = options['interval']
+        seq = frames = dropped = 0
+        last_sent = time.monotonic()
+        while not stop_event.is_set():
+            while True:
+                try:
+                    name, value = commands.get_nowait()
+                except queue.Empty:
+                    break
+                if name == 'region':
+                    region = value
+                    store.reset()
+                elif name == 'interval':
+                    interval = value
+
+            start = time.perf_counter()
+            try:
+                frame = grab(region)
+            except Exception as e:
+                print(f"❌ 截图子进程截图失败: {e}")
+                stop_event.wait(max(interval, 1.0))
+                continue
+            captured = time.perf_counter()
+            change = store.update(frame)
+            frames += 1
+            done = time.perf_counter()
+
+            heartbeat = time.monotonic() - last_sent >= 1.0
+            if change.first or change.ratio > 0 or heartbeat:
+                slot = -1
+                if change.first or change.ratio > 0:
+                    seq += 1
+                    slot = seq % ring.slots
+                    if not ring.write(slot, seq, frame):
+                        slot = -1
+                event = CaptureEvent(seq if slot >= 0 else 0, slot, time.time(), change.first, change.ratio,
+                                     tuple(change.rects), frame.shape, frames, dropped,
+                                     (captured - start) * 1000.0, (done - captured) * 1000.0)
+                try:
+                    events.put_nowait(event)
+                    last_sent = time.monotonic()
+                except queue.Full:
+                    dropped += 1
+            del frame
+            stop_event.wait(max(0.0, interval - (time.perf_counter() - start)))
+    finally:
+        ring.close()
+
+
+class CaptureProcess:
+    """
+    截图子进程
+    截图和变化检测（NumPy/OpenCV）在单独的进程中进行，不与界面和模型请求争用GIL；
+    有变化的帧写入共享内存环，主进程只收到CaptureEvent（变化比例和变化区域），需要像素时再用read()复制
+    """
+
+    def __init__(self, region=None, interval=0.5, level=1, pixel_threshold=0, slots=3,
+                 max_frame_bytes=1920 * 1080 * 3, grab=DEFAULT_GRAB, max_events=64):
+        """
+        :param region: 截图区域 (x, y, 宽, 高)，None为全屏
+        :param max_frame_bytes: 每个槽位的大小，应不小于全屏BGR帧；更大的帧不写入共享内存
+        :param grab: 截图函数的 "模块:函数" 名称，函数接收region并返回BGR数组
+        :param max_events: 事件队列容量，主进程来不及处理时丢弃新事件
+        """
+        self.options = {'region': tuple(region) if region else None, 'interval': interval, 'level': level,
+                        'pixel_threshold': pixel_threshold, 'slots': slots, 'slot_bytes': int(max_frame_bytes),
+                        'grab': grab}
+        self.max_events = max_events
+        self.ring = None
+        self.process = None
+        self.events = None
+        self.commands = None
+        self.stop_event = None
+
+    def start(self):
+        # 使用spawn启动：子进程不继承主进程的Qt和线程状态
+        context = multiprocessing.get_context('spawn')
+        self.ring = FrameRing(self.options['slots'], self.options['slot_bytes'])
+        self.events = context.Queue(self.max_events)
+        self.commands = context.Queue()
+        self.stop_event = context.Event()
+        self.process = context.Process(target=_capture_main, name='capture',
+                                       args=(self.options, self.ring.name, self.events, self.commands,
+                                             self.stop_event), daemon=True)
+        try:
+            self.process.start()
+        except Exception:
+            self.ring.close()
+            self.ring = None
+            raise
+        print(f"📸 截图子进程已启动 (PID {self.process.pid})")
+        return self
+
+    @property
+    def alive(self):
+        return self.process is not None and self.process.is_alive()
+
+    def get_event(self, timeout=0.2):
+        """等待下一个事件，超时返回None"""
+        try:
+            return self.events.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def set_region(self, region):
+        self.options['region'] = tuple(region) if region else None
+        if self.commands is not None:
+            self.commands.put(('region', self.options['region']))
+
+    def set_interval(self, interval):
+        self.options['interval'] = interval
+        if self.commands is not None:
+            self.commands.put(('interval', interval))
+
+    def read(self, event, rect=None):
+        """复制事件对应的帧（或其中一块变化区域），帧已被后续帧覆盖时返回None"""
+        if self.ring is None or event.slot < 0:
+            return None
+        return self.ring.read(event.slot, event.seq, rect)
+
+    def stop(self, timeout=2.0):
+        if self.process is None:
+            return
+        self.stop_event.set()
+        self.process.join(timeout)
+        if self.process.is_alive():
+            print("⚠️ 截图子进程未能及时退出，强制结束")
+            self.process.terminate()
+            self.process.join(1.0)
+        for q in (self.events, self.commands):
+            q.cancel_join_thread()
+            q.close()
+        self.process = None
+        self.ring.close()
+        self.ring = None
@@ -0,0 +1,145 @@
+# modules/change_gate.py
+import os
+import sys
+import threading
+
+import cv2
+import numpy as np
+
+
+class XlibPatchGrabber:
+    """
+    通过持久的X连接用get_image截取小区域，返回灰度图
+    不像pyautogui.screenshot那样每次启动外部截图程序并截取整个屏幕
+    """
+
+    name = 'xlib'
+
+    def __init__(self, display_name=None):
+        from Xlib import X, display
+        self.X = X
+        self.display = display.Display(display_name)
+        screen = self.display.screen()
+        formats = {f.depth: f.bits_per_pixel for f in self.display.info.pixmap_formats}
+        if formats.get(screen.root_depth) != 32:
+            self.display.close()
+            raise RuntimeError(f"不支持的屏幕色深: {screen.root_depth}")
+        self.root = screen.root
+        self.lock = threading.Lock()  # Xlib连接不是线程安全的，多个闸门共用同一连接
+
+    def screen_size(self):
+        screen = self.display.screen()
+        return screen.width_in_pixels, screen.height_in_pixels
+
+    def grab_gray(self, region):
+        left, top, width, height = region
+        with self.lock:
+            image = self.root.get_image(left, top, width, height, self.X.ZPixmap, 0xffffffff)
+        # 24/32位色深的ZPixmap每个像素4字节，按BGRX排列
+        bgrx = np.frombuffer(image.data, np.uint8).reshape(height, width, 4)
+        return cv2.cvtColor(bgrx, cv2.COLOR_BGRA2GRAY)
+
+    def close(self):
+        self.display.close()
+
+
+class PyAutoGUIPatchGrabber:
+    """基于pyautogui.screenshot的截图，没有X11显示（Windows/macOS）或Xlib不可用时使用"""
+
+    name = 'pyautogui'
+
+    def __init__(self):
+        import pyautogui
+        self.pyautogui = pyautogui
+
+    def screen_size(self):
+        width, height = self.pyautogui.size()
+        return int(width), int(height)
+
+    def grab_gray(self, region):
+        screenshot = self.pyautogui.screenshot(region=region)
+        return cv2.cvtColor(np.array(screenshot.convert('RGB')), cv2.COLOR_RGB2GRAY)
+
+
+_default_grabber = None
+_default_grabber_lock = threading.Lock()
+
+
+def default_patch_grabber():
+    """所有闸门共用的截图器，第一次使用时创建：Linux有X显示时优先Xlib，不可用时回退到pyautogui"""
+    global _default_grabber
+    with _default_grabber_lock:
+        if _default_grabber is None:
+            if sys.platform.startswith('linux') and os.environ.get('DISPLAY'):
+                try:
+                    _default_grabber = XlibPatchGrabber()
+                except Exception as e:
+                    print(f"⚠️ Xlib截图不可用，回退到pyautogui: {e}")
+            if _default_grabber is None:
+                _default_grabber = PyAutoGUIPatchGrabber()
+        return _default_grabber
+
+
+class PatchChangeGate:
+    """
+    捕获点变化闸门
+    对捕获点周围的一小块区域做与ScreenMonitor相同的差分检测，
+    只有该区域相对上次已处理的消息发生变化时，才值得执行完整的复制周期
+    """
+
+    def __init__(self, patch_size=64, change_threshold=0.005, pixel_threshold=16, grabber=None):
+        """
+        :param patch_size: 捕获点周围正方形区域的边长（像素）
+        :param change_threshold: 变化像素占比超过该值即认为有变化
+        :param pixel_threshold: 单个像素灰度差超过该值才计为变化，用于过滤抗锯齿等噪声
+        :param grabber: 截图器（提供screen_size()和grab_gray(region)），省略时在第一次截图时使用共用的默认截图器
+        """
+        self.patch_size = patch_size
+        self.change_threshold = change_threshold
+        self.pixel_threshold = pixel_threshold
+        self.grabber = grabber
+        self._screen_size = None  # 屏幕尺寸只查询一次，reset()时重新查询
+        self.baseline = None  # 上次已处理消息时的区域图像（灰度）
+        self.baseline_point = None
+
+    def _get_grabber(self):
+        if self.grabber is None:
+            self.grabber = default_patch_grabber()
+        return self.grabber
+
+    def patch_region(self, x, y):
+        """计算以(x, y)为中心的截图区域，限制在屏幕范围内"""
+        if self._screen_size is None:
+            self._screen_size = self._get_grabber().screen_size()
+        screen_width, screen_height = self._screen_size
+        half = self.patch_size // 2
+        left = max(0, min(int(x) - half, screen_width - self.patch_size))
+        top = max(0, min(int(y) - half, screen_height - self.patch_size))
+        return (left, top, self.patch_size, self.patch_size)
+
+    def capture_patch(self, x, y):
+        """截取捕获点周围的区域，返回灰度图"""
+        return self._get_grabber().grab_gray(self.patch_region(x, y))
+
+    def change_ratio(self, patch):
+        """计算与基准图像相比的变化像素占比"""
+        diff = cv2.absdiff(self.baseline, patch)
+        _, mask = cv2.threshold(diff, self.pixel_threshold, 255, cv2.THRESH_BINARY)
+        return cv2.countNonZero(mask) / float(patch.shape[0] * patch.shape[1])
+
+    def has_changed(self, patch, point):
+        """判断区域是否相对基准发生变化；没有基准或捕获点改变时视为有变化"""
+        if self.baseline is None or self.baseline_point != point or self.baseline.shape != patch.shape:
+            return True
+        return self.change_ratio(patch) > self.change_threshold
+
+    def commit(self, patch, point):
+        """把当前区域记为已处理消息的基准"""
+        self.baseline = patch
+        self.baseline_point = point
+
+    def reset(self):
+        """清除基准和缓存的屏幕尺寸，下次检测一定视为有变化"""
+        self.baseline = None
+        self.baseline_point = None
+        self._screen_size = None
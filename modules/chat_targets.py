@@ -0,0 +1,163 @@
+# modules/chat_targets.py
+import time
+import threading
+from collections import deque
+
+from .change_gate import PatchChangeGate
+from .dedup_store import DedupStore, KIND_INBOUND, KIND_REPLY
+from .conversation_store import ROLE_USER, ROLE_ASSISTANT
+from .pipeline import StageQueue
+from .config_snapshot import read_target_definitions
+
+
+class ChatTarget:
+    """
+    一个聊天窗口
+    拥有各自的捕获点、输入框，以及独立的变化闸门、去重表、对话历史和捕获队列
+    """
+
+    def __init__(self, name, capture_point, input_point, dedup_config=None, monitoring_config=None,
+                 queue_config=None, history_turns=6, merge=None, store=None):
+        """
+        :param capture_point: 文本捕获点 (x, y)
+        :param input_point: 输入框 (x, y)
+        :param history_turns: 保留的最近对话轮数，每轮包含一条消息和一条回复
+        :param merge: 捕获队列coalesce策略的合并函数
+        :param store: 会话存储（ConversationStore），提供时记录每轮对话，并在创建时恢复历史和去重指纹
+        """
+        dedup_config = dedup_config or {}
+        monitoring_config = monitoring_config or {}
+        queue_config = queue_config or {}
+        self.name = name
+        self.capture_point = tuple(capture_point)
+        self.input_point = tuple(input_point)
+        self.dedup_store = DedupStore(
+            max_entries=dedup_config.get('max_entries', 256),
+            ttl=dedup_config.get('ttl_seconds', 300)
+        )
+        self.change_gate = PatchChangeGate(
+            patch_size=monitoring_config.get('change_gate_patch_size', 64),
+            change_threshold=monitoring_config.get('change_gate_threshold', 0.005)
+        )
+        self.history = deque(maxlen=max(0, int(history_turns)) * 2)  # (角色, 文本)
+        self.history_lock = threading.Lock()
+        self.capture_queue = StageQueue(
+            f"capture:{name}",
+            maxsize=queue_config.get('maxsize', 4),
+            policy=queue_config.get('policy', 'coalesce'),
+            merge=merge
+        )
+        self.next_capture_at = 0.0  # 下次应当捕获的时间（time.perf_counter）
+        self.executed_cycles = 0
+        self.skipped_cycles = 0
+        self.replies_sent = 0
+        self.store = store
+        if store is not None:
+            self.restore()
+
+    @property
+    def key(self):
+        """用于判断配置是否改变的标识"""
+        return (self.name, self.capture_point, self.input_point)
+
+    def check_change_gate(self, enabled=True):
+        """
+        检查捕获点周围区域是否有变化
+        :return: 有变化时返回当前区域图像（用于之后记为基准），无变化返回False，
+                 闸门关闭或截图失败时返回None（照常执行周期）
+        """
+        if not enabled:
+            return None
+        try:
+            patch = self.change_gate.capture_patch(*self.capture_point)
+        except Exception as e:
+            print(f"⚠️ [{self.name}] 捕获区域截图失败，照常执行复制周期: {e}")
+            return None
+        if not self.change_gate.has_changed(patch, self.capture_point):
+            return False
+        return patch
+
+    def commit_change_gate(self, patch):
+        """把捕获时的区域记为已处理消息的基准"""
+        if patch is not None:
+            self.change_gate.commit(patch, self.capture_point)
+
+    def record_exchange(self, inbound_text, reply_text):
+        """记录一轮已完成的对话"""
+        self.dedup_store.add(inbound_text, KIND_INBOUND)
+        self.dedup_store.add(reply_text, KIND_REPLY)
+        self.replies_sent += 1
+        if self.store is not None:
+            self.store.append(self.name, ROLE_USER, inbound_text)
+            self.store.append(self.name, ROLE_ASSISTANT, reply_text)
+        if self.history.maxlen:
+            with self.history_lock:
+                self.history.append((ROLE_USER, inbound_text))
+                self.history.append((ROLE_ASSISTANT, reply_text))
+
+    def restore(self):
+        """从会话存储恢复最近的对话历史，以及有效期内的消息和回复指纹（程序重启后继续去重）"""
+        try:
+            history = self.store.recent(self.name, limit=self.history.maxlen) if self.history.maxlen else []
+            fingerprints = self.store.recent(self.name, limit=self.dedup_store.max_entries,
+                                             since=time.time() - self.dedup_store.ttl)
+        except Exception as e:
+            print(f"⚠️ [{self.name}] 从会话存储恢复对话失败: {e}")
+            return
+        for message in fingerprints:
+            self.dedup_store.add(message.text, KIND_REPLY if message.role == ROLE_ASSISTANT else KIND_INBOUND)
+        with self.history_lock:
+            self.history.extend((message.role, message.text) for message in history)
+        if history or fingerprints:
+            print(f"💾 [{self.name}] 已恢复 {len(history)} 条对话历史、{len(fingerprints)} 个去重指纹")
+
+    def format_history(self):
+        """把最近的对话格式化为提示词片段，没有历史时返回空字符串"""
+        with self.history_lock:
+            entries = list(self.history)
+        lines = [f"{'用户' if role == ROLE_USER else '你'}: {text}" for role, text in entries]
+        return "\n".join(lines)
+
+    def reset(self):
+        """开始运行前重置闸门和调度时间"""
+        self.change_gate.reset()
+        self.next_capture_at = time.perf_counter()
+
+    def get_stats(self):
+        return {
+            'capture_point': list(self.capture_point),
+            'input_point': list(self.input_point),
+            'executed_cycles': self.executed_cycles,
+            'skipped_cycles': self.skipped_cycles,
+            'replies_sent': self.replies_sent,
+            'history_entries': len(self.history),
+            'dedup': self.dedup_store.get_stats(),
+            'capture_queue': self.capture_queue.get_stats(),
+        }
+
+
+def build_chat_targets(config, existing=None, merge=None, definitions=None, store=None):
+    """
+    根据配置创建聊天目标列表
+    名称和坐标均未改变的目标沿用原对象，保留其去重表和对话历史
+    :param definitions: 已解析的目标定义（如配置快照中的chat_targets），省略时从config读取
+    :param store: 新建的目标共用的会话存储
+    """
+    existing = {target.key: target for target in (existing or [])}
+    if definitions is None:
+        definitions = read_target_definitions(config)
+    targets = []
+    for name, capture_point, input_point in definitions:
+        target = existing.get((name, tuple(capture_point), tuple(input_point)))
+        if target is None:
+            target = ChatTarget(
+                name, capture_point, input_point,
+                dedup_config=config.get('dedup', {}),
+                monitoring_config=config.get('monitoring', {}),
+                queue_config=config.get('pipeline', {}).get('capture_queue', {}),
+                history_turns=config.get('chat_history_turns', 6),
+                merge=merge,
+                store=store
+            )
+        targets.append(target)
+    return targets
@@ -0,0 +1,352 @@
+# modules/clipboard_backend.py
+import os
+import sys
+import time
+import queue
+import select
+import threading
+
+from .cancellation import OperationCancelled
+
+
+class ClipboardBackend:
+    """
+    剪贴板后端的基类
+    change_token() 返回当前剪贴板状态的标记，wait_for_change() 等待剪贴板相对该标记发生变化，
+    用于在Ctrl+C之后等待复制真正完成，而不是固定休眠
+    """
+
+    name = 'base'
+
+    def copy(self, text):
+        raise NotImplementedError
+
+    def paste(self):
+        raise NotImplementedError
+
+    def clear(self):
+        self.copy("")
+
+    def holds(self, text):
+        """剪贴板当前内容是否为text（用于确认粘贴之前剪贴板仍由我们的内容占有）"""
+        return self.paste() == text
+
+    def change_token(self):
+        raise NotImplementedError
+
+    def wait_for_change(self, token, timeout=1.0, cancel_event=None):
+        """
+        等待剪贴板相对token发生变化
+        :return: 在timeout秒内发生变化返回True，超时返回False
+        停止事件被设置时抛出OperationCancelled
+        """
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class PyperclipBackend(ClipboardBackend):
+    """
+    基于pyperclip的后端（Linux下每次调用都会启动xclip/xsel子进程）
+    没有变化通知，wait_for_change 以较低频率轮询剪贴板内容
+    """
+
+    name = 'pyperclip'
+
+    def __init__(self, poll_interval=0.05):
+        import pyperclip
+        self.pyperclip = pyperclip
+        self.poll_interval = poll_interval
+
+    def copy(self, text):
+        self.pyperclip.copy(text)
+
+    def paste(self):
+        return self.pyperclip.paste()
+
+    def change_token(self):
+        return self.paste()
+
+    def wait_for_change(self, token, timeout=1.0, cancel_event=None):
+        deadline = time.perf_counter() + timeout
+        while True:
+            if self.paste() != token:
+                return True
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                return False
+            wait = min(self.poll_interval, remaining)
+            if cancel_event is not None:
+                if cancel_event.wait(wait):
+                    raise OperationCancelled()
+            else:
+                time.sleep(wait)
+
+
+class X11ClipboardBackend(ClipboardBackend):
+    """
+    基于python-xlib的X11剪贴板后端
+    保持一个持久的X连接和一个隐藏窗口，由后台线程处理选区请求：
+    - copy() 让隐藏窗口成为CLIPBOARD的所有者，其他程序粘贴时直接由本进程应答，不启动子进程
+    - paste() 通过ConvertSelection读取其他程序持有的剪贴板内容
+    - 通过XFixes订阅选区所有者变化，Ctrl+C完成时立即唤醒 wait_for_change()
+    """
+
+    name = 'x11'
+
+    def __init__(self, display_name=None, request_timeout=1.0):
+        from Xlib import X, Xatom, display
+        from Xlib.ext import xfixes
+        from Xlib.protocol import event as xevent
+        self.X = X
+        self.Xatom = Xatom
+        self.xevent = xevent
+        self.request_timeout = request_timeout
+
+        self.display = display.Display(display_name)
+        if not self.display.has_extension('XFIXES'):
+            self.display.close()
+            raise RuntimeError("X服务器不支持XFIXES扩展")
+        self.display.xfixes_query_version()
+
+        self.CLIPBOARD = self.display.intern_atom('CLIPBOARD')
+        self.UTF8_STRING = self.display.intern_atom('UTF8_STRING')
+        self.TARGETS = self.display.intern_atom('TARGETS')
+        self.TEXT = self.display.intern_atom('TEXT')
+        self.INCR = self.display.intern_atom('INCR')
+        self.PROPERTY = self.display.intern_atom('CHAT_AUTOMATION_CLIPBOARD')
+
+        self.window = self.display.screen().root.create_window(
+            0, 0, 1, 1, 0, X.CopyFromParent, event_mask=X.PropertyChangeMask)
+        self.display.xfixes_select_selection_input(
+            self.window, self.CLIPBOARD, xfixes.XFixesSetSelectionOwnerNotifyMask)
+        self.display.flush()
+
+        self._text = None          # 本进程持有剪贴板时的内容
+        self._owner_serial = 0     # 选区所有者变化次数
+        self._cond = threading.Condition()
+        self._commands = queue.Queue()
+        self._pending_paste = None  # 正在进行的读取请求
+        self._wake_r, self._wake_w = os.pipe()
+        self._running = True
+        self._thread = threading.Thread(target=self._event_loop, name="x11-clipboard", daemon=True)
+        self._thread.start()
+
+    # ---- 调用方接口（任意线程） ----
+
+    def _call(self, name, *args):
+        """把操作交给事件线程执行并等待结果（X连接只在事件线程中使用）"""
+        done = threading.Event()
+        result = {}
+        self._commands.put((name, args, done, result))
+        os.write(self._wake_w, b'x')
+        if not done.wait(self.request_timeout + 1.0):
+            raise TimeoutError(f"X11剪贴板操作超时: {name}")
+        if 'error' in result:
+            raise result['error']
+        return result.get('value')
+
+    def copy(self, text):
+        self._call('copy', text)
+
+    def paste(self):
+        with self._cond:
+            if self._text is not None:
+                return self._text  # 自己持有剪贴板，无需往返X服务器
+        value = self._call('paste')
+        return value if value is not None else ""
+
+    def holds(self, text):
+        # 其他程序取得剪贴板时_text会被清除，无需往返X服务器
+        with self._cond:
+            return self._text == text
+
+    def change_token(self):
+        with self._cond:
+            return self._owner_serial
+
+    def wait_for_change(self, token, timeout=1.0, cancel_event=None):
+        deadline = time.perf_counter() + timeout
+        with self._cond:
+            while self._owner_serial == token:
+                if cancel_event is not None and cancel_event.is_set():
+                    raise OperationCancelled()
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    return False
+                # 有停止事件时分段等待，保证停止能在50ms内生效
+                self._cond.wait(min(remaining, 0.05) if cancel_event is not None else remaining)
+            return True
+
+    def close(self):
+        if not self._running:
+            return
+        self._running = False
+        os.write(self._wake_w, b'q')
+        self._thread.join(timeout=1.0)
+        os.close(self._wake_r)
+        os.close(self._wake_w)
+        self.display.close()
+
+    # ---- 事件线程 ----
+
+    def _event_loop(self):
+        while self._running:
+            try:
+                readable, _, _ = select.select([self.display.fileno(), self._wake_r], [], [], 0.5)
+                if self._wake_r in readable:
+                    os.read(self._wake_r, 4096)
+                self._run_commands()
+                while self.display.pending_events():
+                    self._handle_event(self.display.next_event())
+                self._expire_pending_paste()
+                self.display.flush()
+            except Exception as e:
+                if self._running:
+                    print(f"⚠️ X11剪贴板事件处理出错: {e}")
+
+    def _run_commands(self):
+        deferred = []
+        while True:
+            try:
+                command = self._commands.get_nowait()
+            except queue.Empty:
+                break
+            name, args, done, result = command
+            try:
+                if name == 'copy':
+                    self._do_copy(*args)
+                    done.set()
+                elif name == 'paste':
+                    if self._pending_paste is not None:
+                        deferred.append(command)  # 同一时间只进行一个读取请求
+                    else:
+                        self._start_paste(done, result)
+            except Exception as e:
+                result['error'] = e
+                done.set()
+        for command in deferred:
+            self._commands.put(command)
+
+    def _do_copy(self, text):
+        with self._cond:
+            self._text = text
+        self.window.set_selection_owner(self.CLIPBOARD, self.X.CurrentTime)
+        owner = self.display.get_selection_owner(self.CLIPBOARD)
+        if owner != self.window:
+            with self._cond:
+                self._text = None
+            raise RuntimeError("无法取得CLIPBOARD所有权")
+
+    def _start_paste(self, done, result):
+        owner = self.display.get_selection_owner(self.CLIPBOARD)
+        if owner == self.X.NONE:
+            result['value'] = ""
+            done.set()
+            return
+        self.window.convert_selection(self.CLIPBOARD, self.UTF8_STRING, self.PROPERTY, self.X.CurrentTime)
+        self._pending_paste = {
+            'done': done, 'result': result, 'chunks': None,
+            'deadline': time.perf_counter() + self.request_timeout,
+        }
+
+    def _finish_paste(self, value):
+        pending, self._pending_paste = self._pending_paste, None
+        if pending is not None:
+            pending['result']['value'] = value
+            pending['done'].set()
+        if not self._commands.empty():
+            os.write(self._wake_w, b'x')  # 唤醒事件线程处理排队的读取请求
+
+    def _expire_pending_paste(self):
+        if self._pending_paste is not None and time.perf_counter() > self._pending_paste['deadline']:
+            print("⚠️ 读取剪贴板超时，剪贴板所有者没有应答")
+            self._finish_paste(None)
+
+    def _read_property(self):
+        prop = self.window.get_full_property(self.PROPERTY, self.X.AnyPropertyType)
+        self.window.delete_property(self.PROPERTY)
+        return prop
+
+    @staticmethod
+    def _decode(value):
+        if isinstance(value, bytes):
+            return value.decode('utf-8', errors='replace')
+        return value or ""
+
+    def _handle_event(self, e):
+        X = self.X
+        if (e.type, getattr(e, 'sub_code', None)) == self.display.extension_event.SetSelectionOwnerNotify:
+            # 只统计其他程序取得剪贴板（如聊天窗口响应Ctrl+C），本进程自己的copy()不算变化
+            if e.selection == self.CLIPBOARD and e.owner != self.window:
+                with self._cond:
+                    self._text = None
+                    self._owner_serial += 1
+                    self._cond.notify_all()
+        elif e.type == X.SelectionRequest:
+            self._answer_request(e)
+        elif e.type == X.SelectionClear:
+            with self._cond:
+                self._text = None
+        elif e.type == X.SelectionNotify and self._pending_paste is not None:
+            if e.property == X.NONE:
+                self._finish_paste(None)
+                return
+            prop = self._read_property()
+            if prop is None:
+                self._finish_paste(None)
+            elif prop.property_type == self.INCR:
+                self._pending_paste['chunks'] = []  # 大段文本分块传输，等待PropertyNotify
+            else:
+                self._finish_paste(self._decode(prop.value))
+        elif e.type == X.PropertyNotify and self._pending_paste is not None \
+                and self._pending_paste['chunks'] is not None \
+                and e.atom == self.PROPERTY and e.state == X.PropertyNewValue:
+            prop = self._read_property()
+            chunk = prop.value if prop is not None else b''
+            if chunk:
+                self._pending_paste['chunks'].append(chunk if isinstance(chunk, bytes) else chunk.encode('utf-8'))
+                self._pending_paste['deadline'] = time.perf_counter() + self.request_timeout
+            else:
+                self._finish_paste(self._decode(b''.join(self._pending_paste['chunks'])))
+
+    def _answer_request(self, request):
+        """应答其他程序对本进程所持剪贴板的读取请求"""
+        X = self.X
+        with self._cond:
+            text = self._text
+        prop = request.property if request.property != X.NONE else request.target
+        if text is None:
+            prop = X.NONE
+        elif request.target == self.TARGETS:
+            request.requestor.change_property(
+                prop, self.Xatom.ATOM, 32, [self.TARGETS, self.UTF8_STRING, self.Xatom.STRING, self.TEXT])
+        elif request.target in (self.UTF8_STRING, self.TEXT):
+            request.requestor.change_property(prop, self.UTF8_STRING, 8, text.encode('utf-8'))
+        elif request.target == self.Xatom.STRING:
+            request.requestor.change_property(prop, self.Xatom.STRING, 8, text.encode('latin-1', errors='replace'))
+        else:
+            prop = X.NONE
+        notify = self.xevent.SelectionNotify(
+            time=request.time, requestor=request.requestor, selection=request.selection,
+            target=request.target, property=prop)
+        request.requestor.send_event(notify, event_mask=0)
+
+
+def create_clipboard_backend(name='auto'):
+    """
+    创建剪贴板后端
+    :param name: 'auto'（Linux有X显示时优先X11）、'x11' 或 'pyperclip'
+    X11后端不可用时回退到pyperclip
+    """
+    if name in ('auto', 'x11') and sys.platform.startswith('linux') and os.environ.get('DISPLAY'):
+        try:
+            backend = X11ClipboardBackend()
+            print("📋 剪贴板后端: X11 (XFixes)")
+            return backend
+        except Exception as e:
+            print(f"⚠️ X11剪贴板后端不可用，回退到pyperclip: {e}")
+    elif name == 'x11':
+        print("⚠️ 当前环境没有X11显示，X11剪贴板后端不可用，回退到pyperclip")
+    return PyperclipBackend()
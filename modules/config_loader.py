@@ -1,6 +1,11 @@
 import os
+import copy
 import json
 import sys
+import time
+import tempfile
+import threading
+from contextlib import contextmanager
 from pathlib import Path
 
 # 添加项目根目录到sys.path，以便正确导入config模块
@@ -9,29 +14,99 @@ sys.path.insert(0, str(project_root))
 
 # 使用绝对导入路径
 import config
-CONFIG = config.CONFIG
+
+from modules.config_snapshot import build_snapshot
+
+
+def atomic_write_json(path, data):
+    """先写入同目录下的临时文件并落盘，再用os.replace替换目标文件，中途崩溃不会留下半个文件"""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, temp_path = tempfile.mkstemp(prefix=f".{os.path.basename(path)}.", suffix='.tmp', dir=directory)
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, path)
+    except BaseException:
+        try:
+            os.unlink(temp_path)
+        except OSError:
+            pass
+        raise
+
+
+_MISSING = object()
+
+
+def diff_config(old, new, prefix=''):
+    """
+    比较两份配置字典，返回值不同的键（点分路径）
+    嵌套字典逐级比较，其余值（包括列表）整体比较；只在一侧存在的键也算变化
+    """
+    changed = []
+    for key in list(old) + [k for k in new if k not in old]:
+        path = f"{prefix}{key}"
+        old_value, new_value = old.get(key, _MISSING), new.get(key, _MISSING)
+        if isinstance(old_value, dict) and isinstance(new_value, dict):
+            changed.extend(diff_config(old_value, new_value, f"{path}."))
+        elif old_value != new_value:
+            changed.append(path)
+    return changed
+
+
+def _lookup(config, key):
+    value = config
+    for k in key.split('.'):
+        if not isinstance(value, dict) or k not in value:
+            return _MISSING
+        value = value[k]
+    return value
 
 
 class ConfigLoader:
-    def __init__(self, config_file="config.json"):
+    def __init__(self, config_file="config.json", write_behind=False, debounce=0.5, max_delay=5.0):
         """
         初始化配置加载器
         :param config_file: 配置文件路径
+        :param write_behind: 为True时，set()之后由后台线程延迟写回config_file
+        :param debounce: 最后一次修改之后静默多久（秒）才写入，连续的修改合并为一次写入
+        :param max_delay: 从第一次未保存的修改起最多等待多久（秒），持续修改时也会定期写入
         """
         # 使用传入的配置文件路径，如果没有找到则使用默认配置
         self.config_file = config_file
         self.config = {}
+
+        # 延迟写回：记录未保存的键，由后台线程合并后原子写入
+        self.debounce = debounce
+        self.max_delay = max_delay
+        self._dirty_keys = set()
+        self._first_dirty_at = None
+        self._last_dirty_at = None
+        self._cond = threading.Condition()
+        self._write_lock = threading.Lock()  # 保证同一时间只有一次写入
+        self._writer_thread = None
+        self._closing = False
+        # 配置快照：每次修改后重新构建并整体替换，工作线程通过snapshot()读取
+        self._snapshot = None
+        self._snapshot_version = 0
+        self._batch_depth = 0
+        self.write_stats = {'writes': 0, 'updates': 0, 'errors': 0, 'last_write_ms': 0.0,
+                            'max_write_ms': 0.0, 'total_write_ms': 0.0, 'last_keys': []}
         
         # 尝试从传入的配置文件加载
         if os.path.exists(config_file):
             with open(config_file, 'r', encoding='utf-8') as f:
                 self.config = json.load(f)
         else:
-            # 如果传入的配置文件不存在，使用默认配置
-            self.config = CONFIG.copy()
+            # 如果传入的配置文件不存在，使用默认配置（只在此时才计算默认配置）
+            self.config = config.CONFIG.copy()
+        # 上次从config_file读取或写入的内容，热重载时与之比较找出变化的键
+        self._disk_config = copy.deepcopy(self.config) if os.path.exists(config_file) else {}
         
-        # 加载用户配置覆盖默认配置
-        if os.path.exists("user_config.json"):
+        # 加载用户配置覆盖默认配置（config_file本身就是用户配置时无需再读一遍）
+        if os.path.exists("user_config.json") and \
+                os.path.abspath("user_config.json") != os.path.abspath(config_file):
             with open("user_config.json", 'r', encoding='utf-8') as f:
                 user_config = json.load(f)
                 
@@ -42,6 +117,10 @@ class ConfigLoader:
                     else:
                         self.config[key] = value
 
+        self._publish_snapshot()
+        if write_behind:
+            self.start_write_behind()
+
     def get(self, key, default=None):
         """
         获取配置值
@@ -66,15 +145,41 @@ class ConfigLoader:
         :param key: 键名，可以是'key.subkey'格式
         :param value: 值
         """
+        self._assign(key, value)
+        self.mark_dirty(key)
+
+    def _assign(self, key, value):
         keys = key.split('.')
         config_ref = self.config
         
         for k in keys[:-1]:
-            if k not in config_ref:
+            if not isinstance(config_ref.get(k), dict):
                 config_ref[k] = {}
             config_ref = config_ref[k]
             
-        config_ref[keys[-1]] = value
+        if value is _MISSING:
+            config_ref.pop(keys[-1], None)
+        else:
+            config_ref[keys[-1]] = value
+
+    def reload(self):
+        """
+        重新读取config_file，只把相对上次读写的文件内容发生变化的键应用到当前配置
+        （原地修改self.config，持有该字典的组件无需重建），并发布新的快照
+        :return: 发生变化的键（点分路径）列表；文件内容与上次相同（如本进程自己的写入）时为空
+        """
+        with open(self.config_file, 'r', encoding='utf-8') as f:
+            new_config = json.load(f)
+        with self._cond:
+            old_config = self._disk_config
+            self._disk_config = new_config
+        changed = diff_config(old_config, new_config)
+        if changed:
+            with self.batch_update():
+                for key in changed:
+                    value = _lookup(new_config, key)
+                    self._assign(key, value if value is _MISSING else copy.deepcopy(value))
+        return changed
     
     def update_config(self, key, value):
         """
@@ -86,9 +191,142 @@ class ConfigLoader:
 
     def save(self, config_file=None):
         """
-        保存配置到文件
+        保存配置到文件（原子写入）
         :param config_file: 要保存到的文件路径，默认使用初始化时指定的文件
         """
         target_file = config_file or self.config_file
-        with open(target_file, 'w', encoding='utf-8') as f:
-            json.dump(self.config, f, ensure_ascii=False, indent=2)
\ No newline at end of file
+        if os.path.abspath(target_file) == os.path.abspath(self.config_file):
+            self.flush(force=True)
+        else:
+            atomic_write_json(target_file, self._serialize())
+
+    def mark_dirty(self, key):
+        """记录一个未保存的修改；直接修改self.config中的字典后也可以调用它"""
+        now = time.monotonic()
+        with self._cond:
+            self._dirty_keys.add(key)
+            self.write_stats['updates'] += 1
+            if self._first_dirty_at is None:
+                self._first_dirty_at = now
+            self._last_dirty_at = now
+            self._cond.notify_all()
+        if self._batch_depth == 0:
+            self._publish_snapshot()
+
+    def snapshot(self):
+        """
+        当前配置的不可变快照（ConfigSnapshot）
+        读取只是一次属性访问，不加锁；快照在修改时整体替换，读者不会看到修改了一半的配置
+        """
+        return self._snapshot
+
+    def _publish_snapshot(self):
+        try:
+            snapshot = build_snapshot(self.config, self._snapshot_version + 1)
+        except (TypeError, ValueError, AttributeError) as e:
+            print(f"⚠️ 配置值无效，保留上一份配置快照: {e}")
+            return
+        self._snapshot_version = snapshot.version
+        self._snapshot = snapshot  # 单次引用赋值，对其他线程是原子的
+
+    @contextmanager
+    def batch_update(self):
+        """一组相关修改完成后只发布一次快照，例如GUI同时更新坐标和区域"""
+        self._batch_depth += 1
+        try:
+            yield self
+        finally:
+            self._batch_depth -= 1
+            if self._batch_depth == 0:
+                self._publish_snapshot()
+
+    def _serialize(self):
+        # 其他线程可能正在修改嵌套字典，遇到迭代冲突时重试
+        for _ in range(5):
+            try:
+                return json.dumps(self.config, ensure_ascii=False, indent=2)
+            except RuntimeError:
+                time.sleep(0.001)
+        return json.dumps(self.config, ensure_ascii=False, indent=2)
+
+    def flush(self, force=False):
+        """
+        立即把未保存的修改写入config_file
+        :param force: 为True时即使没有未保存的修改也写入
+        :return: 是否发生了写入
+        """
+        with self._write_lock:
+            with self._cond:
+                keys = self._dirty_keys
+                if not keys and not force:
+                    return False
+                self._dirty_keys = set()
+                self._first_dirty_at = None
+                self._last_dirty_at = None
+            start = time.perf_counter()
+            try:
+                data = self._serialize()
+                atomic_write_json(self.config_file, data)
+            except Exception:
+                with self._cond:
+                    self._dirty_keys |= keys  # 写入失败，保留未保存的键留待下次重试
+                    if self._first_dirty_at is None:
+                        self._first_dirty_at = self._last_dirty_at = time.monotonic()
+                    self.write_stats['errors'] += 1
+                raise
+            elapsed_ms = (time.perf_counter() - start) * 1000.0
+            with self._cond:
+                self._disk_config = json.loads(data)
+                self.write_stats['writes'] += 1
+                self.write_stats['last_write_ms'] = elapsed_ms
+                self.write_stats['max_write_ms'] = max(self.write_stats['max_write_ms'], elapsed_ms)
+                self.write_stats['total_write_ms'] += elapsed_ms
+                self.write_stats['last_keys'] = sorted(keys)
+            return True
+
+    def start_write_behind(self):
+        """启动后台写回线程"""
+        if self._writer_thread is not None and self._writer_thread.is_alive():
+            return
+        self._closing = False
+        self._writer_thread = threading.Thread(target=self._write_behind_loop, name="config-writer", daemon=True)
+        self._writer_thread.start()
+
+    def _write_behind_loop(self):
+        while True:
+            with self._cond:
+                while not self._dirty_keys and not self._closing:
+                    self._cond.wait()
+                if self._closing:
+                    return
+                # 等到最后一次修改之后静默debounce秒，或距第一次修改已超过max_delay秒
+                now = time.monotonic()
+                due = min(self._last_dirty_at + self.debounce, self._first_dirty_at + self.max_delay)
+                if now < due:
+                    self._cond.wait(due - now)
+                    continue
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"⚠️ 写入配置文件失败: {e}")
+                with self._cond:
+                    self._cond.wait(1.0)  # 稍后重试
+
+    def close(self):
+        """停止后台写回线程并写入所有未保存的修改"""
+        with self._cond:
+            self._closing = True
+            self._cond.notify_all()
+        if self._writer_thread is not None:
+            self._writer_thread.join(timeout=2.0)
+            self._writer_thread = None
+        self.flush()
+
+    def get_write_stats(self):
+        """写回统计：写入次数、合并的修改次数、写入耗时（毫秒）和未保存的键"""
+        with self._cond:
+            stats = dict(self.write_stats)
+            stats['pending_keys'] = sorted(self._dirty_keys)
+        stats['coalesced'] = max(0, stats['updates'] - stats['writes'])
+        stats['mean_write_ms'] = stats['total_write_ms'] / stats['writes'] if stats['writes'] else 0.0
+        return stats
\ No newline at end of file
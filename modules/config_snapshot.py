@@ -0,0 +1,137 @@
+# modules/config_snapshot.py
+from typing import NamedTuple, Tuple
+
+DEFAULT_OLLAMA_URL = 'http://localhost:11434/api/generate'
+DEFAULT_OLLAMA_MODEL = 'qwen3:8b'
+
+
+class OllamaSettings(NamedTuple):
+    url: str
+    model: str
+    prompt_template: str
+
+
+class MonitoringSettings(NamedTuple):
+    change_gate_enabled: bool
+    change_gate_patch_size: int
+    change_gate_threshold: float
+
+
+class AutoCopySettings(NamedTuple):
+    interval: float
+    delay_scale: float
+    mouse_move_rate_hz: int
+    mouse_trajectory: str
+    pipeline_enabled: bool
+    max_concurrent_generations: int
+
+
+class ChatTargetSpec(NamedTuple):
+    name: str
+    capture_point: Tuple[int, int]
+    input_point: Tuple[int, int]
+
+
+class ConfigSnapshot(NamedTuple):
+    """
+    某一时刻配置的不可变快照
+    工作线程直接读取属性，不再逐级查找嵌套字典，也不会读到GUI线程修改了一半的配置
+    """
+    version: int
+    ollama: OllamaSettings
+    monitoring: MonitoringSettings
+    auto_copy: AutoCopySettings
+    chat_targets: Tuple[ChatTargetSpec, ...]
+
+
+def _point(coords):
+    """把{'x':..,'y':..}转换为(x, y)，未设置（0, 0）时返回None"""
+    if not coords:
+        return None
+    x, y = coords.get('x', 0), coords.get('y', 0)
+    if x == 0 and y == 0:
+        return None
+    return (x, y)
+
+
+def resolve_ollama_model(config):
+    """
+    当前使用的模型名称
+    顶层的ollama_model是界面、控制命令和update_model写入的当前选择，优先于ollama.model（默认模型）
+    """
+    return config.get('ollama_model') or config.get('ollama', {}).get('model') or DEFAULT_OLLAMA_MODEL
+
+
+def read_target_definitions(config, warn=True):
+    """
+    读取聊天目标定义
+    monitoring.chat_targets 为列表时每一项是一个聊天窗口：
+        {"name": "群聊A", "copy_area_coords": {"x":..,"y":..}, "input_coords": {"x":..,"y":..}}
+    未配置列表时回退到单个窗口（monitoring.copy_area_coords/input_coords，或旧的capture_point/input_point）
+    :param warn: 是否提示坐标未设置的项
+    :return: [(名称, 捕获点, 输入框)]，坐标未设置的项会被跳过
+    """
+    monitoring_config = config.get('monitoring', {})
+    entries = monitoring_config.get('chat_targets') or []
+    if not entries:
+        entries = [{
+            'name': 'default',
+            'copy_area_coords': monitoring_config.get('copy_area_coords') or config.get('capture_point', {}),
+            'input_coords': monitoring_config.get('input_coords') or config.get('input_point', {}),
+        }]
+
+    definitions = []
+    for index, entry in enumerate(entries):
+        name = entry.get('name') or f"target{index + 1}"
+        capture_point = _point(entry.get('copy_area_coords'))
+        input_point = _point(entry.get('input_coords'))
+        if capture_point is None:
+            if warn:
+                print(f"⚠️ [{name}] 文本捕获点坐标未设置")
+            continue
+        if input_point is None:
+            if warn:
+                print(f"⚠️ [{name}] 输入框坐标未设置")
+            continue
+        definitions.append((name, capture_point, input_point))
+    return definitions
+
+
+def build_snapshot(config, version=0):
+    """
+    由配置字典构建快照，所有值都在此时复制为不可变的类型
+    :param config: 配置字典
+    """
+    ollama_config = config.get('ollama', {})
+    monitoring_config = config.get('monitoring', {})
+    pipeline_config = config.get('pipeline', {})
+
+    # 与原先的回退规则一致：ollama.url为空时使用ollama_host拼接
+    url = ollama_config.get('url', DEFAULT_OLLAMA_URL) or \
+        f"{config.get('ollama_host', 'http://localhost:11434')}/api/generate"
+
+    return ConfigSnapshot(
+        version=version,
+        ollama=OllamaSettings(
+            url=url,
+            model=resolve_ollama_model(config),
+            prompt_template=config.get('prompt_template', '请对以下消息进行简洁回复：{message}'),
+        ),
+        monitoring=MonitoringSettings(
+            change_gate_enabled=bool(monitoring_config.get('change_gate_enabled', True)),
+            change_gate_patch_size=int(monitoring_config.get('change_gate_patch_size', 64)),
+            change_gate_threshold=float(monitoring_config.get('change_gate_threshold', 0.005)),
+        ),
+        auto_copy=AutoCopySettings(
+            interval=float(config.get('auto_copy_interval', 2)),
+            delay_scale=float(config.get('humanize_delay_scale', 1.0)),
+            mouse_move_rate_hz=int(config.get('mouse_move_rate_hz', 60)),
+            mouse_trajectory=config.get('mouse_trajectory', 'eased'),
+            pipeline_enabled=bool(pipeline_config.get('enabled', True)),
+            max_concurrent_generations=int(pipeline_config.get('max_concurrent_generations', 0)),
+        ),
+        chat_targets=tuple(
+            ChatTargetSpec(name, tuple(capture_point), tuple(input_point))
+            for name, capture_point, input_point in read_target_definitions(config, warn=False)
+        ),
+    )
@@ -0,0 +1,156 @@
+# modules/config_watcher.py
+import os
+import sys
+import time
+import struct
+import select
+import ctypes
+import ctypes.util
+import threading
+
+# inotify常量（见 <sys/inotify.h>）
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+_EVENT_HEADER = struct.Struct('iIII')  # wd, mask, cookie, len
+
+
+class _Inotify:
+    """
+    通过ctypes调用libc的inotify接口，监视一个目录
+    监视目录而不是文件本身：原子写入（临时文件 + rename）会替换文件的inode
+    """
+
+    def __init__(self, directory):
+        libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        self.fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1失败")
+        wd = libc.inotify_add_watch(self.fd, os.fsencode(directory), IN_CLOSE_WRITE | IN_MOVED_TO)
+        if wd < 0:
+            errno = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(errno, f"无法监视目录: {directory}")
+
+    def read_names(self):
+        """读取所有待处理的事件，返回涉及的文件名"""
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+        names = []
+        offset = 0
+        while offset + _EVENT_HEADER.size <= len(data):
+            _, _, _, length = _EVENT_HEADER.unpack_from(data, offset)
+            start = offset + _EVENT_HEADER.size
+            names.append(os.fsdecode(data[start:start + length].rstrip(b'\0')))
+            offset = start + length
+        return names
+
+    def close(self):
+        os.close(self.fd)
+
+
+class ConfigWatcher:
+    """
+    配置文件监视器
+    Linux下使用inotify，文件写入完成（或被原子替换）时才唤醒；其他平台按间隔比较文件的修改时间和大小。
+    短时间内的多次变化合并为一次回调，回调在监视线程中执行
+    """
+
+    def __init__(self, path, on_change, debounce=0.2, poll_interval=1.0):
+        """
+        :param on_change: 文件变化时调用的无参函数
+        :param debounce: 收到变化后再等待多久（秒），合并连续的写入
+        :param poll_interval: 不支持inotify时的轮询间隔（秒）
+        """
+        self.path = os.path.abspath(path)
+        self.on_change = on_change
+        self.debounce = debounce
+        self.poll_interval = poll_interval
+        self.mode = None
+        self.stats = {'events': 0, 'callbacks': 0, 'errors': 0}
+        self._thread = None
+        self._stop_event = threading.Event()
+        self._wake_r = self._wake_w = None
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        inotify = None
+        if sys.platform.startswith('linux'):
+            try:
+                inotify = _Inotify(os.path.dirname(self.path))
+            except (OSError, AttributeError) as e:
+                print(f"⚠️ inotify不可用，改为轮询配置文件: {e}")
+        if inotify is not None:
+            self.mode = 'inotify'
+            self._wake_r, self._wake_w = os.pipe()
+            target, args = self._inotify_loop, (inotify,)
+        else:
+            self.mode = 'poll'
+            target, args = self._poll_loop, ()
+        self._thread = threading.Thread(target=target, args=args, name="config-watcher", daemon=True)
+        self._thread.start()
+        print(f"👀 正在监视配置文件 ({self.mode}): {self.path}")
+
+    def stop(self):
+        if self._thread is None:
+            return
+        self._stop_event.set()
+        if self._wake_w is not None:
+            os.write(self._wake_w, b'q')
+        self._thread.join(timeout=2.0)
+        self._thread = None
+        if self._wake_w is not None:
+            os.close(self._wake_r)
+            os.close(self._wake_w)
+            self._wake_r = self._wake_w = None
+
+    def _notify(self):
+        self.stats['callbacks'] += 1
+        try:
+            self.on_change()
+        except Exception as e:
+            self.stats['errors'] += 1
+            print(f"⚠️ 处理配置文件变化时出错: {e}")
+
+    def _inotify_loop(self, inotify):
+        name = os.path.basename(self.path)
+        try:
+            while not self._stop_event.is_set():
+                readable, _, _ = select.select([inotify.fd, self._wake_r], [], [])
+                if self._wake_r in readable:
+                    break
+                if name not in inotify.read_names():
+                    continue
+                self.stats['events'] += 1
+                # 合并紧接着的写入（如编辑器先写入再重命名）
+                if self._stop_event.wait(self.debounce):
+                    break
+                inotify.read_names()
+                self._notify()
+        finally:
+            inotify.close()
+
+    def _signature(self):
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+
+    def _poll_loop(self):
+        last = self._signature()
+        while not self._stop_event.wait(self.poll_interval):
+            current = self._signature()
+            if current != last and current is not None:
+                self.stats['events'] += 1
+                if self._stop_event.wait(self.debounce):
+                    break
+                last = self._signature()
+                self._notify()
+            else:
+                last = current
@@ -0,0 +1,217 @@
+# modules/control_server.py
+import os
+import json
+import socket
+import threading
+import socketserver
+
+MODES = ('auto_copy', 'screen_monitor')
+MAX_LINE = 64 * 1024  # 单条命令的最大长度（字节）
+
+
+class CommandError(Exception):
+    """命令参数错误或无法执行，错误信息原样返回给客户端"""
+
+
+def default_socket_path():
+    """默认的控制socket路径：$XDG_RUNTIME_DIR（仅当前用户可访问）下，没有时使用/tmp"""
+    directory = os.environ.get('XDG_RUNTIME_DIR') or '/tmp'
+    return os.path.join(directory, f"chat_automation-{os.getuid()}.sock")
+
+
+def process_stats():
+    """当前进程的常驻内存和线程数（读取/proc，其他平台只返回PID）"""
+    stats = {'pid': os.getpid(), 'threads': threading.active_count()}
+    try:
+        with open('/proc/self/status', 'r') as f:
+            for line in f:
+                if line.startswith(('VmRSS:', 'VmHWM:')):
+                    stats['rss_kb' if line.startswith('VmRSS') else 'peak_rss_kb'] = int(line.split()[1])
+    except OSError:
+        pass
+    return stats
+
+
+def summary_to_json(summary):
+    """把MetricsAggregator.summary()的元组键转换为 "追踪类型/阶段" 字符串，便于JSON序列化"""
+    result = dict(summary)
+    result['stages'] = {f"{kind}/{name}": stage for (kind, name), stage in summary['stages'].items()}
+    result['outcomes'] = {f"{kind}/{outcome}": count for (kind, outcome), count in summary['outcomes'].items()}
+    return result
+
+
+class ControlServer:
+    """
+    本地控制socket（Unix域套接字，JSON行协议）
+    每行一个请求 {"cmd": "start"}，每行一个响应 {"ok": true, ...} 或 {"ok": false, "error": "..."}；
+    一个连接上可以连续发送多条命令。命令串行执行，避免启动和停止交错
+    支持的命令: ping, status, start, stop, mode {"mode"}, model {"model"}, stats
+    """
+
+    def __init__(self, app, path=None):
+        """
+        :param app: ChatAutomationApp
+        :param path: socket文件路径，默认见default_socket_path()
+        """
+        self.app = app
+        self.path = path or default_socket_path()
+        self.command_lock = threading.Lock()
+        self.stats = {'connections': 0, 'commands': 0, 'errors': 0}
+        self.commands = {
+            'ping': self.cmd_ping,
+            'status': self.cmd_status,
+            'start': self.cmd_start,
+            'stop': self.cmd_stop,
+            'mode': self.cmd_mode,
+            'model': self.cmd_model,
+            'stats': self.cmd_stats,
+        }
+        self.server = None
+        self.thread = None
+
+    # ---------- 启动和关闭 ----------
+
+    def start(self):
+        self._remove_stale_socket()
+        server = self
+        old_umask = os.umask(0o177)  # socket文件只允许当前用户读写
+        try:
+            self.server = socketserver.ThreadingUnixStreamServer(self.path, self._handler_class(server))
+        finally:
+            os.umask(old_umask)
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, name='control-server', daemon=True)
+        self.thread.start()
+        print(f"🔌 控制socket已监听: {self.path}")
+        return self
+
+    def close(self):
+        if self.server is None:
+            return
+        self.server.shutdown()
+        self.server.server_close()
+        self.server = None
+        try:
+            os.unlink(self.path)
+        except FileNotFoundError:
+            pass
+
+    def _remove_stale_socket(self):
+        """删除上次异常退出留下的socket文件；已有进程在监听时拒绝启动"""
+        if not os.path.exists(self.path):
+            return
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(self.path)
+        except (ConnectionRefusedError, FileNotFoundError):
+            os.unlink(self.path)
+        else:
+            raise RuntimeError(f"控制socket {self.path} 已被另一个进程使用")
+        finally:
+            probe.close()
+
+    @staticmethod
+    def _handler_class(server):
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                server.stats['connections'] += 1
+                while True:
+                    line = self.rfile.readline(MAX_LINE + 1)
+                    if not line:
+                        break
+                    if not line.strip():
+                        continue
+                    if len(line) > MAX_LINE:
+                        response = {'ok': False, 'error': f"命令超过 {MAX_LINE} 字节"}
+                    else:
+                        response = server.dispatch(line)
+                    try:
+                        self.wfile.write(json.dumps(response, ensure_ascii=False, default=str).encode('utf-8') + b'\n')
+                        self.wfile.flush()
+                    except (BrokenPipeError, ConnectionResetError):
+                        break
+                    if len(line) > MAX_LINE:
+                        break  # 无法确定下一条命令从哪里开始
+        return Handler
+
+    # ---------- 命令 ----------
+
+    def dispatch(self, line):
+        """解析并执行一条命令，返回响应字典（不抛出异常）"""
+        try:
+            try:
+                request = json.loads(line)
+            except ValueError as e:
+                raise CommandError(f"无效的JSON: {e}")
+            if not isinstance(request, dict):
+                raise CommandError("请求必须是JSON对象")
+            name = request.get('cmd')
+            handler = self.commands.get(name)
+            if handler is None:
+                raise CommandError(f"未知命令: {name}，支持: {', '.join(self.commands)}")
+            with self.command_lock:
+                self.stats['commands'] += 1
+                result = handler(request)
+            response = {'ok': True}
+            response.update(result or {})
+            return response
+        except CommandError as e:
+            self.stats['errors'] += 1
+            return {'ok': False, 'error': str(e)}
+        except Exception as e:
+            self.stats['errors'] += 1
+            print(f"❌ 执行控制命令失败: {e}")
+            return {'ok': False, 'error': f"{type(e).__name__}: {e}"}
+
+    def cmd_ping(self, request):
+        return {'pong': True}
+
+    def cmd_status(self, request):
+        return self.app.get_status()
+
+    def cmd_start(self, request):
+        if self.app.is_running():
+            return dict(self.app.get_status(), changed=False)
+        if not self.app.start_monitoring():
+            raise CommandError("启动失败，请检查坐标和模式设置")
+        return dict(self.app.get_status(), changed=True)
+
+    def cmd_stop(self, request):
+        was_running = self.app.is_running()
+        self.app.stop_monitoring()
+        return dict(self.app.get_status(), changed=was_running)
+
+    def cmd_mode(self, request):
+        mode = request.get('mode')
+        if mode not in MODES:
+            raise CommandError(f"mode必须是 {' / '.join(MODES)} 之一")
+        self.app.switch_mode(mode)
+        return self.app.get_status()
+
+    def cmd_model(self, request):
+        model = request.get('model')
+        if not isinstance(model, str) or not model.strip():
+            raise CommandError("缺少model参数")
+        self.app.update_model(model.strip())
+        return self.app.get_status()
+
+    def cmd_stats(self, request):
+        return {'metrics': summary_to_json(self.app.metrics.summary()), 'control': dict(self.stats),
+                'process': process_stats()}
+
+
+def send_command(cmd, path=None, timeout=10.0, **args):
+    """
+    客户端：连接控制socket发送一条命令并返回响应字典
+    例如 send_command('mode', mode='screen_monitor')
+    """
+    request = dict(args, cmd=cmd)
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(timeout)
+        sock.connect(path or default_socket_path())
+        sock.sendall(json.dumps(request, ensure_ascii=False).encode('utf-8') + b'\n')
+        with sock.makefile('rb') as reader:
+            line = reader.readline(MAX_LINE * 16)
+    if not line:
+        raise ConnectionError("控制socket已关闭连接")
+    return json.loads(line)
@@ -0,0 +1,246 @@
+# modules/conversation_store.py
+import os
+import time
+import queue
+import sqlite3
+import threading
+from typing import NamedTuple
+
+from .dedup_store import text_fingerprint
+
+ROLE_USER = 'user'
+ROLE_ASSISTANT = 'assistant'
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS messages (
+    id INTEGER PRIMARY KEY,
+    chat TEXT NOT NULL,
+    ts REAL NOT NULL,
+    role TEXT NOT NULL,
+    fingerprint TEXT NOT NULL,
+    text TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_messages_chat_ts ON messages (chat, ts);
+CREATE INDEX IF NOT EXISTS idx_messages_fingerprint ON messages (fingerprint, ts);
+"""
+
+_INSERT = "INSERT INTO messages (chat, ts, role, fingerprint, text) VALUES (?, ?, ?, ?, ?)"
+
+_STOP = object()  # 写入线程的退出标记
+
+
+class StoredMessage(NamedTuple):
+    ts: float
+    role: str
+    text: str
+
+
+class ConversationStore:
+    """
+    SQLite会话存储（WAL模式）
+    流水线各线程调用append()只把消息放进内存队列，不等待磁盘；唯一的写入线程把队列中积累的消息
+    合并为一个事务写入（队列越满，每批越大）。读取使用各线程自己的连接，WAL模式下不会被写入阻塞。
+    查询只能看到已写入的消息，还在队列中的消息由内存中的去重表和对话历史负责
+    """
+
+    def __init__(self, path, max_batch=512, max_pending=10000, retention_days=30, clock=time.time):
+        """
+        :param path: 数据库文件路径，所在目录不存在时自动创建
+        :param max_batch: 每个事务最多写入的消息数
+        :param max_pending: 队列容量，写入跟不上时丢弃新消息而不阻塞调用方
+        :param retention_days: 保留的天数，写入线程每小时删除一次更早的消息；0为不删除
+        """
+        self.path = path
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self.max_batch = max(1, int(max_batch))
+        self.retention_days = float(retention_days or 0)
+        self.clock = clock
+        self.queue = queue.Queue(max(1, int(max_pending)))
+        self.closed = False
+        self.stats = {'queued': 0, 'written': 0, 'batches': 0, 'max_batch': 0, 'dropped': 0, 'errors': 0,
+                      'pruned': 0, 'write_seconds': 0.0}
+        self._local = threading.local()
+        self._readers = []
+        self._readers_lock = threading.Lock()
+
+        self._writer = self._connect()
+        self._writer.executescript(_SCHEMA)
+        mode = self._writer.execute("PRAGMA journal_mode=WAL").fetchone()[0]
+        if mode.lower() != 'wal':
+            print(f"⚠️ 会话存储无法使用WAL模式（当前 {mode}），读取可能被写入阻塞")
+        self.writer_thread = threading.Thread(target=self._writer_loop, name="conversation-writer", daemon=True)
+        self.writer_thread.start()
+
+    @classmethod
+    def from_config(cls, config):
+        """从配置字典（conversation_store节）创建，enabled为false时返回None"""
+        config = config or {}
+        if not config.get('enabled', True):
+            return None
+        return cls(config.get('path', os.path.join('cache', 'conversations.db')),
+                   max_batch=config.get('max_batch', 512),
+                   max_pending=config.get('max_pending', 10000),
+                   retention_days=config.get('retention_days', 30))
+
+    def _connect(self):
+        # 连接只在一个线程中使用，但允许close()从其他线程关闭
+        conn = sqlite3.connect(self.path, timeout=5.0, check_same_thread=False)
+        conn.execute("PRAGMA synchronous=NORMAL")  # WAL模式下NORMAL不会损坏数据库，只可能丢失最后的事务
+        return conn
+
+    # ---------- 写入 ----------
+
+    def append(self, chat, role, text, ts=None):
+        """
+        记录一条消息（不等待写入），队列已满或存储已关闭时返回False
+        :param role: ROLE_USER或ROLE_ASSISTANT
+        """
+        if self.closed or not text:
+            return False
+        try:
+            self.queue.put_nowait((chat, ts if ts is not None else self.clock(), role, text))
+        except queue.Full:
+            self.stats['dropped'] += 1
+            return False
+        self.stats['queued'] += 1
+        return True
+
+    def flush(self, timeout=5.0):
+        """等待调用之前放入队列的消息全部写入，超时返回False"""
+        if self.closed:
+            return True
+        done = threading.Event()
+        try:
+            self.queue.put(done, timeout=timeout)
+        except queue.Full:
+            return False
+        return done.wait(timeout)
+
+    def _writer_loop(self):
+        next_prune = 0.0
+        while True:
+            item = self.queue.get()
+            batch, markers, stop = [], [], False
+            # 取出队列中已有的全部消息（最多max_batch条），合并为一个事务
+            while True:
+                if item is _STOP:
+                    stop = True
+                elif isinstance(item, threading.Event):
+                    markers.append(item)
+                else:
+                    batch.append(item)
+                if stop or len(batch) >= self.max_batch:
+                    break
+                try:
+                    item = self.queue.get_nowait()
+                except queue.Empty:
+                    break
+            if batch:
+                self._write(batch)
+            for marker in markers:
+                marker.set()
+            if self.retention_days and time.monotonic() >= next_prune:
+                self._prune()
+                next_prune = time.monotonic() + 3600
+            if stop:
+                break
+
+    def _write(self, batch):
+        start = time.perf_counter()
+        rows = [(chat, ts, role, text_fingerprint(text), text) for chat, ts, role, text in batch]
+        try:
+            with self._writer:
+                self._writer.executemany(_INSERT, rows)
+        except sqlite3.Error as e:
+            self.stats['errors'] += 1
+            print(f"❌ 会话存储写入失败，丢弃 {len(rows)} 条消息: {e}")
+            return
+        self.stats['written'] += len(rows)
+        self.stats['batches'] += 1
+        self.stats['max_batch'] = max(self.stats['max_batch'], len(rows))
+        self.stats['write_seconds'] += time.perf_counter() - start
+
+    def _prune(self):
+        try:
+            with self._writer:
+                cursor = self._writer.execute("DELETE FROM messages WHERE ts < ?",
+                                              (self.clock() - self.retention_days * 86400,))
+            self.stats['pruned'] += cursor.rowcount
+        except sqlite3.Error as e:
+            print(f"⚠️ 会话存储清理旧消息失败: {e}")
+
+    # ---------- 查询 ----------
+
+    def _reader(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._connect()
+            conn.execute("PRAGMA query_only=ON")
+            self._local.conn = conn
+            with self._readers_lock:
+                self._readers.append(conn)
+        return conn
+
+    def recent(self, chat, limit=20, since=None):
+        """某个聊天最近的消息，按时间从旧到新排列"""
+        sql = "SELECT ts, role, text FROM messages WHERE chat = ?"
+        params = [chat]
+        if since is not None:
+            sql += " AND ts >= ?"
+            params.append(since)
+        sql += " ORDER BY ts DESC, id DESC LIMIT ?"
+        params.append(int(limit))
+        rows = self._reader().execute(sql, params).fetchall()
+        return [StoredMessage(*row) for row in reversed(rows)]
+
+    def lookup(self, text, chat=None, since=None):
+        """
+        按指纹查询文本是否出现过
+        :return: 最近一次出现时的角色，未出现返回None
+        """
+        sql = "SELECT role FROM messages WHERE fingerprint = ?"
+        params = [text_fingerprint(text)]
+        if chat is not None:
+            sql += " AND chat = ?"
+            params.append(chat)
+        if since is not None:
+            sql += " AND ts >= ?"
+            params.append(since)
+        row = self._reader().execute(sql + " ORDER BY ts DESC LIMIT 1", params).fetchone()
+        return row[0] if row else None
+
+    def messages_after(self, last_id, limit=256):
+        """编号大于last_id的消息（按编号递增），用于增量处理新消息，返回 (编号, 聊天, 时间, 角色, 文本) 列表"""
+        return self._reader().execute(
+            "SELECT id, chat, ts, role, text FROM messages WHERE id > ? ORDER BY id LIMIT ?",
+            (int(last_id), int(limit))).fetchall()
+
+    def count(self, chat=None):
+        if chat is None:
+            return self._reader().execute("SELECT COUNT(*) FROM messages").fetchone()[0]
+        return self._reader().execute("SELECT COUNT(*) FROM messages WHERE chat = ?", (chat,)).fetchone()[0]
+
+    # ---------- 生命周期 ----------
+
+    def close(self, timeout=5.0):
+        """写入队列中剩余的消息后关闭所有连接"""
+        if self.closed:
+            return
+        self.closed = True
+        self.queue.put(_STOP)
+        self.writer_thread.join(timeout)
+        if self.writer_thread.is_alive():
+            print(f"⚠️ 会话存储未能在 {timeout} 秒内写完，剩余约 {self.queue.qsize()} 条消息未保存")
+            return
+        self._writer.close()
+        with self._readers_lock:
+            for conn in self._readers:
+                conn.close()
+            self._readers.clear()
+
+    def get_stats(self):
+        stats = dict(self.stats)
+        stats['pending'] = self.queue.qsize()
+        stats['avg_batch'] = stats['written'] / stats['batches'] if stats['batches'] else 0.0
+        return stats
@@ -0,0 +1,114 @@
+# modules/dedup_store.py
+import re
+import time
+import hashlib
+import threading
+import unicodedata
+from collections import deque
+
+# 指纹类型：收到的消息和我们自己发出的回复
+KIND_INBOUND = 'inbound'
+KIND_REPLY = 'reply'
+
+_WHITESPACE = re.compile(r'\s+')
+
+
+def normalize_text(text):
+    """归一化文本：全半角统一、去除首尾空白、合并连续空白、忽略大小写"""
+    text = unicodedata.normalize('NFKC', text or '')
+    return _WHITESPACE.sub(' ', text).strip().casefold()
+
+
+def text_fingerprint(text):
+    """计算归一化文本的指纹"""
+    return hashlib.blake2b(normalize_text(text).encode('utf-8'), digest_size=8).hexdigest()
+
+
+class DedupStore:
+    """
+    有界的文本指纹去重表
+    哈希表负责O(1)查询，环形缓冲区记录插入顺序，超出容量时淘汰最旧的指纹；
+    每个指纹在TTL秒后过期。同时记录收到的消息和自己发出的回复，
+    避免重复生成回复或把自己的回复当成新消息
+    """
+
+    def __init__(self, max_entries=256, ttl=300.0, clock=time.monotonic):
+        """
+        :param max_entries: 最多保留的指纹数量
+        :param ttl: 指纹的有效期（秒）
+        """
+        self.max_entries = max(1, int(max_entries))
+        self.ttl = float(ttl)
+        self.clock = clock
+        self.lock = threading.Lock()
+        self._entries = {}     # 指纹 -> (记录时间, 类型)
+        self._ring = deque()   # (指纹, 记录时间)，按插入顺序
+        self.hits = {KIND_INBOUND: 0, KIND_REPLY: 0}
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _expire(self, now):
+        """从环形缓冲区头部淘汰过期或超出容量的指纹"""
+        while self._ring and (len(self._ring) > self.max_entries or now - self._ring[0][1] > self.ttl):
+            fingerprint, recorded_at = self._ring.popleft()
+            entry = self._entries.get(fingerprint)
+            # 同一指纹被重新记录过时，环中较早的那一项已经失效，不能删除新记录
+            if entry is not None and entry[0] == recorded_at:
+                del self._entries[fingerprint]
+                self.evictions += 1
+
+    def check(self, text):
+        """
+        查询文本是否已记录
+        :return: 命中时返回指纹类型（KIND_INBOUND/KIND_REPLY），未命中返回None
+        """
+        fingerprint = text_fingerprint(text)
+        with self.lock:
+            now = self.clock()
+            self._expire(now)
+            entry = self._entries.get(fingerprint)
+            if entry is None or now - entry[0] > self.ttl:
+                self.misses += 1
+                return None
+            kind = entry[1]
+            self.hits[kind] = self.hits.get(kind, 0) + 1
+            return kind
+
+    def add(self, text, kind=KIND_INBOUND):
+        """记录文本指纹，已存在时刷新时间和类型"""
+        if not normalize_text(text):
+            return
+        fingerprint = text_fingerprint(text)
+        with self.lock:
+            now = self.clock()
+            self._entries[fingerprint] = (now, kind)
+            self._ring.append((fingerprint, now))
+            self._expire(now)
+
+    def discard(self, text):
+        """删除文本指纹（环形缓冲区中的旧项会在淘汰时被忽略），用于处理失败后允许重试"""
+        fingerprint = text_fingerprint(text)
+        with self.lock:
+            self._entries.pop(fingerprint, None)
+
+    def clear(self):
+        with self.lock:
+            self._entries.clear()
+            self._ring.clear()
+
+    def get_stats(self):
+        """获取命中统计"""
+        with self.lock:
+            hits = dict(self.hits)
+            total = sum(hits.values()) + self.misses
+            return {
+                'entries': len(self._entries),
+                'hits_inbound': hits.get(KIND_INBOUND, 0),
+                'hits_reply': hits.get(KIND_REPLY, 0),
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': (sum(hits.values()) / total) if total else 0.0,
+            }
@@ -0,0 +1,186 @@
+# modules/frame_store.py
+import time
+import threading
+from collections import OrderedDict
+from typing import NamedTuple
+
+import cv2
+import numpy as np
+
+
+class DirtyRegion(NamedTuple):
+    """一块发生变化的区域及其全分辨率图像"""
+    region_id: int
+    rect: tuple        # 帧内坐标 (x, y, 宽, 高)，全分辨率
+    image: np.ndarray  # 该区域的全分辨率BGR图像（独立副本）
+    captured_at: float
+
+
+class FrameChange(NamedTuple):
+    """一次变化检测的结果"""
+    first: bool            # 第一帧（没有可比较的上一帧）
+    ratio: float           # 变化像素占比（在缩小后的灰度图上计算）
+    diff: np.ndarray       # 缩小后的灰度差异图，first为True时为None
+    rects: list            # 变化区域，全分辨率坐标
+
+
+class FrameStore:
+    """
+    变化检测用的帧存储
+    上一帧只以缩小后的灰度图保存（第level层金字塔，每层长宽各减半），1080p的BGR帧约6MB，
+    level=2时只需约130KB；开启keep_dirty_regions时，发生变化的区域另外保留全分辨率的副本，供后续处理（如文字识别）取用，
+    这些副本的总大小不超过budget_bytes，超出时先淘汰最旧的区域
+    """
+
+    def __init__(self, level=1, budget_bytes=16 * 1024 * 1024, pixel_threshold=0, keep_dirty_regions=False,
+                 max_regions=32, min_region_area=16):
+        """
+        :param level: 金字塔层数，0为不缩小
+        :param budget_bytes: 全分辨率区域副本的内存上限（字节）
+        :param pixel_threshold: 灰度差超过该值才计为变化，0表示任何差异都算
+        :param keep_dirty_regions: 是否保留变化区域的全分辨率副本（默认不保留，有取用副本的处理时再开启）
+        :param max_regions: 单帧最多提取的变化区域数，更多时合并为一个外接矩形
+        :param min_region_area: 缩小后面积小于该值的变化区域视为噪声，不保留副本
+        """
+        self.level = max(0, int(level))
+        self.scale = 1 << self.level
+        self.budget_bytes = int(budget_bytes)
+        self.pixel_threshold = pixel_threshold
+        self.keep_dirty_regions = keep_dirty_regions
+        self.max_regions = max_regions
+        self.min_region_area = min_region_area
+        self.lock = threading.Lock()
+        self.previous = None   # 上一帧缩小后的灰度图
+        self.frame_shape = None
+        self._regions = OrderedDict()  # region_id -> DirtyRegion，按加入顺序，最旧的在前
+        self._region_bytes = 0
+        self._next_id = 1
+        self.stats = {'frames': 0, 'regions': 0, 'evicted': 0, 'rejected': 0, 'peak_bytes': 0}
+
+    @classmethod
+    def from_config(cls, config):
+        """从配置字典（frame_store节）创建，预算以MB为单位"""
+        config = config or {}
+        return cls(level=config.get('level', 1),
+                   budget_bytes=int(float(config.get('budget_mb', 16)) * 1024 * 1024),
+                   pixel_threshold=config.get('pixel_threshold', 0),
+                   keep_dirty_regions=config.get('keep_dirty_regions', False))
+
+    # ---------- 变化检测 ----------
+
+    def downscale(self, frame):
+        """BGR（或灰度）帧转为缩小后的灰度图"""
+        gray = frame if frame.ndim == 2 else cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        if self.level == 0:
+            return gray.copy() if gray is frame else gray
+        height, width = gray.shape
+        size = (max(1, width // self.scale), max(1, height // self.scale))
+        return cv2.resize(gray, size, interpolation=cv2.INTER_AREA)
+
+    def update(self, frame):
+        """
+        与上一帧比较并把当前帧记为新的上一帧；变化区域的全分辨率副本放入区域缓存
+        :param frame: 全分辨率BGR帧，调用返回后即可复用或释放
+        :return: FrameChange
+        """
+        small = self.downscale(frame)
+        with self.lock:
+            previous = self.previous
+            self.previous = small
+            resized = self.frame_shape != frame.shape[:2]
+            self.frame_shape = frame.shape[:2]
+            self.stats['frames'] += 1
+        if previous is None or resized or previous.shape != small.shape:
+            return FrameChange(True, 1.0, None, [])
+
+        diff = cv2.absdiff(previous, small)
+        if self.pixel_threshold > 0:
+            _, mask = cv2.threshold(diff, self.pixel_threshold, 255, cv2.THRESH_BINARY)
+        else:
+            mask = diff
+        changed = cv2.countNonZero(mask)
+        ratio = changed / float(small.shape[0] * small.shape[1])
+        rects = self._dirty_rects(mask, frame.shape) if changed else []
+        if rects and self.keep_dirty_regions:
+            now = time.time()
+            for rect in rects:
+                x, y, w, h = rect
+                self._add_region(rect, frame[y:y + h, x:x + w].copy(), now)
+        return FrameChange(False, ratio, diff, rects)
+
+    def _dirty_rects(self, mask, frame_shape):
+        """把缩小后的变化掩码分成若干外接矩形，换算到全分辨率坐标（向外取整，不漏掉边缘像素）"""
+        binary = (mask > 0).astype(np.uint8)
+        # 膨胀一格，把相邻的零散变化（如一行文字中的各个字）合成一块
+        binary = cv2.dilate(binary, np.ones((3, 3), np.uint8))
+        count, _, boxes, _ = cv2.connectedComponentsWithStats(binary, connectivity=8)
+        boxes = [tuple(int(v) for v in box[:4]) for box in boxes[1:] if box[4] >= self.min_region_area]
+        if len(boxes) > self.max_regions:
+            xs = [b[0] for b in boxes] + [b[0] + b[2] for b in boxes]
+            ys = [b[1] for b in boxes] + [b[1] + b[3] for b in boxes]
+            boxes = [(min(xs), min(ys), max(xs) - min(xs), max(ys) - min(ys))]
+        height, width = frame_shape[:2]
+        rects = []
+        for x, y, w, h in boxes:
+            left, top = x * self.scale, y * self.scale
+            right, bottom = min(width, (x + w) * self.scale), min(height, (y + h) * self.scale)
+            if right > left and bottom > top:
+                rects.append((left, top, right - left, bottom - top))
+        return rects
+
+    # ---------- 全分辨率区域缓存 ----------
+
+    def _add_region(self, rect, image, captured_at):
+        nbytes = image.nbytes
+        with self.lock:
+            if nbytes > self.budget_bytes:
+                self.stats['rejected'] += 1  # 单个区域就超过预算，不保留
+                return
+            while self._regions and self._region_bytes + nbytes > self.budget_bytes:
+                _, evicted = self._regions.popitem(last=False)
+                self._region_bytes -= evicted.image.nbytes
+                self.stats['evicted'] += 1
+            region = DirtyRegion(self._next_id, rect, image, captured_at)
+            self._next_id += 1
+            self._regions[region.region_id] = region
+            self._region_bytes += nbytes
+            self.stats['regions'] += 1
+            self.stats['peak_bytes'] = max(self.stats['peak_bytes'], self._region_bytes)
+
+    def regions(self):
+        """当前保留的变化区域（从旧到新），不移出缓存"""
+        with self.lock:
+            return list(self._regions.values())
+
+    def take_regions(self):
+        """取出并清空保留的变化区域，后续处理完成后副本即可释放"""
+        with self.lock:
+            regions = list(self._regions.values())
+            self._regions.clear()
+            self._region_bytes = 0
+        return regions
+
+    @property
+    def region_bytes(self):
+        return self._region_bytes
+
+    def memory_bytes(self):
+        """当前占用的图像内存：缩小后的上一帧加上全分辨率区域副本"""
+        with self.lock:
+            previous = self.previous.nbytes if self.previous is not None else 0
+            return previous + self._region_bytes
+
+    def reset(self):
+        """清除上一帧和所有区域副本，下一帧视为第一帧"""
+        with self.lock:
+            self.previous = None
+            self.frame_shape = None
+            self._regions.clear()
+            self._region_bytes = 0
+
+    def get_stats(self):
+        with self.lock:
+            stats = dict(self.stats)
+            stats.update({'level': self.level, 'retained_regions': len(self._regions),
+                          'region_bytes': self._region_bytes, 'budget_bytes': self.budget_bytes})
+        return stats
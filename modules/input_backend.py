@@ -0,0 +1,235 @@
+# modules/input_backend.py
+import os
+import sys
+from contextlib import contextmanager
+
+
+class InputFailSafeException(Exception):
+    """鼠标位于屏幕角落时触发的安全中止，与pyautogui的FAILSAFE行为一致"""
+
+
+class InputBackend:
+    """
+    输入注入后端的基类
+    所有坐标均为屏幕绝对坐标；batch() 内的事件会合并为一次刷新发送
+    """
+
+    name = 'base'
+
+    def position(self):
+        raise NotImplementedError
+
+    def screen_size(self):
+        raise NotImplementedError
+
+    def move_to(self, x, y):
+        raise NotImplementedError
+
+    def click(self, x=None, y=None, clicks=1, button='left'):
+        raise NotImplementedError
+
+    def hotkey(self, *keys):
+        raise NotImplementedError
+
+    def press(self, key):
+        raise NotImplementedError
+
+    @contextmanager
+    def batch(self):
+        """合并一组事件，默认实现逐个发送"""
+        yield self
+
+    def focus_at_pointer(self):
+        """
+        键盘焦点是否位于鼠标所在的顶层窗口中（用于点击输入框后确认焦点）
+        :return: True/False，无法判断时返回None
+        """
+        return None
+
+    def fail_safe_check(self):
+        """
+        鼠标位于屏幕四角时抛出InputFailSafeException
+        每个周期检查一次，代替pyautogui在每次调用时都做的检查
+        """
+        x, y = self.position()
+        width, height = self.screen_size()
+        if (x, y) in ((0, 0), (0, height - 1), (width - 1, 0), (width - 1, height - 1)):
+            raise InputFailSafeException(f"鼠标位于屏幕角落 ({x}, {y})，已触发安全中止")
+
+    def close(self):
+        pass
+
+
+class PyAutoGUIBackend(InputBackend):
+    """基于pyautogui的后端，所有调用都跳过全局PAUSE"""
+
+    name = 'pyautogui'
+
+    def __init__(self):
+        import pyautogui
+        self.pyautogui = pyautogui
+
+    def position(self):
+        x, y = self.pyautogui.position()
+        return int(x), int(y)
+
+    def screen_size(self):
+        width, height = self.pyautogui.size()
+        return int(width), int(height)
+
+    def fail_safe_check(self):
+        # 遵循pyautogui.FAILSAFE开关
+        if self.pyautogui.FAILSAFE:
+            super().fail_safe_check()
+
+    def move_to(self, x, y):
+        self.pyautogui.moveTo(x, y, _pause=False)
+
+    def click(self, x=None, y=None, clicks=1, button='left'):
+        self.pyautogui.click(x, y, clicks=clicks, interval=0.0, button=button, _pause=False)
+
+    def hotkey(self, *keys):
+        self.pyautogui.hotkey(*keys, _pause=False)
+
+    def press(self, key):
+        self.pyautogui.press(key, _pause=False)
+
+
+# pyautogui风格的按键名到X11 keysym名的映射，其余按键直接交给XK.string_to_keysym
+_X11_KEY_NAMES = {
+    'ctrl': 'Control_L', 'ctrlleft': 'Control_L', 'ctrlright': 'Control_R',
+    'shift': 'Shift_L', 'shiftleft': 'Shift_L', 'shiftright': 'Shift_R',
+    'alt': 'Alt_L', 'altleft': 'Alt_L', 'altright': 'Alt_R',
+    'win': 'Super_L', 'winleft': 'Super_L', 'command': 'Super_L',
+    'enter': 'Return', 'return': 'Return', 'backspace': 'BackSpace',
+    'tab': 'Tab', 'esc': 'Escape', 'escape': 'Escape', 'space': 'space',
+    'delete': 'Delete', 'del': 'Delete', 'home': 'Home', 'end': 'End',
+    'up': 'Up', 'down': 'Down', 'left': 'Left', 'right': 'Right',
+    'pageup': 'Prior', 'pagedown': 'Next',
+}
+
+_X11_BUTTONS = {'left': 1, 'middle': 2, 'right': 3}
+
+
+class XTestBackend(InputBackend):
+    """
+    基于X11 XTest扩展的后端
+    保持一个持久的X连接直接注入事件；batch() 内的事件只在结束时刷新一次
+    """
+
+    name = 'xtest'
+
+    def __init__(self, display_name=None):
+        from Xlib import X, XK, display
+        from Xlib.ext import xtest
+        self.X = X
+        self.XK = XK
+        self.xtest = xtest
+        self.display = display.Display(display_name)
+        if not self.display.has_extension('XTEST'):
+            self.display.close()
+            raise RuntimeError("X服务器不支持XTEST扩展")
+        self.root = self.display.screen().root
+        self._keycodes = {}
+        self._batch_depth = 0
+
+    def _flush(self):
+        """批处理之外每个操作结束后立即刷新"""
+        if self._batch_depth == 0:
+            self.display.sync()
+
+    def _keycode(self, key):
+        keycode = self._keycodes.get(key)
+        if keycode is None:
+            keysym = self.XK.string_to_keysym(_X11_KEY_NAMES.get(key.lower(), key))
+            if keysym == 0 and len(key) == 1:
+                keysym = ord(key)
+            keycode = self.display.keysym_to_keycode(keysym)
+            if not keycode:
+                raise ValueError(f"无法映射按键: {key}")
+            self._keycodes[key] = keycode
+        return keycode
+
+    def position(self):
+        pointer = self.root.query_pointer()
+        return pointer.root_x, pointer.root_y
+
+    def screen_size(self):
+        screen = self.display.screen()
+        return screen.width_in_pixels, screen.height_in_pixels
+
+    def move_to(self, x, y):
+        self.xtest.fake_input(self.display, self.X.MotionNotify, x=int(x), y=int(y), root=self.root)
+        self._flush()
+
+    def click(self, x=None, y=None, clicks=1, button='left'):
+        if x is not None and y is not None:
+            self.xtest.fake_input(self.display, self.X.MotionNotify, x=int(x), y=int(y), root=self.root)
+        detail = _X11_BUTTONS[button]
+        for _ in range(clicks):
+            self.xtest.fake_input(self.display, self.X.ButtonPress, detail)
+            self.xtest.fake_input(self.display, self.X.ButtonRelease, detail)
+        self._flush()
+
+    def hotkey(self, *keys):
+        keycodes = [self._keycode(key) for key in keys]
+        for keycode in keycodes:
+            self.xtest.fake_input(self.display, self.X.KeyPress, keycode)
+        for keycode in reversed(keycodes):
+            self.xtest.fake_input(self.display, self.X.KeyRelease, keycode)
+        self._flush()
+
+    def press(self, key):
+        keycode = self._keycode(key)
+        self.xtest.fake_input(self.display, self.X.KeyPress, keycode)
+        self.xtest.fake_input(self.display, self.X.KeyRelease, keycode)
+        self._flush()
+
+    def focus_at_pointer(self):
+        X = self.X
+        focus = self.display.get_input_focus().focus
+        if focus == X.PointerRoot:
+            return True  # 焦点跟随鼠标
+        if focus == X.NONE:
+            return False
+        pointer_child = self.root.query_pointer().child
+        if pointer_child == X.NONE:
+            return None
+        # 焦点窗口可能是顶层窗口的子窗口，沿父窗口上溯到根窗口的直接子窗口再比较
+        window = focus
+        while True:
+            parent = window.query_tree().parent
+            if parent == X.NONE or parent == self.root:
+                break
+            window = parent
+        return window == pointer_child
+
+    @contextmanager
+    def batch(self):
+        self._batch_depth += 1
+        try:
+            yield self
+        finally:
+            self._batch_depth -= 1
+            self._flush()
+
+    def close(self):
+        self.display.close()
+
+
+def create_input_backend(name='auto'):
+    """
+    创建输入后端
+    :param name: 'auto'（Linux有X显示时优先XTest）、'xtest' 或 'pyautogui'
+    XTest不可用时回退到pyautogui
+    """
+    if name in ('auto', 'xtest') and sys.platform.startswith('linux') and os.environ.get('DISPLAY'):
+        try:
+            backend = XTestBackend()
+            print("⌨️ 输入后端: XTest")
+            return backend
+        except Exception as e:
+            print(f"⚠️ XTest输入后端不可用，回退到pyautogui: {e}")
+    elif name == 'xtest':
+        print("⚠️ 当前环境没有X11显示，XTest输入后端不可用，回退到pyautogui")
+    return PyAutoGUIBackend()
@@ -2,71 +2,177 @@
 import pyautogui
 import time
 import random
+from .input_backend import create_input_backend, InputFailSafeException
+from .clipboard_backend import create_clipboard_backend
+from .change_gate import PatchChangeGate
+from .cancellation import OperationCancelled, interruptible_sleep, wait_for_condition
 
 class KeyboardSimulator:
-    def __init__(self):
-        # 设置pyautogui的通用延迟
+    def __init__(self, delay_scale=1.0, input_backend=None, clipboard=None, delivery_config=None):
+        """
+        :param delivery_config: 发送确认和人性化节奏的配置（config中的delivery节）:
+            focus_timeout / clipboard_timeout / verify_timeout - 各确认条件的最长等待时间（秒）
+            verify_patch_size - 输入框周围用于确认粘贴和发送的区域边长（像素），0表示不做画面确认
+            verify_change_threshold - 变化像素占比超过该值才算输入框有变化，需高于光标闪烁造成的变化
+            pacing_budget - 每条消息人性化等待的总时长上限（秒，再乘以delay_scale）
+        """
+        delivery_config = delivery_config or {}
+        # 设置pyautogui的通用延迟（输入后端的调用会跳过该延迟）
         pyautogui.PAUSE = 0.1  # 操作之间的小延迟
-    
-    def send_message(self, message, input_coords):
-        """发送消息 - 使用更可靠的方法输入文字"""
+        # 输入注入后端：Linux下优先XTest，不可用时回退到pyautogui
+        self.input_backend = input_backend or create_input_backend()
+        # 剪贴板后端：与自动复制处理器共用同一个持久连接
+        self.clipboard = clipboard or create_clipboard_backend()
+        # 人性化延迟缩放系数，0表示跳过所有模拟等待（用于基准测试）
+        self.delay_scale = delay_scale
+
+        self.focus_timeout = float(delivery_config.get('focus_timeout', 1.0))
+        self.clipboard_timeout = float(delivery_config.get('clipboard_timeout', 0.5))
+        self.verify_timeout = float(delivery_config.get('verify_timeout', 1.0))
+        self.pacing_budget = float(delivery_config.get('pacing_budget', 2.0))
+        patch_size = int(delivery_config.get('verify_patch_size', 48))
+        # 输入框画面确认：粘贴后画面应改变，回车后输入框被清空，画面应回到粘贴前的样子
+        # 阈值高于变化闸门的默认值：48像素的区域中闪烁的光标约占2%，不能算作粘贴或发送成功
+        change_threshold = float(delivery_config.get('verify_change_threshold', 0.05))
+        self.input_gate = PatchChangeGate(patch_size=patch_size, change_threshold=change_threshold) \
+            if patch_size > 0 else None
+
+        self._cancel_event = None  # 本次发送的停止事件，设置后等待立即中断
+
+        self._pacing_left = 0.0  # 本条消息剩余的人性化等待预算（秒，未缩放）
+        self.stats = {
+            'sent': 0, 'verified': 0, 'paste_unverified': 0, 'send_unverified': 0,
+            'focus_failed': 0, 'clipboard_failed': 0, 'condition_wait': 0.0, 'pacing': 0.0,
+        }
+
+    def _pace(self, seconds):
+        """人性化停顿，从本条消息的预算中扣除，预算用完后不再等待"""
+        seconds = min(max(0.0, seconds), self._pacing_left)
+        self._pacing_left -= seconds
+        if seconds > 0 and self.delay_scale > 0:
+            if self._cancel_event is not None:
+                interruptible_sleep(self._cancel_event, seconds * self.delay_scale)
+            else:
+                time.sleep(seconds * self.delay_scale)
+            self.stats['pacing'] += seconds * self.delay_scale
+
+    def _wait_for(self, predicate, timeout):
+        """等待可观察的条件成立，记录等待耗时"""
+        start = time.perf_counter()
+        try:
+            return wait_for_condition(predicate, timeout, cancel_event=self._cancel_event)
+        finally:
+            self.stats['condition_wait'] += time.perf_counter() - start
+
+    def _capture_input_patch(self, x, y):
+        """截取输入框周围区域，画面确认关闭或截图失败时返回None"""
+        if self.input_gate is None:
+            return None
+        try:
+            return self.input_gate.capture_patch(x, y)
+        except Exception as e:
+            print(f"⚠️ 输入框截图失败，跳过画面确认: {e}")
+            return None
+
+    def _wait_for_input(self, x, y, baseline, changed=True):
+        """
+        等待输入框周围画面相对baseline发生变化（changed=True），或回到与baseline相同（changed=False）
+        没有基准画面时返回None（无法确认）
+        """
+        if baseline is None:
+            return None
+        self.input_gate.commit(baseline, (x, y))
+        return self._wait_for(
+            lambda: self.input_gate.has_changed(self.input_gate.capture_patch(x, y), (x, y)) == changed,
+            self.verify_timeout)
+
+    def send_message(self, message, input_coords, cancel_event=None):
+        """
+        发送消息 - 使用剪贴板粘贴的方式输入文字
+        每一步以可观察的条件确认，而不是固定休眠：点击后确认键盘焦点，粘贴前确认剪贴板内容，
+        粘贴后确认输入框画面发生变化，回车后确认输入框回到粘贴前的空白画面；人性化停顿总时长不超过pacing_budget
+        :param cancel_event: 停止事件，设置后停顿和确认等待立即中断，放弃发送
+        """
+        self._cancel_event = cancel_event
         try:
             # 检查输入参数
             if not message or not input_coords:
                 print("❌ 输入参数无效: 消息或坐标为空")
                 return False
-                
+
             if len(input_coords) != 2:
                 print("❌ 坐标参数格式错误，应为 (x, y)")
                 return False
-                
-            # 点击输入框
+
+            self._pacing_left = self.pacing_budget
+
+            # 点击输入框并确认焦点（无法判断焦点时直接继续）
             x, y = input_coords
-            pyautogui.click(x, y)
-            time.sleep(0.3)  # 等待焦点设置
-            
-            # 清空输入框（可选）
-            pyautogui.hotkey('ctrl', 'a')
-            pyautogui.press('backspace')
-            time.sleep(0.1)
-            
-            # 计算打字速度 - 基于消息长度
+            self.input_backend.fail_safe_check()
+            self.input_backend.click(x, y)
+            if not self._wait_for(lambda: self.input_backend.focus_at_pointer() is not False, self.focus_timeout):
+                self.stats['focus_failed'] += 1
+                print(f"❌ 点击输入框 ({x}, {y}) 后键盘焦点不在该窗口，取消发送")
+                return False
+            self._pace(random.uniform(0.1, 0.3))
+
+            # 清空输入框（可选）- 全选和删除合并为一次注入
+            with self.input_backend.batch():
+                self.input_backend.hotkey('ctrl', 'a')
+                self.input_backend.press('backspace')
+
+            # 复制消息到剪贴板，并确认剪贴板内容确实是该消息
+            self.clipboard.copy(message)
+            if not self._wait_for(lambda: self.clipboard.holds(message), self.clipboard_timeout):
+                self.stats['clipboard_failed'] += 1
+                print("❌ 剪贴板内容未能设置为待发送的消息，取消发送")
+                return False
+
+            # 粘贴消息（使用Ctrl+V），等待输入框画面变化
+            baseline = self._capture_input_patch(x, y)  # 清空后的输入框
+            self.input_backend.hotkey('ctrl', 'v')
+            pasted = self._wait_for_input(x, y, baseline)
+            if pasted is False:
+                self.stats['paste_unverified'] += 1
+                print(f"⚠️ {self.verify_timeout:.1f}秒内未观察到输入框变化，粘贴可能未生效")
+
+            # 模拟打字时间 - 基于消息长度，但受本条消息的人性化预算限制
             message_length = len(message)
-            
-            # 根据消息长度调整打字速度
             if message_length < 10:  # 短消息
                 delay = random.uniform(0.05, 0.1)  # 0.05-0.1秒/字符
             elif message_length < 50:  # 中等消息
                 delay = random.uniform(0.08, 0.15)  # 0.08-0.15秒/字符
             else:  # 长消息
                 delay = random.uniform(0.1, 0.25)  # 0.1-0.25秒/字符
-            
-            # 使用pyperclip复制粘贴的方式（更可靠）
-            import pyperclip
-            pyperclip.copy(message)  # 复制消息到剪贴板
-            
-            # 粘贴消息（使用Ctrl+V）
-            time.sleep(0.1)
-            pyautogui.hotkey('ctrl', 'v')
-            time.sleep(0.2)  # 等待粘贴完成
-            
-            # 检查是否成功粘贴（可选：添加延时以模拟打字）
-            if message_length > 0:
-                # 根据消息长度添加相应的延时
-                total_delay = message_length * delay
-                time.sleep(total_delay)
-                
-                # 发送消息（回车键）
-                pyautogui.press('enter')
-                print(f"消息已发送，长度: {message_length} 字符")
-                return True
+            self._pace(message_length * delay)
+
+            # 发送消息（回车键），等待输入框被清空，即画面回到粘贴前的样子
+            # 粘贴未被确认时无法区分“已清空”和“从未粘贴上”，不做确认
+            self.input_backend.press('enter')
+            self.stats['sent'] += 1
+            sent = self._wait_for_input(x, y, baseline if pasted else None, changed=False)
+            if sent:
+                self.stats['verified'] += 1
+                print(f"消息已发送并确认，长度: {message_length} 字符")
+            elif sent is False:
+                self.stats['send_unverified'] += 1
+                print(f"⚠️ 消息已发送但未观察到输入框被清空，长度: {message_length} 字符")
             else:
-                print("消息为空")
-                return False
-                
-        except pyautogui.FailSafeException:
+                print(f"消息已发送，长度: {message_length} 字符")
+            return True
+
+        except OperationCancelled:
+            print("⏹️ 发送已停止")
+            return False
+        except (pyautogui.FailSafeException, InputFailSafeException):
             print("❌ 鼠标移动到屏幕角落触发了PyAutoGUI的安全机制")
             return False
         except Exception as e:
             print(f"发送消息失败: {e}")
-            return False
\ No newline at end of file
+            return False
+        finally:
+            self._cancel_event = None
+
+    def get_stats(self):
+        """发送确认和等待时间的统计（等待时间单位为秒）"""
+        return dict(self.stats)
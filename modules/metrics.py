@@ -0,0 +1,139 @@
+# modules/metrics.py
+import time
+import threading
+from collections import deque
+
+from .tracing import DEFAULT_BUCKETS
+
+
+def ollama_generation_stats(result):
+    """
+    从Ollama非流式响应中提取生成统计（Ollama返回的耗时单位为纳秒）
+    非流式请求无法直接观察首个token的到达时间，以模型加载加上提示词处理的耗时作为首token时间
+    :return: {'tokens', 'tokens_per_s', 'ttft_s'}，响应中没有统计字段时返回空字典
+    """
+    eval_count = result.get('eval_count')
+    eval_duration = result.get('eval_duration')
+    if not eval_count or not eval_duration:
+        return {}
+    return {
+        'tokens': int(eval_count),
+        'tokens_per_s': eval_count / (eval_duration / 1e9),
+        'ttft_s': (result.get('load_duration', 0) + result.get('prompt_eval_duration', 0)) / 1e9,
+    }
+
+
+def _percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(pct / 100.0 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+class MetricsAggregator:
+    """
+    进程内的指标聚合器
+    作为追踪器的监听器接收每个span，按(追踪类型, 阶段)保存最近的样本（环形缓冲区）；
+    记录只做一次追加，聚合计算在读取方（如GUI的定时器）调用summary()时进行，不占用流水线线程的时间
+    """
+
+    def __init__(self, window=300.0, max_samples=2048, buckets=DEFAULT_BUCKETS):
+        """
+        :param window: 统计的时间窗口（秒），更早的样本不计入
+        :param max_samples: 每个阶段最多保留的样本数
+        """
+        self.window = window
+        self.max_samples = max_samples
+        self.buckets = tuple(buckets)
+        self.lock = threading.Lock()
+        self._stages = {}  # (追踪类型, 阶段) -> deque[(时间, 耗时, 是否出错)]
+        self._outcomes = {}  # (追踪类型, 结果) -> deque[时间]
+        self._generations = deque(maxlen=max_samples)  # (时间, token数, 每秒token数, 首token时间)
+        self.sources = {}  # 名称 -> 返回当前状态字典的函数（如队列深度），在summary()时调用
+
+    def on_span(self, kind, name, duration, status, attrs):
+        """追踪器监听器：记录一个已结束的span"""
+        now = time.monotonic()
+        with self.lock:
+            samples = self._stages.get((kind, name))
+            if samples is None:
+                samples = self._stages[(kind, name)] = deque(maxlen=self.max_samples)
+            samples.append((now, duration, status == 'error'))
+            if name == 'total' and attrs.get('outcome'):
+                key = (kind, attrs['outcome'])
+                outcomes = self._outcomes.get(key)
+                if outcomes is None:
+                    outcomes = self._outcomes[key] = deque(maxlen=self.max_samples)
+                outcomes.append(now)
+            if name == 'llm' and attrs.get('tokens'):
+                self._generations.append((now, attrs['tokens'], attrs['tokens_per_s'], attrs['ttft_s']))
+
+    def add_source(self, name, source):
+        """注册一个状态来源，summary()时调用并原样放入结果"""
+        self.sources[name] = source
+
+    def attach(self, tracer):
+        """挂接到追踪器，之后该追踪器记录的每个span都会交给本聚合器"""
+        tracer.add_listener(self.on_span)
+        return self
+
+    def summary(self, now=None):
+        """
+        聚合时间窗口内的样本
+        :return: {'window', 'stages', 'outcomes', 'llm', 'sources'}
+            stages: {(追踪类型, 阶段): {count, rate, errors, p50, p95, max, histogram}}，耗时单位为秒，
+            histogram与buckets一一对应，最后多一个超出最大桶的计数
+        """
+        now = time.monotonic() if now is None else now
+        since = now - self.window
+        with self.lock:
+            stages = {key: list(samples) for key, samples in self._stages.items()}
+            outcomes = {key: list(times) for key, times in self._outcomes.items()}
+            generations = list(self._generations)
+
+        result = {'window': self.window, 'stages': {}, 'outcomes': {}, 'llm': None, 'sources': {}}
+        for key, samples in stages.items():
+            recent = [(duration, error) for ts, duration, error in samples if ts >= since]
+            if not recent:
+                continue
+            durations = sorted(duration for duration, _ in recent)
+            histogram = [0] * (len(self.buckets) + 1)
+            for duration in durations:
+                for i, upper in enumerate(self.buckets):
+                    if duration <= upper:
+                        histogram[i] += 1
+                        break
+                else:
+                    histogram[-1] += 1
+            result['stages'][key] = {
+                'count': len(durations),
+                'rate': len(durations) / self.window,
+                'errors': sum(1 for _, error in recent if error),
+                'p50': _percentile(durations, 50),
+                'p95': _percentile(durations, 95),
+                'max': durations[-1],
+                'histogram': histogram,
+            }
+        for key, times in outcomes.items():
+            count = sum(1 for ts in times if ts >= since)
+            if count:
+                result['outcomes'][key] = count
+
+        recent = [g for g in generations if g[0] >= since]
+        if recent:
+            ttfts = sorted(g[3] for g in recent)
+            result['llm'] = {
+                'count': len(recent),
+                'tokens': sum(g[1] for g in recent),
+                'tokens_per_s': sum(g[2] for g in recent) / len(recent),
+                'last_tokens_per_s': recent[-1][2],
+                'ttft_p50': _percentile(ttfts, 50),
+                'ttft_p95': _percentile(ttfts, 95),
+            }
+
+        for name, source in list(self.sources.items()):
+            try:
+                result['sources'][name] = source()
+            except Exception as e:
+                result['sources'][name] = {'error': str(e)}
+        return result
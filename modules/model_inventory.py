@@ -0,0 +1,198 @@
+# modules/model_inventory.py
+import os
+import json
+import time
+import hashlib
+import threading
+from typing import NamedTuple, Optional
+
+from .config_loader import atomic_write_json
+
+CACHE_VERSION = 1
+
+
+class ModelInfo(NamedTuple):
+    """一个本地模型的基本信息；未知的字段为None"""
+    name: str
+    size: int                      # 模型文件大小（字节）
+    digest: str
+    modified_at: str
+    family: Optional[str]
+    parameter_size: Optional[str]  # 如 "8.2B"
+    quantization: Optional[str]    # 如 "Q4_K_M"
+    context_length: Optional[int]  # 来自 /api/show 的 <架构>.context_length
+
+    def describe(self):
+        """简短说明，如 "8.2B · Q4_K_M · 上下文40960 · 5.2GB" """
+        parts = [part for part in (self.parameter_size, self.quantization) if part]
+        if self.context_length:
+            parts.append(f"上下文{self.context_length}")
+        if self.size:
+            parts.append(f"{self.size / 1024 ** 3:.1f}GB")
+        return ' · '.join(parts)
+
+
+def ollama_base_url(url):
+    """从生成接口地址（如 http://localhost:11434/api/generate）得到服务根地址"""
+    url = (url or 'http://localhost:11434').rstrip('/')
+    if '/api/' in url:
+        url = url[:url.index('/api/')]
+    return url
+
+
+def tags_fingerprint(models):
+    """
+    /api/tags 返回的模型列表的指纹，作用相当于ETag：
+    只要名称、摘要和修改时间都没有变化，就不需要重新获取各模型的 /api/show
+    """
+    key = sorted((m.get('name', ''), m.get('digest', ''), m.get('modified_at', '')) for m in models)
+    return hashlib.sha1(json.dumps(key).encode('utf-8')).hexdigest()
+
+
+def _context_length(show):
+    """从 /api/show 的model_info中找出上下文长度，键名以架构为前缀，如 qwen3.context_length"""
+    for key, value in (show.get('model_info') or {}).items():
+        if key.endswith('.context_length'):
+            try:
+                return int(value)
+            except (TypeError, ValueError):
+                return None
+    return None
+
+
+class ModelInventory:
+    """
+    本地模型清单
+    缓存 /api/tags 和各模型 /api/show 的结果到磁盘：启动时直接读取缓存即可显示模型列表，
+    超过ttl后在后台刷新；列表指纹不变且所有模型都已取得上下文长度时不再请求 /api/show，
+    摘要不变的模型沿用缓存的详情
+    """
+
+    def __init__(self, host='http://localhost:11434', cache_path=os.path.join('cache', 'model_inventory.json'),
+                 ttl=600.0, timeout=5.0):
+        """
+        :param host: Ollama服务根地址
+        :param ttl: 缓存有效期（秒），过期后refresh_if_stale()才会请求服务
+        :param timeout: 每个HTTP请求的超时（秒）
+        """
+        self.host = ollama_base_url(host)
+        self.cache_path = cache_path
+        self.ttl = ttl
+        self.timeout = timeout
+        self.lock = threading.Lock()
+        self.stats = {'tags_requests': 0, 'show_requests': 0, 'unchanged': 0, 'errors': 0}
+        self._cache = self._load_cache()
+
+    def _load_cache(self):
+        try:
+            with open(self.cache_path, 'r', encoding='utf-8') as f:
+                cache = json.load(f)
+        except FileNotFoundError:
+            cache = None
+        except (OSError, ValueError) as e:
+            print(f"⚠️ 模型清单缓存无法读取，将重新获取: {e}")
+            cache = None
+        if not cache or cache.get('version') != CACHE_VERSION or cache.get('host') != self.host:
+            cache = {'version': CACHE_VERSION, 'host': self.host, 'fetched_at': 0, 'fingerprint': None,
+                     'models': []}
+        return cache
+
+    def _save_cache(self):
+        directory = os.path.dirname(self.cache_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self.lock:
+            data = json.dumps(self._cache, ensure_ascii=False, indent=2)
+        atomic_write_json(self.cache_path, data)
+
+    def models(self):
+        """缓存中的模型列表（不请求服务）"""
+        with self.lock:
+            entries = list(self._cache['models'])
+        return [ModelInfo(**entry) for entry in entries]
+
+    def get(self, name):
+        for model in self.models():
+            if model.name == name:
+                return model
+        return None
+
+    def is_stale(self):
+        return time.time() - self._cache['fetched_at'] >= self.ttl
+
+    def refresh_if_stale(self):
+        """缓存过期时刷新，返回 (模型列表, 是否有变化)"""
+        if not self.is_stale():
+            return self.models(), False
+        return self.refresh()
+
+    def refresh(self):
+        """
+        请求 /api/tags，列表有变化时再为新增或摘要变化的模型请求 /api/show，并写回缓存
+        :return: (模型列表, 是否有变化)；服务不可用时抛出requests的异常，缓存保持不变
+        """
+        import requests  # 在后台刷新线程中才导入，启动时只读取缓存
+        self.stats['tags_requests'] += 1
+        try:
+            response = requests.get(f"{self.host}/api/tags", timeout=self.timeout)
+            response.raise_for_status()
+            tags = response.json().get('models', [])
+        except (requests.RequestException, ValueError):
+            self.stats['errors'] += 1
+            raise
+
+        fingerprint = tags_fingerprint(tags)
+        with self.lock:
+            cached_models = list(self._cache['models'])
+            fingerprint_changed = fingerprint != self._cache['fingerprint']
+        previous = {entry['digest']: entry for entry in cached_models}
+        # 上次获取详情失败的模型（上下文长度为None）即使列表不变也要重新请求 /api/show
+        if not fingerprint_changed and all(entry['context_length'] is not None for entry in cached_models):
+            self.stats['unchanged'] += 1
+            with self.lock:
+                self._cache['fetched_at'] = time.time()
+            self._write_cache_quietly()
+            return self.models(), False
+
+        entries = []
+        for model in tags:
+            digest = model.get('digest', '')
+            cached = previous.get(digest)
+            if cached is not None and cached['name'] == model.get('name') and cached['context_length'] is not None:
+                entries.append(cached)
+                continue
+            details = model.get('details') or {}
+            entries.append(ModelInfo(
+                name=model.get('name', ''),
+                size=int(model.get('size') or 0),
+                digest=digest,
+                modified_at=model.get('modified_at', ''),
+                family=details.get('family'),
+                parameter_size=details.get('parameter_size'),
+                quantization=details.get('quantization_level'),
+                context_length=self._fetch_context_length(model.get('name', '')),
+            )._asdict())
+
+        with self.lock:
+            self._cache.update({'fetched_at': time.time(), 'fingerprint': fingerprint, 'models': entries})
+        self._write_cache_quietly()
+        return self.models(), fingerprint_changed or entries != cached_models
+
+    def _fetch_context_length(self, name):
+        """请求 /api/show 获取上下文长度，失败时返回None（下次刷新时再试）"""
+        import requests
+        self.stats['show_requests'] += 1
+        try:
+            response = requests.post(f"{self.host}/api/show", json={'model': name}, timeout=self.timeout)
+            response.raise_for_status()
+            return _context_length(response.json())
+        except (requests.RequestException, ValueError) as e:
+            self.stats['errors'] += 1
+            print(f"⚠️ 获取模型 {name} 的详情失败: {e}")
+            return None
+
+    def _write_cache_quietly(self):
+        try:
+            self._save_cache()
+        except OSError as e:
+            print(f"⚠️ 无法写入模型清单缓存 {self.cache_path}: {e}")
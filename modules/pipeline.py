@@ -0,0 +1,183 @@
+# modules/pipeline.py
+import time
+import threading
+from collections import deque
+
+from .cancellation import OperationCancelled
+
+# 队列满时的背压策略
+POLICY_DROP_OLDEST = 'drop_oldest'  # 丢弃最旧的元素
+POLICY_COALESCE = 'coalesce'        # 把新元素合并到队尾元素
+POLICY_BLOCK = 'block'              # 阻塞生产者直到有空位
+POLICIES = (POLICY_DROP_OLDEST, POLICY_COALESCE, POLICY_BLOCK)
+
+
+def _percentile(ordered, pct):
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(round((len(ordered) - 1) * pct / 100.0)))]
+
+
+class StageQueue:
+    """
+    流水线阶段之间的有界队列
+    队列满时按背压策略处理新元素；记录队列深度、丢弃/合并次数和元素的排队等待时间
+    """
+
+    def __init__(self, name, maxsize=4, policy=POLICY_DROP_OLDEST, merge=None, wait_window=256):
+        """
+        :param name: 队列名称，用于统计和指标标签
+        :param maxsize: 队列容量
+        :param policy: 背压策略，见POLICIES
+        :param merge: coalesce策略的合并函数 merge(队尾元素, 新元素)，默认新元素直接替换队尾元素
+        :param wait_window: 用于计算等待时间分位数的最近样本数
+        """
+        if policy not in POLICIES:
+            raise ValueError(f"未知的背压策略: {policy}，可选: {', '.join(POLICIES)}")
+        self.name = name
+        self.maxsize = max(1, int(maxsize))
+        self.policy = policy
+        self.merge = merge or (lambda old, new: new)
+        self._items = deque()  # (入队时间, 元素)
+        self._cond = threading.Condition()
+        self._waits = deque(maxlen=wait_window)
+        self.put_count = 0
+        self.get_count = 0
+        self.dropped = 0
+        self.coalesced = 0
+        self.max_depth = 0
+        self.blocked_time = 0.0  # block策略下生产者累计阻塞的时间（秒）
+
+    def __len__(self):
+        return len(self._items)
+
+    def put(self, item, cancel_event=None, poll_interval=0.05):
+        """放入元素；block策略下阻塞时每poll_interval秒检查一次停止事件"""
+        with self._cond:
+            if len(self._items) >= self.maxsize:
+                if self.policy == POLICY_DROP_OLDEST:
+                    self._items.popleft()
+                    self.dropped += 1
+                elif self.policy == POLICY_COALESCE:
+                    # 保留队尾元素的入队时间，等待时间按合并后最早的内容计算
+                    enqueued_at, tail = self._items.pop()
+                    self._items.append((enqueued_at, self.merge(tail, item)))
+                    self.coalesced += 1
+                    self._cond.notify_all()
+                    return
+                else:
+                    block_start = time.perf_counter()
+                    try:
+                        while len(self._items) >= self.maxsize:
+                            if cancel_event is not None and cancel_event.is_set():
+                                raise OperationCancelled()
+                            self._cond.wait(poll_interval)
+                    finally:
+                        self.blocked_time += time.perf_counter() - block_start
+            self._items.append((time.perf_counter(), item))
+            self.put_count += 1
+            self.max_depth = max(self.max_depth, len(self._items))
+            self._cond.notify_all()
+
+    def get(self, cancel_event=None, poll_interval=0.05):
+        """
+        取出最早的元素，队列为空时等待
+        :return: (元素, 排队等待的秒数)
+        """
+        with self._cond:
+            while not self._items:
+                if cancel_event is not None and cancel_event.is_set():
+                    raise OperationCancelled()
+                self._cond.wait(poll_interval)
+            enqueued_at, item = self._items.popleft()
+            waited = time.perf_counter() - enqueued_at
+            self._waits.append(waited)
+            self.get_count += 1
+            self._cond.notify_all()
+            return item, waited
+
+    def drain(self):
+        """取出全部剩余元素（不计入等待时间统计）"""
+        with self._cond:
+            items = [item for _, item in self._items]
+            self._items.clear()
+            self._cond.notify_all()
+            return items
+
+    def clear(self):
+        self.drain()
+
+    def get_stats(self):
+        """获取队列统计"""
+        with self._cond:
+            waits = sorted(self._waits)
+            return {
+                'policy': self.policy,
+                'maxsize': self.maxsize,
+                'depth': len(self._items),
+                'max_depth': self.max_depth,
+                'put': self.put_count,
+                'get': self.get_count,
+                'dropped': self.dropped,
+                'coalesced': self.coalesced,
+                'blocked_ms': self.blocked_time * 1000.0,
+                'wait_p50_ms': _percentile(waits, 50) * 1000.0,
+                'wait_p95_ms': _percentile(waits, 95) * 1000.0,
+                'wait_max_ms': (waits[-1] * 1000.0) if waits else 0.0,
+            }
+
+
+class FairLock:
+    """
+    按申请顺序授予的锁（票号锁）
+    捕获和投递阶段轮流操作鼠标键盘时，保证任何一方都不会因另一方反复加锁而长期等待
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._next_ticket = 0
+        self._now_serving = 0
+        self.acquisitions = 0
+        self.wait_time = 0.0  # 累计等待时间（秒）
+
+    def acquire(self):
+        start = time.perf_counter()
+        with self._cond:
+            ticket = self._next_ticket
+            self._next_ticket += 1
+            while self._now_serving != ticket:
+                self._cond.wait()
+            self.acquisitions += 1
+            self.wait_time += time.perf_counter() - start
+
+    def release(self):
+        with self._cond:
+            self._now_serving += 1
+            self._cond.notify_all()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.release()
+
+
+def render_queue_metrics(queues):
+    """以Prometheus文本格式输出各队列的深度、丢弃和合并计数"""
+    metrics = (
+        ('chat_automation_queue_depth', 'gauge', 'Items currently waiting in a pipeline queue.', 'depth'),
+        ('chat_automation_queue_dropped_total', 'counter', 'Items dropped by the drop_oldest policy.', 'dropped'),
+        ('chat_automation_queue_coalesced_total', 'counter', 'Items merged by the coalesce policy.', 'coalesced'),
+        ('chat_automation_queue_blocked_seconds_total', 'counter', 'Time producers spent blocked on a full queue.',
+         'blocked_ms'),
+    )
+    stats = [(queue.name, queue.get_stats()) for queue in queues]
+    lines = []
+    for metric, metric_type, help_text, key in metrics:
+        lines.append(f'# HELP {metric} {help_text}')
+        lines.append(f'# TYPE {metric} {metric_type}')
+        for name, values in stats:
+            value = values[key] / 1000.0 if key == 'blocked_ms' else values[key]
+            lines.append(f'{metric}{{queue="{name}"}} {value}')
+    return lines
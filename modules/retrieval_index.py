@@ -0,0 +1,342 @@
+# modules/retrieval_index.py
+import os
+import time
+import threading
+from typing import NamedTuple
+
+import numpy as np
+
+from .dedup_store import text_fingerprint
+from .model_inventory import ollama_base_url
+
+CACHE_VERSION = 1
+
+
+class Snippet(NamedTuple):
+    """检索到的一条早期消息"""
+    score: float   # 与查询的余弦相似度
+    chat: str
+    role: str
+    text: str
+    ts: float
+
+
+class OllamaEmbedder:
+    """通过Ollama的 /api/embed 批量计算文本向量，旧版本Ollama没有该接口时改为逐条请求 /api/embeddings"""
+
+    def __init__(self, host='http://localhost:11434', model='nomic-embed-text', timeout=30.0):
+        self.host = ollama_base_url(host)
+        self.model = model
+        self.timeout = timeout
+        self.legacy = False
+        self.requests = 0
+
+    def __call__(self, texts):
+        """
+        :return: (len(texts), 维度) 的float32数组；服务不可用时抛出requests的异常
+        """
+        import requests
+        texts = list(texts)
+        if not self.legacy:
+            self.requests += 1
+            response = requests.post(f"{self.host}/api/embed", json={'model': self.model, 'input': texts},
+                                     timeout=self.timeout)
+            # 模型不存在时Ollama同样返回404，但错误信息中带有模型名称
+            if response.status_code != 404 or self.model in response.text:
+                response.raise_for_status()
+                return np.asarray(response.json()['embeddings'], dtype=np.float32)
+            self.legacy = True
+            print("⚠️ Ollama不支持 /api/embed，改为逐条请求 /api/embeddings")
+        vectors = []
+        for text in texts:
+            self.requests += 1
+            response = requests.post(f"{self.host}/api/embeddings", json={'model': self.model, 'prompt': text},
+                                     timeout=self.timeout)
+            response.raise_for_status()
+            vectors.append(response.json()['embedding'])
+        return np.asarray(vectors, dtype=np.float32)
+
+
+def format_snippets(snippets, max_chars=200):
+    """把检索结果格式化为提示词片段，没有结果时返回空字符串"""
+    lines = []
+    for snippet in snippets:
+        text = snippet.text if len(snippet.text) <= max_chars else snippet.text[:max_chars] + '…'
+        when = time.strftime('%Y-%m-%d %H:%M', time.localtime(snippet.ts))
+        lines.append(f"- [{when}] {'用户' if snippet.role == 'user' else '你'}: {text}")
+    return "\n".join(lines)
+
+
+class RetrievalIndex:
+    """
+    早期对话的向量检索索引
+    消息向量（已归一化）按行存放在一个连续的float32矩阵中，容量不足时成倍扩大；
+    查询时一次矩阵乘法得到与所有消息的余弦相似度，再用argpartition取前k个。
+    新消息由后台线程从会话存储增量读取、分批计算向量后追加，生成回复时只做一次查询向量计算和矩阵乘法
+    """
+
+    def __init__(self, embed, batch_size=64, initial_capacity=1024, top_k=3, min_score=0.5,
+                 max_snippet_chars=200, cache_path=None):
+        """
+        :param embed: 计算向量的函数，接收文本列表，返回 (数量, 维度) 数组，如OllamaEmbedder
+        :param batch_size: 每次计算向量的消息数
+        :param top_k: 注入提示词的最多片段数
+        :param min_score: 相似度低于该值的片段不注入（合适的值与向量模型有关）
+        :param cache_path: stop()时保存向量的文件，None为不保存
+        """
+        self.embed = embed
+        self.cache_path = cache_path
+        self.batch_size = max(1, int(batch_size))
+        self.top_k = top_k
+        self.min_score = min_score
+        self.max_snippet_chars = max_snippet_chars
+        self.lock = threading.Lock()
+        self._capacity = max(1, int(initial_capacity))
+        self._matrix = None                 # (容量, 维度)，前_count行有效
+        self._chat_codes = np.empty(self._capacity, np.int32)
+        self._count = 0
+        self._chats = {}                    # 聊天名称 -> 编号
+        self._meta = []                     # 每行对应的 (聊天, 角色, 文本, 时间)
+        self._seen = set()                  # 已索引的 (聊天, 文本指纹)，重复的消息只索引一次
+        self.last_id = 0                    # 已处理到的会话存储消息编号
+        self.stats = {'indexed': 0, 'duplicates': 0, 'embed_batches': 0, 'embed_seconds': 0.0,
+                      'searches': 0, 'errors': 0}
+        self.sync_thread = None
+        self.stop_event = threading.Event()
+
+    @classmethod
+    def from_config(cls, config, store):
+        """
+        从完整配置创建（retrieval节），加载缓存的向量并开始后台同步
+        retrieval.enabled为false或没有会话存储时返回None
+        """
+        settings = config.get('retrieval', {})
+        if not settings.get('enabled', False) or store is None:
+            return None
+        embedder = OllamaEmbedder(config.get('ollama', {}).get('url', 'http://localhost:11434'),
+                                  model=settings.get('model', 'nomic-embed-text'),
+                                  timeout=settings.get('timeout', 30.0))
+        index = cls(embedder, batch_size=settings.get('batch_size', 64), top_k=settings.get('top_k', 3),
+                    min_score=settings.get('min_score', 0.5),
+                    max_snippet_chars=settings.get('max_snippet_chars', 200),
+                    cache_path=settings.get('cache_path', os.path.join('cache', 'retrieval_index.npz')))
+        index.load(index.cache_path, embedder.model)
+        index.start(store, interval=settings.get('sync_interval', 5.0))
+        return index
+
+    def __len__(self):
+        return self._count
+
+    # ---------- 建立索引 ----------
+
+    def add(self, messages):
+        """
+        计算向量并加入索引
+        :param messages: (聊天, 角色, 文本, 时间) 的可迭代对象
+        :return: 新加入的数量
+        """
+        pending = []
+        for chat, role, text, ts in messages:
+            key = (chat, text_fingerprint(text))
+            if not text.strip() or key in self._seen:
+                self.stats['duplicates'] += 1
+                continue
+            self._seen.add(key)
+            pending.append((chat, role, text, ts))
+        added = 0
+        for start in range(0, len(pending), self.batch_size):
+            batch = pending[start:start + self.batch_size]
+            embed_start = time.perf_counter()
+            try:
+                vectors = np.asarray(self.embed([item[2] for item in batch]), dtype=np.float32)
+            except Exception:
+                for chat, _, text, _ in pending[start:]:
+                    self._seen.discard((chat, text_fingerprint(text)))
+                raise
+            self.stats['embed_batches'] += 1
+            self.stats['embed_seconds'] += time.perf_counter() - embed_start
+            self._append(vectors, batch)
+            added += len(batch)
+        return added
+
+    def _append(self, vectors, batch):
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        vectors = vectors / np.maximum(norms, 1e-12)
+        with self.lock:
+            if self._matrix is None:
+                self._matrix = np.empty((self._capacity, vectors.shape[1]), np.float32)
+            elif vectors.shape[1] != self._matrix.shape[1]:
+                raise ValueError(f"向量维度 {vectors.shape[1]} 与索引的维度 {self._matrix.shape[1]} 不一致")
+            needed = self._count + len(vectors)
+            if needed > self._capacity:
+                # 成倍扩大并复制：查询线程持有的旧矩阵引用仍然有效
+                capacity = max(needed, self._capacity * 2)
+                matrix = np.empty((capacity, self._matrix.shape[1]), np.float32)
+                matrix[:self._count] = self._matrix[:self._count]
+                codes = np.empty(capacity, np.int32)
+                codes[:self._count] = self._chat_codes[:self._count]
+                self._matrix, self._chat_codes, self._capacity = matrix, codes, capacity
+            self._matrix[self._count:needed] = vectors
+            for offset, (chat, role, text, ts) in enumerate(batch):
+                self._chat_codes[self._count + offset] = self._chats.setdefault(chat, len(self._chats))
+                self._meta.append((chat, role, text, ts))
+            self._count = needed
+            self.stats['indexed'] += len(batch)
+
+    def sync(self, store, max_messages=None):
+        """从会话存储读取上次之后的新消息加入索引，返回处理的消息数；计算向量失败时下次从同一位置重试"""
+        processed = 0
+        while max_messages is None or processed < max_messages:
+            rows = store.messages_after(self.last_id, self.batch_size * 4)
+            if not rows:
+                break
+            self.add((chat, role, text, ts) for _, chat, ts, role, text in rows)
+            self.last_id = rows[-1][0]
+            processed += len(rows)
+        return processed
+
+    def start(self, store, interval=5.0):
+        """启动后台同步线程"""
+        def run():
+            while not self.stop_event.is_set():
+                try:
+                    added = self.sync(store)
+                    if added:
+                        print(f"🧠 检索索引已加入 {added} 条消息 (共 {self._count} 条)")
+                except Exception as e:
+                    self.stats['errors'] += 1
+                    print(f"⚠️ 检索索引同步失败，稍后重试: {e}")
+                self.stop_event.wait(interval)
+
+        self.stop_event.clear()
+        self.sync_thread = threading.Thread(target=run, name="retrieval-sync", daemon=True)
+        self.sync_thread.start()
+
+    def stop(self, timeout=2.0):
+        """停止后台同步，设置了cache_path时保存向量"""
+        self.stop_event.set()
+        if self.sync_thread is not None:
+            self.sync_thread.join(timeout)
+            self.sync_thread = None
+        if self.cache_path and self._count:
+            try:
+                self.save(self.cache_path, getattr(self.embed, 'model', ''))
+            except OSError as e:
+                print(f"⚠️ 无法保存检索索引 {self.cache_path}: {e}")
+
+    # ---------- 查询 ----------
+
+    def search(self, text, k=None, chat=None, min_score=None, exclude=()):
+        """计算查询文本的向量并检索，见search_vector"""
+        if not self._count:
+            return []
+        vector = np.asarray(self.embed([text]), dtype=np.float32)[0]
+        return self.search_vector(vector, k, chat, min_score, exclude)
+
+    def search_vector(self, vector, k=None, chat=None, min_score=None, exclude=()):
+        """
+        余弦相似度最高的k条消息，按相似度从高到低
+        :param chat: 只在该聊天的消息中检索
+        :param exclude: 不返回的文本（如已在提示词中的最近对话和当前消息）
+        """
+        k = self.top_k if k is None else k
+        min_score = self.min_score if min_score is None else min_score
+        with self.lock:
+            count = self._count
+            matrix, codes, meta = self._matrix, self._chat_codes, self._meta
+            code = self._chats.get(chat) if chat is not None else None
+        if not count or k <= 0 or (chat is not None and code is None):
+            return []
+        self.stats['searches'] += 1
+        query = (vector / max(float(np.linalg.norm(vector)), 1e-12)).astype(np.float32)
+        if code is not None:
+            # 只取出该聊天的行再相乘，不必读取整个矩阵
+            rows = np.flatnonzero(codes[:count] == code)
+            scores = matrix[rows] @ query
+        else:
+            rows = None
+            scores = matrix[:count] @ query
+        excluded = {text_fingerprint(text) for text in exclude}
+        wanted = min(len(scores), k + len(excluded))
+        if wanted < len(scores):
+            candidates = np.argpartition(-scores, wanted - 1)[:wanted]
+        else:
+            candidates = np.arange(len(scores))
+        candidates = candidates[np.argsort(-scores[candidates], kind='stable')]
+        results = []
+        for candidate in candidates:
+            score = float(scores[candidate])
+            row = candidate if rows is None else rows[candidate]
+            if score < min_score:
+                break
+            chat_name, role, text, ts = meta[row]
+            if excluded and text_fingerprint(text) in excluded:
+                continue
+            results.append(Snippet(score, chat_name, role, text, ts))
+            if len(results) >= k:
+                break
+        return results
+
+    def related_text(self, text, chat=None, exclude=()):
+        """
+        供生成回复时注入提示词：最相关的几条早期消息，格式化为文本
+        索引为空、检索失败或没有足够相关的消息时返回空字符串，不影响回复
+        """
+        try:
+            snippets = self.search(text, chat=chat, exclude=tuple(exclude) + (text,))
+        except Exception as e:
+            self.stats['errors'] += 1
+            print(f"⚠️ 检索早期对话失败: {e}")
+            return ""
+        return format_snippets(snippets, self.max_snippet_chars)
+
+    # ---------- 缓存 ----------
+
+    def save(self, path, model=''):
+        """把向量和对应的消息保存为npz，重启后不必重新计算所有向量"""
+        with self.lock:
+            count = self._count
+            matrix = self._matrix[:count].copy()
+            codes = self._chat_codes[:count].copy()
+            chats = sorted(self._chats, key=self._chats.get)
+            meta = list(self._meta[:count])
+            last_id = self.last_id
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        temp_path = f"{path}.tmp"
+        with open(temp_path, 'wb') as f:
+            np.savez(f, version=CACHE_VERSION, model=model, last_id=last_id, vectors=matrix, chat_codes=codes,
+                     chats=np.array(chats, dtype=str), roles=np.array([m[1] for m in meta], dtype=str),
+                     texts=np.array([m[2] for m in meta], dtype=str),
+                     ts=np.array([m[3] for m in meta], dtype=np.float64))
+        os.replace(temp_path, path)
+
+    def load(self, path, model=''):
+        """加载save()保存的索引，文件不存在、版本或模型不同时返回False（从头建立）"""
+        if not os.path.exists(path):
+            return False
+        try:
+            with np.load(path, allow_pickle=False) as data:
+                if int(data['version']) != CACHE_VERSION or str(data['model']) != model:
+                    print("🔄 检索索引缓存的模型或版本不同，重新建立索引")
+                    return False
+                vectors, codes = data['vectors'], data['chat_codes']
+                chats = [str(name) for name in data['chats']]
+                meta = [(chats[code], str(role), str(text), float(ts))
+                        for code, role, text, ts in zip(codes, data['roles'], data['texts'], data['ts'])]
+                last_id = int(data['last_id'])
+        except (OSError, ValueError, KeyError) as e:
+            print(f"⚠️ 无法读取检索索引缓存 {path}: {e}")
+            return False
+        if len(vectors):
+            self._append(vectors, meta)
+            self._seen.update((chat, text_fingerprint(text)) for chat, _, text, _ in meta)
+        self.last_id = last_id
+        print(f"🧠 已加载检索索引缓存: {len(vectors)} 条消息")
+        return True
+
+    def get_stats(self):
+        stats = dict(self.stats)
+        stats.update({'messages': self._count, 'chats': len(self._chats), 'last_id': self.last_id,
+                      'matrix_bytes': int(self._matrix.nbytes) if self._matrix is not None else 0})
+        return stats
@@ -5,16 +5,82 @@ import pyautogui
 from PIL import Image
 import time
 import threading
+from .tracing import NULL_TRACER
+from .frame_store import FrameStore
+
+
+class ChangeHeatmap:
+    """
+    变化热力图
+    每次变化检测的差异像素按cell×cell的小格累计，旧的变化按decay逐次衰减；
+    累计在监控线程中进行（只做一次缩小），界面线程通过snapshot()取得副本
+    """
+
+    def __init__(self, cell=8, decay=0.9):
+        self.cell = cell
+        self.decay = decay
+        self.lock = threading.Lock()
+        self.heat = None    # float32数组，每格的累计变化比例
+        self.region = None  # 热力图覆盖的屏幕区域 (x, y, 宽, 高)
+        self.samples = 0
+
+    def accumulate(self, diff_gray, region):
+        """
+        :param diff_gray: 灰度差异图，非零像素视为变化
+        :param region: 差异图对应的屏幕区域 (x, y, 宽, 高)
+        """
+        height, width = diff_gray.shape[:2]
+        grid = (max(1, width // self.cell), max(1, height // self.cell))
+        # INTER_AREA缩小后每格的值即该格内变化像素的比例
+        changed = cv2.resize((diff_gray > 0).astype(np.float32), grid, interpolation=cv2.INTER_AREA)
+        with self.lock:
+            if self.heat is None or self.region != tuple(region) or self.heat.shape != changed.shape:
+                self.heat = np.zeros_like(changed)
+                self.region = tuple(region)
+                self.samples = 0
+            self.heat *= self.decay
+            self.heat += changed
+            self.samples += 1
+
+    def snapshot(self):
+        """返回 (热力图副本, 区域)，尚无数据时为 (None, None)"""
+        with self.lock:
+            if self.heat is None:
+                return None, None
+            return self.heat.copy(), self.region
+
+    def reset(self):
+        with self.lock:
+            self.heat = None
+            self.region = None
+            self.samples = 0
+
 
 class ScreenMonitor:
-    def __init__(self, callback=None, confidence_threshold=0.7, check_interval=0.5):
+    def __init__(self, callback=None, confidence_threshold=0.7, check_interval=0.5, tracer=None, frame_store=None,
+                 capture_process=None):
+        """
+        :param frame_store: 变化检测用的帧存储，默认只保留缩小一层的灰度帧
+        :param capture_process: 截图子进程设置（配置中的capture_process节），enabled为true时
+            截图和变化检测在单独的进程中进行
+        """
         self.callback = callback
+        self.tracer = tracer or NULL_TRACER  # 各阶段耗时追踪
         self.confidence_threshold = confidence_threshold
         self.check_interval = check_interval
-        self.previous_screenshot = None
+        # 上一帧以缩小后的灰度图保存，变化区域保留有预算上限的全分辨率副本
+        self.frame_store = frame_store or FrameStore()
+        self.capture_options = capture_process or {}
+        self.capture_process = None     # 运行中的CaptureProcess
+        self.last_capture_event = None  # 子进程模式下最近一次有变化的事件，可用capture_process.read()取得像素
+        self.stats = {'frames': 0, 'changes': 0, 'dropped_events': 0}
         self.last_change_time = time.time()
         self.running = False
         self.monitor_thread = None
+        self.stop_event = threading.Event()  # 停止事件：监控循环的等待在停止时立即返回
+        self.last_stop_latency = None        # 最近一次停止的耗时（秒）
+        # 累计的变化热力图，供区域选择器显示；差异图已缩小，格子相应缩小以保持相同的屏幕粒度
+        self.heatmap = ChangeHeatmap(cell=max(1, 8 >> self.frame_store.level))
         
         # 获取屏幕区域参数（从配置文件中获取，需要从外部获取）
         self.detection_region = None  # 初始化时不确定区域
@@ -25,6 +91,8 @@ class ScreenMonitor:
         self.detection_region = (x, y, width, height)
         print(f"🔄 屏幕检测区域已更新: ({x}, {y}, {width}, {height})")
         self.reset_change_detection()
+        if self.capture_process is not None:
+            self.capture_process.set_region(self.detection_region)
     
     def get_current_region(self):
         """获取当前屏幕检测区域"""
@@ -72,38 +140,29 @@ class ScreenMonitor:
             return None
 
     def detect_changes(self, current_img):
-        """检测屏幕变化"""
-        if self.previous_screenshot is None:
-            # 第一次捕获，直接保存
-            self.previous_screenshot = current_img.copy() if current_img is not None else None
-            return True
-        
+        """检测屏幕变化（在缩小后的灰度图上比较，当前帧不会被整帧保留）"""
         if current_img is None:
             return False
-        
-        # 计算差异
-        diff = cv2.absdiff(self.previous_screenshot, current_img)
-        # 转换为灰度图
-        gray_diff = cv2.cvtColor(diff, cv2.COLOR_BGR2GRAY)
-        # 计算非零像素数量
-        non_zero_count = cv2.countNonZero(gray_diff)
-        
+
+        change = self.frame_store.update(current_img)
+        if change.first:
+            # 第一次捕获（或区域尺寸改变），只记录作为比较基准
+            return True
+
+        offset_x, offset_y = self.detection_region[:2] if self.detection_region else (0, 0)
+        self.heatmap.accumulate(change.diff, (offset_x, offset_y, current_img.shape[1], current_img.shape[0]))
+
         # 计算变化百分比
-        total_pixels = current_img.shape[0] * current_img.shape[1]
-        change_percentage = (non_zero_count / total_pixels) * 100
-        
-        print(f"🔍 屏幕变化检测: {change_percentage:.2f}% (像素变化: {non_zero_count}/{total_pixels})")
-        
-        # 更新上一次的截图
-        self.previous_screenshot = current_img.copy()
-        
+        change_percentage = change.ratio * 100
+        print(f"🔍 屏幕变化检测: {change_percentage:.2f}% (变化区域: {len(change.rects)} 个)")
+
         # 如果变化超过阈值，则认为有变化
         threshold = self.confidence_threshold * 100  # 转换为百分比进行比较
         return change_percentage > threshold
 
     def reset_change_detection(self):
         """重置变化检测"""
-        self.previous_screenshot = None
+        self.frame_store.reset()
 
     def start_monitoring(self):
         """启动屏幕监控"""
@@ -111,43 +170,126 @@ class ScreenMonitor:
             print("⚠️ 屏幕监控已在运行中")
             return
 
+        self.stop_event.clear()
         self.running = True
-        self.monitor_thread = threading.Thread(target=self._monitor_loop, daemon=True)
+        loop = self._process_loop if self.capture_options.get('enabled') else self._monitor_loop
+        self.monitor_thread = threading.Thread(target=loop, daemon=True)
         self.monitor_thread.start()
         print("✅ 屏幕监控已启动")
 
     def stop_monitoring(self):
         """停止屏幕监控"""
+        stop_start = time.perf_counter()
         self.running = False
-        if self.monitor_thread:
+        self.stop_event.set()
+        if self.monitor_thread and self.monitor_thread is not threading.current_thread():
             self.monitor_thread.join(timeout=2)
-        print("✅ 屏幕监控已停止")
+        self.last_stop_latency = time.perf_counter() - stop_start
+        print(f"✅ 屏幕监控已停止 (耗时 {self.last_stop_latency * 1000:.0f}ms)")
 
     def _monitor_loop(self):
         """监控循环"""
         while self.running:
             try:
-                # 捕获屏幕
-                current_img = self.capture_screen()
-                
-                # 检测变化
-                if self.detect_changes(current_img):
-                    print("✨ 检测到屏幕变化")
-                    # 这里可以触发回调，但现在我们只是打印
-                    if self.callback:
-                        # 注意：这里需要实际的文本内容作为参数调用回调
-                        # 由于我们移除了OCR功能，暂时使用占位符
-                        pass
-                        
-                # 等待下一个检查周期
-                time.sleep(self.check_interval)
+                with self.tracer.trace('screen_monitor') as trace:
+                    # 捕获屏幕
+                    with trace.span('capture'):
+                        current_img = self.capture_screen()
+
+                    # 检测变化
+                    with trace.span('diff') as span_attrs:
+                        changed = self.detect_changes(current_img)
+                        span_attrs['changed'] = changed
+                    trace.attrs['outcome'] = 'changed' if changed else 'unchanged'
+                    if changed:
+                        self.stats['changes'] += 1
+                        print("✨ 检测到屏幕变化")
+                        # 这里可以触发回调，但现在我们只是打印
+                        with trace.span('callback'):
+                            if self.callback:
+                                # 注意：这里需要实际的文本内容作为参数调用回调
+                                # 由于我们移除了OCR功能，暂时使用占位符
+                                pass
+
+                # 等待下一个检查周期，停止时立即返回
+                self.stop_event.wait(self.check_interval)
             except Exception as e:
                 print(f"❌ 监控循环中出现错误: {e}")
-                time.sleep(self.check_interval)
+                self.stop_event.wait(self.check_interval)
+
+    def _process_loop(self):
+        """子进程模式的监控循环：只接收变化事件，截图和比较都在截图子进程中进行"""
+        from .capture_process import CaptureProcess, DEFAULT_GRAB
+        screen_width, screen_height = pyautogui.size()
+        interval = self.check_interval
+        process = CaptureProcess(
+            region=self.detection_region, interval=interval, level=self.frame_store.level,
+            pixel_threshold=self.frame_store.pixel_threshold, slots=self.capture_options.get('slots', 3),
+            max_frame_bytes=screen_width * screen_height * 3, grab=self.capture_options.get('grab', DEFAULT_GRAB))
+        try:
+            process.start()
+        except Exception as e:
+            print(f"⚠️ 无法启动截图子进程，改为在本进程中截图: {e}")
+            self._monitor_loop()
+            return
+        self.capture_process = process
+        try:
+            while self.running:
+                if self.check_interval != interval:  # 配置热更新
+                    interval = self.check_interval
+                    process.set_interval(interval)
+                event = process.get_event(timeout=0.2)
+                if event is None:
+                    if not process.alive:
+                        print("❌ 截图子进程意外退出，屏幕监控已停止")
+                        self.running = False
+                    continue
+                try:
+                    self._on_capture_event(event)
+                except Exception as e:
+                    print(f"❌ 处理截图事件时出现错误: {e}")
+        finally:
+            self.capture_process = None
+            process.stop()
+
+    def _on_capture_event(self, event):
+        """处理子进程发来的事件：记录耗时、累计热力图并与阈值比较"""
+        self.stats['frames'] = event.frames
+        self.stats['dropped_events'] = event.dropped_events
+        if event.seq == 0:
+            return  # 心跳，只更新统计
+        with self.tracer.trace('screen_monitor') as trace:
+            trace.add_span('capture', event.capture_ms / 1000.0)
+            trace.add_span('diff', event.diff_ms / 1000.0, changed=event.ratio > 0)
+            if event.first:
+                changed = True
+            else:
+                # 用变化区域在缩小的网格上重建掩码，累计热力图（不需要读取像素）
+                scale = self.frame_store.scale
+                height, width = event.shape[:2]
+                mask = np.zeros((max(1, height // scale), max(1, width // scale)), np.uint8)
+                for x, y, w, h in event.rects:
+                    mask[y // scale:(y + h) // scale, x // scale:(x + w) // scale] = 255
+                offset_x, offset_y = self.detection_region[:2] if self.detection_region else (0, 0)
+                self.heatmap.accumulate(mask, (offset_x, offset_y, width, height))
+                change_percentage = event.ratio * 100
+                print(f"🔍 屏幕变化检测: {change_percentage:.2f}% (变化区域: {len(event.rects)} 个)")
+                changed = change_percentage > self.confidence_threshold * 100
+            trace.attrs['outcome'] = 'changed' if changed else 'unchanged'
+            if changed:
+                self.stats['changes'] += 1
+                self.last_capture_event = event
+                print("✨ 检测到屏幕变化")
+
+    def get_stats(self):
+        """已处理的帧数和有变化的次数"""
+        stats = dict(self.stats)
+        stats['mode'] = 'process' if self.capture_options.get('enabled') else 'thread'
+        if stats['mode'] == 'thread':
+            stats['frames'] = self.frame_store.stats['frames']
+        return stats
 
     def cleanup(self):
         """清理资源"""
         self.stop_monitoring()
-        if self.previous_screenshot is not None:
-            del self.previous_screenshot
-            self.previous_screenshot = None
\ No newline at end of file
+        self.frame_store.reset()
\ No newline at end of file
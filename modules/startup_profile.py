@@ -0,0 +1,173 @@
+# modules/startup_profile.py
+import sys
+import json
+import time
+import importlib.machinery
+from contextlib import contextmanager
+
+# 每个模块各自实例化的文件loader
+_FILE_LOADERS = (importlib.machinery.SourceFileLoader, importlib.machinery.SourcelessFileLoader,
+                 importlib.machinery.ExtensionFileLoader)
+
+
+class StartupProfiler:
+    """
+    启动耗时分析（--profile-startup）
+    在sys.meta_path最前面插入一个查找器，为每个新导入的模块记录执行耗时（与 python -X importtime 相同，
+    区分自身耗时和包含子模块的累计耗时）；step()记录各初始化步骤的耗时，最后按包汇总输出
+    """
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.imports = []  # (模块名, 自身耗时, 累计耗时, 所在步骤)
+        self.steps = []    # (步骤名, 开始时刻, 耗时)，时刻相对于start
+        self.marks = {}    # 里程碑名 -> 相对于start的时刻
+        self._stack = []   # 正在执行的导入: [模块名, 子模块累计耗时, 开始时刻]
+        self._step_stack = []
+        self._installed = False
+
+    # ---------- 导入计时 ----------
+
+    def find_spec(self, name, path=None, target=None):
+        """MetaPathFinder接口：交给其余查找器查找，找到后为该模块的loader包装计时"""
+        for finder in sys.meta_path:
+            if finder is self or not hasattr(finder, 'find_spec'):
+                continue
+            spec = finder.find_spec(name, path, target)
+            if spec is not None:
+                loader = spec.loader
+                # 只包装每个模块各自的文件loader（源码、字节码、扩展模块）；
+                # 内置/冻结模块的loader是类本身，zip导入器被多个模块共用，都不做包装
+                if isinstance(loader, _FILE_LOADERS):
+                    loader.create_module = self._timed_create(name, loader.create_module)
+                    loader.exec_module = self._timed(name, loader.exec_module)
+                return spec
+        return None
+
+    def _timed_create(self, name, create_module):
+        # 扩展模块的加载和初始化（如PyQt5）发生在create_module中，从这里开始计时
+        def create_module_timed(spec):
+            entry = [name, 0.0, time.perf_counter()]
+            self._stack.append(entry)
+            try:
+                return create_module(spec)
+            except BaseException:
+                self._stack.remove(entry)
+                raise
+        return create_module_timed
+
+    def _timed(self, name, exec_module):
+        def exec_module_timed(module):
+            if self._stack and self._stack[-1][0] == name:
+                entry = self._stack[-1]
+            else:
+                entry = [name, 0.0, time.perf_counter()]
+                self._stack.append(entry)
+            start = entry[2]
+            try:
+                return exec_module(module)
+            finally:
+                elapsed = time.perf_counter() - start
+                self._stack.pop()
+                if self._stack:
+                    self._stack[-1][1] += elapsed
+                step = self._step_stack[-1] if self._step_stack else 'startup'
+                self.imports.append((name, elapsed - entry[1], elapsed, step))
+        return exec_module_timed
+
+    def install(self):
+        if not self._installed:
+            sys.meta_path.insert(0, self)
+            self._installed = True
+        return self
+
+    def uninstall(self):
+        if self._installed:
+            sys.meta_path.remove(self)
+            self._installed = False
+
+    # ---------- 初始化步骤 ----------
+
+    @contextmanager
+    def step(self, name):
+        """记录一个初始化步骤的耗时，步骤内发生的导入归到该步骤"""
+        self._step_stack.append(name)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._step_stack.pop()
+            self.steps.append((name, start - self.start, time.perf_counter() - start))
+
+    def mark(self, name):
+        """记录一个里程碑（如GUI可用）"""
+        self.marks[name] = time.perf_counter() - self.start
+
+    # ---------- 报告 ----------
+
+    def package_totals(self):
+        """按顶层包汇总导入的自身耗时（项目内的模块按模块名单列）"""
+        totals = {}
+        for name, self_time, _, step in self.imports:
+            parts = name.split('.')
+            key = '.'.join(parts[:2]) if parts[0] in ('modules', 'gui') else parts[0]
+            total, count, first_step = totals.get(key, (0.0, 0, step))
+            totals[key] = (total + self_time, count + 1, first_step)
+        return sorted(totals.items(), key=lambda item: item[1][0], reverse=True)
+
+    def report(self, top=20):
+        """格式化的文本报告"""
+        total_import = sum(self_time for _, self_time, _, _ in self.imports)
+        lines = ["⏱️ 启动耗时分析", f"  导入 {len(self.imports)} 个模块，共 {total_import * 1000:.0f}ms"]
+        lines.append("  按包汇总的导入耗时（自身耗时，首次导入所在步骤）:")
+        for key, (total, count, step) in self.package_totals()[:top]:
+            lines.append(f"    {total * 1000:8.1f}ms  {key:<32} {count:>4} 个模块  [{step}]")
+        lines.append("  初始化步骤（包含其中的导入）:")
+        for name, started, elapsed in self.steps:
+            lines.append(f"    {elapsed * 1000:8.1f}ms  {name}  (开始于 {started * 1000:.0f}ms)")
+        for name, at in self.marks.items():
+            lines.append(f"  📍 {name}: {at * 1000:.0f}ms")
+        return '\n'.join(lines)
+
+    def to_dict(self):
+        return {
+            'imports': [{'module': name, 'self_ms': self_time * 1000.0, 'cumulative_ms': cumulative * 1000.0,
+                         'step': step} for name, self_time, cumulative, step in self.imports],
+            'packages': {key: {'self_ms': total * 1000.0, 'modules': count, 'step': step}
+                         for key, (total, count, step) in self.package_totals()},
+            'steps': [{'name': name, 'start_ms': started * 1000.0, 'duration_ms': elapsed * 1000.0}
+                      for name, started, elapsed in self.steps],
+            'marks_ms': {name: at * 1000.0 for name, at in self.marks.items()},
+        }
+
+    def write_json(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False, indent=2)
+
+
+class _NullProfiler:
+    """未启用分析时使用，step()不做任何记录"""
+
+    @contextmanager
+    def step(self, name):
+        yield
+
+    def mark(self, name):
+        pass
+
+
+NULL_PROFILER = _NullProfiler()
+_active = NULL_PROFILER
+
+
+def start_profiling():
+    """启用启动耗时分析，应在导入其他模块之前调用"""
+    global _active
+    if _active is NULL_PROFILER:
+        _active = StartupProfiler().install()
+    return _active
+
+
+def get_profiler():
+    """当前的分析器，未启用时返回不做记录的空分析器"""
+    return _active
@@ -0,0 +1,287 @@
+# modules/tracing.py
+import os
+import json
+import time
+import uuid
+import threading
+from contextlib import contextmanager
+
+# Prometheus直方图的桶上限（秒），覆盖从毫秒级的剪贴板操作到分钟级的模型推理
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+class RotatingJsonlWriter:
+    """按文件大小滚动的JSONL写入器：trace.jsonl 写满后依次滚动为 trace.jsonl.1 ... .N"""
+
+    def __init__(self, path, max_bytes=5 * 1024 * 1024, backup_count=3):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.file = open(path, 'a', encoding='utf-8')
+
+    def write(self, record):
+        line = json.dumps(record, ensure_ascii=False) + '\n'
+        with self.lock:
+            if self.file is None:
+                return
+            self.file.write(line)
+            self.file.flush()
+            if self.max_bytes and self.file.tell() >= self.max_bytes:
+                self._rotate()
+
+    def _rotate(self):
+        self.file.close()
+        for i in range(self.backup_count - 1, 0, -1):
+            source = f"{self.path}.{i}"
+            if os.path.exists(source):
+                os.replace(source, f"{self.path}.{i + 1}")
+        if self.backup_count > 0:
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+        self.file = open(self.path, 'a', encoding='utf-8')
+
+    def close(self):
+        with self.lock:
+            if self.file is not None:
+                self.file.close()
+                self.file = None
+
+
+class StageHistogram:
+    """单个(追踪类型, 阶段)组合的累计直方图"""
+
+    __slots__ = ('bucket_counts', 'count', 'total', 'errors')
+
+    def __init__(self, bucket_count):
+        self.bucket_counts = [0] * bucket_count
+        self.count = 0
+        self.total = 0.0
+        self.errors = 0
+
+
+class PrometheusExporter:
+    """
+    在本地端口上以Prometheus文本格式暴露各阶段耗时直方图
+    只监听127.0.0.1，访问 http://127.0.0.1:<port>/metrics
+    """
+
+    def __init__(self, tracer, port, host='127.0.0.1'):
+        # 只有配置了指标端口时才需要http.server，避免拖慢启动
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+        exporter = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass  # 不输出访问日志
+
+            def do_GET(self):
+                if self.path.split('?')[0] != '/metrics':
+                    self.send_error(404)
+                    return
+                body = exporter.tracer.render_prometheus().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        self.tracer = tracer
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        print(f"📈 Prometheus指标已暴露: http://{host}:{self.server.server_address[1]}/metrics")
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class Trace:
+    """一次处理周期（如一次自动复制周期），包含若干阶段span"""
+
+    def __init__(self, tracer, kind):
+        self.tracer = tracer
+        self.kind = kind
+        self.trace_id = uuid.uuid4().hex[:16]
+        self.start = time.perf_counter()
+        self.wall_start = time.time()
+        self.attrs = {}  # 整体span的附加属性，如本次周期的处理结果
+
+    @contextmanager
+    def span(self, name, **attrs):
+        """
+        记录一个阶段的耗时；阶段内抛出的异常会被标记为error并继续抛出
+        异常类可以用span_status属性指定其他状态（如停止时的cancelled）
+        """
+        if not self.tracer.enabled:
+            yield attrs
+            return
+        wall_start = time.time()
+        start = time.perf_counter()
+        status = 'ok'
+        try:
+            yield attrs
+        except BaseException as e:
+            status = getattr(e, 'span_status', 'error')
+            raise
+        finally:
+            self.tracer.record(self, name, wall_start, time.perf_counter() - start, status, attrs)
+
+    def add_span(self, name, duration, **attrs):
+        """记录一个已在别处测得耗时的阶段，如元素在队列中的等待时间"""
+        if self.tracer.enabled:
+            self.tracer.record(self, name, time.time() - duration, duration, 'ok', attrs)
+
+
+class Tracer:
+    """
+    轻量级追踪器
+    每个span结束时写入滚动JSONL文件，并累计到Prometheus直方图中
+    """
+
+    def __init__(self, enabled=True, jsonl_path=None, max_bytes=5 * 1024 * 1024, backup_count=3,
+                 prometheus_port=None, buckets=DEFAULT_BUCKETS):
+        self.enabled = enabled
+        self.buckets = tuple(buckets)
+        self.histograms = {}
+        self.lock = threading.Lock()
+        self.writer = None
+        self.exporter = None
+        self.collectors = []  # 额外指标的渲染函数，返回Prometheus文本行列表
+        self.listeners = []  # 每个span结束时调用的函数，如进程内的指标聚合器
+        if not enabled:
+            return
+        if jsonl_path:
+            try:
+                self.writer = RotatingJsonlWriter(jsonl_path, max_bytes, backup_count)
+            except OSError as e:
+                print(f"⚠️ 无法打开追踪文件 {jsonl_path}: {e}")
+        if prometheus_port:
+            try:
+                self.exporter = PrometheusExporter(self, int(prometheus_port))
+            except OSError as e:
+                print(f"⚠️ 无法启动Prometheus指标端口 {prometheus_port}: {e}")
+
+    @classmethod
+    def from_config(cls, tracing_config, base_dir=None):
+        """
+        根据配置中的tracing块创建追踪器
+        :param base_dir: 相对的jsonl_path（包括默认的logs/trace.jsonl）相对于该目录，
+            通常是配置文件所在目录；None时相对于当前工作目录
+        """
+        tracing_config = tracing_config or {}
+        jsonl_path = tracing_config.get('jsonl_path', os.path.join('logs', 'trace.jsonl'))
+        if jsonl_path and base_dir and not os.path.isabs(jsonl_path):
+            jsonl_path = os.path.join(base_dir, jsonl_path)
+        return cls(
+            enabled=tracing_config.get('enabled', True),
+            jsonl_path=jsonl_path,
+            max_bytes=tracing_config.get('max_bytes', 5 * 1024 * 1024),
+            backup_count=tracing_config.get('backup_count', 3),
+            prometheus_port=tracing_config.get('prometheus_port'),
+        )
+
+    @contextmanager
+    def trace(self, kind):
+        """开始一次处理周期，结束时记录名为total的整体span"""
+        current = Trace(self, kind)
+        with current.span('total', **current.attrs) as attrs:
+            current.attrs = attrs
+            yield current
+
+    def record(self, trace, name, wall_start, duration, status, attrs):
+        """记录一个已结束的span"""
+        with self.lock:
+            key = (trace.kind, name)
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = StageHistogram(len(self.buckets))
+            for i, upper in enumerate(self.buckets):
+                if duration <= upper:
+                    histogram.bucket_counts[i] += 1
+                    break
+            histogram.count += 1
+            histogram.total += duration
+            if status == 'error':
+                histogram.errors += 1
+
+        for listener in self.listeners:
+            try:
+                listener(trace.kind, name, duration, status, attrs)
+            except Exception as e:
+                print(f"⚠️ 指标监听器出错: {e}")
+
+        if self.writer is not None:
+            record = {
+                'ts': round(wall_start, 6),
+                'trace_id': trace.trace_id,
+                'trace': trace.kind,
+                'span': name,
+                'duration_ms': round(duration * 1000.0, 3),
+                'status': status,
+            }
+            if attrs:
+                record['attrs'] = attrs
+            try:
+                self.writer.write(record)
+            except (OSError, TypeError, ValueError) as e:
+                print(f"⚠️ 写入追踪记录失败: {e}")
+
+    def add_listener(self, listener):
+        """注册span监听器：listener(追踪类型, 阶段, 耗时, 状态, 属性)，在记录span的线程中调用，应尽快返回"""
+        if self.enabled:
+            self.listeners.append(listener)
+
+    def add_collector(self, collector):
+        """注册额外指标（如队列深度），在render_prometheus时一并输出"""
+        if self.enabled:
+            self.collectors.append(collector)
+
+    def render_prometheus(self):
+        """以Prometheus文本格式输出各阶段耗时直方图"""
+        metric = 'chat_automation_stage_duration_seconds'
+        lines = [
+            f'# HELP {metric} Duration of each processing stage.',
+            f'# TYPE {metric} histogram',
+        ]
+        error_lines = [
+            '# HELP chat_automation_stage_errors_total Stages that ended with an exception.',
+            '# TYPE chat_automation_stage_errors_total counter',
+        ]
+        with self.lock:
+            items = sorted(self.histograms.items())
+            for (kind, name), histogram in items:
+                labels = f'trace="{kind}",stage="{name}"'
+                cumulative = 0
+                for upper, count in zip(self.buckets, histogram.bucket_counts):
+                    cumulative += count
+                    lines.append(f'{metric}_bucket{{{labels},le="{upper}"}} {cumulative}')
+                lines.append(f'{metric}_bucket{{{labels},le="+Inf"}} {histogram.count}')
+                lines.append(f'{metric}_sum{{{labels}}} {histogram.total:.6f}')
+                lines.append(f'{metric}_count{{{labels}}} {histogram.count}')
+                error_lines.append(f'chat_automation_stage_errors_total{{{labels}}} {histogram.errors}')
+        for collector in list(self.collectors):
+            try:
+                error_lines.extend(collector())
+            except Exception as e:
+                print(f"⚠️ 渲染额外指标失败: {e}")
+        return '\n'.join(lines + error_lines) + '\n'
+
+    def close(self):
+        """关闭文件和指标端口"""
+        if self.exporter is not None:
+            self.exporter.close()
+            self.exporter = None
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
+
+
+# 未配置追踪时使用的空追踪器，span不做任何记录
+NULL_TRACER = Tracer(enabled=False)
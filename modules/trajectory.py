@@ -0,0 +1,127 @@
+# modules/trajectory.py
+import time
+import random
+from collections import namedtuple
+
+# 预计算轨迹上的一个点：t为相对起点的计划时间（秒）
+TrajectoryPoint = namedtuple('TrajectoryPoint', ['t', 'x', 'y'])
+
+# 一次回放的结果，planned/actual单位为秒
+PlaybackResult = namedtuple('PlaybackResult', ['planned', 'actual', 'points_sent', 'points_skipped'])
+
+
+def ease_in_quad(progress):
+    """二次缓入（与原先的鼠标移动方式一致）"""
+    return progress * progress
+
+
+def ease_in_out_cubic(progress):
+    """三次缓入缓出，起步和到达时都较慢"""
+    if progress < 0.5:
+        return 4 * progress * progress * progress
+    return 1 - pow(-2 * progress + 2, 3) / 2
+
+
+def _sample_times(duration, rate_hz):
+    """按采样频率生成 (0, duration] 上均匀分布的时间点"""
+    steps = max(1, int(duration * rate_hz))
+    return [duration * (i + 1) / steps for i in range(steps)]
+
+
+def plan_eased_path(start, end, duration, rate_hz=60, easing=ease_in_quad, jitter=2.0):
+    """
+    规划直线缓动轨迹
+    :param start: 起点 (x, y)
+    :param end: 终点 (x, y)
+    :param duration: 计划总时长（秒）
+    :param rate_hz: 每秒的采样点数
+    :param easing: 缓动函数
+    :param jitter: 中间点的随机偏移幅度（像素），终点不加偏移
+    :return: TrajectoryPoint列表，最后一个点恰好落在终点
+    """
+    if duration <= 0:
+        return [TrajectoryPoint(0.0, end[0], end[1])]
+    points = []
+    times = _sample_times(duration, rate_hz)
+    for t in times[:-1]:
+        eased = easing(t / duration)
+        x = start[0] + (end[0] - start[0]) * eased + random.uniform(-jitter, jitter)
+        y = start[1] + (end[1] - start[1]) * eased + random.uniform(-jitter, jitter)
+        points.append(TrajectoryPoint(t, x, y))
+    points.append(TrajectoryPoint(duration, end[0], end[1]))
+    return points
+
+
+def plan_bezier_path(start, end, duration, rate_hz=60, easing=ease_in_out_cubic, curvature=0.3):
+    """
+    规划三次贝塞尔曲线轨迹，两个控制点在起终点连线两侧随机偏移，模拟手腕的弧线运动
+    :param curvature: 控制点偏离连线的最大幅度（相对连线长度的比例）
+    """
+    if duration <= 0:
+        return [TrajectoryPoint(0.0, end[0], end[1])]
+    sx, sy = start
+    ex, ey = end
+    dx, dy = ex - sx, ey - sy
+    # 连线的法向量，用于在两侧放置控制点
+    nx, ny = -dy, dx
+    c1 = (sx + dx * 0.3 + nx * random.uniform(-curvature, curvature),
+          sy + dy * 0.3 + ny * random.uniform(-curvature, curvature))
+    c2 = (sx + dx * 0.7 + nx * random.uniform(-curvature, curvature),
+          sy + dy * 0.7 + ny * random.uniform(-curvature, curvature))
+
+    points = []
+    times = _sample_times(duration, rate_hz)
+    for t in times[:-1]:
+        u = easing(t / duration)
+        v = 1 - u
+        x = v * v * v * sx + 3 * v * v * u * c1[0] + 3 * v * u * u * c2[0] + u * u * u * ex
+        y = v * v * v * sy + 3 * v * v * u * c1[1] + 3 * v * u * u * c2[1] + u * u * u * ey
+        points.append(TrajectoryPoint(t, x, y))
+    points.append(TrajectoryPoint(duration, ex, ey))
+    return points
+
+
+class TrajectoryPlayer:
+    """
+    按单调时钟的截止时间回放预计算轨迹
+    每个点在 起始时间 + 计划时间 - 预估注入开销 时发出；
+    落后于计划时跳过中间点，保证移动在计划时长内完成，终点总会发出
+    """
+
+    def __init__(self, move_fn, clock=time.perf_counter, sleep=time.sleep, overhead_smoothing=0.2):
+        """
+        :param move_fn: 注入一次鼠标移动的函数 move_fn(x, y)
+        :param clock: 单调时钟
+        :param sleep: 休眠函数
+        :param overhead_smoothing: 注入开销指数滑动平均的系数
+        """
+        self.move_fn = move_fn
+        self.clock = clock
+        self.sleep = sleep
+        self.overhead_smoothing = overhead_smoothing
+        self.injection_overhead = 0.0  # 单次move_fn调用耗时的滑动平均（秒）
+
+    def play(self, points):
+        """回放轨迹，返回PlaybackResult"""
+        if not points:
+            return PlaybackResult(0.0, 0.0, 0, 0)
+        planned = points[-1].t
+        start = self.clock()
+        sent = 0
+        skipped = 0
+        last_index = len(points) - 1
+        for i, point in enumerate(points):
+            now = self.clock()
+            # 已经赶不上下一个点的计划时间，当前中间点直接跳过
+            if i < last_index and now - start > points[i + 1].t:
+                skipped += 1
+                continue
+            wait = start + point.t - self.injection_overhead - now
+            if wait > 0:
+                self.sleep(wait)
+            call_start = self.clock()
+            self.move_fn(int(round(point.x)), int(round(point.y)))
+            cost = self.clock() - call_start
+            self.injection_overhead += (cost - self.injection_overhead) * self.overhead_smoothing
+            sent += 1
+        return PlaybackResult(planned, self.clock() - start, sent, skipped)
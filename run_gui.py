@@ -1,10 +1,35 @@
-import importlib.util
 import sys
+if '--profile-startup' in sys.argv:
+    # 在其他导入之前开始统计启动耗时
+    from modules.startup_profile import start_profiling
+    start_profiling()
+import importlib.util
 import os
 import traceback
 
+from modules.startup_profile import get_profiler
+
+
+def report_startup(profiler):
+    """
+    GUI进入事件循环后输出启动耗时分析
+    --profile-output <路径> 同时写入JSON，便于比较不同版本；--exit-after-startup 输出后直接退出
+    """
+    profiler.mark('GUI可用')
+    print(profiler.report())
+    if '--profile-output' in sys.argv:
+        index = sys.argv.index('--profile-output')
+        if index + 1 < len(sys.argv):
+            profiler.write_json(sys.argv[index + 1])
+            print(f"📄 启动耗时已写入: {sys.argv[index + 1]}")
+    if '--exit-after-startup' in sys.argv:
+        from PyQt5.QtWidgets import QApplication
+        QApplication.instance().quit()
+
+
 def main():
     print("🚀 启动聊天自动化系统...")
+    profiler = get_profiler()
     
     try:
         # 检查依赖
@@ -30,13 +55,15 @@ def main():
             print(f"❌ 找不到主模块文件: {main_module_path}")
             return
         
-        spec = importlib.util.spec_from_file_location("main_module", main_module_path)
-        main_module = importlib.util.module_from_spec(spec)
-        spec.loader.exec_module(main_module)
+        with profiler.step('import main'):
+            spec = importlib.util.spec_from_file_location("main_module", main_module_path)
+            main_module = importlib.util.module_from_spec(spec)
+            spec.loader.exec_module(main_module)
         
-        # 创建聊天自动化系统实例
+        # 创建聊天自动化系统实例（各模式的子系统在第一次使用时才创建）
         try:
-            automation_system = main_module.ChatAutomationApp("user_config.json")
+            with profiler.step('ChatAutomationApp.__init__'):
+                automation_system = main_module.ChatAutomationApp("user_config.json")
         except Exception as exc:
             print(f"⚠️ 初始化失败: {exc}")
             print(f"详细错误信息: {traceback.format_exc()}")
@@ -50,18 +77,26 @@ def main():
             print(f"❌ 找不到GUI应用文件: {gui_app_path}")
             return
         
-        gui_spec = importlib.util.spec_from_file_location("gui_app", gui_app_path)
-        gui_app_module = importlib.util.module_from_spec(gui_spec)
-        gui_spec.loader.exec_module(gui_app_module)
+        with profiler.step('import gui_app'):
+            gui_spec = importlib.util.spec_from_file_location("gui_app", gui_app_path)
+            gui_app_module = importlib.util.module_from_spec(gui_spec)
+            gui_spec.loader.exec_module(gui_app_module)
         
         from PyQt5.QtWidgets import QApplication
-        app = QApplication(sys.argv)
+        from PyQt5.QtCore import QTimer
+        with profiler.step('QApplication'):
+            app = QApplication(sys.argv)
         
         # 创建GUI应用实例 - 现在传递自动化系统实例
-        gui_app = gui_app_module.GUIApp(automation_system)
-        gui_app.show()
+        with profiler.step('GUIApp.__init__'):
+            gui_app = gui_app_module.GUIApp(automation_system)
+        with profiler.step('GUIApp.show'):
+            gui_app.show()
         
         print("✅ 系统启动完成，GUI已显示")
+        if '--profile-startup' in sys.argv:
+            # 第一次进入事件循环时窗口已可以响应操作
+            QTimer.singleShot(0, lambda: report_startup(profiler))
         
         # 启动Qt事件循环
         sys.exit(app.exec_())
@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+可取消的等待和请求测试脚本:
+    python test_cancellation.py
+在127.0.0.1的随机端口上启动一个慢速HTTP服务，模拟生成中的Ollama
+"""
+
+import os
+import sys
+import json
+import time
+import socket
+import select
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import requests
+
+from modules.cancellation import OperationCancelled, interruptible_sleep, wait_for_condition, post_json_cancellable
+
+
+class _SlowHandler(BaseHTTPRequestHandler):
+    """/slow 在delay秒后才返回（期间检测客户端是否断开），/error 返回500，其他路径立即返回"""
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        payload = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        if self.path == '/slow':
+            deadline = time.monotonic() + self.server.delay
+            while time.monotonic() < deadline:
+                readable, _, _ = select.select([self.connection], [], [], 0.01)
+                if readable and not self.connection.recv(1, socket.MSG_PEEK):
+                    self.server.disconnected.set()  # 客户端断开，相当于Ollama中止生成
+                    return
+        status = 500 if self.path == '/error' else 200
+        body = json.dumps({'response': payload.get('prompt', ''), 'done': True}).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class SlowServer:
+    def __init__(self, delay=5.0):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), _SlowHandler)
+        self.server.daemon_threads = True
+        self.server.delay = delay
+        self.server.disconnected = threading.Event()
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.base_url = f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def _cancel_after(seconds):
+    event = threading.Event()
+    threading.Timer(seconds, event.set).start()
+    return event
+
+
+def _request_threads():
+    return [t for t in threading.enumerate() if t.name == 'cancellable-post']
+
+
+def test_interruptible_sleep():
+    """未设置停止事件时睡满时长，设置后立即抛出OperationCancelled"""
+    event = threading.Event()
+    start = time.perf_counter()
+    interruptible_sleep(event, 0.05)
+    assert time.perf_counter() - start >= 0.05
+    interruptible_sleep(event, 0)  # 只检查一次
+
+    start = time.perf_counter()
+    try:
+        interruptible_sleep(_cancel_after(0.05), 5.0)
+    except OperationCancelled:
+        elapsed = time.perf_counter() - start
+    else:
+        raise AssertionError("停止事件设置后应抛出OperationCancelled")
+    assert elapsed < 0.5, elapsed
+    event.set()
+    try:
+        interruptible_sleep(event, -1)
+    except OperationCancelled:
+        pass
+    else:
+        raise AssertionError("事件已设置时seconds<=0也应抛出")
+
+    assert wait_for_condition(lambda: True, 0.01)
+    assert not wait_for_condition(lambda: False, 0.05)
+    print(f"✅ 可中断等待正常 (停止后 {elapsed * 1000:.0f}ms 返回)")
+
+
+def test_post_returns_response():
+    """正常返回requests.Response；HTTP错误状态照常返回，由调用方检查"""
+    server = SlowServer()
+    try:
+        response = post_json_cancellable(f"{server.base_url}/fast", {'prompt': '你好'}, threading.Event())
+        assert isinstance(response, requests.Response)
+        assert response.status_code == 200 and response.json()['response'] == '你好'
+        assert json.loads(response.text) == response.json()
+        response = post_json_cancellable(f"{server.base_url}/error", {'prompt': 'x'}, None)
+        assert response.status_code == 500
+    finally:
+        server.stop()
+    print("✅ 请求正常返回")
+
+
+def test_cancel_aborts_request():
+    """停止后立即返回，并断开连接，服务端看到客户端断开"""
+    server = SlowServer(delay=5.0)
+    try:
+        start = time.perf_counter()
+        try:
+            post_json_cancellable(f"{server.base_url}/slow", {'prompt': 'x'}, _cancel_after(0.1), poll_interval=0.01)
+        except OperationCancelled:
+            latency = time.perf_counter() - start - 0.1
+        else:
+            raise AssertionError("停止后应抛出OperationCancelled")
+        assert latency < 0.2, f"停止后 {latency:.3f}秒才返回"
+        assert server.server.disconnected.wait(1.0), "服务端应看到连接断开，而不是继续生成"
+        deadline = time.perf_counter() + 1.0
+        while _request_threads() and time.perf_counter() < deadline:
+            time.sleep(0.01)
+        assert not _request_threads(), "后台请求线程应随连接断开结束"
+    finally:
+        server.stop()
+    print(f"✅ 停止后立即中断请求 (延迟 {latency * 1000:.0f}ms)")
+
+
+def test_repeated_cancels_do_not_accumulate():
+    """反复启动和停止不会积累被放弃的请求，之后的请求不受影响"""
+    server = SlowServer(delay=5.0)
+    try:
+        for _ in range(8):
+            server.server.disconnected.clear()
+            try:
+                post_json_cancellable(f"{server.base_url}/slow", {'prompt': 'x'}, _cancel_after(0.02),
+                                      poll_interval=0.01)
+            except OperationCancelled:
+                pass
+            assert server.server.disconnected.wait(1.0)
+        start = time.perf_counter()
+        response = post_json_cancellable(f"{server.base_url}/fast", {'prompt': 'ok'}, threading.Event())
+        assert response.json()['response'] == 'ok' and time.perf_counter() - start < 0.5
+        time.sleep(0.05)
+        assert not _request_threads(), f"仍有 {len(_request_threads())} 个请求线程"
+    finally:
+        server.stop()
+    print("✅ 反复停止不积累后台请求")
+
+
+def test_errors_propagate():
+    """超时和连接失败以requests的异常抛出"""
+    server = SlowServer(delay=5.0)
+    try:
+        start = time.perf_counter()
+        try:
+            post_json_cancellable(f"{server.base_url}/slow", {'prompt': 'x'}, threading.Event(), timeout=0.2)
+        except requests.exceptions.Timeout:
+            elapsed = time.perf_counter() - start
+        else:
+            raise AssertionError("应抛出requests.exceptions.Timeout")
+        assert elapsed < 1.0, elapsed
+    finally:
+        server.stop()
+
+    with socket.socket() as probe:  # 取一个没有服务监听的端口
+        probe.bind(('127.0.0.1', 0))
+        port = probe.getsockname()[1]
+    try:
+        post_json_cancellable(f"http://127.0.0.1:{port}/api/generate", {}, threading.Event(), timeout=1)
+    except requests.exceptions.ConnectionError:
+        pass
+    else:
+        raise AssertionError("应抛出requests.exceptions.ConnectionError")
+    print(f"✅ 超时和连接错误正常抛出 (超时 {elapsed * 1000:.0f}ms)")
+
+
+if __name__ == "__main__":
+    test_interruptible_sleep()
+    test_post_returns_response()
+    test_cancel_aborts_request()
+    test_repeated_cancels_do_not_accumulate()
+    test_errors_propagate()
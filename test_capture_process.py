@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+截图子进程测试脚本:
+    python test_capture_process.py
+"""
+
+import os
+import sys
+import time
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+
+from modules.capture_process import FrameRing, CaptureProcess
+
+
+def test_frame_ring():
+    """共享内存环写入读取，槽位被覆盖后旧序号读不到"""
+    ring = FrameRing(slots=2, slot_bytes=64 * 48 * 3)
+    try:
+        frame = np.random.default_rng(0).integers(0, 255, (48, 64, 3), dtype=np.uint8)
+        assert ring.write(1, 1, frame)
+        copy = ring.read(1, 1)
+        assert np.array_equal(copy, frame) and not np.shares_memory(copy, frame)
+        assert np.array_equal(ring.read(1, 1, (10, 5, 20, 8)), frame[5:13, 10:30])
+        assert ring.write(1, 3, np.zeros_like(frame))
+        assert ring.read(1, 1) is None, "被覆盖的帧应返回None"
+        assert not ring.write(0, 2, np.zeros((100, 100, 3), np.uint8)), "超过槽位大小的帧不写入"
+    finally:
+        ring.close()
+    print("✅ 共享内存帧环读写正常")
+
+
+def test_capture_process():
+    """子进程截图并发送变化事件，主进程从共享内存读取变化区域"""
+    capture = CaptureProcess(region=(0, 0, 640, 360), interval=0.02, level=1,
+                             max_frame_bytes=640 * 360 * 3,
+                             grab='benchmarks.bench_capture_process:synthetic_grab').start()
+    try:
+        events = []
+        deadline = time.time() + 15
+        while time.time() < deadline and len([e for e in events if e.seq and not e.first]) < 3:
+            event = capture.get_event(timeout=0.5)
+            if event is not None:
+                events.append(event)
+        assert capture.alive
+        assert events and events[0].first and events[0].shape == (360, 640, 3)
+        changes = [e for e in events if e.seq and not e.first]
+        assert len(changes) >= 3, f"应收到变化事件: {events}"
+        event = changes[-1]
+        assert event.ratio > 0 and event.rects
+        x, y, w, h = event.rects[0]
+        region = capture.read(event, event.rects[0])
+        assert region is None or region.shape == (h, w, 3)
+
+        capture.set_region((0, 0, 320, 200))
+        deadline = time.time() + 10
+        while time.time() < deadline:
+            event = capture.get_event(timeout=0.5)
+            if event is not None and event.first and event.shape == (200, 320, 3):
+                break
+        else:
+            raise AssertionError("修改区域后应重新发送第一帧")
+    finally:
+        capture.stop()
+    assert not capture.alive
+    print(f"✅ 截图子进程正常 (收到 {len(events)} 个事件)")
+
+
+if __name__ == "__main__":
+    test_frame_ring()
+    test_capture_process()
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+捕获点变化闸门测试脚本:
+    python test_change_gate.py
+使用合成的灰度区域和替身截图器，不截取屏幕
+"""
+
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+
+from modules.change_gate import PatchChangeGate
+
+
+def _patch(changed_pixels=0, delta=255):
+    """64x64的灰度区域，前changed_pixels个像素加上delta"""
+    patch = np.full((64, 64), 40, np.uint8)
+    patch.reshape(-1)[:changed_pixels] = min(255, 40 + delta)
+    return patch
+
+
+def test_threshold():
+    """变化像素占比超过change_threshold才算变化，灰度差不超过pixel_threshold的像素不计入"""
+    gate = PatchChangeGate(patch_size=64, change_threshold=0.01, pixel_threshold=16)
+    point = (100, 200)
+    gate.commit(_patch(), point)
+    limit = int(64 * 64 * 0.01)  # 40个像素
+    assert not gate.has_changed(_patch(), point)
+    assert not gate.has_changed(_patch(limit), point), "恰好等于阈值不算变化"
+    assert gate.has_changed(_patch(limit + 1), point)
+    assert not gate.has_changed(_patch(64 * 64, delta=16), point), "灰度差未超过pixel_threshold应视为噪声"
+    assert gate.has_changed(_patch(64 * 64, delta=17), point)
+    assert abs(gate.change_ratio(_patch(410)) - 410 / 4096) < 1e-9
+    print("✅ 变化阈值正常")
+
+
+def test_commit_semantics():
+    """没有基准、捕获点改变或尺寸改变时视为有变化；commit后以新区域为基准，reset后重新视为有变化"""
+    gate = PatchChangeGate(patch_size=64)
+    before, after = _patch(), _patch(2000)
+    assert gate.has_changed(before, (1, 1)), "没有基准时应视为有变化"
+    gate.commit(before, (1, 1))
+    assert not gate.has_changed(before, (1, 1))
+    assert gate.has_changed(before, (2, 1)), "捕获点改变时应视为有变化"
+    assert gate.has_changed(np.full((32, 32), 40, np.uint8), (1, 1)), "区域尺寸改变时应视为有变化"
+
+    # 只检查不提交时基准不变：同一条消息在处理完成前一直算作变化
+    assert gate.has_changed(after, (1, 1)) and gate.has_changed(after, (1, 1))
+    gate.commit(after, (1, 1))
+    assert not gate.has_changed(after, (1, 1)) and gate.has_changed(before, (1, 1))
+    gate.reset()
+    assert gate.baseline is None and gate.has_changed(after, (1, 1))
+    print("✅ 基准提交和重置正常")
+
+
+class FakeGrabber:
+    """记录截图区域和屏幕尺寸的查询次数，返回与区域同尺寸的灰度图"""
+
+    def __init__(self, size=(1920, 1080)):
+        self.size = size
+        self.size_queries = 0
+        self.regions = []
+
+    def screen_size(self):
+        self.size_queries += 1
+        return self.size
+
+    def grab_gray(self, region):
+        self.regions.append(region)
+        return np.full((region[3], region[2]), 40, np.uint8)
+
+
+def test_capture_patch():
+    """截图区域以捕获点为中心并限制在屏幕内；屏幕尺寸只查询一次，reset后重新查询"""
+    grabber = FakeGrabber()
+    gate = PatchChangeGate(patch_size=64, grabber=grabber)
+    assert gate.capture_patch(500, 400).shape == (64, 64)
+    gate.capture_patch(5, 1079)
+    gate.capture_patch(1919, 3)
+    assert grabber.regions == [(468, 368, 64, 64), (0, 1016, 64, 64), (1856, 0, 64, 64)]
+    assert grabber.size_queries == 1, "屏幕尺寸应缓存"
+
+    grabber.size = (1280, 720)
+    gate.reset()
+    gate.capture_patch(1279, 719)
+    assert grabber.regions[-1] == (1216, 656, 64, 64) and grabber.size_queries == 2
+    print("✅ 截图区域和屏幕尺寸缓存正常")
+
+
+if __name__ == "__main__":
+    test_threshold()
+    test_commit_semantics()
+    test_capture_patch()
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+聊天目标测试脚本:
+    python test_chat_targets.py
+配置写入临时目录，使用替身输入后端和剪贴板，不操作真实的鼠标键盘
+"""
+
+import os
+import sys
+import json
+import time
+import tempfile
+import threading
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from modules.config_loader import ConfigLoader
+from modules.config_snapshot import read_target_definitions, build_snapshot
+from modules.chat_targets import build_chat_targets
+from modules.auto_copy_handler import AutoCopyHandler
+from modules.tracing import Tracer
+
+
+def _target(name, capture, input_point):
+    return {'name': name, 'copy_area_coords': {'x': capture[0], 'y': capture[1]},
+            'input_coords': {'x': input_point[0], 'y': input_point[1]}}
+
+
+def _temp_loader(config):
+    path = os.path.join(tempfile.mkdtemp(), 'config.json')
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(config, f)
+    return ConfigLoader(path)
+
+
+def test_parse_definitions():
+    """chat_targets列表中每一项是一个目标；未命名的项按序号命名，坐标未设置的项被跳过"""
+    config = {'monitoring': {'chat_targets': [
+        _target('群聊A', (10, 20), (30, 40)),
+        {'copy_area_coords': {'x': 50, 'y': 60}, 'input_coords': {'x': 70, 'y': 80}},
+        _target('未设置输入框', (1, 1), (0, 0)),
+        {'name': '未设置捕获点', 'input_coords': {'x': 5, 'y': 5}},
+    ]}}
+    assert read_target_definitions(config, warn=False) == [
+        ('群聊A', (10, 20), (30, 40)), ('target2', (50, 60), (70, 80))]
+    snapshot = build_snapshot(config)
+    assert [tuple(spec) for spec in snapshot.chat_targets] == read_target_definitions(config, warn=False)
+    assert snapshot.chat_targets[0].capture_point == (10, 20) and snapshot.chat_targets[0].input_point == (30, 40)
+    print("✅ 聊天目标定义解析正常")
+
+
+def test_single_target_fallback():
+    """没有chat_targets列表时回退到monitoring.copy_area_coords/input_coords，再回退到旧的capture_point/input_point"""
+    config = {'monitoring': {'copy_area_coords': {'x': 520, 'y': 997}, 'input_coords': {'x': 449, 'y': 1159}},
+              'capture_point': {'x': 1, 'y': 2}, 'input_point': {'x': 3, 'y': 4}}
+    assert read_target_definitions(config) == [('default', (520, 997), (449, 1159))]
+    assert read_target_definitions({'monitoring': {'chat_targets': []}, 'capture_point': {'x': 1, 'y': 2},
+                                    'input_point': {'x': 3, 'y': 4}}) == [('default', (1, 2), (3, 4))]
+    assert read_target_definitions({'monitoring': {}}, warn=False) == []
+    assert build_snapshot({}).chat_targets == ()
+    print("✅ 单目标坐标回退正常")
+
+
+def test_reuse_by_key():
+    """重新加载配置时名称和坐标都未改变的目标沿用原对象（保留去重表和历史），改变的目标重新创建"""
+    config = {'monitoring': {'chat_targets': [_target('A', (10, 20), (30, 40)), _target('B', (50, 60), (70, 80))]}}
+    targets = build_chat_targets(config)
+    a, b = targets
+    a.record_exchange("在吗？", "在的")
+    b.record_exchange("你好", "你好呀")
+
+    config['monitoring']['chat_targets'] = [_target('B', (50, 60), (70, 99)), _target('A', (10, 20), (30, 40)),
+                                            _target('C', (1, 2), (3, 4))]
+    reloaded = build_chat_targets(config, existing=targets)
+    assert [t.name for t in reloaded] == ['B', 'A', 'C']
+    assert reloaded[1] is a and a.replies_sent == 1 and a.format_history() == "用户: 在吗？\n你: 在的"
+    assert reloaded[0] is not b and reloaded[0].replies_sent == 0, "输入框改变的目标应重新创建"
+    assert reloaded[0].input_point == (70, 99) and reloaded[0].format_history() == ""
+
+    definitions = [('A', [10, 20], [30, 40])]  # 列表形式的坐标与元组形式的键相同
+    assert build_chat_targets(config, existing=reloaded, definitions=definitions) == [a]
+    print("✅ 按名称和坐标沿用目标正常")
+
+
+class _FakeInput:
+    name = 'fake'
+
+    def move_to(self, x, y):
+        pass
+
+
+class _FakeClipboard:
+    name = 'fake'
+
+    def clear(self):
+        pass
+
+
+def _run_capture_loop(handler, seconds):
+    captures = []
+
+    def capture(trace, target, settings):
+        captures.append((target.name, time.perf_counter()))
+        return None  # 没有新消息
+
+    handler._capture_message = capture
+    thread = threading.Thread(target=handler._pipeline_capture_loop, daemon=True)
+    thread.start()
+    time.sleep(seconds)
+    handler.stop_event.set()
+    thread.join(2.0)
+    assert not thread.is_alive(), "停止后捕获线程应退出"
+    return captures
+
+
+def test_per_target_scheduling():
+    """捕获线程总是先处理最早到期的目标，每个目标按各自的间隔调度，运行中新增的目标也被调度"""
+    config = _temp_loader({'auto_copy_interval': 0,
+                           'monitoring': {'chat_targets': [_target('A', (10, 20), (30, 40)),
+                                                           _target('B', (50, 60), (70, 80))]}})
+    handler = AutoCopyHandler(config, tracer=Tracer(jsonl_path=None), input_backend=_FakeInput(),
+                              clipboard_backend=_FakeClipboard())
+    captures = _run_capture_loop(handler, 1.3)
+    names = [name for name, _ in captures]
+    assert names[:2] == ['A', 'B'], "两个目标都应立即捕获一次"
+    for name in ('A', 'B'):
+        times = [t for n, t in captures if n == name]
+        assert len(times) >= 2, captures
+        gaps = [later - earlier for earlier, later in zip(times, times[1:])]
+        assert all(0.45 <= gap < 1.1 for gap in gaps), (name, gaps)  # 间隔 max(0.5, interval±0.5)
+
+    # 热重载新增目标：原有目标沿用，新目标在下一轮被调度
+    a = handler.targets[0]
+    handler.stop_event.clear()
+    config.set('monitoring.chat_targets', [_target('A', (10, 20), (30, 40)), _target('B', (50, 60), (70, 80)),
+                                           _target('C', (90, 100), (110, 120))])
+    captures = _run_capture_loop(handler, 0.8)
+    assert handler.targets[0] is a and [t.name for t in handler.targets] == ['A', 'B', 'C']
+    assert 'C' in [name for name, _ in captures], captures
+    print(f"✅ 按目标调度捕获正常 (首轮 {len(names)} 次捕获)")
+
+
+if __name__ == "__main__":
+    test_parse_definitions()
+    test_single_target_fallback()
+    test_reuse_by_key()
+    test_per_target_scheduling()
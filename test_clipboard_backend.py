@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+X11剪贴板后端测试脚本，需要在Xvfb等虚拟显示中运行:
+    xvfb-run -a python test_clipboard_backend.py
+用两个独立的后端实例模拟本程序和聊天窗口；没有X11显示时自动跳过
+"""
+
+import os
+import sys
+import threading
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from testing_support import skip
+
+
+def _x11_backends():
+    if not os.environ.get('DISPLAY'):
+        skip("没有X11显示，跳过X11剪贴板测试")
+        return None
+    from modules.clipboard_backend import X11ClipboardBackend
+    return X11ClipboardBackend(), X11ClipboardBackend()
+
+
+def test_copy_paste_between_clients():
+    """一个实例写入的文本（含中文）能被另一个实例读取"""
+    backends = _x11_backends()
+    if backends is None:
+        return
+    ours, chat = backends
+    try:
+        chat.copy("你好，剪贴板 clipboard")
+        assert ours.paste() == "你好，剪贴板 clipboard", ours.paste()
+        ours.copy("AI回复")
+        assert chat.paste() == "AI回复"
+        assert ours.paste() == "AI回复"  # 自己持有时直接返回
+        print("✅ X11剪贴板读写正常")
+    finally:
+        ours.close()
+        chat.close()
+
+
+def test_long_text():
+    """较长的文本能完整读取"""
+    backends = _x11_backends()
+    if backends is None:
+        return
+    ours, chat = backends
+    try:
+        text = "消息" * 20000
+        chat.copy(text)
+        assert ours.paste() == text
+        print("✅ 长文本读取正常")
+    finally:
+        ours.close()
+        chat.close()
+
+
+def test_owner_change_notification():
+    """其他客户端取得剪贴板时 wait_for_change 立即返回，自己的copy()不算变化"""
+    backends = _x11_backends()
+    if backends is None:
+        return
+    ours, chat = backends
+    try:
+        token = ours.change_token()
+        ours.copy("")
+        assert not ours.wait_for_change(token, timeout=0.2), "自己的copy()不应唤醒等待"
+
+        token = ours.change_token()
+        timer = threading.Timer(0.1, chat.copy, args=("新消息",))
+        timer.start()
+        assert ours.wait_for_change(token, timeout=2.0), "没有收到所有者变化通知"
+        assert ours.paste() == "新消息"
+        print("✅ 所有者变化通知正常")
+    finally:
+        ours.close()
+        chat.close()
+
+
+def test_wait_cancelled():
+    """停止事件被设置时等待立即中断"""
+    backends = _x11_backends()
+    if backends is None:
+        return
+    from modules.cancellation import OperationCancelled
+    ours, chat = backends
+    try:
+        stop_event = threading.Event()
+        threading.Timer(0.1, stop_event.set).start()
+        try:
+            ours.wait_for_change(ours.change_token(), timeout=5.0, cancel_event=stop_event)
+        except OperationCancelled:
+            print("✅ 等待可被停止事件中断")
+        else:
+            raise AssertionError("停止事件没有中断等待")
+    finally:
+        ours.close()
+        chat.close()
+
+
+if __name__ == "__main__":
+    test_copy_paste_between_clients()
+    test_long_text()
+    test_owner_change_notification()
+    test_wait_cancelled()
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+配置快照测试脚本:
+    python test_config_snapshot.py
+在临时目录中运行，不会修改项目的配置文件
+"""
+
+import os
+import sys
+import json
+import tempfile
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from modules.config_loader import ConfigLoader
+from modules.config_snapshot import build_snapshot, resolve_ollama_model, DEFAULT_OLLAMA_MODEL
+
+
+def _temp_loader():
+    path = os.path.join(tempfile.mkdtemp(), 'config.json')
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({'prompt_template': '回复：{message}'}, f)
+    return ConfigLoader(path)
+
+
+def test_snapshot_immutable():
+    """快照及其各节都不能修改，修改原配置字典也不影响已构建的快照"""
+    config = {'ollama': {'url': 'http://127.0.0.1:1/api/generate'}, 'auto_copy_interval': 2,
+              'monitoring': {'chat_targets': [{'name': 'a', 'copy_area_coords': {'x': 1, 'y': 2},
+                                               'input_coords': {'x': 3, 'y': 4}}]}}
+    snapshot = build_snapshot(config, 1)
+    for target, name in ((snapshot, 'version'), (snapshot.ollama, 'model'), (snapshot.auto_copy, 'interval')):
+        try:
+            setattr(target, name, None)
+        except AttributeError:
+            pass
+        else:
+            raise AssertionError(f"快照的 {name} 不应可修改")
+    assert isinstance(snapshot.chat_targets, tuple) and snapshot.chat_targets[0].capture_point == (1, 2)
+
+    config['ollama']['url'] = 'http://changed'
+    config['auto_copy_interval'] = 9
+    config['monitoring']['chat_targets'][0]['copy_area_coords']['x'] = 100
+    assert snapshot.ollama.url == 'http://127.0.0.1:1/api/generate'
+    assert snapshot.auto_copy.interval == 2.0 and snapshot.chat_targets[0].capture_point == (1, 2)
+    print("✅ 快照不可修改")
+
+
+def test_version_bumps():
+    """每次修改发布新快照，版本号递增，旧快照保持不变；批量修改只发布一次"""
+    config = _temp_loader()
+    try:
+        first = config.snapshot()
+        config.set('auto_copy_interval', 5)
+        second = config.snapshot()
+        assert second is not first and second.version == first.version + 1
+        assert second.auto_copy.interval == 5.0 and first.auto_copy.interval != 5.0
+
+        with config.batch_update():
+            config.set('auto_copy_interval', 6)
+            config.set('humanize_delay_scale', 0.5)
+            assert config.snapshot() is second, "批量修改完成前不应发布快照"
+        third = config.snapshot()
+        assert third.version == second.version + 1
+        assert third.auto_copy.interval == 6.0 and third.auto_copy.delay_scale == 0.5
+
+        config.set('auto_copy_interval', 'abc')  # 无效值：保留上一份快照
+        assert config.snapshot() is third
+        print(f"✅ 快照版本递增 ({first.version} -> {third.version})")
+    finally:
+        config.close()
+
+
+def test_model_precedence():
+    """当前选择的ollama_model优先于ollama.model"""
+    both = {'ollama': {'model': 'qwen3:8b'}, 'ollama_model': 'llama3'}
+    assert resolve_ollama_model(both) == 'llama3' and build_snapshot(both, 1).ollama.model == 'llama3'
+    assert resolve_ollama_model({'ollama': {'model': 'qwen3:8b'}}) == 'qwen3:8b'
+    assert resolve_ollama_model({'ollama_model': ''}) == DEFAULT_OLLAMA_MODEL
+    print("✅ 模型选择优先级一致")
+
+
+if __name__ == "__main__":
+    test_snapshot_immutable()
+    test_version_bumps()
+    test_model_precedence()
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+配置文件热重载测试脚本:
+    python test_config_watcher.py
+在临时目录中运行，不会修改项目的配置文件
+"""
+
+import os
+import sys
+import json
+import time
+import tempfile
+import threading
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from modules.config_loader import ConfigLoader, diff_config
+from modules.config_watcher import ConfigWatcher
+
+
+def _write_atomic(path, data):
+    temp_path = path + '.tmp'
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f)
+    os.replace(temp_path, path)
+
+
+def test_diff_config():
+    """只报告真正变化的键，嵌套字典按点分路径报告"""
+    old = {'screen_region': {'width': 800, 'height': 600}, 'ollama_model': 'a', 'removed': 1}
+    new = {'screen_region': {'width': 1024, 'height': 600}, 'ollama_model': 'a', 'added': [1]}
+    assert sorted(diff_config(old, new)) == ['added', 'removed', 'screen_region.width']
+    print("✅ 配置差异比较正常")
+
+
+def test_reload_applies_only_changes():
+    """外部修改文件后只应用变化的键；本进程自己写入的内容不算变化"""
+    path = os.path.join(tempfile.mkdtemp(), 'config.json')
+    _write_atomic(path, {'screen_region': {'width': 800}, 'auto_copy_interval': 2})
+    config = ConfigLoader(path)
+    shared = config.config  # 其他组件持有的同一个字典
+
+    changes = []
+    done = threading.Event()
+
+    def on_change():
+        changes.append(config.reload())
+        done.set()
+
+    watcher = ConfigWatcher(path, on_change, debounce=0.05, poll_interval=0.1)
+    watcher.start()
+    try:
+        time.sleep(0.1)
+        _write_atomic(path, {'screen_region': {'width': 1024}, 'auto_copy_interval': 2})
+        assert done.wait(2.0), "没有收到文件变化通知"
+        assert changes[-1] == ['screen_region.width'], changes
+        assert shared['screen_region']['width'] == 1024
+        assert config.snapshot().auto_copy.interval == 2.0
+
+        done.clear()
+        config.set('auto_copy_interval', 1)
+        config.flush()
+        assert done.wait(2.0), "没有收到文件变化通知"
+        assert changes[-1] == [], "本进程自己的写入不应被视为变化"
+        print(f"✅ 热重载只应用变化的键 ({watcher.mode})")
+    finally:
+        watcher.stop()
+
+
+if __name__ == "__main__":
+    test_diff_config()
+    test_reload_applies_only_changes()
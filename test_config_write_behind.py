@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ConfigLoader延迟写回测试脚本:
+    python test_config_write_behind.py
+在临时目录中运行，不会修改项目的配置文件
+"""
+
+import os
+import sys
+import json
+import time
+import tempfile
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from modules.config_loader import ConfigLoader
+
+
+def _temp_config():
+    directory = tempfile.mkdtemp()
+    path = os.path.join(directory, 'config.json')
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({'monitoring': {'input_coords': {'x': 0, 'y': 0}}}, f)
+    return directory, path
+
+
+def test_burst_coalesced_into_one_write():
+    """一串连续修改只产生一次写入，且写入的是最后的值"""
+    directory, path = _temp_config()
+    config = ConfigLoader(path, write_behind=True, debounce=0.2)
+    try:
+        for i in range(50):
+            config.set('monitoring.input_coords', {'x': i, 'y': i})
+            time.sleep(0.002)
+        time.sleep(0.5)
+        stats = config.get_write_stats()
+        assert stats['writes'] == 1, stats
+        assert stats['coalesced'] == 49, stats
+        with open(path, encoding='utf-8') as f:
+            assert json.load(f)['monitoring']['input_coords'] == {'x': 49, 'y': 49}
+        assert not [name for name in os.listdir(directory) if name.endswith('.tmp')], "残留临时文件"
+        print(f"✅ 50次修改合并为 {stats['writes']} 次写入，耗时 {stats['last_write_ms']:.2f}ms")
+    finally:
+        config.close()
+
+
+def test_max_delay_bounds_continuous_edits():
+    """持续修改时仍按max_delay定期写入"""
+    directory, path = _temp_config()
+    config = ConfigLoader(path, write_behind=True, debounce=0.2, max_delay=0.3)
+    try:
+        end = time.perf_counter() + 1.0
+        i = 0
+        while time.perf_counter() < end:
+            config.set('counter', i)
+            i += 1
+            time.sleep(0.05)
+        stats = config.get_write_stats()
+        assert stats['writes'] >= 2, stats
+        print(f"✅ 持续修改1秒期间写入 {stats['writes']} 次")
+    finally:
+        config.close()
+
+
+def test_close_flushes_pending():
+    """关闭时写入尚未到期的修改"""
+    directory, path = _temp_config()
+    config = ConfigLoader(path, write_behind=True, debounce=10.0, max_delay=10.0)
+    config.set('ollama_model', 'qwen3:8b')
+    config.close()
+    with open(path, encoding='utf-8') as f:
+        assert json.load(f)['ollama_model'] == 'qwen3:8b'
+    assert config.get_write_stats()['pending_keys'] == []
+    print("✅ 关闭时未保存的修改已写入")
+
+
+if __name__ == "__main__":
+    test_burst_coalesced_into_one_write()
+    test_max_delay_bounds_continuous_edits()
+    test_close_flushes_pending()
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+会话存储测试脚本:
+    python test_conversation_store.py
+"""
+
+import os
+import sys
+import time
+import sqlite3
+import tempfile
+import threading
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from modules.conversation_store import ConversationStore, ROLE_USER, ROLE_ASSISTANT
+
+from testing_support import skip
+
+
+def new_store(**kwargs):
+    return ConversationStore(os.path.join(tempfile.mkdtemp(), 'conversations.db'), **kwargs)
+
+
+def test_queries():
+    """最近历史按时间排列，指纹查询忽略空白和全半角差异"""
+    store = new_store()
+    try:
+        now = time.time()
+        store.append('a', ROLE_USER, '你好', ts=now - 100)
+        store.append('a', ROLE_ASSISTANT, '你好！有什么可以帮你？', ts=now - 99)
+        store.append('b', ROLE_USER, '在吗', ts=now - 50)
+        store.append('a', ROLE_USER, '今天天气怎么样', ts=now - 10)
+        assert store.flush()
+        recent = store.recent('a', limit=2)
+        assert [m.text for m in recent] == ['你好！有什么可以帮你？', '今天天气怎么样']
+        assert [m.role for m in store.recent('a', since=now - 60)] == [ROLE_USER]
+        assert store.lookup('  今天天气怎么样 ') == ROLE_USER
+        assert store.lookup('你好！有什么可以帮你?', chat='a') == ROLE_ASSISTANT
+        assert store.lookup('在吗', chat='a') is None and store.lookup('在吗', since=now - 1) is None
+        assert store.count() == 4 and store.count('b') == 1
+        mode = store._reader().execute("PRAGMA journal_mode").fetchone()[0]
+        assert mode == 'wal', mode
+    finally:
+        store.close()
+    print("✅ 会话查询正常 (WAL模式)")
+
+
+def test_batched_writes():
+    """多个线程同时写入，由写入线程合并为少量事务，关闭时写完剩余消息"""
+    store = new_store()
+    path = store.path
+
+    def produce(chat):
+        for i in range(2000):
+            store.append(chat, ROLE_USER, f"{chat} 消息 {i}")
+
+    threads = [threading.Thread(target=produce, args=(f"chat{n}",)) for n in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    store.close()
+    stats = store.get_stats()
+    assert stats['written'] == 8000 and stats['dropped'] == 0
+    assert stats['batches'] < 8000 and stats['max_batch'] > 1, stats
+
+    reopened = ConversationStore(path)
+    try:
+        assert reopened.count() == 8000 and reopened.count('chat3') == 2000
+        assert reopened.recent('chat0', limit=1)[0].text == 'chat0 消息 1999'
+    finally:
+        reopened.close()
+    print(f"✅ 批量写入正常 ({stats['batches']} 个事务，平均每批 {stats['avg_batch']:.0f} 条)")
+
+
+def test_append_never_blocks():
+    """数据库被其他连接锁住时，append()不等待，队列满后丢弃新消息"""
+    store = new_store(max_pending=100)
+    blocker = sqlite3.connect(store.path)
+    try:
+        blocker.execute("BEGIN IMMEDIATE")  # 占住写锁，写入线程只能等待
+        start = time.perf_counter()
+        results = [store.append('a', ROLE_USER, f"消息 {i}") for i in range(500)]
+        elapsed = time.perf_counter() - start
+        assert elapsed < 0.5, f"append被阻塞了 {elapsed:.2f}秒"
+        assert results.count(False) > 0 and store.get_stats()['dropped'] == results.count(False)
+        blocker.rollback()
+        assert store.flush()
+        assert store.count() == results.count(True)
+    finally:
+        blocker.close()
+        store.close()
+    print(f"✅ 写入不阻塞调用方 (500次append耗时 {elapsed * 1000:.1f}ms)")
+
+
+def test_chat_target_restore():
+    """重建聊天目标时从存储恢复对话历史和去重指纹"""
+    try:
+        from modules.chat_targets import ChatTarget
+        from modules.dedup_store import KIND_INBOUND, KIND_REPLY
+    except ImportError as e:
+        skip(f"缺少依赖，跳过聊天目标恢复测试: {e}")
+        return
+    store = new_store()
+    try:
+        target = ChatTarget('main', (10, 10), (20, 20), history_turns=1, store=store)
+        target.record_exchange('第一条消息', '第一条回复')
+        target.record_exchange('第二条消息', '第二条回复')
+        assert store.flush()
+
+        restarted = ChatTarget('main', (10, 10), (20, 20), history_turns=1, store=store)
+        assert list(restarted.history) == [('user', '第二条消息'), ('assistant', '第二条回复')]
+        assert restarted.dedup_store.check('第一条消息') == KIND_INBOUND
+        assert restarted.dedup_store.check('第二条回复') == KIND_REPLY
+        other = ChatTarget('other', (30, 30), (40, 40), store=store)
+        assert len(other.history) == 0 and other.dedup_store.check('第一条消息') is None
+    finally:
+        store.close()
+    print("✅ 聊天目标重启后恢复对话和去重指纹")
+
+
+if __name__ == "__main__":
+    test_queries()
+    test_batched_writes()
+    test_append_never_blocks()
+    test_chat_target_restore()
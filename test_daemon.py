@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+守护进程模式和控制socket测试脚本:
+    python test_daemon.py
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import signal
+import socket
+import tempfile
+import subprocess
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from modules.control_server import ControlServer, send_command
+from modules.metrics import MetricsAggregator
+from modules.tracing import Tracer
+
+PROJECT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+class FakeApp:
+    """只实现控制socket用到的接口，不创建任何子系统"""
+
+    def __init__(self, start_ok=True):
+        self.running = False
+        self.mode = 'auto_copy'
+        self.model = 'qwen3:8b'
+        self.start_ok = start_ok
+        self.calls = []
+        self.tracer = Tracer(jsonl_path=None)
+        self.metrics = MetricsAggregator().attach(self.tracer)
+
+    def is_running(self):
+        return self.running
+
+    def get_status(self):
+        return {'running': self.running, 'mode': self.mode, 'model': self.model}
+
+    def start_monitoring(self):
+        self.calls.append('start')
+        self.running = self.start_ok
+        return self.start_ok
+
+    def stop_monitoring(self):
+        self.calls.append('stop')
+        self.running = False
+
+    def switch_mode(self, mode):
+        self.mode = mode
+
+    def update_model(self, model):
+        self.model = model
+
+
+def test_commands():
+    """各命令的响应，以及错误请求不会断开连接"""
+    path = os.path.join(tempfile.mkdtemp(), 'control.sock')
+    app = FakeApp()
+    with app.tracer.trace('auto_copy') as trace:
+        with trace.span('capture'):
+            pass
+    server = ControlServer(app, path).start()
+    try:
+        assert oct(os.stat(path).st_mode & 0o777) == oct(0o600), "socket文件应只允许当前用户访问"
+        assert send_command('ping', path=path) == {'ok': True, 'pong': True}
+        response = send_command('start', path=path)
+        assert response['ok'] and response['changed'] and response['running']
+        assert send_command('start', path=path)['changed'] is False, "已在运行时不应重复启动"
+        assert send_command('mode', path=path, mode='screen_monitor')['mode'] == 'screen_monitor'
+        assert not send_command('mode', path=path, mode='bogus')['ok']
+        assert send_command('model', path=path, model=' llama3 ')['model'] == 'llama3'
+        stats = send_command('stats', path=path)
+        assert stats['metrics']['stages']['auto_copy/capture']['count'] == 1
+        assert stats['process']['pid'] == os.getpid()
+        assert send_command('stop', path=path)['running'] is False
+        assert app.calls == ['start', 'stop']
+
+        # 同一连接上连续发送：无效JSON、未知命令、正常命令
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(5)
+            sock.connect(path)
+            sock.sendall(b'not json\n{"cmd": "reboot"}\n{"cmd": "status"}\n')
+            reader = sock.makefile('rb')
+            responses = [json.loads(reader.readline()) for _ in range(3)]
+        assert not responses[0]['ok'] and '无效的JSON' in responses[0]['error']
+        assert not responses[1]['ok'] and '未知命令' in responses[1]['error']
+        assert responses[2]['ok'] and responses[2]['mode'] == 'screen_monitor'
+
+        try:
+            ControlServer(FakeApp(), path).start()
+            raise AssertionError("socket已被占用时应拒绝启动")
+        except RuntimeError:
+            pass
+    finally:
+        server.close()
+    assert not os.path.exists(path), "关闭后应删除socket文件"
+
+    # 上次异常退出留下的socket文件
+    stale = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    stale.bind(path)
+    stale.close()
+    server = ControlServer(FakeApp(start_ok=False), path).start()
+    try:
+        response = send_command('start', path=path)
+        assert not response['ok'] and '启动失败' in response['error']
+    finally:
+        server.close()
+    print("✅ 控制命令正常")
+
+
+def test_no_qt():
+    """守护进程用到的模块不导入Qt（在新的解释器中检查，不受同一进程中其他测试导入的Qt影响）"""
+    check = subprocess.run(
+        [sys.executable, '-c', "import main, daemon, sys; "
+                               "loaded = [name for name in sys.modules if name.startswith('PyQt5')]; "
+                               "assert not loaded, loaded"],
+        cwd=PROJECT_DIR, capture_output=True, text=True, timeout=60)
+    assert check.returncode == 0, f"守护进程不应加载Qt: {check.stderr.strip().splitlines()[-1:]}"
+    print("✅ 守护进程不加载Qt")
+
+
+def test_daemon_process():
+    """以子进程运行daemon.py，通过ctl命令控制，SIGTERM后正常退出"""
+    workdir = tempfile.mkdtemp()
+    config_path = os.path.join(workdir, 'config.json')
+    shutil.copy(os.path.join(PROJECT_DIR, 'user_config.json'), config_path)
+    path = os.path.join(workdir, 'control.sock')
+    process = subprocess.Popen([sys.executable, os.path.join(PROJECT_DIR, 'daemon.py'),
+                                '--config', config_path, '--socket', path],
+                               cwd=workdir, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+    try:
+        deadline = time.time() + 20
+        while not os.path.exists(path):
+            assert process.poll() is None, f"守护进程提前退出: {process.stdout.read()}"
+            assert time.time() < deadline, "守护进程启动超时"
+            time.sleep(0.05)
+        status = send_command('status', path=path)
+        assert status['ok'] and status['running'] is False and status['loaded'] == []
+        send_command('model', path=path, model='test-model:1b')
+        send_command('mode', path=path, mode='screen_monitor')
+        stats = send_command('stats', path=path)
+        assert stats['ok'] and stats['process']['rss_kb'] > 0
+
+        ctl = subprocess.run([sys.executable, os.path.join(PROJECT_DIR, 'daemon.py'), '--socket', path,
+                              'ctl', 'status'], capture_output=True, text=True, timeout=20)
+        assert ctl.returncode == 0 and json.loads(ctl.stdout)['model'] == 'test-model:1b'
+
+        process.send_signal(signal.SIGTERM)
+        assert process.wait(timeout=10) == 0
+    finally:
+        if process.poll() is None:
+            process.kill()
+    with open(config_path, 'r', encoding='utf-8') as f:
+        config = json.load(f)
+    assert config['ollama_model'] == 'test-model:1b' and config['active_mode'] == 'screen_monitor'
+    assert not os.path.exists(path)
+    print(f"✅ 守护进程运行正常 (常驻内存 {stats['process']['rss_kb'] / 1024:.1f}MB)")
+
+
+if __name__ == "__main__":
+    test_commands()
+    test_no_qt()
+    test_daemon_process()
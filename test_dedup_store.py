@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+消息去重表测试脚本:
+    python test_dedup_store.py
+使用可控的时钟，不需要等待真实的过期时间
+"""
+
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from modules.dedup_store import DedupStore, KIND_INBOUND, KIND_REPLY, text_fingerprint
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_hit_and_miss():
+    """归一化后相同的文本命中，并区分收到的消息和自己的回复"""
+    store = DedupStore(clock=FakeClock())
+    assert store.check("你好") is None
+    store.add("你好，在吗？")
+    store.add("好的，收到啦", KIND_REPLY)
+    assert store.check("  你好，在吗？ ") == KIND_INBOUND
+    assert store.check("你好,在吗?") == KIND_INBOUND, "全角和半角标点应视为相同"
+    assert store.check("好的，\n收到啦") is None, "换行与空白不同，不应命中"
+    assert store.check("好的，收到啦") == KIND_REPLY
+    assert text_fingerprint("Hello  World") == text_fingerprint("hello world")
+
+    store.add("   ")  # 空白文本不记录
+    assert len(store) == 2
+    store.discard("你好，在吗？")
+    assert store.check("你好，在吗？") is None, "删除后应允许重试"
+
+    stats = store.get_stats()
+    assert stats['hits_inbound'] == 2 and stats['hits_reply'] == 1 and stats['misses'] == 3
+    print(f"✅ 命中与未命中正常 (命中率 {stats['hit_rate']:.0%})")
+
+
+def test_ttl_expiry():
+    """指纹在TTL秒后过期，重新记录会刷新时间"""
+    clock = FakeClock()
+    store = DedupStore(ttl=10.0, clock=clock)
+    store.add("第一条")
+    clock.now += 5
+    store.add("第二条")
+    clock.now += 6  # 第一条已过期11秒，第二条6秒
+    assert store.check("第一条") is None
+    assert store.check("第二条") == KIND_INBOUND
+    assert len(store) == 1 and store.get_stats()['evictions'] == 1
+
+    store.add("第二条", KIND_REPLY)  # 刷新时间和类型
+    clock.now += 8
+    assert store.check("第二条") == KIND_REPLY, "刷新后的记录不应被旧的环形缓冲区项淘汰"
+    clock.now += 3
+    assert store.check("第二条") is None
+    print("✅ TTL过期正常")
+
+
+def test_capacity_eviction():
+    """超出容量时淘汰最旧的指纹"""
+    clock = FakeClock()
+    store = DedupStore(max_entries=3, ttl=300.0, clock=clock)
+    for i in range(5):
+        store.add(f"消息{i}")
+        clock.now += 1
+    assert len(store) == 3
+    assert store.check("消息0") is None and store.check("消息1") is None
+    assert all(store.check(f"消息{i}") == KIND_INBOUND for i in range(2, 5))
+    assert store.get_stats()['evictions'] == 2
+    print("✅ 容量淘汰正常")
+
+
+if __name__ == "__main__":
+    test_hit_and_miss()
+    test_ttl_expiry()
+    test_capacity_eviction()
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+变化检测帧存储测试脚本:
+    python test_frame_store.py
+"""
+
+import os
+import sys
+import tracemalloc
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+
+from modules.frame_store import FrameStore
+
+from testing_support import skip
+
+
+def test_downscaled_previous():
+    """上一帧只以缩小后的灰度图保存"""
+    store = FrameStore(level=2)
+    frame = np.zeros((1080, 1920, 3), np.uint8)
+    assert store.update(frame).first
+    assert store.previous.shape == (270, 480) and store.previous.dtype == np.uint8
+    assert store.memory_bytes() == 270 * 480, "未变化时不应保留全分辨率数据"
+    change = store.update(frame)
+    assert not change.first and change.ratio == 0.0 and change.rects == []
+    print(f"✅ 上一帧缩小保存 ({frame.nbytes / 1024 / 1024:.1f}MB -> {store.memory_bytes() / 1024:.0f}KB)")
+
+
+def test_dirty_regions():
+    """变化区域换算回全分辨率坐标，副本包含变化的像素"""
+    store = FrameStore(level=2, keep_dirty_regions=True)
+    before = np.zeros((480, 640, 3), np.uint8)
+    after = before.copy()
+    after[100:140, 200:300] = (0, 128, 255)
+    after[400:420, 20:60] = 255
+    store.update(before)
+    change = store.update(after)
+    assert len(change.rects) == 2
+    for x, y, w, h in change.rects:
+        assert x % 4 == 0 and y % 4 == 0
+    regions = store.regions()
+    covered = {(r.rect[0] <= 200 and r.rect[1] <= 100 and r.rect[0] + r.rect[2] >= 300 and
+                r.rect[1] + r.rect[3] >= 140) for r in regions}
+    assert True in covered, f"变化区域应覆盖修改的矩形: {change.rects}"
+    for region in regions:
+        x, y, w, h = region.rect
+        assert np.array_equal(region.image, after[y:y + h, x:x + w])
+        assert not np.shares_memory(region.image, after), "副本不应引用调用方的帧"
+    assert len(store.take_regions()) == 2 and store.region_bytes == 0
+
+    default = FrameStore(level=2)
+    default.update(before)
+    assert default.update(after).rects and default.regions() == [], "默认不应保留副本"
+    print("✅ 变化区域提取正常")
+
+
+def test_budget_eviction():
+    """全分辨率副本总大小不超过预算，最旧的先被淘汰，超过预算的单个区域不保留"""
+    frame = np.zeros((240, 320, 3), np.uint8)
+    block = 40 * 40 * 3
+    store = FrameStore(level=1, budget_bytes=block * 3 + 100, keep_dirty_regions=True)
+    store.update(frame)
+    for i in range(10):
+        frame = np.zeros_like(frame)
+        frame[100:140, i * 20:i * 20 + 40] = 200 + i  # 每次一块40x40的变化
+        change = store.update(frame)
+        assert store.region_bytes <= store.budget_bytes
+    stats = store.get_stats()
+    assert stats['evicted'] > 0 and stats['peak_bytes'] <= store.budget_bytes
+    ids = [region.region_id for region in store.regions()]
+    assert ids == sorted(ids) and ids[-1] == stats['regions'], "应保留最新的区域"
+
+    small = FrameStore(level=0, budget_bytes=1000, keep_dirty_regions=True)
+    small.update(np.zeros((100, 100, 3), np.uint8))
+    small.update(np.full((100, 100, 3), 255, np.uint8))
+    assert small.get_stats()['rejected'] == 1 and small.regions() == []
+    print(f"✅ 内存预算生效 (淘汰 {stats['evicted']} 个区域)")
+
+
+def test_memory_flat():
+    """长时间运行时内存保持平稳（tracemalloc统计numpy/OpenCV分配的数组）"""
+    store = FrameStore(level=1, budget_bytes=512 * 1024, keep_dirty_regions=True)
+    rng = np.random.default_rng(0)
+    base = rng.integers(0, 255, (720, 1280, 3), dtype=np.uint8)
+
+    def run(iterations, offset):
+        for i in range(offset, offset + iterations):
+            frame = base.copy()
+            y, x = (i * 37) % 600, (i * 53) % 1100
+            frame[y:y + 80, x:x + 160] = i % 256  # 每帧一块移动的变化
+            store.update(frame)
+
+    tracemalloc.start()
+    try:
+        run(200, 0)  # 预热，让区域缓存填满预算
+        warm, _ = tracemalloc.get_traced_memory()
+        run(2000, 200)
+        current, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    growth = current - warm
+    frame_bytes = base.nbytes
+    assert growth < 256 * 1024, f"运行2000帧后内存增长了 {growth / 1024:.0f}KB"
+    assert store.region_bytes <= store.budget_bytes
+    assert peak < warm + 4 * frame_bytes, "峰值只应包含少量临时帧"
+    print(f"✅ 内存保持平稳 (2000帧后增长 {growth / 1024:.1f}KB，峰值 {peak / 1024 / 1024:.1f}MB)")
+
+
+def test_screen_monitor():
+    """ScreenMonitor不再保存整帧，变化检测结果与阈值比较"""
+    try:
+        from modules.screen_monitor import ScreenMonitor
+    except ImportError as e:
+        skip(f"缺少依赖，跳过屏幕监控测试: {e}")
+        return
+    monitor = ScreenMonitor(confidence_threshold=0.1, frame_store=FrameStore(level=2))
+    before = np.zeros((400, 600, 3), np.uint8)
+    after = before.copy()
+    after[:, :300] = 255
+    assert monitor.detect_changes(before)
+    assert not monitor.detect_changes(before)
+    assert monitor.detect_changes(after)
+    assert not hasattr(monitor, 'previous_screenshot')
+    monitor.reset_change_detection()
+    assert monitor.frame_store.previous is None and monitor.frame_store.regions() == []
+    print("✅ 屏幕监控使用帧存储")
+
+
+if __name__ == "__main__":
+    test_downscaled_previous()
+    test_dirty_regions()
+    test_budget_eviction()
+    test_memory_flat()
+    test_screen_monitor()
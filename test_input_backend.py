@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+输入注入后端测试脚本，需要在Xvfb等虚拟显示中运行:
+    xvfb-run -a python test_input_backend.py
+没有X11显示时自动跳过
+"""
+
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from testing_support import skip
+
+
+def _xtest_backend():
+    if not os.environ.get('DISPLAY'):
+        skip("没有X11显示，跳过XTest测试")
+        return None
+    from modules.input_backend import XTestBackend
+    return XTestBackend()
+
+
+def test_xtest_move_and_position():
+    """移动后读取到的指针位置应与目标一致"""
+    backend = _xtest_backend()
+    if backend is None:
+        return
+    try:
+        for target in [(10, 20), (300, 200), (123, 456)]:
+            backend.move_to(*target)
+            assert backend.position() == target, f"期望 {target}，实际 {backend.position()}"
+        print("✅ XTest移动与位置读取正常")
+    finally:
+        backend.close()
+
+
+def test_xtest_batch_sequence():
+    """三击+Ctrl+C 在批处理中注入，结束后指针停在点击位置"""
+    backend = _xtest_backend()
+    if backend is None:
+        return
+    try:
+        with backend.batch():
+            backend.click(200, 150, clicks=3)
+            backend.hotkey('ctrl', 'c')
+        assert backend.position() == (200, 150)
+        print("✅ XTest批量注入正常")
+    finally:
+        backend.close()
+
+
+def test_xtest_key_mapping():
+    """自动化流程用到的按键都能映射到键码"""
+    backend = _xtest_backend()
+    if backend is None:
+        return
+    try:
+        for key in ['ctrl', 'shift', 'alt', 'enter', 'backspace', 'a', 'c', 'v']:
+            assert backend._keycode(key), key
+        print("✅ XTest按键映射正常")
+    finally:
+        backend.close()
+
+
+def test_fail_safe_corner():
+    """鼠标位于屏幕角落时应触发安全中止"""
+    backend = _xtest_backend()
+    if backend is None:
+        return
+    from modules.input_backend import InputFailSafeException
+    try:
+        backend.move_to(0, 0)
+        try:
+            backend.fail_safe_check()
+        except InputFailSafeException:
+            print("✅ 安全中止检查正常")
+        else:
+            raise AssertionError("鼠标在角落时没有触发安全中止")
+    finally:
+        backend.close()
+
+
+if __name__ == "__main__":
+    test_xtest_move_and_position()
+    test_xtest_batch_sequence()
+    test_xtest_key_mapping()
+    test_fail_safe_corner()
@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+消息发送（键盘模拟）测试脚本:
+    python test_keyboard_sim.py
+使用替身输入后端、剪贴板和输入框画面，不操作真实的鼠标键盘
+"""
+
+import os
+import sys
+import time
+import threading
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+
+from testing_support import skip
+
+
+def _import_simulator():
+    try:
+        from modules.keyboard_sim import KeyboardSimulator
+    except ImportError as e:
+        skip(f"缺少依赖，跳过消息发送测试: {e}")
+        return None
+    return KeyboardSimulator
+
+
+class FakeInput:
+    """记录注入的事件；focus为点击后focus_at_pointer的返回值，draft表示输入框中是否有内容"""
+
+    name = 'fake'
+
+    def __init__(self, clipboard, focus=True):
+        self.clipboard = clipboard
+        self.focus = focus
+        self.events = []
+        self.draft = ''
+
+    def position(self):
+        return (500, 500)
+
+    def screen_size(self):
+        return (1920, 1080)
+
+    def fail_safe_check(self):
+        pass
+
+    def click(self, x=None, y=None, clicks=1, button='left'):
+        self.events.append(('click', x, y))
+
+    def batch(self):
+        return _NullContext()
+
+    def focus_at_pointer(self):
+        return self.focus
+
+    def hotkey(self, *keys):
+        self.events.append(('hotkey',) + keys)
+        if keys == ('ctrl', 'a'):
+            self.draft = ''
+        elif keys == ('ctrl', 'v'):
+            self.draft = self.clipboard.text
+
+    def press(self, key):
+        self.events.append(('press', key))
+        if key == 'enter':
+            self.draft = ''
+
+    def keys(self):
+        return [event[1:] for event in self.events if event[0] != 'click']
+
+
+class _NullContext:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+class FakeClipboard:
+    """accept=False时模拟剪贴板被其他程序抢占，copy的内容不会生效"""
+
+    name = 'fake'
+
+    def __init__(self, accept=True):
+        self.accept = accept
+        self.text = ''
+
+    def copy(self, text):
+        if self.accept:
+            self.text = text
+
+    def holds(self, text):
+        return self.text == text
+
+
+def _gate_for(fake_input):
+    """真实的变化闸门，截图换成输入框的合成画面：有草稿时亮，空白时暗"""
+    from modules.change_gate import PatchChangeGate
+
+    class FakeInputGate(PatchChangeGate):
+        def capture_patch(self, x, y):
+            return np.full((self.patch_size, self.patch_size), 200 if fake_input.draft else 20, np.uint8)
+
+    return FakeInputGate(patch_size=48, change_threshold=0.05)
+
+
+def _simulator(KeyboardSimulator, delay_scale=0.0, focus=True, accept=True, **delivery):
+    clipboard = FakeClipboard(accept)
+    fake_input = FakeInput(clipboard, focus)
+    config = {'focus_timeout': 0.05, 'clipboard_timeout': 0.05, 'verify_timeout': 0.2}
+    config.update(delivery)
+    sim = KeyboardSimulator(delay_scale=delay_scale, input_backend=fake_input, clipboard=clipboard,
+                            delivery_config=config)
+    sim.input_gate = _gate_for(fake_input)
+    return sim, fake_input
+
+
+def test_verified_send():
+    """点击、清空、粘贴、回车依次注入，粘贴和发送都由输入框画面确认"""
+    KeyboardSimulator = _import_simulator()
+    if KeyboardSimulator is None:
+        return
+    sim, fake_input = _simulator(KeyboardSimulator)
+    assert sim.send_message("你好，在吗？", (300, 400))
+    assert fake_input.events[0] == ('click', 300, 400)
+    assert fake_input.keys() == [('ctrl', 'a'), ('backspace',), ('ctrl', 'v'), ('enter',)]
+    stats = sim.get_stats()
+    assert stats['sent'] == 1 and stats['verified'] == 1
+    assert stats['paste_unverified'] == 0 and stats['send_unverified'] == 0
+    print("✅ 发送经画面确认")
+
+
+def test_failed_verification_aborts():
+    """焦点不在输入框或剪贴板内容未生效时放弃发送，不粘贴也不回车"""
+    KeyboardSimulator = _import_simulator()
+    if KeyboardSimulator is None:
+        return
+    sim, fake_input = _simulator(KeyboardSimulator, focus=False)
+    assert not sim.send_message("你好", (300, 400))
+    assert fake_input.keys() == [], "焦点确认失败后不应注入按键"
+    assert sim.get_stats()['focus_failed'] == 1 and sim.get_stats()['sent'] == 0
+
+    sim, fake_input = _simulator(KeyboardSimulator, accept=False)
+    assert not sim.send_message("你好", (300, 400))
+    assert ('ctrl', 'v') not in fake_input.keys() and ('enter',) not in fake_input.keys()
+    assert sim.get_stats()['clipboard_failed'] == 1 and sim.get_stats()['sent'] == 0
+
+    # 无法判断焦点（None）时照常发送
+    sim, fake_input = _simulator(KeyboardSimulator, focus=None)
+    assert sim.send_message("你好", (300, 400)) and sim.get_stats()['sent'] == 1
+    print("✅ 确认失败时放弃发送")
+
+
+def test_cancel_interrupts_pacing():
+    """人性化停顿中设置停止事件，立即放弃发送，不按回车"""
+    KeyboardSimulator = _import_simulator()
+    if KeyboardSimulator is None:
+        return
+    sim, fake_input = _simulator(KeyboardSimulator, delay_scale=1.0, pacing_budget=10.0)
+    cancel = threading.Event()
+    threading.Timer(0.3, cancel.set).start()
+    start = time.perf_counter()
+    assert not sim.send_message("长消息" * 40, (300, 400), cancel_event=cancel)
+    elapsed = time.perf_counter() - start
+    assert elapsed < 0.8, f"停止后 {elapsed:.2f}秒才返回"
+    assert ('enter',) not in fake_input.keys() and sim.get_stats()['sent'] == 0
+    assert sim._cancel_event is None, "发送结束后应清除停止事件"
+    print(f"✅ 停止事件中断停顿 ({elapsed * 1000:.0f}ms 返回)")
+
+
+def test_pacing_budget():
+    """每条消息的人性化停顿总时长不超过 pacing_budget * delay_scale"""
+    KeyboardSimulator = _import_simulator()
+    if KeyboardSimulator is None:
+        return
+    for delay_scale in (1.0, 0.5):
+        sim, _ = _simulator(KeyboardSimulator, delay_scale=delay_scale, pacing_budget=0.2)
+        for _ in range(2):  # 预算按消息计算，第二条消息重新获得完整预算
+            before = sim.get_stats()['pacing']
+            start = time.perf_counter()
+            assert sim.send_message("长消息" * 40, (300, 400))  # 不受预算限制时需要十几秒
+            elapsed = time.perf_counter() - start
+            paced = sim.get_stats()['pacing'] - before
+            assert abs(paced - 0.2 * delay_scale) < 1e-6, paced
+            assert elapsed < 0.2 * delay_scale + 0.3, elapsed
+
+    sim, _ = _simulator(KeyboardSimulator, delay_scale=0.0, pacing_budget=5.0)
+    start = time.perf_counter()
+    assert sim.send_message("长消息" * 40, (300, 400))
+    assert sim.get_stats()['pacing'] == 0.0 and time.perf_counter() - start < 0.2, "delay_scale=0时不应等待"
+    print("✅ 人性化停顿不超过预算")
+
+
+if __name__ == "__main__":
+    test_verified_send()
+    test_failed_verification_aborts()
+    test_cancel_interrupts_pacing()
+    test_pacing_budget()
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+GUI日志写入器测试脚本:
+    python test_log_sink.py
+没有显示器时使用 QT_QPA_PLATFORM=offscreen 运行（由pytest运行时自动使用offscreen）
+"""
+
+import os
+import sys
+import time
+import threading
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from testing_support import qt_application
+
+
+def _drain(app, sink, threads):
+    while any(t.is_alive() for t in threads) or sink._pending:
+        app.processEvents()
+        time.sleep(0.005)
+
+
+def _check_multithreaded_batching(app):
+    """多个线程同时写入，按批刷新，视图行数不超过上限"""
+    from PyQt5.QtWidgets import QPlainTextEdit
+    from gui.log_sink import LogSink
+
+    view = QPlainTextEdit()
+    sink = LogSink(view, max_blocks=1000, flush_interval_ms=20, max_batch=500)
+
+    def writer(index):
+        for i in range(2000):
+            sink.emit(f"线程{index} 消息{i}")
+
+    threads = [threading.Thread(target=writer, args=(i,)) for i in range(4)]
+    for t in threads:
+        t.start()
+    _drain(app, sink, threads)
+    sink.stop()
+
+    stats = sink.stats
+    assert stats['displayed'] + sink.dropped == 8000, stats
+    assert stats['flushes'] < stats['displayed'], "日志应按批追加"
+    assert view.blockCount() == 1000, view.blockCount()
+    print(f"✅ 多线程批量写入正常 (刷新{stats['flushes']}次，单次最长{stats['max_flush_ms']:.1f}ms)")
+
+
+def _check_level_filter(app):
+    """级别过滤：修改级别后重新显示保留的记录"""
+    from PyQt5.QtWidgets import QPlainTextEdit
+    from gui.log_sink import LogSink
+
+    view = QPlainTextEdit()
+    sink = LogSink(view, min_level='WARNING')
+    sink.emit("普通消息")
+    sink.emit("出错了", "ERROR")
+    sink.flush()
+    assert view.toPlainText().count('\n') == 0 and "出错了" in view.toPlainText()
+    sink.set_min_level('INFO')
+    assert "普通消息" in view.toPlainText() and "出错了" in view.toPlainText()
+    sink.clear()
+    assert view.toPlainText() == ''
+    sink.stop()
+    print("✅ 日志级别过滤正常")
+
+
+def test_multithreaded_batching():
+    _check_multithreaded_batching(qt_application())
+
+
+def test_level_filter():
+    _check_level_filter(qt_application())
+
+
+if __name__ == "__main__":
+    app = qt_application()
+    _check_multithreaded_batching(app)
+    _check_level_filter(app)
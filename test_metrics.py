@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+进程内指标聚合和性能面板测试脚本:
+    python test_metrics.py
+没有显示器时使用 QT_QPA_PLATFORM=offscreen 运行
+"""
+
+import os
+import sys
+import time
+import threading
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from modules.tracing import Tracer
+from modules.metrics import MetricsAggregator, ollama_generation_stats
+
+
+def test_generation_stats():
+    """Ollama响应中的纳秒统计换算为token/s和首token时间"""
+    stats = ollama_generation_stats({'eval_count': 50, 'eval_duration': 2_000_000_000,
+                                     'load_duration': 100_000_000, 'prompt_eval_duration': 200_000_000})
+    assert stats['tokens'] == 50 and abs(stats['tokens_per_s'] - 25.0) < 1e-9
+    assert abs(stats['ttft_s'] - 0.3) < 1e-9
+    assert ollama_generation_stats({'response': 'hi'}) == {}
+    print("✅ 生成统计换算正常")
+
+
+def _check_aggregator_from_tracer():
+    """追踪器记录的span进入聚合器，按阶段统计分位数、结果和生成速度；返回聚合器供面板测试使用"""
+    tracer = Tracer(jsonl_path=None)
+    metrics = MetricsAggregator(window=60.0).attach(tracer)
+    metrics.add_source('queues', lambda: {'capture': 1})
+
+    def worker():
+        for i in range(200):
+            with tracer.trace('pipeline_capture') as trace:
+                with trace.span('capture'):
+                    pass
+                trace.attrs['outcome'] = 'skipped' if i % 2 else 'queued'
+
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    with tracer.trace('pipeline_inference') as trace:
+        with trace.span('llm') as attrs:
+            attrs.update({'tokens': 40, 'tokens_per_s': 20.0, 'ttft_s': 0.25})
+
+    summary = metrics.summary()
+    capture = summary['stages'][('pipeline_capture', 'capture')]
+    assert capture['count'] == 800 and sum(capture['histogram']) == 800
+    assert summary['outcomes'][('pipeline_capture', 'skipped')] == 400
+    assert summary['llm']['tokens_per_s'] == 20.0 and summary['llm']['ttft_p50'] == 0.25
+    assert summary['sources']['queues'] == {'capture': 1}
+    assert metrics.summary(now=time.monotonic() + 120)['stages'] == {}, "窗口外的样本不应计入"
+
+    start = time.perf_counter()
+    for _ in range(10000):
+        metrics.on_span('bench', 'capture', 0.01, 'ok', {})
+    per_span_us = (time.perf_counter() - start) / 10000 * 1e6
+    print(f"✅ 指标聚合正常 (每个span记录耗时 {per_span_us:.2f}us)")
+    tracer.close()
+    return metrics
+
+
+def test_aggregator_from_tracer():
+    _check_aggregator_from_tracer()
+
+
+def _check_metrics_panel(metrics):
+    """性能面板只在可见时刷新"""
+    from PyQt5.QtWidgets import QApplication
+    from gui.metrics_panel import MetricsPanel, render_histogram
+
+    app = QApplication.instance() or QApplication(sys.argv)
+    assert render_histogram([0, 4, 8]) == ' ▄█'
+    panel = MetricsPanel(metrics, refresh_hz=100)
+    assert panel.timer.interval() == 200, "刷新频率应有上限"
+    panel.refresh()
+    assert panel.refresh_count == 0, "面板不可见时不应聚合"
+    panel.show()
+    panel.refresh()
+    assert panel.refresh_count == 1
+    assert panel.stage_table.rowCount() == 5  # 两种追踪的total、capture、llm和计时用的bench阶段
+    assert "20.0 token/s" in panel.summary_label.text()
+    panel.close()
+    print("✅ 性能面板刷新正常")
+
+
+def test_metrics_panel():
+    _check_metrics_panel(_check_aggregator_from_tracer())
+
+
+if __name__ == "__main__":
+    test_generation_stats()
+    metrics = _check_aggregator_from_tracer()
+    _check_metrics_panel(metrics)
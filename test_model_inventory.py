@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+模型清单缓存测试脚本:
+    python test_model_inventory.py
+使用本地的Ollama替身服务，缓存写入临时目录
+"""
+
+import os
+import sys
+import tempfile
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from benchmarks.fakes import FakeOllamaServer
+from modules.model_inventory import ModelInventory, ollama_base_url
+
+
+def test_base_url():
+    assert ollama_base_url('http://localhost:11434/api/generate') == 'http://localhost:11434'
+    assert ollama_base_url('http://host:1234/') == 'http://host:1234'
+    print("✅ 服务地址解析正常")
+
+
+def test_cache_and_change_detection():
+    """首次刷新获取详情并写入缓存；列表不变时不再请求 /api/show；新实例直接读取缓存"""
+    server = FakeOllamaServer(model_name='bench:8b').start()
+    cache_path = os.path.join(tempfile.mkdtemp(), 'model_inventory.json')
+    try:
+        inventory = ModelInventory(server.base_url, cache_path=cache_path, ttl=600.0)
+        assert inventory.models() == [] and inventory.is_stale()
+
+        models, changed = inventory.refresh_if_stale()
+        assert changed and [m.name for m in models] == ['bench:8b']
+        info = models[0]
+        assert (info.parameter_size, info.quantization, info.context_length) == ('8.2B', 'Q4_K_M', 40960)
+        assert server.server.show_count == 1
+
+        # 缓存未过期时不请求服务
+        models, changed = inventory.refresh_if_stale()
+        assert not changed and server.server.tags_count == 1
+
+        # 强制刷新：列表指纹不变，不再请求 /api/show
+        models, changed = inventory.refresh()
+        assert not changed and server.server.show_count == 1
+
+        # 模型更新后摘要变化，重新获取详情
+        server.server.model_digest = 'sha256:updated'
+        models, changed = inventory.refresh()
+        assert changed and server.server.show_count == 2
+
+        # 新实例（如下次启动）直接从磁盘读取
+        restarted = ModelInventory(server.base_url, cache_path=cache_path, ttl=600.0)
+        assert restarted.get('bench:8b').describe() == '8.2B · Q4_K_M · 上下文40960 · 4.8GB'
+        assert not restarted.is_stale()
+        print(f"✅ 模型清单缓存正常 (tags请求 {server.server.tags_count} 次, show请求 {server.server.show_count} 次)")
+    finally:
+        server.stop()
+
+
+def test_retry_missing_details():
+    """/api/show 失败的模型即使列表不变，下次刷新也重新获取详情，取得后不再请求"""
+    server = FakeOllamaServer(model_name='bench:8b').start()
+    try:
+        server.server.show_failures = 1
+        inventory = ModelInventory(server.base_url, cache_path=os.path.join(tempfile.mkdtemp(), 'inv.json'))
+        models, changed = inventory.refresh()
+        assert changed and models[0].context_length is None and inventory.stats['errors'] == 1
+
+        models, changed = inventory.refresh()
+        assert changed and models[0].context_length == 40960 and server.server.show_count == 2
+
+        models, changed = inventory.refresh()
+        assert not changed and server.server.show_count == 2
+        print("✅ 获取详情失败的模型在下次刷新时重试")
+    finally:
+        server.stop()
+
+
+def test_service_unavailable():
+    """服务不可用时抛出异常，缓存保持不变"""
+    server = FakeOllamaServer().start()
+    base_url = server.base_url
+    server.stop()
+    inventory = ModelInventory(base_url, cache_path=os.path.join(tempfile.mkdtemp(), 'inv.json'), timeout=1.0)
+    try:
+        inventory.refresh()
+    except Exception:
+        assert inventory.models() == [] and inventory.stats['errors'] == 1
+        print("✅ 服务不可用时保留缓存")
+    else:
+        raise AssertionError("服务不可用时应抛出异常")
+
+
+if __name__ == "__main__":
+    test_base_url()
+    test_cache_and_change_detection()
+    test_retry_missing_details()
+    test_service_unavailable()
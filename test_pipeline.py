@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+流水线队列和公平锁测试脚本:
+    python test_pipeline.py
+"""
+
+import os
+import sys
+import time
+import threading
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from modules.cancellation import OperationCancelled
+from modules.pipeline import (StageQueue, FairLock, render_queue_metrics,
+                              POLICY_DROP_OLDEST, POLICY_COALESCE, POLICY_BLOCK)
+
+
+def _wait_until(predicate, timeout=2.0):
+    deadline = time.perf_counter() + timeout
+    while not predicate():
+        assert time.perf_counter() < deadline, "等待超时"
+        time.sleep(0.001)
+
+
+def test_backpressure_policies():
+    """队列满时：drop_oldest丢弃最旧的元素，coalesce合并到队尾元素"""
+    queue = StageQueue('capture', maxsize=2, policy=POLICY_DROP_OLDEST)
+    for i in range(5):
+        queue.put(i)
+    assert [queue.get()[0] for _ in range(2)] == [3, 4]
+    assert queue.get_stats()['dropped'] == 3 and queue.get_stats()['max_depth'] == 2
+
+    queue = StageQueue('capture', maxsize=2, policy=POLICY_COALESCE, merge=lambda old, new: f"{old}\n{new}")
+    for text in ('a', 'b', 'c', 'd'):
+        queue.put(text)
+    assert queue.drain() == ['a', 'b\nc\nd']
+    assert queue.get_stats()['coalesced'] == 2 and len(queue) == 0
+
+    try:
+        StageQueue('bad', policy='unknown')
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("未知的背压策略应报错")
+    print("✅ 丢弃和合并策略正常")
+
+
+def test_block_policy():
+    """block策略下生产者等到消费者取走元素后才继续，不丢失元素"""
+    queue = StageQueue('delivery', maxsize=1, policy=POLICY_BLOCK)
+    queue.put('first')
+    done = threading.Event()
+
+    def producer():
+        queue.put('second')
+        done.set()
+
+    threading.Thread(target=producer, daemon=True).start()
+    assert not done.wait(0.1), "队列已满时生产者应被阻塞"
+    item, waited = queue.get()
+    assert item == 'first' and waited >= 0.1
+    assert done.wait(1.0) and queue.get()[0] == 'second'
+    stats = queue.get_stats()
+    assert stats['dropped'] == 0 and stats['blocked_ms'] >= 50 and stats['put'] == stats['get'] == 2
+
+    lines = render_queue_metrics([queue])
+    assert 'chat_automation_queue_depth{queue="delivery"} 0' in lines
+    print(f"✅ 阻塞策略正常 (生产者阻塞 {stats['blocked_ms']:.0f}ms)")
+
+
+def test_shutdown():
+    """停止事件设置后，阻塞中的put和get都立即抛出OperationCancelled"""
+    stop = threading.Event()
+    full = StageQueue('delivery', maxsize=1, policy=POLICY_BLOCK)
+    full.put('item')
+    empty = StageQueue('capture', maxsize=1)
+    outcomes = []
+
+    def blocked(call):
+        start = time.perf_counter()
+        try:
+            call()
+            outcomes.append(('returned', 0.0))
+        except OperationCancelled:
+            outcomes.append(('cancelled', time.perf_counter() - start))
+
+    threads = [threading.Thread(target=blocked, args=(lambda: full.put('more', stop, poll_interval=0.01),)),
+               threading.Thread(target=blocked, args=(lambda: empty.get(stop, poll_interval=0.01),))]
+    for t in threads:
+        t.start()
+    time.sleep(0.05)
+    stop.set()
+    for t in threads:
+        t.join(1.0)
+        assert not t.is_alive(), "停止后线程应立即退出"
+    assert [outcome for outcome, _ in outcomes] == ['cancelled', 'cancelled'], outcomes
+    assert full.drain() == ['item'], "被取消的put不应放入元素"
+    print("✅ 停止时阻塞的put/get立即退出")
+
+
+def test_fair_lock_fifo():
+    """公平锁按申请顺序授予"""
+    lock = FairLock()
+    order = []
+    lock.acquire()
+
+    def worker(index):
+        with lock:
+            order.append(index)
+
+    threads = []
+    for i in range(8):
+        t = threading.Thread(target=worker, args=(i,))
+        t.start()
+        threads.append(t)
+        _wait_until(lambda: lock._next_ticket == i + 2)  # 该线程已领取票号
+    lock.release()
+    for t in threads:
+        t.join(2.0)
+    assert order == list(range(8)), order
+    assert lock.acquisitions == 9
+    print("✅ 公平锁按申请顺序授予")
+
+
+if __name__ == "__main__":
+    test_backpressure_policies()
+    test_block_policy()
+    test_shutdown()
+    test_fair_lock_fifo()
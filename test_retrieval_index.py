@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+早期对话检索索引测试脚本:
+    python test_retrieval_index.py
+使用本地的Ollama替身服务计算向量，数据库和缓存写入临时目录
+"""
+
+import os
+import sys
+import time
+import tempfile
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+
+from benchmarks.fakes import FakeOllamaServer, fake_embeddings
+from modules.conversation_store import ConversationStore, ROLE_USER, ROLE_ASSISTANT
+from modules.retrieval_index import RetrievalIndex, OllamaEmbedder
+
+from testing_support import skip
+
+
+def messages(chat, texts, ts=None):
+    ts = ts or time.time()
+    return [(chat, ROLE_USER, text, ts + i) for i, text in enumerate(texts)]
+
+
+def test_topk_matches_bruteforce():
+    """向量化的top-k与逐条计算余弦相似度的结果一致，扩容后旧数据不变"""
+    rng = np.random.default_rng(1)
+    table = {}
+
+    def embed(texts):
+        return np.stack([table.setdefault(text, rng.standard_normal(32).astype(np.float32)) for text in texts])
+
+    index = RetrievalIndex(embed, batch_size=7, initial_capacity=4, min_score=-1.0)
+    texts = [f"消息{i}" for i in range(500)]
+    assert index.add(messages('a', texts)) == 500 and len(index) == 500
+    assert index.add(messages('a', texts[:10])) == 0, "重复的消息不应再次索引"
+
+    query = rng.standard_normal(32).astype(np.float32)
+    expected = sorted(texts, key=lambda t: -float(table[t] @ query / np.linalg.norm(table[t])))[:5]
+    hits = index.search_vector(query, k=5)
+    assert [hit.text for hit in hits] == expected
+    assert all(a.score >= b.score for a, b in zip(hits, hits[1:]))
+    hits = index.search_vector(query, k=5, exclude=expected[:2])
+    assert len(hits) == 5 and [hit.text for hit in hits[:3]] == expected[2:]
+    print("✅ 向量化top-k与逐条计算一致")
+
+
+def test_chat_filter_and_threshold():
+    """只在指定聊天中检索，相似度低于阈值的消息不返回"""
+    index = RetrievalIndex(fake_embeddings, min_score=0.2)
+    index.add(messages('alice', ['周末去爬山吗？天气预报说周六晴', '上次推荐的那本书看完了']))
+    index.add(messages('bob', ['周末去爬山吗？我们周六出发']))
+    hits = index.search('周末去爬山的事定了吗', k=3, chat='alice')
+    assert hits and hits[0].text.startswith('周末去爬山') and all(hit.chat == 'alice' for hit in hits)
+    assert index.search('周末去爬山', chat='nobody') == []
+    assert index.search('完全无关的内容XYZ', k=3, chat='alice') == [], "不相关的消息不应注入"
+    text = index.related_text('周末去爬山的事定了吗', chat='alice')
+    assert '周末去爬山' in text and '那本书' not in text
+    print("✅ 按聊天过滤和相似度阈值生效")
+
+
+def test_incremental_sync_and_cache():
+    """从会话存储增量建立索引，计算向量失败时下次重试，保存后重新加载不必重新计算"""
+    workdir = tempfile.mkdtemp()
+    store = ConversationStore(os.path.join(workdir, 'conversations.db'))
+    calls = []
+    failing = [False]
+
+    def embed(texts):
+        if failing[0]:
+            raise ConnectionError('embedding service down')
+        calls.append(len(texts))
+        return fake_embeddings(texts)
+
+    try:
+        for i in range(30):
+            store.append('main', ROLE_USER, f"第{i}条消息")
+            store.append('main', ROLE_ASSISTANT, f"第{i}条回复")
+        assert store.flush()
+        index = RetrievalIndex(embed, batch_size=16)
+        assert index.sync(store) == 60 and len(index) == 60
+
+        store.append('main', ROLE_USER, '新的消息')
+        assert store.flush()
+        failing[0] = True
+        try:
+            index.sync(store)
+            raise AssertionError("计算向量失败时应抛出异常")
+        except ConnectionError:
+            pass
+        assert len(index) == 60 and index.last_id == 60
+        failing[0] = False
+        assert index.sync(store) == 1 and len(index) == 61 and calls[-1] == 1
+
+        cache_path = os.path.join(workdir, 'retrieval_index.npz')
+        index.save(cache_path, model='m1')
+        restored = RetrievalIndex(embed)
+        assert restored.load(cache_path, model='m1') and len(restored) == 61 and restored.last_id == 61
+        query = fake_embeddings(['第7条回复'])[0]
+        assert restored.search_vector(query, k=1)[0].text == index.search_vector(query, k=1)[0].text == '第7条回复'
+        assert restored.sync(store) == 0
+        assert not RetrievalIndex(embed).load(cache_path, model='m2'), "模型不同时不应加载缓存"
+    finally:
+        store.close()
+    print("✅ 增量同步和向量缓存正常")
+
+
+def test_prompt_injection():
+    """通过Ollama接口计算向量，AIHandler只把最相关的片段加入提示"""
+    try:
+        from modules.ai_handler import AIHandler
+    except ImportError as e:
+        skip(f"缺少依赖，跳过提示注入测试: {e}")
+        return
+    server = FakeOllamaServer(model_name='bench:8b').start()
+    try:
+        embedder = OllamaEmbedder(server.base_url, model='embed-model')
+        index = RetrievalIndex(embedder, top_k=2, min_score=0.2)
+        index.add(messages('main', ['我家的猫叫咪咪，今年三岁了', '明天要去医院复查', '最近在学吉他']))
+        assert server.server.embed_count == 3 and embedder.requests == 1
+
+        config = {'ollama': {'url': f"{server.base_url}/api/generate", 'model': 'bench:8b'}}
+        handler = AIHandler(config, retrieval_index=index)
+        assert handler.get_ai_response('你还记得我家的猫叫什么吗', chat='main')
+        prompt = server.server.last_prompt
+        assert '相关的早期对话' in prompt and '咪咪' in prompt and '医院' not in prompt
+        assert prompt.rstrip().endswith('请根据上述系统信息和用户消息进行智能回复:')
+
+        AIHandler(config).get_ai_response('你还记得我家的猫叫什么吗')
+        assert '相关的早期对话' not in server.server.last_prompt
+    finally:
+        server.stop()
+    print("✅ 检索片段注入提示")
+
+
+if __name__ == "__main__":
+    test_topk_matches_bruteforce()
+    test_chat_filter_and_threshold()
+    test_incremental_sync_and_cache()
+    test_prompt_injection()
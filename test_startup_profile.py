@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+启动耗时分析测试脚本:
+    python test_startup_profile.py
+在临时目录中生成被导入的包和配置文件
+"""
+
+import os
+import sys
+import json
+import tempfile
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from modules import startup_profile
+from modules.startup_profile import StartupProfiler
+
+_PACKAGE = '_profile_demo'
+
+
+def _write_demo_package(directory):
+    """生成一个导入时休眠的包：包本身20ms，子模块slow 50ms"""
+    package = os.path.join(directory, _PACKAGE)
+    os.makedirs(package)
+    with open(os.path.join(package, '__init__.py'), 'w', encoding='utf-8') as f:
+        f.write("import time\ntime.sleep(0.02)\nfrom . import slow\n")
+    with open(os.path.join(package, 'slow.py'), 'w', encoding='utf-8') as f:
+        f.write("import time\ntime.sleep(0.05)\n")
+
+
+def test_profiled_import():
+    """步骤内的导入被记录并归到该步骤，区分自身耗时和累计耗时，报告中按包汇总"""
+    with tempfile.TemporaryDirectory() as tmp:
+        _write_demo_package(tmp)
+        sys.path.insert(0, tmp)
+        profiler = StartupProfiler().install()
+        try:
+            with profiler.step('init demo'):
+                __import__(_PACKAGE)
+        finally:
+            profiler.uninstall()
+            sys.path.remove(tmp)
+            for name in (_PACKAGE, f"{_PACKAGE}.slow"):
+                sys.modules.pop(name, None)
+        assert profiler not in sys.meta_path
+
+        imports = {name: (self_time, cumulative, step) for name, self_time, cumulative, step in profiler.imports}
+        package_self, package_cumulative, package_step = imports[_PACKAGE]
+        slow_self, slow_cumulative, slow_step = imports[f"{_PACKAGE}.slow"]
+        assert package_step == slow_step == 'init demo'
+        assert slow_self >= 0.05 and abs(slow_self - slow_cumulative) < 0.005, "没有子模块时自身耗时等于累计耗时"
+        assert 0.02 <= package_self < 0.05, "包的自身耗时不应包含子模块"
+        assert package_cumulative >= package_self + slow_cumulative - 0.001
+
+        (name, started, elapsed), = profiler.steps
+        assert name == 'init demo' and elapsed >= package_cumulative and started >= 0
+        totals = dict(profiler.package_totals())
+        total, count, step = totals[_PACKAGE]
+        assert count == 2 and step == 'init demo' and total >= 0.07
+
+        profiler.mark('GUI可用')
+        report = profiler.report()
+        assert _PACKAGE in report and 'init demo' in report and 'GUI可用' in report
+        path = os.path.join(tmp, 'startup.json')
+        profiler.write_json(path)
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        assert data['packages'][_PACKAGE]['modules'] == 2 and data['steps'][0]['name'] == 'init demo'
+    print(f"✅ 导入耗时被记录 ({_PACKAGE}.slow 自身 {slow_self * 1000:.0f}ms)")
+
+
+def test_lazy_init_step():
+    """按需创建的子系统在分析器启用时记录初始化步骤，未启用时不做记录"""
+    from main import ChatAutomationApp
+
+    with tempfile.TemporaryDirectory() as tmp:
+        config_file = os.path.join(tmp, 'config.json')
+        with open(config_file, 'w', encoding='utf-8') as f:
+            json.dump({'config_hot_reload': False, 'tracing': {'enabled': False},
+                       'conversation_store': {'path': os.path.join(tmp, 'conversations.db')}}, f)
+        app = ChatAutomationApp(config_file)
+        profiler = StartupProfiler()
+        previous = startup_profile._active
+        startup_profile._active = profiler
+        try:
+            assert app.loaded('conversation_store') is None
+            store = app.conversation_store
+            assert app.conversation_store is store, "第二次访问不应重新创建"
+        finally:
+            startup_profile._active = previous
+            app.shutdown()
+    assert [name for name, _, _ in profiler.steps] == ['init ConversationStore']
+    assert startup_profile.get_profiler() is previous
+    print(f"✅ 按需初始化步骤被记录 ({profiler.steps[0][2] * 1000:.1f}ms)")
+
+
+if __name__ == "__main__":
+    test_profiled_import()
+    test_lazy_init_step()
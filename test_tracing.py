@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+追踪器测试脚本:
+    python test_tracing.py
+追踪文件写入临时目录
+"""
+
+import os
+import sys
+import json
+import time
+import tempfile
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from modules.cancellation import OperationCancelled
+from modules.tracing import Tracer, RotatingJsonlWriter
+
+
+def _read_jsonl(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return [json.loads(line) for line in f]
+
+
+def test_span_timing():
+    """span记录阶段耗时和状态，total覆盖整个周期，异常按span_status标记后继续抛出"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'trace.jsonl')
+        tracer = Tracer(jsonl_path=path)
+        with tracer.trace('auto_copy') as trace:
+            with trace.span('copy', chat='A'):
+                time.sleep(0.05)
+            trace.add_span('queue_wait', 0.2)
+            trace.attrs['result'] = 'sent'
+        for error, status in ((ValueError("失败"), 'error'), (OperationCancelled(), 'cancelled')):
+            try:
+                with tracer.trace('auto_copy') as trace:
+                    with trace.span('llm'):
+                        raise error
+            except type(error):
+                pass
+            else:
+                raise AssertionError("span内的异常应继续抛出")
+        tracer.close()
+
+        records = _read_jsonl(path)
+        spans = {(r['span'], r['status']): r for r in records}
+        copy = spans[('copy', 'ok')]
+        assert 50 <= copy['duration_ms'] < 150 and copy['attrs'] == {'chat': 'A'}
+        assert spans[('queue_wait', 'ok')]['duration_ms'] == 200.0
+        total = records[2]
+        assert total['span'] == 'total' and total['attrs'] == {'result': 'sent'}
+        assert total['duration_ms'] >= copy['duration_ms'] and total['trace_id'] == copy['trace_id']
+        assert ('llm', 'error') in spans and ('llm', 'cancelled') in spans
+        assert tracer.histograms[('auto_copy', 'llm')].errors == 1, "被取消的span不应计为错误"
+
+    disabled = Tracer(enabled=False)
+    with disabled.trace('auto_copy') as trace:
+        with trace.span('copy'):
+            pass
+    assert not disabled.histograms
+    print(f"✅ span计时正常 (copy {copy['duration_ms']:.1f}ms)")
+
+
+def test_prometheus_rendering():
+    """直方图按桶累计，包含+Inf、sum、count、错误计数和额外指标"""
+    tracer = Tracer(jsonl_path=None, buckets=(0.1, 1.0))
+    trace = type('FakeTrace', (), {'kind': 'on_new_content'})()
+    for duration in (0.05, 0.5, 0.5, 5.0):
+        tracer.record(trace, 'llm', time.time(), duration, 'ok', {})
+    tracer.record(trace, 'send', time.time(), 0.01, 'error', {})
+    tracer.add_collector(lambda: ['chat_automation_queue_depth{queue="delivery"} 3'])
+    lines = tracer.render_prometheus().splitlines()
+
+    metric = 'chat_automation_stage_duration_seconds'
+    labels = 'trace="on_new_content",stage="llm"'
+    assert f'# TYPE {metric} histogram' in lines
+    assert f'{metric}_bucket{{{labels},le="0.1"}} 1' in lines
+    assert f'{metric}_bucket{{{labels},le="1.0"}} 3' in lines
+    assert f'{metric}_bucket{{{labels},le="+Inf"}} 4' in lines
+    assert f'{metric}_sum{{{labels}}} 6.050000' in lines
+    assert f'{metric}_count{{{labels}}} 4' in lines
+    assert 'chat_automation_stage_errors_total{trace="on_new_content",stage="send"} 1' in lines
+    assert 'chat_automation_stage_errors_total{trace="on_new_content",stage="llm"} 0' in lines
+    assert lines[-1] == 'chat_automation_queue_depth{queue="delivery"} 3'
+    print("✅ Prometheus文本格式正常")
+
+
+def test_jsonl_rotation():
+    """文件写满后滚动，只保留backup_count个旧文件，每行都是完整的JSON"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'logs', 'trace.jsonl')
+        writer = RotatingJsonlWriter(path, max_bytes=1024, backup_count=2)
+        for i in range(200):
+            writer.write({'seq': i, 'span': '阶段'})
+        writer.close()
+        writer.write({'seq': -1})  # 关闭后的写入被忽略
+
+        assert sorted(os.listdir(os.path.dirname(path))) == ['trace.jsonl', 'trace.jsonl.1', 'trace.jsonl.2']
+        assert os.path.getsize(path + '.1') >= 1024 and os.path.getsize(path) < 1024
+        seqs = [r['seq'] for name in (path + '.2', path + '.1', path) for r in _read_jsonl(name)]
+        assert seqs == list(range(seqs[0], 200)), "滚动后的记录应连续且不重复"
+
+        single = os.path.join(tmp, 'single.jsonl')
+        writer = RotatingJsonlWriter(single, max_bytes=64, backup_count=0)
+        for i in range(10):
+            writer.write({'seq': i, 'padding': 'x' * 40})
+        writer.close()
+        assert not os.path.exists(single + '.1')
+    print(f"✅ JSONL滚动正常 (保留最近 {len(seqs)} 条记录)")
+
+
+def test_default_path():
+    """相对的追踪文件路径相对于配置文件所在目录，而不是当前工作目录"""
+    with tempfile.TemporaryDirectory() as tmp:
+        tracer = Tracer.from_config({}, base_dir=tmp)
+        assert tracer.writer.path == os.path.join(tmp, 'logs', 'trace.jsonl')
+        tracer.close()
+        tracer = Tracer.from_config({'jsonl_path': 'custom/t.jsonl'}, base_dir=tmp)
+        assert tracer.writer.path == os.path.join(tmp, 'custom', 't.jsonl')
+        tracer.close()
+        absolute = os.path.join(tmp, 'abs.jsonl')
+        tracer = Tracer.from_config({'jsonl_path': absolute}, base_dir=os.path.join(tmp, 'other'))
+        assert tracer.writer.path == absolute
+        tracer.close()
+        assert Tracer.from_config({'jsonl_path': None}, base_dir=tmp).writer is None
+    print("✅ 追踪文件默认路径正常")
+
+
+if __name__ == "__main__":
+    test_span_timing()
+    test_prometheus_rendering()
+    test_jsonl_rotation()
+    test_default_path()
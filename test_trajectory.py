@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+鼠标轨迹规划和回放测试脚本:
+    python test_trajectory.py
+使用可控的时钟和记录移动的替身后端，不移动真实的鼠标
+"""
+
+import os
+import sys
+import time
+import threading
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from modules.cancellation import OperationCancelled, interruptible_sleep
+from modules.trajectory import TrajectoryPlayer, plan_eased_path, plan_bezier_path
+
+
+class FakeBackend:
+    """记录每次移动及其发生的时钟时间；每次移动消耗latency秒"""
+
+    def __init__(self, latency=0.0):
+        self.now = 0.0
+        self.latency = latency
+        self.moves = []
+
+    def clock(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += max(0.0, seconds)
+
+    def move_to(self, x, y):
+        self.moves.append((self.now, x, y))
+        self.now += self.latency
+
+
+def test_endpoints():
+    """轨迹从起点附近出发，最后一个点恰好落在终点，计划时间递增到duration"""
+    start, end = (100, 200), (900, 600)
+    for planner in (plan_eased_path, plan_bezier_path):
+        points = planner(start, end, 0.5, rate_hz=60)
+        assert len(points) == 30
+        assert (points[-1].x, points[-1].y, points[-1].t) == (900, 600, 0.5)
+        assert all(a.t < b.t for a, b in zip(points, points[1:])), "计划时间应严格递增"
+        assert abs(points[0].x - start[0]) < 20 and abs(points[0].y - start[1]) < 20, points[0]
+        assert planner(start, end, 0) == [(0.0, 900, 600)], "时长为0时直接移动到终点"
+
+    points = plan_eased_path(start, end, 0.5, jitter=0.0)
+    assert all(abs((p.y - 200) * 800 - (p.x - 100) * 400) < 1e-6 for p in points), "没有抖动时应在直线上"
+    points = plan_bezier_path(start, end, 0.5, curvature=0.0)
+    assert all(abs((p.y - 200) * 800 - (p.x - 100) * 400) < 1e-6 for p in points), "没有弯曲时应在直线上"
+    print("✅ 轨迹起终点正常")
+
+
+def test_monotonic_timing():
+    """按计划时间发出移动；注入太慢时跳过中间点，终点总会发出，总时长不超出计划太多"""
+    points = plan_eased_path((0, 0), (600, 300), 0.5, rate_hz=60)
+
+    backend = FakeBackend(latency=0.0)
+    result = TrajectoryPlayer(backend.move_to, clock=backend.clock, sleep=backend.sleep).play(points)
+    assert result.points_sent == len(points) and result.points_skipped == 0
+    assert [t for t, _, _ in backend.moves] == [p.t for p in points], "没有注入开销时应在计划时间发出"
+    assert backend.moves[-1][1:] == (600, 300) and result.actual == result.planned == 0.5
+
+    backend = FakeBackend(latency=0.05)  # 每次注入50ms，远慢于60Hz
+    player = TrajectoryPlayer(backend.move_to, clock=backend.clock, sleep=backend.sleep)
+    result = player.play(points)
+    times = [t for t, _, _ in backend.moves]
+    assert all(a <= b for a, b in zip(times, times[1:])), "移动时间应单调不减"
+    assert result.points_skipped > 0 and result.points_sent + result.points_skipped == len(points)
+    assert backend.moves[-1][1:] == (600, 300), "终点不应被跳过"
+    assert result.actual <= result.planned + 2 * backend.latency, result
+    assert abs(player.injection_overhead - 0.05) < 0.01, "应估计出注入开销"
+
+    assert TrajectoryPlayer(backend.move_to).play([]) == (0.0, 0.0, 0, 0)
+    print(f"✅ 回放时序正常 (慢速注入时跳过 {result.points_skipped}/{len(points)} 个点)")
+
+
+def test_cancellation():
+    """停止事件设置后回放立即中断，不再发出后续的点（包括终点）"""
+    points = plan_eased_path((0, 0), (600, 300), 0.5, rate_hz=60)
+    backend = FakeBackend()
+
+    def sleep(seconds):
+        backend.sleep(seconds)
+        if backend.now > 0.2:
+            raise OperationCancelled()
+
+    try:
+        TrajectoryPlayer(backend.move_to, clock=backend.clock, sleep=sleep).play(points)
+    except OperationCancelled:
+        pass
+    else:
+        raise AssertionError("休眠中被停止时应抛出OperationCancelled")
+    assert backend.moves and backend.moves[-1][0] <= 0.2
+    assert backend.moves[-1][1:] != (600, 300), "被停止后不应移动到终点"
+
+    # 真实时钟：与自动复制处理器一样用可中断的等待作为休眠函数
+    stop = threading.Event()
+    moves = []
+    player = TrajectoryPlayer(lambda x, y: moves.append((x, y)), sleep=lambda s: interruptible_sleep(stop, s))
+    threading.Timer(0.1, stop.set).start()
+    start = time.perf_counter()
+    try:
+        player.play(plan_eased_path((0, 0), (600, 300), 2.0, rate_hz=60))
+    except OperationCancelled:
+        elapsed = time.perf_counter() - start
+    else:
+        raise AssertionError("停止事件设置后应抛出OperationCancelled")
+    assert elapsed < 0.3, elapsed
+    assert 0 < len(moves) < 120 and moves[-1] != (600, 300)
+    print(f"✅ 停止时中断回放 ({elapsed * 1000:.0f}ms 返回)")
+
+
+if __name__ == "__main__":
+    test_endpoints()
+    test_monotonic_timing()
+    test_cancellation()
@@ -0,0 +1,29 @@
+# testing_support.py
+"""
+脚本式测试的共用工具
+测试脚本既可以直接运行（python test_xxx.py），也可以由pytest收集；
+缺少依赖或运行环境时，pytest中标记为skipped而不是算作通过
+"""
+
+import os
+import sys
+
+
+def skip(reason):
+    """
+    跳过当前测试：由pytest运行时抛出pytest的跳过异常，直接运行脚本时只打印提示，由调用方随后返回
+    """
+    print(f"⏭️ {reason}")
+    if 'pytest' in sys.modules:
+        import pytest
+        pytest.skip(reason)
+
+
+def qt_application():
+    """返回QApplication实例（没有时创建），未指定Qt平台时使用offscreen，不需要显示器"""
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    if 'pytest' in sys.modules:
+        import pytest
+        pytest.importorskip('PyQt5.QtWidgets')
+    from PyQt5.QtWidgets import QApplication
+    return QApplication.instance() or QApplication(sys.argv[:1])